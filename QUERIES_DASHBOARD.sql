@@ -23,15 +23,21 @@ ORDER BY date;
 -- ============================================
 -- 2. ANÁLISIS POR CONDICIÓN CLIMÁTICA
 -- ============================================
+-- Se agrega desde el agregado horario: promedios ponderados por viaje (no promedio
+-- de promedios ni de las horas con viajes) y taxis únicos combinando los sketches HLL++.
+-- Temperatura y precipitación son del día, repetidas en cada hora: se ponderan por
+-- los viajes de cada hora con dato
 SELECT 
   weather_category,
   COUNT(DISTINCT trip_date) as days_count,
   SUM(total_trips) as total_trips,
-  AVG(total_trips) as avg_trips_per_day,
-  AVG(avg_trip_duration_seconds) / 60 as avg_duration_minutes,
-  AVG(temperature) as avg_temperature,
-  AVG(precipitation) as avg_precipitation
-FROM `chicago-taxi-48702.chicago_taxi_gold.daily_summary`
+  SUM(total_trips) / COUNT(DISTINCT trip_date) as avg_trips_per_day,
+  HLL_COUNT.MERGE(taxi_id_sketch) as unique_taxis,
+  SAFE_DIVIDE(SUM(trip_seconds_sum), SUM(trip_seconds_count)) / 60 as avg_duration_minutes,
+  KLL_QUANTILES.MERGE_POINT_INT64(trip_seconds_sketch, 0.5) / 60 as median_duration_minutes,
+  SAFE_DIVIDE(SUM(temperature * total_trips), SUM(IF(temperature IS NULL, 0, total_trips))) as avg_temperature,
+  SAFE_DIVIDE(SUM(precipitation * total_trips), SUM(IF(precipitation IS NULL, 0, total_trips))) as avg_precipitation
+FROM `chicago-taxi-48702.chicago_taxi_gold.taxi_weather_hourly`
 GROUP BY weather_category
 ORDER BY total_trips DESC;
 
@@ -53,12 +59,15 @@ LIMIT 20;
 -- ============================================
 -- 4. ANÁLISIS POR HORA DEL DÍA Y CLIMA
 -- ============================================
+-- Mediana y taxis únicos correctos al sumar días: se combinan los sketches
 SELECT 
   trip_hour,
   weather_category,
-  SUM(trips_by_hour) as total_trips,
-  AVG(avg_trip_duration_seconds) / 60 as avg_duration_minutes
-FROM `chicago-taxi-48702.chicago_taxi_gold.taxi_weather_analysis`
+  SUM(total_trips) as total_trips,
+  HLL_COUNT.MERGE(taxi_id_sketch) as unique_taxis,
+  SAFE_DIVIDE(SUM(trip_seconds_sum), SUM(trip_seconds_count)) / 60 as avg_duration_minutes,
+  KLL_QUANTILES.MERGE_POINT_INT64(trip_seconds_sketch, 0.5) / 60 as median_duration_minutes
+FROM `chicago-taxi-48702.chicago_taxi_gold.taxi_weather_hourly`
 GROUP BY trip_hour, weather_category
 ORDER BY trip_hour, weather_category;
 
@@ -83,6 +92,7 @@ ORDER BY avg_trips_per_day DESC;
 -- ============================================
 -- 6. ANÁLISIS POR TEMPERATURA
 -- ============================================
+-- daily_summary tiene una fila por día: los AVG son por día (no por viaje)
 SELECT 
   temperature_category,
   COUNT(DISTINCT trip_date) as days,
@@ -6,24 +6,68 @@ from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.providers.google.cloud.operators.bigquery import BigQueryCheckOperator
 from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator
-from airflow.providers.google.cloud.transfers.bigquery_to_gcs import BigQueryToGCSOperator
 from airflow.providers.google.cloud.hooks.gcs import GCSHook
 from airflow.operators.python import PythonOperator
 from airflow.operators.python import ShortCircuitOperator
-from airflow.operators.bash import BashOperator
 from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
 import os
 
+from completeness import PartitionCompleteness, deduplicate_days, duplicate_days
+from dbt_runner import DbtBuildOperator
+from query_guard import GIB, QueryExecutor
+from taxi_sources import PUBLIC_TAXI_TABLE, TAXI_QUALITY_FILTER, TAXI_RAW_COLUMNS, build_source, ingest_taxi_delta
+from weather_trigger import WeatherIngestionOperator
+
 # Configuración - usar variables de Airflow si están disponibles
 from airflow.models import Variable
 
 try:
     PROJECT_ID = Variable.get('GCP_PROJECT_ID', default_var='chicago-taxi-48702')
     REGION = Variable.get('GCP_REGION', default_var='us-central1')
+    # Ventana de la carga histórica (fechas inclusive, YYYY-MM-DD)
+    HISTORY_START_DATE = Variable.get('HISTORY_START_DATE', default_var='2023-06-01')
+    HISTORY_END_DATE = Variable.get('HISTORY_END_DATE', default_var='2023-12-31')
+    # Codec del export a GCS: SNAPPY o ZSTD se leen más rápido que GZIP
+    TAXI_EXPORT_COMPRESSION = Variable.get('TAXI_EXPORT_COMPRESSION', default_var='SNAPPY')
+    # Pool de Airflow que limita cuántos meses de taxis se cargan a la vez
+    TAXI_SHARD_POOL = Variable.get('TAXI_SHARD_POOL', default_var='taxi_month_shards')
+    # Origen del delta diario de taxis: "public" o "parquet:<ruta>" (ver taxi_sources.py)
+    TAXI_DELTA_SOURCE = Variable.get('TAXI_DELTA_SOURCE', default_var='public')
+    TAXI_DELTA_LOOKBACK_DAYS = int(Variable.get('TAXI_DELTA_LOOKBACK_DAYS', default_var=3))
+    # Un día de taxis con menos viajes que esto se considera incompleto y se recarga su mes
+    TAXI_MIN_ROWS_PER_DAY = int(Variable.get('TAXI_MIN_ROWS_PER_DAY', default_var=1000))
+    # Backfill de clima: días por invocación de la función y cuántas invocaciones en paralelo
+    # (no más que el max_instance_count de la función en terraform)
+    WEATHER_CHUNK_DAYS = int(Variable.get('WEATHER_CHUNK_DAYS', default_var=31))
+    WEATHER_MAX_PARALLEL_INVOCATIONS = int(Variable.get('WEATHER_MAX_PARALLEL_INVOCATIONS', default_var=4))
+    # dbt: proyecto (con profiles.yml), estado de parseo persistido y threads de `dbt build`
+    DBT_PROJECT_DIR = Variable.get('DBT_PROJECT_DIR', default_var='/home/airflow/gcs/data/dbt')
+    DBT_STATE_DIR = Variable.get('DBT_STATE_DIR', default_var='/home/airflow/gcs/data/dbt_state')
+    DBT_THREADS = int(Variable.get('DBT_THREADS', default_var=4))
+    # Control de costo de las queries de cada tarea (ver query_guard.py): tope por query
+    # y presupuesto por tarea en GiB (0 = sin tope), y qué hacer al superar el presupuesto
+    QUERY_MAX_GIB_PER_QUERY = float(Variable.get('QUERY_MAX_GIB_PER_QUERY', default_var=100))
+    QUERY_MAX_GIB_PER_RUN = float(Variable.get('QUERY_MAX_GIB_PER_RUN', default_var=250))
+    QUERY_OVER_BUDGET = Variable.get('QUERY_OVER_BUDGET', default_var='batch')
 except:
     # Fallback si las variables no están disponibles
     PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'chicago-taxi-48702')
     REGION = os.environ.get('GCP_REGION', 'us-central1')
+    HISTORY_START_DATE = os.environ.get('HISTORY_START_DATE', '2023-06-01')
+    HISTORY_END_DATE = os.environ.get('HISTORY_END_DATE', '2023-12-31')
+    TAXI_EXPORT_COMPRESSION = os.environ.get('TAXI_EXPORT_COMPRESSION', 'SNAPPY')
+    TAXI_SHARD_POOL = os.environ.get('TAXI_SHARD_POOL', 'taxi_month_shards')
+    TAXI_DELTA_SOURCE = os.environ.get('TAXI_DELTA_SOURCE', 'public')
+    TAXI_DELTA_LOOKBACK_DAYS = int(os.environ.get('TAXI_DELTA_LOOKBACK_DAYS', 3))
+    TAXI_MIN_ROWS_PER_DAY = int(os.environ.get('TAXI_MIN_ROWS_PER_DAY', 1000))
+    WEATHER_CHUNK_DAYS = int(os.environ.get('WEATHER_CHUNK_DAYS', 31))
+    WEATHER_MAX_PARALLEL_INVOCATIONS = int(os.environ.get('WEATHER_MAX_PARALLEL_INVOCATIONS', 4))
+    DBT_PROJECT_DIR = os.environ.get('DBT_PROJECT_DIR', '/home/airflow/gcs/data/dbt')
+    DBT_STATE_DIR = os.environ.get('DBT_STATE_DIR', '/home/airflow/gcs/data/dbt_state')
+    DBT_THREADS = int(os.environ.get('DBT_THREADS', 4))
+    QUERY_MAX_GIB_PER_QUERY = float(os.environ.get('QUERY_MAX_GIB_PER_QUERY', 100))
+    QUERY_MAX_GIB_PER_RUN = float(os.environ.get('QUERY_MAX_GIB_PER_RUN', 250))
+    QUERY_OVER_BUDGET = os.environ.get('QUERY_OVER_BUDGET', 'batch')
 RAW_DATASET = 'chicago_taxi_raw'
 SILVER_DATASET = 'chicago_taxi_silver'
 GOLD_DATASET = 'chicago_taxi_gold'
@@ -53,129 +97,221 @@ historical_dag = DAG(
 daily_dag = DAG(
     'chicago_taxi_daily_pipeline',
     default_args=default_args,
-    description='Pipeline diario: ingesta de clima y transformaciones dbt',
+    description='Pipeline diario: delta de taxis, ingesta de clima y transformaciones dbt',
     schedule_interval='0 2 * * *',  # Diario a las 2 AM UTC
     catchup=False,
     tags=['daily', 'production'],
 )
 
+def guarded_client(location: str = REGION) -> QueryExecutor:
+    """Cliente de BigQuery de una tarea con dry-run y los topes de bytes configurados."""
+    client = BigQueryHook(project_id=PROJECT_ID, location=location).get_client(
+        project_id=PROJECT_ID, location=location
+    )
+    return QueryExecutor(
+        client,
+        max_bytes_per_query=int(QUERY_MAX_GIB_PER_QUERY * GIB) or None,
+        max_bytes_per_run=int(QUERY_MAX_GIB_PER_RUN * GIB) or None,
+        over_budget=QUERY_OVER_BUDGET,
+    )
+
+
 def check_historical_data_exists(**context):
-    """Verifica si ya existen datos históricos para evitar re-procesamiento."""
-    print(f"🔍 Verificando datos históricos en {PROJECT_ID}.{RAW_DATASET}.weather_data")
-    hook = BigQueryHook(project_id=PROJECT_ID, location=REGION)
-    # Usar formato correcto sin backticks alrededor del project_id
-    query = f"""
-    SELECT COUNT(DISTINCT date) as days_count
-    FROM `{PROJECT_ID}.{RAW_DATASET}.weather_data`
-    WHERE date >= '2023-06-01' AND date <= '2023-12-31'
     """
+    Verifica qué días de clima de la ventana histórica faltan en weather_data.
+
+    Lee los row counts de INFORMATION_SCHEMA.PARTITIONS (sin escanear la tabla) y
+    publica los días faltantes en XCom (key missing_days).
+    """
+    print(f"🔍 Verificando datos históricos en {PROJECT_ID}.{RAW_DATASET}.weather_data")
+    completeness = PartitionCompleteness(
+        guarded_client(),
+        f"{PROJECT_ID}.{RAW_DATASET}.weather_data",
+        location=REGION,
+    )
     try:
-        result = hook.get_first(query, project_id=PROJECT_ID, location=REGION)
-        days_count = result[0] if result else 0
-        print(f"📊 Días encontrados: {days_count}")
+        missing = completeness.missing_days(
+            datetime.strptime(HISTORY_START_DATE, '%Y-%m-%d'),
+            datetime.strptime(HISTORY_END_DATE, '%Y-%m-%d'),
+        )
     except Exception as e:
-        # Si la tabla no existe, asumimos que no hay datos históricos
+        # Si no se puede verificar, asumimos que no hay datos históricos
         print(f"⚠️  Error verificando datos históricos: {e}")
         print("   Asumiendo que no hay datos históricos y procediendo con la ingesta.")
         print("   Continuando con la ingesta histórica...")
         return
     
-    if days_count >= 180:
-        print(f"✅ Ya existen {days_count} días de datos históricos (>= 180).")
+    context['ti'].xcom_push(key='missing_days', value=[day.isoformat() for day in missing])
+    if not missing:
+        print(f"✅ Ya existen todos los días de {HISTORY_START_DATE} a {HISTORY_END_DATE} (metadatos: {completeness.source}).")
         print("   Continuando con el pipeline (dbt puede actualizar datos existentes).")
     else:
-        print(f"⚠️  Solo hay {days_count} días. Necesitamos ingesta histórica.")
+        print(f"⚠️  Faltan {len(missing)} días (primero {missing[0]}, último {missing[-1]}). Necesitamos ingesta histórica.")
         print("   Continuando con la ingesta histórica...")
 
-def trigger_weather_function(historical=True, **context):
-    """Trigger la Cloud Function de ingesta de clima usando ID token."""
-    import requests
-    import json
-    
-    function_url = Variable.get(
-        "WEATHER_FUNCTION_URL",
-        default_var=f"https://{REGION}-{PROJECT_ID}.cloudfunctions.net/weather-ingestion",
-    )
-    
-    # Obtener ID token para autenticación con Cloud Functions
-    # Cloud Functions requiere un ID token, no un access token
+def ensure_weather_raw_unique(**context):
+    """
+    Deja weather_data con una fila por fecha antes de dbt.
+
+    Las escrituras con streaming (UPSERT_WRITES=false) o las corridas anteriores al
+    MERGE pueden dejar fechas repetidas: se eliminan con un MERGE que conserva la
+    ingesta más reciente (idempotente, sólo toca los días repetidos). Devuelve True
+    si raw quedó sin duplicados; el XCom alimenta la var weather_raw_is_unique de dbt,
+    que con False mantiene la deduplicación en weather_silver.
+    """
+    table_id = f"{PROJECT_ID}.{RAW_DATASET}.weather_data"
+    client = guarded_client()
     try:
-        from google.auth import default
-        from google.auth.transport.requests import Request
-        from google.oauth2 import id_token
-        
-        # Obtener credenciales por defecto
-        credentials, project = default()
-        request_obj = Request()
-        
-        # Obtener ID token para la URL de la función
-        token = id_token.fetch_id_token(request_obj, function_url)
-        print(f"✅ ID token obtenido para autenticación")
+        duplicated = duplicate_days(client, table_id, location=REGION)
+        if duplicated:
+            print(f"🧹 {len(duplicated)} fechas repetidas en {table_id} (primera {duplicated[0]}), deduplicando...")
+            deduplicate_days(client, table_id, duplicated, order_by="ingestion_timestamp DESC", location=REGION)
+            duplicated = duplicate_days(client, table_id, location=REGION)
     except Exception as e:
-        print(f"⚠️  Error obteniendo ID token: {e}")
-        print("   Intentando con access token como fallback...")
-        try:
-            credentials.refresh(request_obj)
-            token = credentials.token
-            print(f"✅ Access token obtenido (puede no funcionar para funciones privadas)")
-        except Exception as e2:
-            print(f"❌ Error obteniendo cualquier token: {e2}")
-            token = None
-    
-    # Trigger con parámetro histórico
-    payload = {"historical": historical}
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+        print(f"⚠️  No se pudo verificar/deduplicar {table_id}: {e}")
+        print("   dbt mantiene la deduplicación en weather_silver.")
+        return False
     
-    try:
-        print(f"🔄 Invocando Cloud Function: {function_url}")
-        print(f"   Payload: {json.dumps(payload)}")
-        response = requests.post(function_url, json=payload, headers=headers, timeout=900)
-        if response.status_code == 404:
-            print("❌ Cloud Function no encontrada (404).")
-            print(f"   URL actual: {function_url}")
-            print("   Configura la variable Airflow WEATHER_FUNCTION_URL")
-            print("   con la URL real de la función desplegada.")
-        response.raise_for_status()
-        print(f"✅ Cloud Function triggered successfully: {response.status_code}")
-        if response.text:
-            print(f"   Response: {response.text[:200]}")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error triggering function: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"   Status code: {e.response.status_code}")
-            print(f"   Response: {e.response.text[:200]}")
-        raise
-    except Exception as e:
-        print(f"❌ Error inesperado: {e}")
-        raise
+    if duplicated:
+        print(f"⚠️  Siguen {len(duplicated)} fechas repetidas: dbt mantiene la deduplicación en weather_silver.")
+        return False
+    print(f"✅ {table_id} tiene una fila por fecha.")
+    return True
+
+# URL de la Cloud Function de clima: variable WEATHER_FUNCTION_URL o la URL por defecto
+# (template, se resuelve al ejecutar la tarea y no al parsear el DAG)
+WEATHER_FUNCTION_URL_TEMPLATE = (
+    "{{ var.value.get('WEATHER_FUNCTION_URL', "
+    f"'https://{REGION}-{PROJECT_ID}.cloudfunctions.net/weather-ingestion') }}}}"
+)
+
+
+def chunk_days(days: list, chunk_size: int) -> list:
+    """Divide una lista ordenada de fechas en chunks de a lo sumo chunk_size días."""
+    return [days[i:i + chunk_size] for i in range(0, len(days), chunk_size)]
+
+
+def plan_weather_backfill(context) -> list:
+    """
+    Payloads del backfill de clima: los días faltantes en chunks de WEATHER_CHUNK_DAYS.
+
+    Toma los días faltantes de check_historical_data (o toda la ventana si no se
+    pudieron calcular); cada chunk es una corrida {"dates": [...]} de la función.
+    """
+    missing_days = context['ti'].xcom_pull(task_ids='check_historical_data', key='missing_days')
+    if missing_days is None:
+        start = datetime.strptime(HISTORY_START_DATE, '%Y-%m-%d')
+        end = datetime.strptime(HISTORY_END_DATE, '%Y-%m-%d')
+        missing_days = [(start + timedelta(days=i)).date().isoformat() for i in range((end - start).days + 1)]
+    chunks = chunk_days(sorted(missing_days), WEATHER_CHUNK_DAYS)
+    print(f"🗓️  {len(missing_days)} días de clima faltantes en {len(chunks)} chunks")
+    return [{"dates": chunk} for chunk in chunks]
 
 EXPORT_BUCKET = f"{PROJECT_ID}-taxi-export"
-EXPORT_URI = f"gs://{EXPORT_BUCKET}/taxi_trips_*.parquet"
+# Un directorio por mes (month=YYYY-MM): cada shard mensual exporta y carga el suyo
+EXPORT_OBJECT_PREFIX = "taxi_trips_window"
+EXPORT_PREFIX = f"gs://{EXPORT_BUCKET}/{EXPORT_OBJECT_PREFIX}"
 RAW_TABLE_ID = f"{PROJECT_ID}.{RAW_DATASET}.taxi_trips_raw_table"
-EXTERNAL_TABLE_ID = f"{PROJECT_ID}.{RAW_DATASET}.taxi_trips_ext"
+
+def month_windows(start_date: str, end_date: str) -> list:
+    """
+    Divide el rango [start_date, end_date] en ventanas mensuales.
+
+    Args:
+        start_date: Fecha inicial inclusive (YYYY-MM-DD)
+        end_date: Fecha final inclusive (YYYY-MM-DD)
+
+    Returns:
+        Lista de dicts {"month": "YYYY-MM", "start": "YYYY-MM-DD", "end": "YYYY-MM-DD"};
+        el primer y el último mes se recortan al rango
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    windows = []
+    current = start
+    while current <= end:
+        next_month = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(end, next_month - timedelta(days=1))
+        windows.append({
+            "month": current.strftime('%Y-%m'),
+            "start": current.isoformat(),
+            "end": window_end.isoformat(),
+        })
+        current = next_month
+    return windows
+
+
+def build_taxi_export_sql(window: dict) -> str:
+    """
+    EXPORT DATA de un mes del dataset público: sólo las columnas de raw y las filas
+    de la ventana que pasan los filtros de calidad de la carga.
+    """
+    columns = ",\n      ".join(TAXI_RAW_COLUMNS)
+    return f"""
+    EXPORT DATA OPTIONS (
+      uri = '{EXPORT_PREFIX}/month={window["month"]}/part-*.parquet',
+      format = 'PARQUET',
+      compression = '{TAXI_EXPORT_COMPRESSION}',
+      overwrite = true
+    ) AS
+    SELECT
+      {columns}
+    FROM `{PUBLIC_TAXI_TABLE}`
+    WHERE DATE(trip_start_timestamp) BETWEEN '{window["start"]}' AND '{window["end"]}'
+      AND {TAXI_QUALITY_FILTER}
+    """
+
+
+def build_taxi_month_load_sql(window: dict) -> str:
+    """
+    Reemplaza un mes de taxi_trips_raw_table con los archivos exportados de ese mes.
+
+    DELETE + LOAD sobre las particiones del mes: re-ejecutar el shard (retry) deja el
+    mismo resultado en vez de duplicar filas.
+    """
+    return f"""
+    DELETE FROM `{RAW_TABLE_ID}`
+    WHERE DATE(trip_start_timestamp) BETWEEN '{window["start"]}' AND '{window["end"]}';
+
+    LOAD DATA INTO `{RAW_TABLE_ID}`
+    FROM FILES (
+      format = 'PARQUET',
+      uris = ['{EXPORT_PREFIX}/month={window["month"]}/*.parquet']
+    );
+    """
 
 
 def taxi_data_missing(**context) -> bool:
-    """Evita re-procesar si la tabla ya tiene datos."""
-    hook = BigQueryHook(project_id=PROJECT_ID, location=REGION)
-    query = f"SELECT COUNT(*) as cnt FROM `{RAW_TABLE_ID}`"
+    """
+    Evita re-procesar si raw ya tiene todos los días de la ventana histórica.
+
+    Un día falta si su partición no existe o tiene menos de TAXI_MIN_ROWS_PER_DAY
+    filas (INFORMATION_SCHEMA.PARTITIONS, sin escanear raw). Los días faltantes se
+    publican en XCom (key missing_days) para cargar sólo sus meses.
+    """
+    completeness = PartitionCompleteness(
+        guarded_client(),
+        RAW_TABLE_ID,
+        date_expression="DATE(trip_start_timestamp)",
+        location=REGION,
+    )
     try:
-        result = hook.get_first(query, project_id=PROJECT_ID, location=REGION)
-        row_count = result[0] if result else 0
-        if row_count > 0:
-            print(f"✅ taxi_trips_raw_table ya tiene {row_count:,} registros. Saltando carga.")
-            return False
-        print("⚠️  Tabla existe pero está vacía. Procediendo con la carga.")
-        return True
+        missing = completeness.missing_days(
+            datetime.strptime(HISTORY_START_DATE, '%Y-%m-%d'),
+            datetime.strptime(HISTORY_END_DATE, '%Y-%m-%d'),
+            min_rows=TAXI_MIN_ROWS_PER_DAY,
+        )
     except Exception as e:
         print(f"⚠️  No se pudo verificar la tabla: {e}")
         print("   Asumiendo que no hay datos. Procediendo con la carga.")
         return True
+    
+    if not missing:
+        print(f"✅ taxi_trips_raw_table ya tiene todos los días de {HISTORY_START_DATE} a {HISTORY_END_DATE}. Saltando carga.")
+        return False
+    context['ti'].xcom_push(key='missing_days', value=[day.isoformat() for day in missing])
+    print(f"⚠️  {len(missing)} días faltantes o con menos de {TAXI_MIN_ROWS_PER_DAY} viajes. Procediendo con la carga.")
+    return True
 
 
 def ensure_export_bucket(**context):
@@ -193,6 +329,8 @@ def ensure_export_bucket(**context):
 check_taxi_data = ShortCircuitOperator(
     task_id='check_taxi_data_missing',
     python_callable=taxi_data_missing,
+    # Sólo saltea la rama de taxis: clima y dbt siguen con su trigger rule
+    ignore_downstream_trigger_rules=False,
     dag=historical_dag,
 )
 
@@ -202,36 +340,6 @@ create_export_bucket = PythonOperator(
     dag=historical_dag,
 )
 
-export_public_taxi_to_gcs = BigQueryToGCSOperator(
-    task_id='export_public_taxi_to_gcs',
-    source_project_dataset_table='bigquery-public-data:chicago_taxi_trips.taxi_trips',
-    destination_cloud_storage_uris=[EXPORT_URI],
-    export_format='PARQUET',
-    compression='GZIP',
-    project_id=PROJECT_ID,
-    location="US",
-    gcp_conn_id='google_cloud_default',
-    dag=historical_dag,
-)
-
-create_external_table = BigQueryInsertJobOperator(
-    task_id='create_external_taxi_table',
-    configuration={
-        "query": {
-            "query": f"""
-            CREATE EXTERNAL TABLE IF NOT EXISTS `{EXTERNAL_TABLE_ID}`
-            OPTIONS (
-              format = 'PARQUET',
-              uris = ['{EXPORT_URI}']
-            )
-            """,
-            "useLegacySql": False,
-        }
-    },
-    location=REGION,
-    dag=historical_dag,
-)
-
 create_raw_table = BigQueryInsertJobOperator(
     task_id='create_raw_taxi_table',
     configuration={
@@ -269,50 +377,80 @@ create_raw_table = BigQueryInsertJobOperator(
     dag=historical_dag,
 )
 
-load_historical_taxi = BigQueryInsertJobOperator(
-    task_id='load_historical_taxi_data',
-    configuration={
-        "query": {
-            "query": f"""
-            INSERT INTO `{RAW_TABLE_ID}`
-            SELECT
-              unique_key,
-              taxi_id,
-              trip_start_timestamp,
-              trip_end_timestamp,
-              trip_seconds,
-              trip_miles,
-              CAST(pickup_census_tract AS STRING),
-              CAST(dropoff_census_tract AS STRING),
-              pickup_community_area,
-              dropoff_community_area,
-              fare,
-              tips,
-              tolls,
-              extras,
-              trip_total,
-              payment_type,
-              company,
-              pickup_latitude,
-              pickup_longitude,
-              dropoff_latitude,
-              dropoff_longitude
-            FROM `{EXTERNAL_TABLE_ID}`
-            WHERE DATE(trip_start_timestamp) >= '2023-06-01'
-              AND DATE(trip_start_timestamp) <= '2023-12-31'
-              AND trip_start_timestamp IS NOT NULL
-              AND trip_seconds IS NOT NULL
-              AND trip_seconds > 0
-              AND trip_miles >= 0
-            """,
-            "useLegacySql": False,
-            "priority": "BATCH",
-        }
-    },
-    location=REGION,
+def plan_taxi_month_shards(**context) -> list:
+    """
+    Arma un shard por mes de la ventana histórica (mapeado por load_taxi_month).
+
+    Sólo se cargan los meses con días faltantes según check_taxi_data_missing. La
+    ventana se puede sobrescribir al disparar el DAG con
+    {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"} en la configuración
+    (en ese caso se recargan todos sus meses).
+    """
+    conf = context["dag_run"].conf or {}
+    start_date = conf.get("start_date", HISTORY_START_DATE)
+    end_date = conf.get("end_date", HISTORY_END_DATE)
+    windows = month_windows(start_date, end_date)
+    missing_days = context["ti"].xcom_pull(task_ids='check_taxi_data_missing', key='missing_days')
+    if missing_days and not ("start_date" in conf or "end_date" in conf):
+        missing_months = {day[:7] for day in missing_days}
+        windows = [window for window in windows if window["month"] in missing_months]
+    print(f"🗓️  {len(windows)} shards mensuales de {start_date} a {end_date}")
+    return [{"window": window} for window in windows]
+
+
+def clear_export_month(month: str):
+    """Borra los archivos de un mes en GCS para que un retry no mezcle exports."""
+    hook = GCSHook()
+    for object_name in hook.list(EXPORT_BUCKET, prefix=f"{EXPORT_OBJECT_PREFIX}/month={month}/"):
+        hook.delete(EXPORT_BUCKET, object_name)
+
+
+def load_taxi_month(window: dict, **context):
+    """
+    Carga un mes de taxis: export filtrado a GCS (en US) y DELETE + LOAD en raw (en REGION).
+
+    Idempotente por mes, así que los retries de Airflow rehacen sólo este shard.
+    """
+    print(f"🔄 Mes {window['month']}: {window['start']} a {window['end']}")
+    clear_export_month(window["month"])
+
+    # El export lee la tabla pública completa (no está particionada): pasa por el
+    # dry-run y los topes de bytes antes de ejecutarse
+    export_client = guarded_client("US")
+    export_job = export_client.query(build_taxi_export_sql(window), location="US")
+    export_job.result()
+    print(f"   ✅ Export: {export_job.total_bytes_processed or 0:,} bytes leídos "
+          f"(presupuesto: {export_client.summary()})")
+
+    load_hook = BigQueryHook(project_id=PROJECT_ID, location=REGION)
+    load_hook.insert_job(
+        configuration={
+            "query": {
+                "query": build_taxi_month_load_sql(window),
+                "useLegacySql": False,
+                "priority": "BATCH",
+            }
+        },
+        project_id=PROJECT_ID,
+        location=REGION,
+    )
+    print(f"   ✅ Mes {window['month']} cargado en {RAW_TABLE_ID}")
+
+
+plan_taxi_shards = PythonOperator(
+    task_id='plan_taxi_month_shards',
+    python_callable=plan_taxi_month_shards,
     dag=historical_dag,
 )
 
+# Un task instance por mes; el pool limita la concurrencia entre meses
+load_taxi_months = PythonOperator.partial(
+    task_id='load_taxi_month',
+    python_callable=load_taxi_month,
+    pool=TAXI_SHARD_POOL,
+    dag=historical_dag,
+).expand(op_kwargs=plan_taxi_shards.output)
+
 # Tareas para DAG histórico
 check_historical = PythonOperator(
     task_id='check_historical_data',
@@ -321,128 +459,125 @@ check_historical = PythonOperator(
     dag=historical_dag,
 )
 
-trigger_weather_historical = PythonOperator(
+# Corridas asíncronas de la función: el operador difiere al triggerer y no ocupa un worker
+trigger_weather_historical = WeatherIngestionOperator(
     task_id='trigger_weather_historical',
-    python_callable=trigger_weather_function,
-    op_kwargs={'historical': True},
+    function_url=WEATHER_FUNCTION_URL_TEMPLATE,
+    plan_callable=plan_weather_backfill,
+    max_parallel=WEATHER_MAX_PARALLEL_INVOCATIONS,
     pool=None,  # No usar pool
     dag=historical_dag,
 )
 
-run_dbt_silver = BashOperator(
-    task_id='run_dbt_silver',
-    bash_command="""
-    cd /home/airflow/gcs/data/dbt && \
-    export GCP_PROJECT_ID='{{ params.project_id }}' && \
-    export DBT_DATASET=chicago_taxi_silver && \
-    # NO usar GOOGLE_APPLICATION_CREDENTIALS - usar ADC de Airflow (oauth)
-    # Esto permite acceder a datasets públicos de BigQuery
-    unset GOOGLE_APPLICATION_CREDENTIALS || true && \
-    # Verificar que dbt esté instalado, si no, instalarlo
-    python3 -m pip install --user dbt-bigquery 2>/dev/null || echo "dbt ya instalado o error en instalación" && \
-    # Ejecutar dbt para crear taxi_trips_silver y weather_silver
-    # Usa oauth (Application Default Credentials) para acceder a datasets públicos
-    dbt run --select silver --profiles-dir /home/airflow/gcs/data/dbt
-    """,
-    params={
-        'project_id': PROJECT_ID,
-    },
+# Clima de todas las estaciones del área y dimensión estación más cercana por community
+# area / celda de pickups: la dimensión usa los pickups de raw, así que corre después
+# de la carga de taxis (aunque esa rama se haya salteado porque ya había datos)
+trigger_weather_stations_historical = WeatherIngestionOperator(
+    task_id='trigger_weather_stations_historical',
+    function_url=WEATHER_FUNCTION_URL_TEMPLATE,
+    payloads=[{
+        "stations": True,
+        "start_date": HISTORY_START_DATE,
+        "end_date": HISTORY_END_DATE,
+        "rebuild_lookup": True,
+    }],
+    trigger_rule='none_failed',
     pool=None,  # No usar pool
     dag=historical_dag,
 )
 
-run_dbt_gold = BashOperator(
-    task_id='run_dbt_gold',
-    bash_command="""
-    cd /home/airflow/gcs/data/dbt && \
-    export GCP_PROJECT_ID='{{ params.project_id }}' && \
-    export DBT_DATASET=chicago_taxi_silver && \
-    # NO usar GOOGLE_APPLICATION_CREDENTIALS - usar ADC de Airflow (oauth)
-    unset GOOGLE_APPLICATION_CREDENTIALS || true && \
-    # Verificar que dbt esté instalado, si no, instalarlo
-    python3 -m pip install --user dbt-bigquery 2>/dev/null || echo "dbt ya instalado o error en instalación" && \
-    # Ejecutar dbt
-    dbt run --select gold --profiles-dir /home/airflow/gcs/data/dbt
-    """,
-    params={
-        'project_id': PROJECT_ID,
+# dbt en el proceso del worker: modelos y tests en un solo `dbt build`
+DBT_COMMON_KWARGS = dict(
+    project_dir=DBT_PROJECT_DIR,
+    profiles_dir=DBT_PROJECT_DIR,
+    state_dir=DBT_STATE_DIR,
+    threads=DBT_THREADS,
+    env={
+        'GCP_PROJECT_ID': PROJECT_ID,
+        'DBT_DATASET': SILVER_DATASET,
     },
-    pool=None,  # No usar pool
+)
+
+# weather_raw_is_unique según lo que verificó ensure_weather_raw_unique en esta corrida
+DBT_WEATHER_VARS = {
+    'weather_raw_is_unique': "{{ ti.xcom_pull(task_ids='ensure_weather_raw_unique') }}",
+}
+
+ensure_weather_unique_historical = PythonOperator(
+    task_id='ensure_weather_raw_unique',
+    python_callable=ensure_weather_raw_unique,
+    trigger_rule='none_failed',
     dag=historical_dag,
 )
 
-run_dbt_tests = BashOperator(
-    task_id='run_dbt_tests',
-    bash_command="""
-    cd /home/airflow/gcs/data/dbt && \
-    export GCP_PROJECT_ID='{{ params.project_id }}' && \
-    export DBT_DATASET=chicago_taxi_silver && \
-    unset GOOGLE_APPLICATION_CREDENTIALS || true && \
-    python3 -m pip install --user dbt-bigquery 2>/dev/null || echo "dbt ya instalado o error en instalación" && \
-    dbt test --profiles-dir /home/airflow/gcs/data/dbt
-    """,
-    params={
-        'project_id': PROJECT_ID,
-    },
-    pool=None,
+run_dbt_build = DbtBuildOperator(
+    task_id='run_dbt_build',
+    # --full-refresh: después de la carga histórica se reconstruyen todas las particiones
+    full_refresh=True,
+    pool=None,  # No usar pool
+    # Corre cuando terminan ambas ramas, aunque la de taxis se haya salteado
+    trigger_rule='none_failed',
+    dbt_vars=DBT_WEATHER_VARS,
     dag=historical_dag,
+    **DBT_COMMON_KWARGS,
 )
 
 # Tareas para DAG diario
-trigger_weather_daily = PythonOperator(
+def load_taxi_delta(**context):
+    """Delta diario de taxis: watermark guardado + MERGE por unique_key en raw, hasta el fin del intervalo."""
+    client = guarded_client()
+    source = build_source(TAXI_DELTA_SOURCE, EXPORT_PREFIX, TAXI_EXPORT_COMPRESSION)
+    summary = ingest_taxi_delta(
+        client,
+        source,
+        RAW_TABLE_ID,
+        lookback_days=TAXI_DELTA_LOOKBACK_DAYS,
+        run_id=context['run_id'],
+        until=context['data_interval_end'],
+    )
+    return {**summary, "query_budget": client.summary()}
+
+
+load_taxi_delta_daily = PythonOperator(
+    task_id='load_taxi_delta',
+    python_callable=load_taxi_delta,
+    dag=daily_dag,
+)
+
+trigger_weather_daily = WeatherIngestionOperator(
     task_id='trigger_weather_daily',
-    python_callable=trigger_weather_function,
-    op_kwargs={'historical': False},
+    function_url=WEATHER_FUNCTION_URL_TEMPLATE,
+    # Clima de la ciudad (O'Hare + fallback de API) y de todas las estaciones del área
+    payloads=[{"historical": False}, {"stations": True}],
     dag=daily_dag,
 )
 
-run_dbt_daily = BashOperator(
-    task_id='run_dbt_daily',
-    bash_command="""
-    cd /home/airflow/gcs/data/dbt && \
-    export GCP_PROJECT_ID='{{ params.project_id }}' && \
-    export DBT_DATASET=chicago_taxi_silver && \
-    # NO usar GOOGLE_APPLICATION_CREDENTIALS - usar ADC de Airflow (oauth)
-    unset GOOGLE_APPLICATION_CREDENTIALS || true && \
-    # Verificar que dbt esté instalado, si no, instalarlo
-    python3 -m pip install --user dbt-bigquery 2>/dev/null || echo "dbt ya instalado o error en instalación" && \
-    # Ejecutar dbt
-    dbt run --profiles-dir /home/airflow/gcs/data/dbt
-    """,
-    params={
-        'project_id': PROJECT_ID,
-    },
+ensure_weather_unique_daily = PythonOperator(
+    task_id='ensure_weather_raw_unique',
+    python_callable=ensure_weather_raw_unique,
     dag=daily_dag,
 )
 
-run_dbt_daily_tests = BashOperator(
-    task_id='run_dbt_daily_tests',
-    bash_command="""
-    cd /home/airflow/gcs/data/dbt && \
-    export GCP_PROJECT_ID='{{ params.project_id }}' && \
-    export DBT_DATASET=chicago_taxi_silver && \
-    unset GOOGLE_APPLICATION_CREDENTIALS || true && \
-    python3 -m pip install --user dbt-bigquery 2>/dev/null || echo "dbt ya instalado o error en instalación" && \
-    dbt test --profiles-dir /home/airflow/gcs/data/dbt
-    """,
-    params={
-        'project_id': PROJECT_ID,
-    },
+run_dbt_daily = DbtBuildOperator(
+    task_id='run_dbt_daily',
+    dbt_vars=DBT_WEATHER_VARS,
     dag=daily_dag,
+    **DBT_COMMON_KWARGS,
 )
 
 # Dependencias para DAG histórico
-# 1. Activar acceso al dataset público (intenta activar si no está activado)
-# 2. Cargar datos históricos de taxis a tabla propia (lee del dataset público)
-# 3. Verificar datos históricos de clima
-# 4. Cargar datos históricos de clima
-# 1. Verificar si ya existen datos históricos de taxis
-# 2. Exportar dataset público a GCS
-# 3. Crear tabla externa
-# 4. Crear tabla raw (si no existe) e insertar datos filtrados
-# 5. Verificar y cargar datos históricos de clima
-# 6. Ejecutar dbt silver y gold
-check_taxi_data >> create_export_bucket >> export_public_taxi_to_gcs >> create_external_table >> create_raw_table >> load_historical_taxi >> check_historical >> trigger_weather_historical >> run_dbt_silver >> run_dbt_gold >> run_dbt_tests
+# Rama de taxis: verificar si ya hay datos, crear bucket y tabla raw, y cargar un
+# shard por mes (export filtrado + DELETE/LOAD, en paralelo según el pool)
+# Rama de clima (en paralelo): verificar y cargar datos históricos de clima
+# Clima por estación y su dimensión después de la carga de taxis
+# dbt build (silver, gold y tests) cuando terminan las ramas, después de dejar
+# weather_data con una fila por fecha
+check_taxi_data >> create_export_bucket >> create_raw_table >> plan_taxi_shards >> load_taxi_months
+load_taxi_months >> trigger_weather_stations_historical
+check_historical >> trigger_weather_historical
+[load_taxi_months, trigger_weather_historical, trigger_weather_stations_historical] >> ensure_weather_unique_historical
+ensure_weather_unique_historical >> run_dbt_build
 
 # Dependencias para DAG diario
-trigger_weather_daily >> run_dbt_daily >> run_dbt_daily_tests
+# Delta de taxis y clima en paralelo, dbt build cuando terminan ambos
+[load_taxi_delta_daily, trigger_weather_daily] >> ensure_weather_unique_daily >> run_dbt_daily
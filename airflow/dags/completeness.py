@@ -0,0 +1 @@
+../../functions/weather_ingestion/completeness.py
\ No newline at end of file
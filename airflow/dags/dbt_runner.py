@@ -0,0 +1,220 @@
+"""
+dbt en el proceso del worker, con el parseo del proyecto persistido entre corridas.
+
+Se copia junto a los DAGs en Composer y se importa desde chicago_taxi_pipeline.py.
+
+DbtBuildOperator reemplaza a los BashOperator que hacían `pip install` + `dbt run` /
+`dbt test` en un proceso nuevo por tarea:
+- Invoca dbt con dbtRunner (dbt-core >= 1.5, instalado como paquete PyPI de Composer)
+- Modelos y tests en un solo `dbt build`, con threads configurables
+- partial_parse.msgpack y manifest.json se guardan en state_dir (en el bucket de
+  Composer) y se restauran al target local antes de cada corrida, así dbt sólo
+  re-parsea los archivos que cambiaron. No se cachea el Manifest en el proceso:
+  después de un redeploy del proyecto el worker vería modelos viejos, y el parseo
+  parcial ya compara los archivos del proyecto contra el estado guardado
+- target/ y logs/ van a un directorio local del worker, nunca al proyecto montado
+  desde el bucket
+- El entorno de la tarea (env) sólo se aplica durante la invocación de dbt y
+  después se restaura, para no filtrarse a otras tareas del mismo proceso
+- Los tiempos por nodo de run_results se devuelven como XCom y se emiten como
+  métricas de Airflow (dbt.node.<nombre>.execute_ms)
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+
+# Artefactos que se conservan entre corridas (los demás se regeneran)
+STATE_FILES = ("partial_parse.msgpack", "manifest.json")
+
+
+@contextlib.contextmanager
+def scoped_environ(env: Dict[str, str], unset: Sequence[str] = ()) -> Iterator[None]:
+    """
+    Aplica env (y quita las variables de unset) sólo dentro del bloque.
+
+    Al salir restaura os.environ como estaba: el worker de Airflow reutiliza el
+    proceso para otras tareas.
+    """
+    names = set(env) | set(unset)
+    previous = {name: os.environ.get(name) for name in names}
+    try:
+        for name in unset:
+            os.environ.pop(name, None)
+        os.environ.update(env)
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def restore_state(state_dir: str, target_path: str) -> List[str]:
+    """Copia los artefactos guardados al target local si son más nuevos."""
+    os.makedirs(target_path, exist_ok=True)
+    restored = []
+    for name in STATE_FILES:
+        source = os.path.join(state_dir, name)
+        destination = os.path.join(target_path, name)
+        if os.path.exists(source) and (
+            not os.path.exists(destination) or os.path.getmtime(source) > os.path.getmtime(destination)
+        ):
+            shutil.copy2(source, destination)
+            restored.append(name)
+    return restored
+
+
+def save_state(target_path: str, state_dir: str) -> None:
+    """Guarda los artefactos del target local en state_dir para la próxima corrida."""
+    os.makedirs(state_dir, exist_ok=True)
+    for name in STATE_FILES:
+        source = os.path.join(target_path, name)
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(state_dir, name))
+
+
+def node_timings(run_results: Any) -> List[Dict[str, Any]]:
+    """
+    Tiempos por nodo de un RunExecutionResult de dbt, del más lento al más rápido.
+
+    Returns:
+        Lista de {"unique_id", "name", "resource_type", "status", "execution_time",
+        "compile_s", "execute_s", "bytes_processed"}
+    """
+    timings = []
+    for result in run_results.results:
+        phases = {
+            timing.name: (timing.completed_at - timing.started_at).total_seconds()
+            for timing in result.timing
+            if timing.started_at and timing.completed_at
+        }
+        adapter_response = result.adapter_response or {}
+        timings.append({
+            "unique_id": result.node.unique_id,
+            "name": result.node.name,
+            "resource_type": str(result.node.resource_type),
+            "status": str(result.status),
+            "execution_time": round(result.execution_time or 0.0, 3),
+            "compile_s": round(phases.get("compile", 0.0), 3),
+            "execute_s": round(phases.get("execute", 0.0), 3),
+            "bytes_processed": adapter_response.get("bytes_processed"),
+        })
+    return sorted(timings, key=lambda timing: timing["execution_time"], reverse=True)
+
+
+class DbtBuildOperator(BaseOperator):
+    """
+    Ejecuta `dbt build` en el proceso del worker.
+
+    Args:
+        project_dir: Directorio del proyecto dbt
+        profiles_dir: Directorio de profiles.yml
+        state_dir: Dónde persistir partial_parse.msgpack y manifest.json entre corridas
+        select: Selectores de nodos (vacío = todo el proyecto)
+        exclude: Selectores a excluir
+        full_refresh: Reconstruir los modelos incrementales completos
+        threads: Threads de dbt (None = los de profiles.yml)
+        dbt_vars: Variables de dbt (--vars)
+        env: Variables de entorno para el proyecto (p. ej. GCP_PROJECT_ID)
+    """
+
+    template_fields = ("select", "exclude", "dbt_vars", "env")
+    ui_color = "#ff694a"
+
+    def __init__(self, *, project_dir: str, profiles_dir: str, state_dir: str,
+                 select: Sequence[str] = (), exclude: Sequence[str] = (), full_refresh: bool = False,
+                 threads: Optional[int] = None, dbt_vars: Optional[Dict[str, Any]] = None,
+                 env: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.project_dir = project_dir
+        self.profiles_dir = profiles_dir
+        self.state_dir = state_dir
+        self.select = list(select)
+        self.exclude = list(exclude)
+        self.full_refresh = full_refresh
+        self.threads = threads
+        self.dbt_vars = dbt_vars or {}
+        self.env = env or {}
+
+    def _target_path(self) -> str:
+        # Target local al worker: el bucket montado (gcsfuse) es lento para los artefactos
+        return os.path.join(tempfile.gettempdir(), "dbt_target", os.path.basename(self.project_dir.rstrip("/")))
+
+    def _log_path(self) -> str:
+        # Sin --log-path dbt escribe logs/ dentro del proyecto, es decir en el bucket
+        return os.path.join(tempfile.gettempdir(), "dbt_logs", os.path.basename(self.project_dir.rstrip("/")))
+
+    def _common_args(self, target_path: str) -> List[str]:
+        return [
+            "--project-dir", self.project_dir,
+            "--profiles-dir", self.profiles_dir,
+            "--target-path", target_path,
+            "--log-path", self._log_path(),
+        ]
+
+    def build_args(self, target_path: str) -> List[str]:
+        """Argumentos de `dbt build` para esta tarea."""
+        args = ["build", *self._common_args(target_path)]
+        if self.select:
+            args += ["--select", *self.select]
+        if self.exclude:
+            args += ["--exclude", *self.exclude]
+        if self.full_refresh:
+            args.append("--full-refresh")
+        if self.threads:
+            args += ["--threads", str(self.threads)]
+        if self.dbt_vars:
+            args += ["--vars", json.dumps(self.dbt_vars)]
+        return args
+
+    def execute(self, context):
+        try:
+            from dbt.cli.main import dbtRunner
+        except ImportError as e:
+            raise AirflowException(
+                "dbt-core >= 1.5 no está instalado en el entorno de Airflow "
+                "(agregar dbt-bigquery a los paquetes PyPI de Composer)"
+            ) from e
+
+        target_path = self._target_path()
+        restored = restore_state(self.state_dir, target_path)
+        print(f"📦 Estado de parseo restaurado: {', '.join(restored) or 'ninguno (parseo completo)'}")
+
+        # Las credenciales vienen de ADC (oauth en profiles.yml), no de un keyfile
+        with scoped_environ(self.env, unset=("GOOGLE_APPLICATION_CREDENTIALS",)):
+            # `dbt build` parsea con partial_parse.msgpack: sólo los archivos cambiados
+            args = self.build_args(target_path)
+            print(f"🔄 dbt {' '.join(args)}")
+            result = dbtRunner().invoke(args)
+        save_state(target_path, self.state_dir)
+
+        if result.exception is not None:
+            raise AirflowException(f"dbt build falló: {result.exception}")
+
+        timings = node_timings(result.result)
+        self._emit_metrics(timings)
+        for timing in timings[:10]:
+            print(f"   {timing['execution_time']:>8.2f}s  {timing['status']:<8} {timing['unique_id']}")
+
+        failed = [timing["unique_id"] for timing in timings if timing["status"] in ("error", "fail")]
+        if not result.success or failed:
+            raise AirflowException(f"dbt build con {len(failed)} nodos fallidos: {', '.join(failed)}")
+        return {
+            "elapsed_s": round(result.result.elapsed_time, 3),
+            "nodes": timings,
+        }
+
+    def _emit_metrics(self, timings: List[Dict[str, Any]]) -> None:
+        """Tiempo de cada nodo como métrica de Airflow (StatsD si está configurado)."""
+        from airflow.stats import Stats
+
+        for timing in timings:
+            Stats.timing(f"dbt.node.{timing['name']}.execute_ms", timing["execution_time"] * 1000)
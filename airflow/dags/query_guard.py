@@ -0,0 +1 @@
+../../functions/weather_ingestion/query_guard.py
\ No newline at end of file
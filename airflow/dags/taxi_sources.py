@@ -0,0 +1,395 @@
+"""
+Ingesta incremental de viajes de taxi hacia taxi_trips_raw_table.
+
+Se copia junto a los DAGs en Composer y se importa desde chicago_taxi_pipeline.py.
+
+Flujo del delta diario (ingest_taxi_delta):
+1. Watermark: el MAX(trip_start_timestamp) ya mergeado, guardado por corrida en
+   taxi_delta_watermarks (una fila por tabla raw y origen). La primera vez sale de
+   las últimas particiones de raw (la última se obtiene de
+   INFORMATION_SCHEMA.PARTITIONS, sin escanear raw)
+2. El origen escribe en una tabla staging propia de la corrida los viajes con
+   trip_start_timestamp en [inicio del día del watermark - lookback, until): los
+   nuevos y posibles correcciones de viajes recientes, acotados al intervalo de la
+   corrida
+3. MERGE por unique_key: inserta los nuevos, actualiza los que cambiaron y sólo
+   toca las particiones de las fechas presentes en staging
+4. Guarda el nuevo watermark (nunca retrocede)
+
+El origen es intercambiable: PublicDatasetTaxiSource (dataset público en US, vía
+EXPORT DATA a GCS) o ParquetTaxiSource (archivos Parquet leídos con DuckDB, para
+pruebas locales o cargas manuales).
+"""
+
+import abc
+import os
+import re
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+from google.cloud import bigquery
+
+from query_guard import run_query
+
+PUBLIC_TAXI_TABLE = "bigquery-public-data.chicago_taxi_trips.taxi_trips"
+# Tabla de watermarks del delta (terraform), en el dataset de raw
+WATERMARK_TABLE_NAME = "taxi_delta_watermarks"
+
+# Esquema de taxi_trips_raw_table, en orden
+TAXI_RAW_SCHEMA = [
+    ("unique_key", "STRING"),
+    ("taxi_id", "STRING"),
+    ("trip_start_timestamp", "TIMESTAMP"),
+    ("trip_end_timestamp", "TIMESTAMP"),
+    ("trip_seconds", "INT64"),
+    ("trip_miles", "FLOAT64"),
+    ("pickup_census_tract", "STRING"),
+    ("dropoff_census_tract", "STRING"),
+    ("pickup_community_area", "INT64"),
+    ("dropoff_community_area", "INT64"),
+    ("fare", "FLOAT64"),
+    ("tips", "FLOAT64"),
+    ("tolls", "FLOAT64"),
+    ("extras", "FLOAT64"),
+    ("trip_total", "FLOAT64"),
+    ("payment_type", "STRING"),
+    ("company", "STRING"),
+    ("pickup_latitude", "FLOAT64"),
+    ("pickup_longitude", "FLOAT64"),
+    ("dropoff_latitude", "FLOAT64"),
+    ("dropoff_longitude", "FLOAT64"),
+]
+
+# Columnas a leer del dataset público. Los census tracts son INT64 en el dataset
+# público y STRING en raw: se castean al exportar.
+TAXI_RAW_COLUMNS = [
+    f"CAST({name} AS STRING) AS {name}" if name.endswith("census_tract") else name
+    for name, _ in TAXI_RAW_SCHEMA
+]
+
+# Filtros de calidad comunes a la carga histórica y al delta
+TAXI_QUALITY_FILTER = """trip_start_timestamp IS NOT NULL
+      AND trip_seconds IS NOT NULL
+      AND trip_seconds > 0
+      AND trip_miles >= 0"""
+
+
+def taxi_raw_schema() -> List[bigquery.SchemaField]:
+    """Esquema de raw como SchemaField (para los load jobs a staging)."""
+    return [bigquery.SchemaField(name, field_type) for name, field_type in TAXI_RAW_SCHEMA]
+
+
+def window_predicate(since: datetime, until: datetime, timestamp_type: str = "TIMESTAMP") -> str:
+    """Filtro de la ventana [since, until) sobre trip_start_timestamp, con literales UTC."""
+    return (f"trip_start_timestamp >= {timestamp_type} '{since.isoformat()}'\n"
+            f"      AND trip_start_timestamp < {timestamp_type} '{until.isoformat()}'")
+
+
+class TaxiTripSource(abc.ABC):
+    """Origen de viajes para el delta: escribe en staging los viajes de [since, until)."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def stage(self, client: bigquery.Client, staging_table: str, since: datetime, until: datetime) -> int:
+        """
+        Reemplaza staging_table con los viajes con since <= trip_start_timestamp < until.
+
+        Args:
+            client: Cliente de BigQuery en la región del dataset raw
+            staging_table: ID completo de la tabla staging (proyecto.dataset.tabla)
+            since: Inicio (UTC, inclusive) de la ventana a traer
+            until: Fin (UTC, exclusivo) de la ventana a traer
+
+        Returns:
+            Cantidad de filas escritas en staging
+        """
+
+
+class PublicDatasetTaxiSource(TaxiTripSource):
+    """
+    Dataset público de Chicago (en US). Como no se puede consultar cross-region desde
+    el dataset raw, exporta el delta a GCS con EXPORT DATA y lo carga en staging.
+    """
+
+    name = "public"
+
+    def __init__(self, export_prefix: str, compression: str = "SNAPPY", source_location: str = "US"):
+        self.export_prefix = export_prefix.rstrip("/")
+        self.compression = compression
+        self.source_location = source_location
+
+    def export_sql(self, uri: str, since: datetime, until: datetime) -> str:
+        columns = ",\n      ".join(TAXI_RAW_COLUMNS)
+        return f"""
+    EXPORT DATA OPTIONS (
+      uri = '{uri}',
+      format = 'PARQUET',
+      compression = '{self.compression}',
+      overwrite = true
+    ) AS
+    SELECT
+      {columns}
+    FROM `{PUBLIC_TAXI_TABLE}`
+    WHERE {window_predicate(since, until)}
+      AND {TAXI_QUALITY_FILTER}
+    """
+
+    def stage(self, client: bigquery.Client, staging_table: str, since: datetime, until: datetime) -> int:
+        # Un prefijo por corrida: los archivos de un intento anterior no se mezclan
+        run_prefix = f"{self.export_prefix}/delta/{since:%Y%m%d}-{uuid.uuid4().hex[:8]}"
+        client.query(self.export_sql(f"{run_prefix}/part-*.parquet", since, until),
+                     location=self.source_location).result()
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            schema=taxi_raw_schema(),
+        )
+        client.load_table_from_uri(f"{run_prefix}/*.parquet", staging_table, job_config=job_config).result()
+        return client.get_table(staging_table).num_rows
+
+
+class ParquetTaxiSource(TaxiTripSource):
+    """
+    Archivos Parquet con el esquema de raw (p. ej. los de scripts/generate_synthetic_data.py).
+    DuckDB filtra la ventana y el resultado se sube a staging con un load job.
+    """
+
+    name = "parquet"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def stage(self, client: bigquery.Client, staging_table: str, since: datetime, until: datetime) -> int:
+        import duckdb
+
+        columns = ", ".join(name for name, _ in TAXI_RAW_SCHEMA)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            delta_path = os.path.join(tmp_dir, "delta.parquet")
+            con = duckdb.connect()
+            con.execute("SET TimeZone = 'UTC'")
+            con.execute(
+                f"""
+                COPY (
+                  SELECT {columns}
+                  FROM read_parquet('{self.path}')
+                  WHERE {window_predicate(since, until, "TIMESTAMPTZ")}
+                    AND {TAXI_QUALITY_FILTER}
+                ) TO '{delta_path}' (FORMAT PARQUET)
+                """
+            )
+            con.close()
+
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                schema=taxi_raw_schema(),
+            )
+            with open(delta_path, "rb") as f:
+                client.load_table_from_file(f, staging_table, job_config=job_config).result()
+        return client.get_table(staging_table).num_rows
+
+
+def build_source(spec: str, export_prefix: str, compression: str = "SNAPPY") -> TaxiTripSource:
+    """
+    Crea el origen a partir de su especificación.
+
+    Args:
+        spec: "public" o "parquet:<ruta o glob a archivos Parquet>"
+        export_prefix: Prefijo gs:// para los exports del origen público
+        compression: Codec del export del origen público
+
+    Returns:
+        Instancia de TaxiTripSource
+    """
+    if spec == "public":
+        return PublicDatasetTaxiSource(export_prefix, compression)
+    if spec.startswith("parquet:"):
+        return ParquetTaxiSource(spec[len("parquet:"):])
+    raise ValueError(f"Origen de taxis desconocido: {spec} (usar 'public' o 'parquet:<ruta>')")
+
+
+def get_partition_watermarks(client: bigquery.Client, raw_table: str, lookback_days: int) -> Dict[date, datetime]:
+    """
+    MAX(trip_start_timestamp) de cada una de las últimas particiones de raw.
+
+    La última partición con filas sale de INFORMATION_SCHEMA.PARTITIONS; el MAX sólo
+    escanea las particiones de la ventana [última - lookback_days, última].
+
+    Returns:
+        Dict fecha de partición -> watermark; vacío si raw no tiene datos
+    """
+    project, dataset, table = raw_table.split(".")
+    latest_rows = run_query(client, f"""
+        SELECT MAX(PARSE_DATE('%Y%m%d', partition_id)) AS latest_partition
+        FROM `{project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS`
+        WHERE table_name = @table_name
+          AND partition_id NOT IN ('__NULL__', '__UNPARTITIONED__')
+          AND total_rows > 0
+    """, {"table_name": table})
+    latest_partition = latest_rows[0].latest_partition if latest_rows else None
+    if latest_partition is None:
+        return {}
+
+    window_start = latest_partition - timedelta(days=lookback_days)
+    rows = run_query(client, f"""
+        SELECT DATE(trip_start_timestamp) AS partition_date, MAX(trip_start_timestamp) AS watermark
+        FROM `{raw_table}`
+        WHERE DATE(trip_start_timestamp) BETWEEN @window_start AND @latest_partition
+        GROUP BY partition_date
+    """, {"window_start": window_start, "latest_partition": latest_partition})
+    return {row.partition_date: row.watermark for row in rows}
+
+
+def read_watermark(client: bigquery.Client, watermark_table: str, raw_table: str,
+                   source_name: str) -> Optional[datetime]:
+    """
+    Último watermark guardado para raw_table y el origen (None si nunca corrió).
+
+    Si la tabla de watermarks todavía no existe se trata como sin watermark.
+    """
+    from google.api_core.exceptions import NotFound
+
+    try:
+        rows = run_query(client, f"""
+            SELECT watermark
+            FROM `{watermark_table}`
+            WHERE raw_table = @raw_table AND source = @source
+        """, {"raw_table": raw_table, "source": source_name})
+    except NotFound:
+        return None
+    return rows[0].watermark if rows else None
+
+
+def save_watermark(client: bigquery.Client, watermark_table: str, raw_table: str, source_name: str,
+                   watermark: datetime, run_id: str) -> None:
+    """Guarda el watermark de la corrida; GREATEST evita que retroceda si dos corridas se pisan."""
+    run_query(client, f"""
+        MERGE `{watermark_table}` T
+        USING (SELECT @raw_table AS raw_table, @source AS source, @watermark AS watermark) S
+        ON T.raw_table = S.raw_table AND T.source = S.source
+        WHEN MATCHED THEN UPDATE SET
+          watermark = GREATEST(T.watermark, S.watermark),
+          run_id = @run_id,
+          updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN
+          INSERT (raw_table, source, watermark, run_id, updated_at)
+          VALUES (S.raw_table, S.source, S.watermark, @run_id, CURRENT_TIMESTAMP())
+    """, {"raw_table": raw_table, "source": source_name, "watermark": watermark, "run_id": run_id})
+
+
+def staging_table_for_run(raw_table: str, run_id: str) -> str:
+    """Tabla staging propia de la corrida: dos corridas simultáneas no comparten staging."""
+    suffix = re.sub(r"[^A-Za-z0-9_]", "_", run_id).strip("_")[:200]
+    return f"{raw_table}_delta_staging_{suffix}"
+
+
+def build_merge_sql(raw_table: str, staging_table: str, min_date: date, max_date: date) -> str:
+    """
+    MERGE de staging en raw por unique_key.
+
+    El rango de fechas literal en el ON poda las particiones de raw que se leen y
+    reescriben; WHEN MATCHED sólo actualiza filas con algún valor distinto.
+    """
+    names = [name for name, _ in TAXI_RAW_SCHEMA if name != "unique_key"]
+    changed = "\n        OR ".join(f"T.{name} IS DISTINCT FROM S.{name}" for name in names)
+    updates = ",\n      ".join(f"{name} = S.{name}" for name in names)
+    return f"""
+    MERGE `{raw_table}` T
+    USING (
+      SELECT * EXCEPT (rn)
+      FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY unique_key ORDER BY trip_start_timestamp DESC) AS rn
+        FROM `{staging_table}`
+      )
+      WHERE rn = 1
+    ) S
+    ON T.unique_key = S.unique_key
+      AND DATE(T.trip_start_timestamp) BETWEEN '{min_date}' AND '{max_date}'
+    WHEN MATCHED AND (
+        {changed}
+      ) THEN UPDATE SET
+      {updates}
+    WHEN NOT MATCHED THEN INSERT ROW
+    """
+
+
+def ingest_taxi_delta(client: bigquery.Client, source: TaxiTripSource, raw_table: str,
+                      lookback_days: int = 3, watermark_table: Optional[str] = None,
+                      run_id: Optional[str] = None, until: Optional[datetime] = None) -> dict:
+    """
+    Trae los viajes nuevos o corregidos desde el origen y los mergea en raw.
+
+    Args:
+        client: Cliente de BigQuery (o QueryExecutor) en la región del dataset raw
+        source: Origen de viajes
+        raw_table: ID completo de taxi_trips_raw_table
+        lookback_days: Días hacia atrás (desde el watermark) que se vuelven a comparar
+        watermark_table: Tabla de watermarks; por defecto taxi_delta_watermarks en el dataset de raw
+        run_id: Identificador de la corrida (run_id de Airflow): sufijo de la tabla staging
+        until: Fin (exclusivo) de la ventana, p. ej. data_interval_end; por defecto ahora
+
+    Returns:
+        Resumen con watermark, ventana, filas en staging y filas afectadas por el MERGE
+    """
+    project, dataset, _ = raw_table.split(".")
+    watermark_table = watermark_table or f"{project}.{dataset}.{WATERMARK_TABLE_NAME}"
+    run_id = run_id or uuid.uuid4().hex[:12]
+    until = until or datetime.now(timezone.utc)
+
+    watermark = read_watermark(client, watermark_table, raw_table, source.name)
+    if watermark is not None:
+        since = datetime.combine(watermark.date() - timedelta(days=lookback_days), time.min, tzinfo=timezone.utc)
+        watermark_source = watermark_table
+    else:
+        # Primera corrida: el watermark sale de las últimas particiones de raw
+        watermarks = get_partition_watermarks(client, raw_table, lookback_days)
+        if not watermarks:
+            print(f"⚠️  {raw_table} no tiene datos: correr primero la carga histórica. Nada que hacer.")
+            return {"skipped": True, "staged_rows": 0, "merged_rows": 0}
+        watermark = max(watermarks.values())
+        # La ventana empieza en la partición más vieja del lookback: cubre viajes nuevos
+        # (> watermark) y correcciones de viajes recientes ya cargados
+        since = datetime.combine(min(watermarks), time.min, tzinfo=timezone.utc)
+        watermark_source = f"{len(watermarks)} particiones de raw"
+
+    summary = {"watermark": watermark.isoformat(), "since": since.isoformat(), "until": until.isoformat()}
+    if since >= until:
+        print(f"✅ Ventana vacía: {since} >= {until}")
+        return {**summary, "staged_rows": 0, "merged_rows": 0}
+    print(f"📍 Watermark: {watermark} ({watermark_source}); trayendo viajes de [{since}, {until}) "
+          f"con origen '{source.name}'")
+
+    staging_table = staging_table_for_run(raw_table, run_id)
+    try:
+        staged_rows = source.stage(client, staging_table, since, until)
+        if staged_rows == 0:
+            print("✅ El origen no tiene viajes nuevos")
+            return {**summary, "staged_rows": 0, "merged_rows": 0}
+
+        bounds = list(client.query(f"""
+            SELECT MIN(DATE(trip_start_timestamp)) AS min_date, MAX(DATE(trip_start_timestamp)) AS max_date,
+                   MAX(trip_start_timestamp) AS max_timestamp
+            FROM `{staging_table}`
+        """).result())[0]
+        merge_job = client.query(build_merge_sql(raw_table, staging_table, bounds.min_date, bounds.max_date))
+        merge_job.result()
+        merged_rows = merge_job.num_dml_affected_rows or 0
+    finally:
+        client.delete_table(staging_table, not_found_ok=True)
+
+    new_watermark = max(watermark, bounds.max_timestamp)
+    save_watermark(client, watermark_table, raw_table, source.name, new_watermark, run_id)
+
+    print(f"✅ {staged_rows:,} viajes en staging, {merged_rows:,} insertados o actualizados "
+          f"({bounds.min_date} a {bounds.max_date}); watermark {new_watermark}")
+    return {
+        **summary,
+        "new_watermark": new_watermark.isoformat(),
+        "staged_rows": staged_rows,
+        "merged_rows": merged_rows,
+        "min_date": bounds.min_date.isoformat(),
+        "max_date": bounds.max_date.isoformat(),
+    }
@@ -0,0 +1,262 @@
+"""
+Invocación no bloqueante de la Cloud Function de clima desde Airflow.
+
+Se copia junto a los DAGs en Composer y se importa desde chicago_taxi_pipeline.py.
+
+WeatherIngestionOperator difiere en seguida a WeatherIngestionTrigger, que corre
+en el triggerer (asyncio) y no ocupa un slot de worker:
+1. Envía cada payload con {"async": true}; la función responde 202 con un run_id
+   y sigue la ingesta en segundo plano (ver functions/weather_ingestion/run_status.py)
+2. Consulta el estado de cada run_id con {"run_id": ...} cada poll_interval segundos.
+   Una corrida sin terminar cuyo updated_at (el heartbeat de la función) tiene más
+   de stale_after segundos se da por fallida: la instancia se reinició o se apagó
+   y ya nadie la va a completar
+3. Mantiene a lo sumo max_parallel corridas activas; cuando todas terminan emite
+   un evento con el resultado de cada una y el operador agrega los resúmenes
+
+Si el triggerer se reinicia, el trigger vuelve a enviar los payloads que no
+habían terminado: la ingesta es idempotente (MERGE por date). El defer tiene un
+timeout (defer_timeout) para que la tarea nunca quede esperando indefinidamente.
+
+scripts/fake_weather_status_server.py levanta un endpoint local con el mismo
+contrato para probar el trigger sin GCP.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED")
+SUMMARY_KEYS = ("total_days", "inserted_days", "skipped_days", "failed_days")
+# Los ID tokens duran 1 hora; se renuevan antes
+TOKEN_TTL_SECONDS = 45 * 60
+# La función renueva updated_at cada RUN_HEARTBEAT_SECONDS (60 s por defecto)
+STALE_AFTER_SECONDS = 15 * 60
+DEFER_TIMEOUT = timedelta(hours=6)
+
+
+def function_body(result: Any) -> Dict[str, Any]:
+    """
+    Body de una respuesta de la Cloud Function.
+
+    La función devuelve {"statusCode": ..., "body": "<json>"} dentro de un HTTP 200,
+    así que un statusCode >= 400 se trata como error.
+
+    Raises:
+        AirflowException: Si el statusCode de la función es >= 400
+    """
+    if not isinstance(result, dict):
+        return {}
+    body = result.get("body", result)
+    if isinstance(body, str):
+        body = json.loads(body) if body else {}
+    if result.get("statusCode", 200) >= 400:
+        raise AirflowException(f"La Cloud Function respondió {result['statusCode']}: {body.get('error', body)}")
+    return body
+
+
+def fetch_id_token(audience: str) -> Optional[str]:
+    """ID token para invocar la función (None si no hay credenciales, p. ej. en local)."""
+    try:
+        from google.auth.transport.requests import Request
+        from google.oauth2 import id_token
+        return id_token.fetch_id_token(Request(), audience)
+    except Exception as e:
+        print(f"⚠️  Error obteniendo ID token: {e}")
+        return None
+
+
+def is_stale(record: Dict[str, Any], stale_after: float, now: Optional[datetime] = None) -> bool:
+    """
+    True si la corrida no terminó y su updated_at tiene más de stale_after segundos.
+
+    Args:
+        record: Estado devuelto por la función ({"status", "updated_at", ...})
+        stale_after: Segundos sin heartbeat tolerados
+        now: Hora actual (UTC); por defecto ahora
+    """
+    if record.get("status") in TERMINAL_STATUSES or not record.get("updated_at"):
+        return False
+    updated_at = datetime.fromisoformat(record["updated_at"])
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return ((now or datetime.now(timezone.utc)) - updated_at).total_seconds() > stale_after
+
+
+class WeatherIngestionTrigger(BaseTrigger):
+    """
+    Envía corridas asíncronas a la Cloud Function y espera a que terminen.
+
+    Args:
+        function_url: URL de la Cloud Function
+        payloads: Un request por corrida (p. ej. {"dates": [...]})
+        max_parallel: Máximo de corridas activas a la vez
+        poll_interval: Segundos entre consultas de estado
+        request_timeout: Timeout de cada request HTTP (el 202 llega en segundos)
+        stale_after: Segundos sin heartbeat tras los que una corrida sin terminar es FAILED
+    """
+
+    def __init__(self, function_url: str, payloads: List[Dict[str, Any]], max_parallel: int = 4,
+                 poll_interval: float = 30.0, request_timeout: float = 60.0,
+                 stale_after: float = STALE_AFTER_SECONDS):
+        super().__init__()
+        self.function_url = function_url
+        self.payloads = payloads
+        self.max_parallel = max_parallel
+        self.poll_interval = poll_interval
+        self.request_timeout = request_timeout
+        self.stale_after = stale_after
+        self._token: Optional[str] = None
+        self._token_fetched_at = 0.0
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            "weather_trigger.WeatherIngestionTrigger",
+            {
+                "function_url": self.function_url,
+                "payloads": self.payloads,
+                "max_parallel": self.max_parallel,
+                "poll_interval": self.poll_interval,
+                "request_timeout": self.request_timeout,
+                "stale_after": self.stale_after,
+            },
+        )
+
+    async def _headers(self) -> Dict[str, str]:
+        if self._token is None or time.monotonic() - self._token_fetched_at > TOKEN_TTL_SECONDS:
+            # google-auth es sincrónico: fuera del event loop del triggerer
+            self._token = await asyncio.to_thread(fetch_id_token, self.function_url)
+            self._token_fetched_at = time.monotonic()
+        headers = {"Content-Type": "application/json"}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        return headers
+
+    async def _call(self, session: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with session.post(self.function_url, json=payload, headers=await self._headers()) as response:
+            response.raise_for_status()
+            return function_body(await response.json(content_type=None))
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        import aiohttp
+
+        pending = list(enumerate(self.payloads))
+        active: Dict[str, int] = {}
+        runs: List[Optional[Dict[str, Any]]] = [None] * len(self.payloads)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while pending or active:
+                # Completar los slots libres con corridas nuevas
+                while pending and len(active) < self.max_parallel:
+                    index, payload = pending.pop(0)
+                    try:
+                        accepted = await self._call(session, {**payload, "async": True})
+                        active[accepted["run_id"]] = index
+                        self.log.info(f"Corrida {accepted['run_id']} aceptada para el payload {index}")
+                    except Exception as e:
+                        runs[index] = {"payload": payload, "status": "FAILED", "error": f"Envío fallido: {e}"}
+
+                if not active:
+                    continue
+                await asyncio.sleep(self.poll_interval)
+
+                # Consultar el estado de todas las corridas activas en paralelo
+                run_ids = list(active)
+                records = await asyncio.gather(
+                    *(self._call(session, {"run_id": run_id}) for run_id in run_ids),
+                    return_exceptions=True,
+                )
+                for run_id, record in zip(run_ids, records):
+                    if isinstance(record, Exception):
+                        # Error transitorio de la consulta: se reintenta en la próxima vuelta
+                        self.log.warning(f"No se pudo consultar la corrida {run_id}: {record}")
+                        continue
+                    if record.get("status") in TERMINAL_STATUSES:
+                        index = active.pop(run_id)
+                        runs[index] = {"payload": self.payloads[index], **record}
+                        self.log.info(f"Corrida {run_id}: {record['status']}")
+                    elif is_stale(record, self.stale_after):
+                        index = active.pop(run_id)
+                        error = (f"Sin heartbeat desde {record['updated_at']} (estado {record['status']}): "
+                                 f"la instancia de la función se detuvo")
+                        runs[index] = {"payload": self.payloads[index], **record, "status": "FAILED", "error": error}
+                        self.log.error(f"Corrida {run_id}: {error}")
+
+        failed = [run for run in runs if run["status"] != "SUCCEEDED"]
+        yield TriggerEvent({"status": "error" if failed else "success", "runs": runs})
+
+
+class WeatherIngestionOperator(BaseOperator):
+    """
+    Ejecuta la ingesta de clima como corridas asíncronas, sin ocupar un worker.
+
+    Args:
+        function_url: URL de la Cloud Function (templated)
+        payloads: Requests a enviar, uno por corrida
+        plan_callable: Alternativa a payloads: función (context) -> payloads, evaluada en execute
+        max_parallel: Máximo de corridas activas a la vez
+        poll_interval: Segundos entre consultas de estado
+        stale_after: Segundos sin heartbeat tras los que una corrida sin terminar es FAILED
+        defer_timeout: Espera máxima de todas las corridas; al vencer la tarea falla
+    """
+
+    template_fields = ("function_url",)
+
+    def __init__(self, *, function_url: str, payloads: Optional[List[Dict[str, Any]]] = None,
+                 plan_callable: Optional[Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+                 max_parallel: int = 4, poll_interval: float = 30.0,
+                 stale_after: float = STALE_AFTER_SECONDS, defer_timeout: timedelta = DEFER_TIMEOUT, **kwargs):
+        super().__init__(**kwargs)
+        if (payloads is None) == (plan_callable is None):
+            raise ValueError("Pasar payloads o plan_callable (uno de los dos)")
+        self.function_url = function_url
+        self.payloads = payloads
+        self.plan_callable = plan_callable
+        self.max_parallel = max_parallel
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.defer_timeout = defer_timeout
+
+    def execute(self, context):
+        payloads = self.plan_callable(context) if self.plan_callable else self.payloads
+        if not payloads:
+            print("✅ Nada que ingerir.")
+            return {"runs": 0, **{key: 0 for key in SUMMARY_KEYS}}
+        print(f"🔄 {len(payloads)} corridas asíncronas contra {self.function_url} "
+              f"(hasta {self.max_parallel} en paralelo)")
+        self.defer(
+            trigger=WeatherIngestionTrigger(
+                function_url=self.function_url,
+                payloads=payloads,
+                max_parallel=self.max_parallel,
+                poll_interval=self.poll_interval,
+                stale_after=self.stale_after,
+            ),
+            method_name="execute_complete",
+            timeout=self.defer_timeout,
+        )
+
+    def execute_complete(self, context, event: Dict[str, Any]):
+        totals = {"runs": len(event["runs"]), **{key: 0 for key in SUMMARY_KEYS}}
+        failed = []
+        for run in event["runs"]:
+            summary = run.get("summary") or {}
+            for key in SUMMARY_KEYS:
+                totals[key] += summary.get(key, 0)
+            label = run.get("run_id", json.dumps(run["payload"])[:80])
+            if run["status"] == "SUCCEEDED":
+                print(f"   ✅ {label}: {summary.get('mode')} ({summary.get('rows_written', 0)} filas)")
+            else:
+                print(f"   ❌ {label}: {run.get('error')}")
+                failed.append(label)
+
+        print(f"📊 Ingesta de clima: {totals}")
+        if failed:
+            raise AirflowException(f"{len(failed)} de {totals['runs']} corridas fallaron: {', '.join(failed)}")
+        return totals
@@ -0,0 +1,158 @@
+{#
+  Macros con implementación por adapter. Producción corre en BigQuery; el target
+  duckdb se usa para el benchmark de escala local (scripts/benchmark_dbt_scale.py)
+  sobre Parquet sintético (scripts/generate_synthetic_data.py).
+#}
+
+{% macro raw_table(table_name) %}
+  {{ return(adapter.dispatch('raw_table')(table_name)) }}
+{% endmacro %}
+
+{% macro bigquery__raw_table(table_name) -%}
+  `{{ env_var('GCP_PROJECT_ID') }}.{{ var('raw_dataset') }}.{{ table_name }}`
+{%- endmacro %}
+
+{% macro duckdb__raw_table(table_name) -%}
+  {#- Cada tabla raw es un directorio de Parquet: <raw_parquet_path>/<tabla>/*.parquet -#}
+  read_parquet('{{ var("raw_parquet_path") }}/{{ table_name }}/*.parquet')
+{%- endmacro %}
+
+
+{% macro raw_table_exists(table_name) %}
+  {#- Al parsear no hay conexión: se asume que existe (el SQL compilado se decide en execute) -#}
+  {% if not execute %}
+    {{ return(true) }}
+  {% endif %}
+  {{ return(adapter.dispatch('raw_table_exists')(table_name)) }}
+{% endmacro %}
+
+{% macro bigquery__raw_table_exists(table_name) %}
+  {% set relation = adapter.get_relation(
+    database=env_var('GCP_PROJECT_ID'),
+    schema=var('raw_dataset'),
+    identifier=table_name
+  ) %}
+  {{ return(relation is not none) }}
+{% endmacro %}
+
+{% macro duckdb__raw_table_exists(table_name) %}
+  {% set result = run_query("SELECT COUNT(*) FROM glob('" ~ var('raw_parquet_path') ~ "/" ~ table_name ~ "/*.parquet')") %}
+  {{ return(result.columns[0].values()[0] > 0) }}
+{% endmacro %}
+
+
+{% macro incremental_materialization() %}
+  {#- En BigQuery los modelos son incrementales; en local se reconstruyen completos -#}
+  {{ return('incremental' if target.type == 'bigquery' else 'table') }}
+{% endmacro %}
+
+
+{% macro safe_divide(numerator, denominator) %}
+  {{ return(adapter.dispatch('safe_divide')(numerator, denominator)) }}
+{% endmacro %}
+
+{% macro bigquery__safe_divide(numerator, denominator) -%}
+  SAFE_DIVIDE({{ numerator }}, {{ denominator }})
+{%- endmacro %}
+
+{% macro default__safe_divide(numerator, denominator) -%}
+  ({{ numerator }}) / NULLIF({{ denominator }}, 0)
+{%- endmacro %}
+
+
+{% macro day_of_week(timestamp_column) %}
+  {{ return(adapter.dispatch('day_of_week')(timestamp_column)) }}
+{% endmacro %}
+
+{% macro bigquery__day_of_week(timestamp_column) -%}
+  EXTRACT(DAYOFWEEK FROM {{ timestamp_column }})
+{%- endmacro %}
+
+{% macro duckdb__day_of_week(timestamp_column) -%}
+  {#- DuckDB devuelve 0 (domingo) a 6; BigQuery 1 (domingo) a 7 -#}
+  (EXTRACT(DOW FROM {{ timestamp_column }}) + 1)
+{%- endmacro %}
+
+
+{#
+  Sketches mergeables. En BigQuery: HLL++ para distintos y KLL para cuantiles. DuckDB
+  no tiene sketches serializables, así que se guardan listas (exactas, más pesadas):
+  sirven para medir el modelo localmente, no para comparar tamaños de almacenamiento.
+#}
+
+{% macro distinct_sketch_init(column) %}
+  {{ return(adapter.dispatch('distinct_sketch_init')(column)) }}
+{% endmacro %}
+
+{% macro bigquery__distinct_sketch_init(column) -%}
+  HLL_COUNT.INIT({{ column }})
+{%- endmacro %}
+
+{% macro duckdb__distinct_sketch_init(column) -%}
+  LIST(DISTINCT {{ column }})
+{%- endmacro %}
+
+
+{% macro distinct_sketch_merge(sketch) %}
+  {{ return(adapter.dispatch('distinct_sketch_merge')(sketch)) }}
+{% endmacro %}
+
+{% macro bigquery__distinct_sketch_merge(sketch) -%}
+  HLL_COUNT.MERGE({{ sketch }})
+{%- endmacro %}
+
+{% macro duckdb__distinct_sketch_merge(sketch) -%}
+  LEN(LIST_DISTINCT(FLATTEN(LIST({{ sketch }}))))
+{%- endmacro %}
+
+
+{% macro distinct_sketch_extract(sketch) %}
+  {{ return(adapter.dispatch('distinct_sketch_extract')(sketch)) }}
+{% endmacro %}
+
+{% macro bigquery__distinct_sketch_extract(sketch) -%}
+  HLL_COUNT.EXTRACT({{ sketch }})
+{%- endmacro %}
+
+{% macro duckdb__distinct_sketch_extract(sketch) -%}
+  LEN({{ sketch }})
+{%- endmacro %}
+
+
+{% macro quantile_sketch_init_int(column) %}
+  {{ return(adapter.dispatch('quantile_sketch_init_int')(column)) }}
+{% endmacro %}
+
+{% macro bigquery__quantile_sketch_init_int(column) -%}
+  KLL_QUANTILES.INIT_INT64({{ column }})
+{%- endmacro %}
+
+{% macro duckdb__quantile_sketch_init_int(column) -%}
+  LIST({{ column }}) FILTER (WHERE {{ column }} IS NOT NULL)
+{%- endmacro %}
+
+
+{% macro quantile_sketch_merge_point(sketch, phi) %}
+  {{ return(adapter.dispatch('quantile_sketch_merge_point')(sketch, phi)) }}
+{% endmacro %}
+
+{% macro bigquery__quantile_sketch_merge_point(sketch, phi) -%}
+  KLL_QUANTILES.MERGE_POINT_INT64({{ sketch }}, {{ phi }})
+{%- endmacro %}
+
+{% macro duckdb__quantile_sketch_merge_point(sketch, phi) -%}
+  LIST_AGGREGATE(FLATTEN(LIST({{ sketch }})), 'quantile_disc', {{ phi }})
+{%- endmacro %}
+
+
+{% macro quantile_sketch_extract_point(sketch, phi) %}
+  {{ return(adapter.dispatch('quantile_sketch_extract_point')(sketch, phi)) }}
+{% endmacro %}
+
+{% macro bigquery__quantile_sketch_extract_point(sketch, phi) -%}
+  KLL_QUANTILES.EXTRACT_POINT_INT64({{ sketch }}, {{ phi }})
+{%- endmacro %}
+
+{% macro duckdb__quantile_sketch_extract_point(sketch, phi) -%}
+  LIST_AGGREGATE({{ sketch }}, 'quantile_disc', {{ phi }})
+{%- endmacro %}
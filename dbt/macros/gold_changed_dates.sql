@@ -0,0 +1,40 @@
+{% macro gold_changed_dates(gold_relation, upstream_relation, weather_relation=none) %}
+  {#
+    Fechas que un modelo gold incremental debe recalcular: particiones de
+    upstream_relation modificadas después del último build del modelo gold y, si se
+    pasa weather_relation, las fechas con filas de clima ingeridas después de ese
+    build. Las particiones se leen de INFORMATION_SCHEMA.PARTITIONS (metadata, sin
+    escanear la tabla upstream). Devuelve una lista de strings 'YYYY-MM-DD'.
+  #}
+  {% set query %}
+    WITH gold_built AS (
+      SELECT MAX(last_modified_time) AS built_at
+      FROM `{{ gold_relation.database }}.{{ gold_relation.schema }}.INFORMATION_SCHEMA.PARTITIONS`
+      WHERE table_name = '{{ gold_relation.identifier }}'
+    )
+    SELECT PARSE_DATE('%Y%m%d', p.partition_id) AS changed_date
+    FROM `{{ upstream_relation.database }}.{{ upstream_relation.schema }}.INFORMATION_SCHEMA.PARTITIONS` AS p, gold_built
+    WHERE p.table_name = '{{ upstream_relation.identifier }}'
+      AND p.partition_id NOT IN ('__NULL__', '__UNPARTITIONED__')
+      AND p.last_modified_time > gold_built.built_at
+    {% if weather_relation is not none %}
+    UNION DISTINCT
+    SELECT w.date AS changed_date
+    FROM {{ weather_relation }} AS w, gold_built
+    WHERE w.ingestion_timestamp > gold_built.built_at
+    {% endif %}
+    ORDER BY changed_date
+  {% endset %}
+  {% set results = run_query(query) %}
+  {{ return(results.columns[0].values() | map('string') | list) }}
+{% endmacro %}
+
+
+{% macro changed_dates_filter(column, changed_dates) %}
+  {#- Filtro con fechas literales: a diferencia de una subquery, poda particiones -#}
+  {%- if changed_dates | length > 0 -%}
+    {{ column }} IN ({% for d in changed_dates %}DATE '{{ d }}'{% if not loop.last %}, {% endif %}{% endfor %})
+  {%- else -%}
+    FALSE
+  {%- endif -%}
+{% endmacro %}
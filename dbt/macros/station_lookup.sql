@@ -0,0 +1,11 @@
+{#
+  Estación meteorológica de cada pickup a partir de weather_station_lookup (la arma
+  la función de clima con {"stations": true, "rebuild_lookup": true}). La estación
+  sale de la community area del pickup y, si no tiene, de la celda de la grilla de
+  su lat/long: dos joins de igualdad contra una tabla chica, sin distancias por viaje.
+#}
+
+{% macro station_grid_cell(coordinate_column) -%}
+  {#- Misma expresión que stations.grid_cells de la función (FLOOR(coordenada * celdas por grado)) -#}
+  CAST(FLOOR({{ coordinate_column }} * {{ var('station_grid_cells_per_degree') }}) AS {{ dbt.type_bigint() }})
+{%- endmacro %}
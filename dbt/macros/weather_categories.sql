@@ -0,0 +1,27 @@
+{#
+  Categorías de clima comunes a weather_silver y weather_station_silver: las dos
+  capas (ciudad y estación) clasifican con las mismas reglas.
+  functions/weather_ingestion/weather_lookup.py replica estas reglas en Python:
+  mantener ambos en sincronía.
+#}
+
+{% macro weather_category(condition_column) -%}
+  CASE 
+    WHEN {{ condition_column }} IN ('Rain', 'Drizzle', 'Thunderstorm') THEN 'Rainy'
+    WHEN {{ condition_column }} IN ('Snow', 'Sleet') THEN 'Snowy'
+    WHEN {{ condition_column }} IN ('Clear', 'Sun') THEN 'Clear'
+    WHEN {{ condition_column }} IN ('Clouds', 'Mist', 'Fog') THEN 'Cloudy'
+    ELSE 'Other'
+  END
+{%- endmacro %}
+
+
+{% macro temperature_category(temperature_column) -%}
+  CASE 
+    WHEN {{ temperature_column }} < 0 THEN 'Freezing'
+    WHEN {{ temperature_column }} < 10 THEN 'Cold'
+    WHEN {{ temperature_column }} < 20 THEN 'Cool'
+    WHEN {{ temperature_column }} < 30 THEN 'Warm'
+    ELSE 'Hot'
+  END
+{%- endmacro %}
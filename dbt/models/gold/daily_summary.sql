@@ -1,57 +1,67 @@
 {{
   config(
-    materialized='table',
-    schema='gold'
+    materialized=incremental_materialization(),
+    incremental_strategy='insert_overwrite',
+    schema='gold',
+    partition_by={
+      "field": "trip_date",
+      "data_type": "date",
+      "granularity": "day"
+    },
+    cluster_by=['weather_category']
   )
 }}
 
-WITH taxi_trips AS (
-  SELECT *
-  FROM `{{ var('project_id') }}.{{ var('silver_dataset') }}.taxi_trips_silver`
-),
+-- Incremental: sólo se recalculan las fechas cuyas particiones de
+-- taxi_weather_hourly cambiaron desde el último build (ver macros/gold_changed_dates.sql).
+-- Se deriva del agregado horario: no vuelve a escanear taxi_trips_silver.
+{% if is_incremental() and execute %}
+  {% set changed_dates = gold_changed_dates(this, ref('taxi_weather_hourly')) %}
+  {{ log("daily_summary: " ~ (changed_dates | length) ~ " fechas a recalcular", info=True) }}
+{% endif %}
 
-weather_data AS (
+WITH hourly AS (
   SELECT *
-  FROM `{{ var('project_id') }}.{{ var('silver_dataset') }}.weather_silver`
+  FROM {{ ref('taxi_weather_hourly') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('trip_date', changed_dates) }}
+  {% endif %}
 )
 
 SELECT
-  t.trip_date,
-  w.weather_category,
-  w.temperature_category,
-  w.temperature,
-  w.precipitation,
-  w.wind_speed,
-  w.humidity,
+  trip_date,
+  weather_category,
+  temperature_category,
+  temperature,
+  precipitation,
+  wind_speed,
+  humidity,
   
   -- Resumen diario de viajes
-  COUNT(*) AS total_trips,
-  COUNT(DISTINCT t.taxi_id) AS unique_taxis,
+  SUM(total_trips) AS total_trips,
+  {{ distinct_sketch_merge('taxi_id_sketch') }} AS unique_taxis,
   
   -- Duración promedio de viajes
-  AVG(t.trip_seconds) AS avg_trip_duration_seconds,
-  APPROX_QUANTILES(t.trip_seconds, 100)[OFFSET(50)] AS median_trip_duration_seconds,
+  {{ safe_divide('SUM(trip_seconds_sum)', 'SUM(trip_seconds_count)') }} AS avg_trip_duration_seconds,
+  {{ quantile_sketch_merge_point('trip_seconds_sketch', 0.5) }} AS median_trip_duration_seconds,
   
   -- Distancia total y promedio
-  SUM(t.trip_miles) AS total_miles,
-  AVG(t.trip_miles) AS avg_trip_miles,
+  SUM(total_miles) AS total_miles,
+  {{ safe_divide('SUM(total_miles)', 'SUM(trip_miles_count)') }} AS avg_trip_miles,
   
   -- Ingresos
-  SUM(t.trip_total) AS total_revenue,
-  AVG(t.trip_total) AS avg_trip_total,
+  SUM(total_revenue) AS total_revenue,
+  {{ safe_divide('SUM(total_revenue)', 'SUM(trip_total_count)') }} AS avg_trip_total,
   
   -- Velocidad promedio
-  AVG(t.avg_speed_mph) AS avg_speed_mph
+  {{ safe_divide('SUM(avg_speed_mph_sum)', 'SUM(avg_speed_mph_count)') }} AS avg_speed_mph
   
-FROM taxi_trips t
-LEFT JOIN weather_data w
-  ON t.trip_date = w.date
+FROM hourly
 GROUP BY 
-  t.trip_date,
-  w.weather_category,
-  w.temperature_category,
-  w.temperature,
-  w.precipitation,
-  w.wind_speed,
-  w.humidity
-ORDER BY t.trip_date
+  trip_date,
+  weather_category,
+  temperature_category,
+  temperature,
+  precipitation,
+  wind_speed,
+  humidity
@@ -1,34 +1,31 @@
 {{
   config(
-    materialized='table',
-    schema='gold'
+    materialized=incremental_materialization(),
+    incremental_strategy='insert_overwrite',
+    schema='gold',
+    partition_by={
+      "field": "trip_date",
+      "data_type": "date",
+      "granularity": "day"
+    },
+    cluster_by=['weather_category', 'trip_hour']
   )
 }}
 
-WITH taxi_trips AS (
-  SELECT *
-  FROM `{{ var('project_id') }}.{{ var('silver_dataset') }}.taxi_trips_silver`
-),
+-- Incremental: sólo se recalculan las fechas cuyas particiones de
+-- taxi_weather_hourly cambiaron desde el último build (ver macros/gold_changed_dates.sql).
+-- Misma granularidad que el agregado horario: se extraen los sketches por fila.
+{% if is_incremental() and execute %}
+  {% set changed_dates = gold_changed_dates(this, ref('taxi_weather_hourly')) %}
+  {{ log("taxi_weather_analysis: " ~ (changed_dates | length) ~ " fechas a recalcular", info=True) }}
+{% endif %}
 
-weather_data AS (
+WITH hourly AS (
   SELECT *
-  FROM `{{ var('project_id') }}.{{ var('silver_dataset') }}.weather_silver`
-),
-
--- Agregar datos del clima a los viajes por fecha
-trips_with_weather AS (
-  SELECT 
-    t.*,
-    w.temperature,
-    w.humidity,
-    w.wind_speed,
-    w.precipitation,
-    w.weather_condition,
-    w.weather_category,
-    w.temperature_category
-  FROM taxi_trips t
-  LEFT JOIN weather_data w
-    ON t.trip_date = w.date
+  FROM {{ ref('taxi_weather_hourly') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('trip_date', changed_dates) }}
+  {% endif %}
 )
 
 SELECT
@@ -41,41 +38,40 @@ SELECT
   humidity,
   
   -- Métricas de viajes
-  COUNT(*) AS total_trips,
-  COUNT(DISTINCT taxi_id) AS unique_taxis,
+  total_trips,
+  {{ distinct_sketch_extract('taxi_id_sketch') }} AS unique_taxis,
   
   -- Métricas de duración
-  AVG(trip_seconds) AS avg_trip_duration_seconds,
-  APPROX_QUANTILES(trip_seconds, 100)[OFFSET(50)] AS median_trip_duration_seconds,
-  MIN(trip_seconds) AS min_trip_duration_seconds,
-  MAX(trip_seconds) AS max_trip_duration_seconds,
-  STDDEV(trip_seconds) AS stddev_trip_duration_seconds,
+  {{ safe_divide('trip_seconds_sum', 'trip_seconds_count') }} AS avg_trip_duration_seconds,
+  {{ quantile_sketch_extract_point('trip_seconds_sketch', 0.5) }} AS median_trip_duration_seconds,
+  min_trip_duration_seconds,
+  max_trip_duration_seconds,
+  -- Desvío estándar muestral a partir de suma y suma de cuadrados (NULL con n < 2, como STDDEV)
+  IF(
+    trip_seconds_count > 1,
+    SQRT(GREATEST(
+      (trip_seconds_sum_sq - trip_seconds_sum * trip_seconds_sum / trip_seconds_count)
+        / (trip_seconds_count - 1),
+      0
+    )),
+    NULL
+  ) AS stddev_trip_duration_seconds,
   
   -- Métricas de distancia
-  AVG(trip_miles) AS avg_trip_miles,
-  SUM(trip_miles) AS total_miles,
+  {{ safe_divide('total_miles', 'trip_miles_count') }} AS avg_trip_miles,
+  total_miles,
   
   -- Métricas de velocidad
-  AVG(avg_speed_mph) AS avg_speed_mph,
+  {{ safe_divide('avg_speed_mph_sum', 'avg_speed_mph_count') }} AS avg_speed_mph,
   
   -- Métricas financieras
-  AVG(fare) AS avg_fare,
-  AVG(tips) AS avg_tips,
-  AVG(trip_total) AS avg_trip_total,
-  SUM(trip_total) AS total_revenue,
+  {{ safe_divide('fare_sum', 'fare_count') }} AS avg_fare,
+  {{ safe_divide('tips_sum', 'tips_count') }} AS avg_tips,
+  {{ safe_divide('total_revenue', 'trip_total_count') }} AS avg_trip_total,
+  total_revenue,
   
   -- Métricas por hora del día
   trip_hour,
-  COUNT(*) AS trips_by_hour
+  total_trips AS trips_by_hour
   
-FROM trips_with_weather
-GROUP BY 
-  trip_date,
-  weather_category,
-  temperature_category,
-  temperature,
-  precipitation,
-  wind_speed,
-  humidity,
-  trip_hour
-ORDER BY trip_date, trip_hour
+FROM hourly
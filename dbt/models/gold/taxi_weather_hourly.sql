@@ -0,0 +1,90 @@
+{{
+  config(
+    materialized=incremental_materialization(),
+    incremental_strategy='insert_overwrite',
+    schema='gold',
+    partition_by={
+      "field": "trip_date",
+      "data_type": "date",
+      "granularity": "day"
+    },
+    cluster_by=['weather_category', 'trip_hour']
+  )
+}}
+
+-- Agregado base por fecha y hora: único modelo que escanea taxi_trips_silver.
+-- Guarda sumas/conteos (promedios y desvíos exactos al re-agregar) y sketches
+-- mergeables para las métricas que no se pueden sumar:
+--   taxi_id_sketch       HLL++ de taxi_id          -> HLL_COUNT.MERGE / EXTRACT
+--   trip_seconds_sketch  KLL de trip_seconds       -> KLL_QUANTILES.MERGE_POINT_INT64
+-- daily_summary, taxi_weather_analysis y las queries del dashboard se derivan de acá.
+{% if is_incremental() and execute %}
+  {% set changed_dates = gold_changed_dates(this, ref('taxi_trips_silver'), ref('weather_silver')) %}
+  {{ log("taxi_weather_hourly: " ~ (changed_dates | length) ~ " fechas a recalcular", info=True) }}
+{% endif %}
+
+WITH taxi_trips AS (
+  SELECT *
+  FROM {{ ref('taxi_trips_silver') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('trip_date', changed_dates) }}
+  {% endif %}
+),
+
+weather_data AS (
+  SELECT *
+  FROM {{ ref('weather_silver') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('date', changed_dates) }}
+  {% endif %}
+)
+
+SELECT
+  t.trip_date,
+  t.trip_hour,
+  w.weather_condition,
+  w.weather_category,
+  w.temperature_category,
+  w.temperature,
+  w.precipitation,
+  w.wind_speed,
+  w.humidity,
+
+  COUNT(*) AS total_trips,
+
+  -- Sketches mergeables
+  {{ distinct_sketch_init('t.taxi_id') }} AS taxi_id_sketch,
+  {{ quantile_sketch_init_int('t.trip_seconds') }} AS trip_seconds_sketch,
+
+  -- Duración: suma, suma de cuadrados y conteo para AVG/STDDEV exactos al re-agregar
+  COUNT(t.trip_seconds) AS trip_seconds_count,
+  SUM(t.trip_seconds) AS trip_seconds_sum,
+  SUM(CAST(t.trip_seconds AS {{ dbt.type_float() }}) * t.trip_seconds) AS trip_seconds_sum_sq,
+  MIN(t.trip_seconds) AS min_trip_duration_seconds,
+  MAX(t.trip_seconds) AS max_trip_duration_seconds,
+
+  -- Distancia, velocidad y montos: suma + conteo de no nulos (AVG ignora NULL)
+  COUNT(t.trip_miles) AS trip_miles_count,
+  SUM(t.trip_miles) AS total_miles,
+  COUNT(t.avg_speed_mph) AS avg_speed_mph_count,
+  SUM(t.avg_speed_mph) AS avg_speed_mph_sum,
+  COUNT(t.fare) AS fare_count,
+  SUM(t.fare) AS fare_sum,
+  COUNT(t.tips) AS tips_count,
+  SUM(t.tips) AS tips_sum,
+  COUNT(t.trip_total) AS trip_total_count,
+  SUM(t.trip_total) AS total_revenue
+
+FROM taxi_trips t
+LEFT JOIN weather_data w
+  ON t.trip_date = w.date
+GROUP BY
+  t.trip_date,
+  t.trip_hour,
+  w.weather_condition,
+  w.weather_category,
+  w.temperature_category,
+  w.temperature,
+  w.precipitation,
+  w.wind_speed,
+  w.humidity
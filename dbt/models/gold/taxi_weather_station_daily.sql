@@ -0,0 +1,78 @@
+{{
+  config(
+    materialized=incremental_materialization(),
+    incremental_strategy='insert_overwrite',
+    schema='gold',
+    partition_by={
+      "field": "trip_date",
+      "data_type": "date",
+      "granularity": "day"
+    },
+    cluster_by=['pickup_weather_station', 'pickup_community_area']
+  )
+}}
+
+-- Viajes por fecha y community area de pickup con el clima de su estación más
+-- cercana. La estación de cada viaje ya viene resuelta en taxi_trips_silver
+-- (pickup_weather_station), así que el join con el clima es un hash join por
+-- (trip_date, station). Los viajes sin estación o sin datos de su estación ese día
+-- quedan con el clima en NULL.
+-- Incremental: fechas con particiones de silver modificadas o clima de estaciones
+-- ingerido después del último build (ver macros/gold_changed_dates.sql).
+{% if is_incremental() and execute %}
+  {% set changed_dates = gold_changed_dates(this, ref('taxi_trips_silver'), ref('weather_station_silver')) %}
+  {{ log("taxi_weather_station_daily: " ~ (changed_dates | length) ~ " fechas a recalcular", info=True) }}
+{% endif %}
+
+WITH taxi_trips AS (
+  SELECT *
+  FROM {{ ref('taxi_trips_silver') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('trip_date', changed_dates) }}
+  {% endif %}
+),
+
+station_weather AS (
+  SELECT *
+  FROM {{ ref('weather_station_silver') }}
+  {% if is_incremental() %}
+  WHERE {{ changed_dates_filter('date', changed_dates) }}
+  {% endif %}
+)
+
+SELECT
+  t.trip_date,
+  t.pickup_community_area,
+  t.pickup_weather_station,
+  w.station_name,
+  w.weather_condition,
+  w.weather_category,
+  w.temperature_category,
+  w.temperature,
+  w.precipitation,
+  w.wind_speed,
+
+  COUNT(*) AS total_trips,
+  {{ safe_divide('SUM(t.trip_seconds)', 'COUNT(t.trip_seconds)') }} AS avg_trip_duration_seconds,
+  SUM(t.trip_miles) AS total_miles,
+  {{ safe_divide('SUM(t.trip_miles)', 'COUNT(t.trip_miles)') }} AS avg_trip_miles,
+  {{ safe_divide('SUM(t.avg_speed_mph)', 'COUNT(t.avg_speed_mph)') }} AS avg_speed_mph,
+  {{ safe_divide('SUM(t.fare)', 'COUNT(t.fare)') }} AS avg_fare,
+  {{ safe_divide('SUM(t.tips)', 'COUNT(t.tips)') }} AS avg_tips,
+  SUM(t.trip_total) AS total_revenue
+
+FROM taxi_trips t
+LEFT JOIN station_weather w
+  ON t.trip_date = w.date
+  AND t.pickup_weather_station = w.station_id
+GROUP BY
+  t.trip_date,
+  t.pickup_community_area,
+  t.pickup_weather_station,
+  w.station_name,
+  w.weather_condition,
+  w.weather_category,
+  w.temperature_category,
+  w.temperature,
+  w.precipitation,
+  w.wind_speed
@@ -1,8 +1,10 @@
 {{
   config(
-    materialized='table',
+    materialized=incremental_materialization(),
+    incremental_strategy='insert_overwrite',
     schema='silver',
     cluster_by=['trip_date'],
+    on_schema_change='append_new_columns',
     partition_by={
       "field": "trip_date",
       "data_type": "date",
@@ -11,12 +13,24 @@
   )
 }}
 
+-- on_schema_change: las corridas incrementales agregan las columnas nuevas (p. ej.
+-- pickup_weather_station); las particiones fuera del lookback las tienen recién con --full-refresh
+-- Incremental: sólo se reescriben las particiones trip_date de la ventana de lookback
+-- (últimos N días desde la partición más reciente de silver). Para reprocesar toda la
+-- historia (p. ej. después de una carga histórica): dbt run --full-refresh
+{% set lookback_days = var('silver_lookback_days') %}
+
 WITH raw_trips AS (
   SELECT *
-  FROM `{{ env_var('GCP_PROJECT_ID') }}.chicago_taxi_raw.taxi_trips_raw_table`
+  FROM {{ raw_table('taxi_trips_raw_table') }}
+  {% if is_incremental() %}
+  -- _dbt_max_partition es una variable de script (constante), así que poda particiones de raw
+  WHERE DATE(trip_start_timestamp) >= DATE_SUB(_dbt_max_partition, INTERVAL {{ lookback_days }} DAY)
+  {% endif %}
 ),
 
--- Eliminar duplicados basándose en unique_key
+-- Eliminar duplicados basándose en unique_key, sólo dentro de las particiones afectadas
+-- (los duplicados de un viaje comparten trip_start_timestamp, por lo tanto partición)
 deduplicated_trips AS (
   SELECT *
   FROM (
@@ -28,6 +42,46 @@ deduplicated_trips AS (
     FROM raw_trips
   )
   WHERE rn = 1
+),
+
+-- Estación más cercana por community area y por celda de la grilla de pickups
+-- (macros/station_lookup.sql); la dimensión es chica, los joins son de igualdad.
+-- weather_station_lookup la crea terraform y la llena la primera corrida stations de
+-- la función: si todavía no existe, los viajes quedan con pickup_weather_station NULL
+{% set has_station_lookup = raw_table_exists('weather_station_lookup') %}
+{% if not has_station_lookup %}
+  {{ log("taxi_trips_silver: weather_station_lookup no existe, pickup_weather_station queda NULL", info=True) }}
+{% endif %}
+area_stations AS (
+  {% if has_station_lookup %}
+  SELECT
+    community_area AS station_community_area,
+    station_id AS area_station_id
+  FROM {{ raw_table('weather_station_lookup') }}
+  WHERE lookup_type = 'community_area'
+  {% else %}
+  SELECT
+    CAST(NULL AS {{ dbt.type_bigint() }}) AS station_community_area,
+    CAST(NULL AS {{ dbt.type_string() }}) AS area_station_id
+  LIMIT 0
+  {% endif %}
+),
+
+cell_stations AS (
+  {% if has_station_lookup %}
+  SELECT
+    lat_cell AS station_lat_cell,
+    lon_cell AS station_lon_cell,
+    station_id AS cell_station_id
+  FROM {{ raw_table('weather_station_lookup') }}
+  WHERE lookup_type = 'grid_cell'
+  {% else %}
+  SELECT
+    CAST(NULL AS {{ dbt.type_bigint() }}) AS station_lat_cell,
+    CAST(NULL AS {{ dbt.type_bigint() }}) AS station_lon_cell,
+    CAST(NULL AS {{ dbt.type_string() }}) AS cell_station_id
+  LIMIT 0
+  {% endif %}
 )
 
 SELECT
@@ -54,9 +108,16 @@ SELECT
   dropoff_longitude,
   DATE(trip_start_timestamp) AS trip_date,
   EXTRACT(HOUR FROM trip_start_timestamp) AS trip_hour,
-  EXTRACT(DAYOFWEEK FROM trip_start_timestamp) AS trip_day_of_week,
+  {{ day_of_week('trip_start_timestamp') }} AS trip_day_of_week,
   CASE 
     WHEN trip_seconds > 0 THEN trip_miles / (trip_seconds / 3600.0)
     ELSE NULL
-  END AS avg_speed_mph
+  END AS avg_speed_mph,
+  -- Estación de clima del pickup: por community area y, sin área, por celda de lat/long
+  COALESCE(area_station_id, cell_station_id) AS pickup_weather_station
 FROM deduplicated_trips
+LEFT JOIN area_stations
+  ON pickup_community_area = station_community_area
+LEFT JOIN cell_stations
+  ON {{ station_grid_cell('pickup_latitude') }} = station_lat_cell
+  AND {{ station_grid_cell('pickup_longitude') }} = station_lon_cell
@@ -7,11 +7,18 @@
 
 WITH raw_weather AS (
   SELECT *
-  FROM `{{ env_var('GCP_PROJECT_ID') }}.chicago_taxi_raw.weather_data`
+  FROM {{ raw_table('weather_data') }}
   WHERE date >= '2023-06-01'
     AND date <= '2023-12-31'
 ),
 
+{% if var('weather_raw_is_unique') | string | lower == 'true' %}
+-- Verificado antes de dbt (ensure_weather_raw_unique): raw ya tiene una fila por fecha
+deduplicated_weather AS (
+  SELECT *
+  FROM raw_weather
+)
+{% else %}
 -- Eliminar duplicados por fecha, manteniendo el registro más reciente
 deduplicated_weather AS (
   SELECT *
@@ -25,6 +32,7 @@ deduplicated_weather AS (
   )
   WHERE rn = 1
 )
+{% endif %}
 
 SELECT
   date,
@@ -33,20 +41,10 @@ SELECT
   wind_speed,
   precipitation,
   weather_condition,
-  -- Categorizar condiciones climáticas
-  CASE 
-    WHEN weather_condition IN ('Rain', 'Drizzle', 'Thunderstorm') THEN 'Rainy'
-    WHEN weather_condition IN ('Snow', 'Sleet') THEN 'Snowy'
-    WHEN weather_condition IN ('Clear', 'Sun') THEN 'Clear'
-    WHEN weather_condition IN ('Clouds', 'Mist', 'Fog') THEN 'Cloudy'
-    ELSE 'Other'
-  END AS weather_category,
+  -- Usado por los modelos gold incrementales para detectar fechas con clima nuevo
+  ingestion_timestamp,
+  -- Categorizar condiciones climáticas (macros/weather_categories.sql)
+  {{ weather_category('weather_condition') }} AS weather_category,
   -- Categorizar temperatura
-  CASE 
-    WHEN temperature < 0 THEN 'Freezing'
-    WHEN temperature < 10 THEN 'Cold'
-    WHEN temperature < 20 THEN 'Cool'
-    WHEN temperature < 30 THEN 'Warm'
-    ELSE 'Hot'
-  END AS temperature_category
+  {{ temperature_category('temperature') }} AS temperature_category
 FROM deduplicated_weather
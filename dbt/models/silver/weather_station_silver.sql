@@ -0,0 +1,29 @@
+{{
+  config(
+    materialized='table',
+    schema='silver',
+    cluster_by=['station_id', 'date']
+  )
+}}
+
+-- Clima diario por estación GSOD del área de Chicago (weather_station_data, modo
+-- {"stations": true} de la función). La función escribe con MERGE por
+-- (date, station_id), así que raw ya tiene una fila por fecha y estación.
+SELECT
+  date,
+  station_id,
+  station_name,
+  latitude,
+  longitude,
+  temperature,
+  humidity,
+  wind_speed,
+  precipitation,
+  weather_condition,
+  -- Usado por los modelos gold incrementales para detectar fechas con clima nuevo
+  ingestion_timestamp,
+  {{ weather_category('weather_condition') }} AS weather_category,
+  {{ temperature_category('temperature') }} AS temperature_category
+FROM {{ raw_table('weather_station_data') }}
+WHERE date >= '2023-06-01'
+  AND date <= '2023-12-31'
@@ -0,0 +1,67 @@
+-- Paridad de los sketches de taxi_weather_hourly contra el cálculo exacto sobre
+-- taxi_trips_silver, por día, en los últimos sketch_parity_days días del modelo.
+-- Devuelve los días fuera de tolerancia:
+--   unique_taxis  (HLL++)  error relativo <= sketch_distinct_tolerance (2%).
+--                          HLL_COUNT.INIT usa precisión 15: ~0.6% de error estándar
+--                          y exacto en la práctica para unos pocos miles de taxis por día.
+--   mediana de trip_seconds (KLL) el valor devuelto tiene que caer en el rango
+--                          0.5 ± sketch_quantile_rank_tolerance (1%) de la distribución
+--                          exacta. KLL acota el error de rango, no de valor; como
+--                          trip_seconds tiene empates se compara [P(X < m), P(X <= m)].
+-- En DuckDB los sketches son listas exactas (ver cross_db.sql): el test debe dar
+-- diferencia cero y valida el SQL de merge/extract; la tolerancia aplica en BigQuery.
+{% set parity_days = var('sketch_parity_days', 7) %}
+{% set distinct_tolerance = var('sketch_distinct_tolerance', 0.02) %}
+{% set rank_tolerance = var('sketch_quantile_rank_tolerance', 0.01) %}
+
+{% set checked_dates = [] %}
+{% if execute %}
+  {% set query %}
+    SELECT DISTINCT trip_date
+    FROM {{ ref('taxi_weather_hourly') }}
+    ORDER BY trip_date DESC
+    LIMIT {{ parity_days }}
+  {% endset %}
+  {% set checked_dates = run_query(query).columns[0].values() | map('string') | list %}
+{% endif %}
+
+WITH sketched AS (
+  SELECT
+    trip_date,
+    {{ distinct_sketch_merge('taxi_id_sketch') }} AS approx_unique_taxis,
+    {{ quantile_sketch_merge_point('trip_seconds_sketch', 0.5) }} AS approx_median_trip_seconds
+  FROM {{ ref('taxi_weather_hourly') }}
+  WHERE {{ changed_dates_filter('trip_date', checked_dates) }}
+  GROUP BY trip_date
+),
+
+exact AS (
+  SELECT
+    t.trip_date,
+    COUNT(DISTINCT t.taxi_id) AS unique_taxis,
+    {{ safe_divide(
+      'SUM(CASE WHEN t.trip_seconds < s.approx_median_trip_seconds THEN 1 ELSE 0 END)',
+      'COUNT(t.trip_seconds)'
+    ) }} AS rank_below_median,
+    {{ safe_divide(
+      'SUM(CASE WHEN t.trip_seconds <= s.approx_median_trip_seconds THEN 1 ELSE 0 END)',
+      'COUNT(t.trip_seconds)'
+    ) }} AS rank_at_or_below_median
+  FROM {{ ref('taxi_trips_silver') }} t
+  JOIN sketched s ON t.trip_date = s.trip_date
+  WHERE {{ changed_dates_filter('t.trip_date', checked_dates) }}
+  GROUP BY t.trip_date
+)
+
+SELECT
+  s.trip_date,
+  s.approx_unique_taxis,
+  e.unique_taxis,
+  s.approx_median_trip_seconds,
+  e.rank_below_median,
+  e.rank_at_or_below_median
+FROM sketched s
+JOIN exact e ON s.trip_date = e.trip_date
+WHERE ABS(s.approx_unique_taxis - e.unique_taxis) > {{ distinct_tolerance }} * e.unique_taxis
+  OR e.rank_below_median > 0.5 + {{ rank_tolerance }}
+  OR e.rank_at_or_below_median < 0.5 - {{ rank_tolerance }}
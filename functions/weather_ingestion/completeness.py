@@ -0,0 +1,209 @@
+"""
+Completitud por día de tablas particionadas por fecha, leída de metadatos.
+
+Responde "qué días faltan" con INFORMATION_SCHEMA.PARTITIONS (row count por
+partición, sin escanear la tabla) en lugar de COUNT(*) / COUNT(DISTINCT date).
+
+Lo usan la Cloud Function de clima (weather_data) y los ShortCircuit del DAG
+(weather_data y taxi_trips_raw_table); en Composer se copia junto a los DAGs
+(airflow/dags/completeness.py es un symlink a este archivo).
+
+Filas en el streaming buffer (insert_rows_json) todavía no tienen partición y
+aparecen en __UNPARTITIONED__: si esa partición tiene filas, los conteos del
+rango se resuelven con un GROUP BY exacto sobre la tabla.
+
+duplicate_days / deduplicate_days detectan y eliminan fechas repetidas en tablas
+con una fila por día (weather_data antes de las escrituras con MERGE).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Union
+
+from query_guard import run_query
+
+UNPARTITIONED_PARTITION_ID = "__UNPARTITIONED__"
+
+DateLike = Union[date, datetime]
+
+
+def _as_date(value: DateLike) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class PartitionCompleteness:
+    """
+    Conteo de filas por día de una tabla particionada por DAY.
+
+    Los conteos se cachean por instancia: una instancia por corrida (invocación de
+    la función o task de Airflow) hace una sola query de metadatos por rango.
+    Después de escribir en la tabla hay que llamar a invalidate().
+
+    Args:
+        client: Cliente de BigQuery (google.cloud.bigquery.Client, QueryExecutor o compatible)
+        table_id: Tabla destino "project.dataset.table"
+        date_expression: Expresión de la fecha de partición, para el fallback exacto
+        location: Ubicación de los jobs de consulta (None = la del cliente)
+    """
+
+    def __init__(self, client: Any, table_id: str, date_expression: str = "date", location: Optional[str] = None):
+        self.client = client
+        self.table_id = table_id
+        self.date_expression = date_expression
+        self.location = location
+        # "metadata" o "scan": de dónde salieron los últimos conteos (para logs)
+        self.source: Optional[str] = None
+        self._counts: Dict[date, int] = {}
+        self._loaded: Optional[tuple] = None
+
+    def invalidate(self) -> None:
+        """Descarta los conteos cacheados (llamar después de escribir en la tabla)."""
+        self._counts = {}
+        self._loaded = None
+
+    def row_counts(self, start: DateLike, end: DateLike) -> Dict[date, int]:
+        """
+        Filas por día dentro de [start, end]; los días sin partición no aparecen.
+
+        Args:
+            start: Fecha de inicio (inclusive)
+            end: Fecha de fin (inclusive)
+
+        Returns:
+            Dict fecha -> cantidad de filas
+        """
+        start, end = _as_date(start), _as_date(end)
+        if self._loaded is None or start < self._loaded[0] or end > self._loaded[1]:
+            self._counts = self._query_counts(start, end)
+            self._loaded = (start, end)
+        return {day: count for day, count in self._counts.items() if start <= day <= end}
+
+    def missing_days(self, start: DateLike, end: DateLike, min_rows: int = 1) -> List[date]:
+        """
+        Días del rango sin datos o con menos de min_rows filas, en orden.
+
+        Args:
+            start: Fecha de inicio (inclusive)
+            end: Fecha de fin (inclusive)
+            min_rows: Mínimo de filas para considerar el día completo
+
+        Returns:
+            Lista ordenada de fechas faltantes o incompletas
+        """
+        counts = self.row_counts(start, end)
+        return [day for day in _days(_as_date(start), _as_date(end)) if counts.get(day, 0) < min_rows]
+
+    def present_days(self, start: DateLike, end: DateLike, min_rows: int = 1) -> Set[date]:
+        """Días del rango con al menos min_rows filas."""
+        return {day for day, count in self.row_counts(start, end).items() if count >= min_rows}
+
+    def _query(self, query: str, **params: Any) -> List[Any]:
+        try:
+            # location sólo si se pidió: el cliente de la función la infiere del dataset
+            return run_query(self.client, query, params, location=self.location)
+        except Exception as error:
+            # Dataset o tabla inexistente: todavía no hay ningún día cargado
+            from google.api_core.exceptions import NotFound
+            if isinstance(error, NotFound):
+                return []
+            raise
+
+    def _query_counts(self, start: date, end: date) -> Dict[date, int]:
+        project, dataset, table = self.table_id.split(".")
+        rows = self._query(f"""
+            SELECT partition_id, total_rows
+            FROM `{project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS`
+            WHERE table_name = @table_name
+              AND (partition_id BETWEEN @start_partition AND @end_partition
+                   OR partition_id = @unpartitioned)
+        """, table_name=table, start_partition=f"{start:%Y%m%d}", end_partition=f"{end:%Y%m%d}",
+            unpartitioned=UNPARTITIONED_PARTITION_ID)
+        counts = {}
+        streaming_rows = 0
+        for row in rows:
+            if row.partition_id == UNPARTITIONED_PARTITION_ID:
+                streaming_rows = row.total_rows or 0
+            elif row.total_rows:
+                counts[datetime.strptime(row.partition_id, "%Y%m%d").date()] = row.total_rows
+        if not streaming_rows:
+            self.source = "metadata"
+            return counts
+
+        # Hay filas en el streaming buffer: los metadatos no dicen a qué día pertenecen
+        self.source = "scan"
+        rows = self._query(f"""
+            SELECT {self.date_expression} AS day, COUNT(*) AS row_count
+            FROM `{self.table_id}`
+            WHERE {self.date_expression} BETWEEN @start AND @end
+            GROUP BY day
+        """, start=start, end=end)
+        return {row.day: row.row_count for row in rows}
+
+
+def duplicate_days(client: Any, table_id: str, date_expression: str = "date",
+                   location: Optional[str] = None) -> List[date]:
+    """
+    Días con más de una fila en una tabla que debería tener una fila por día.
+
+    Args:
+        client: Cliente de BigQuery (o QueryExecutor)
+        table_id: Tabla "project.dataset.table"
+        date_expression: Expresión de la fecha
+        location: Ubicación del job (None = la del cliente)
+
+    Returns:
+        Lista ordenada de fechas repetidas (vacía si la tabla no existe)
+    """
+    try:
+        rows = run_query(client, f"""
+            SELECT {date_expression} AS day
+            FROM `{table_id}`
+            GROUP BY day
+            HAVING COUNT(*) > 1
+            ORDER BY day
+        """, location=location)
+    except Exception as error:
+        from google.api_core.exceptions import NotFound
+        if isinstance(error, NotFound):
+            return []
+        raise
+    return [row.day for row in rows]
+
+
+def deduplicate_days(client: Any, table_id: str, days: List[date], order_by: str,
+                     date_column: str = "date", location: Optional[str] = None) -> None:
+    """
+    Deja una sola fila por día (la primera según order_by) en los días indicados.
+
+    Un único MERGE con ON FALSE: borra las filas de esos días y vuelve a insertar la
+    elegida, en una sola transacción y sin recrear la tabla (se conservan partición,
+    clustering y opciones). Los demás días no se tocan.
+
+    Args:
+        client: Cliente de BigQuery (o QueryExecutor)
+        table_id: Tabla "project.dataset.table"
+        days: Días a deduplicar (ver duplicate_days)
+        order_by: Orden dentro de cada día; se conserva la primera fila
+        date_column: Columna de la fecha
+        location: Ubicación del job (None = la del cliente)
+    """
+    if not days:
+        return
+    run_query(client, f"""
+        MERGE `{table_id}` T
+        USING (
+          SELECT * EXCEPT (rn)
+          FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY {date_column} ORDER BY {order_by}) AS rn
+            FROM `{table_id}`
+            WHERE {date_column} IN UNNEST(@days)
+          )
+          WHERE rn = 1
+        ) S
+        ON FALSE
+        WHEN NOT MATCHED BY SOURCE AND T.{date_column} IN UNNEST(@days) THEN DELETE
+        WHEN NOT MATCHED THEN INSERT ROW
+    """, {"days": list(days)}, location=location)
@@ -0,0 +1,246 @@
+"""
+Cache de las filas diarias de NOAA GSOD, un archivo Parquet por estación y año.
+
+Las tablas bigquery-public-data.noaa_gsod.gsod{year} no están particionadas: una
+query de un solo día escanea el mismo año completo que una query del año entero.
+El cache trae el año completo de la estación en una query y lo guarda, así los
+reintentos, los requests {"date": ...} repetidos y los backfills ya no vuelven a
+consultar NOAA para días que no cambian.
+
+- Clave: gsod/wban=<estación>/year=<año>/<digest>.parquet, donde el digest es un
+  hash de la query que produce las filas: si cambia la agregación de
+  NOAA_DAILY_SELECT las entradas viejas dejan de usarse solas
+- Backends: disco local (LocalCacheBackend, por defecto /tmp, que se conserva
+  entre invocaciones de una instancia caliente) o GCS (GCSCacheBackend, compartido
+  entre instancias)
+- Frescura: un año cerrado se sirve siempre del cache, salvo que la entrada se haya
+  escrito antes de que NOAA terminara de publicarlo (FINALIZATION_LAG después del
+  31/12). El año en curso se revalida contra NOAA cuando la entrada tiene más de
+  ttl_seconds
+- Cada instancia también guarda en memoria los años ya leídos
+
+Los conteos de hits/misses/revalidaciones de una ingesta se acumulan en el
+contexto abierto con run_stats() (los threads de fetch lo heredan vía
+copy_context) y vuelven en la respuesta de la función.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Demora con la que NOAA termina de publicar un año en GSOD
+FINALIZATION_LAG = timedelta(days=30)
+
+# Conteos de la ingesta en curso (ver run_stats)
+_RUN_STATS: contextvars.ContextVar = contextvars.ContextVar("gsod_cache_stats", default=None)
+
+YearFetcher = Callable[[Any, str, int], List[Any]]
+
+
+class CachedRow:
+    """Fila de NOAA leída del cache, con acceso por atributo como las de BigQuery."""
+
+    def __init__(self, values: Dict[str, Any]):
+        self.__dict__.update(values)
+
+
+def query_digest(query: str) -> str:
+    """Digest de una query normalizada (espacios colapsados) para las claves del cache."""
+    return hashlib.sha256(" ".join(query.split()).encode()).hexdigest()[:16]
+
+
+class LocalCacheBackend:
+    """Entradas como archivos bajo root."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Devuelve (contenido, epoch de escritura) o None si la clave no existe."""
+        path = os.path.join(self.root, key)
+        try:
+            with open(path, "rb") as f:
+                return f.read(), os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, payload: bytes) -> None:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escritura atómica: otra invocación nunca lee un archivo a medio escribir
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+class GCSCacheBackend:
+    """Entradas como objetos de GCS bajo gs://bucket/prefix."""
+
+    def __init__(self, bucket: str, prefix: str = ""):
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucket)
+        self.prefix = prefix.strip("/")
+
+    def _blob(self, key: str) -> Any:
+        return self.bucket.blob(f"{self.prefix}/{key}" if self.prefix else key)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        from google.api_core.exceptions import NotFound
+
+        blob = self._blob(key)
+        try:
+            payload = blob.download_as_bytes()
+        except NotFound:
+            return None
+        return payload, blob.updated.timestamp()
+
+    def put(self, key: str, payload: bytes) -> None:
+        self._blob(key).upload_from_string(payload, content_type="application/vnd.apache.parquet")
+
+
+def build_backend(uri: str) -> Any:
+    """Backend a partir de "gs://bucket/prefijo" o de un directorio local."""
+    if uri.startswith("gs://"):
+        bucket, _, prefix = uri[len("gs://"):].partition("/")
+        return GCSCacheBackend(bucket, prefix)
+    return LocalCacheBackend(uri)
+
+
+def rows_to_parquet(rows: List[Any], columns: List[str]) -> bytes:
+    """Serializa filas (acceso por atributo) como Parquet."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({column: [getattr(row, column) for row in rows] for column in columns})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def parquet_to_rows(payload: bytes) -> List[CachedRow]:
+    """Filas de un Parquet del cache (fechas como datetime.date, nulos como None)."""
+    import pyarrow.parquet as pq
+
+    return [CachedRow(values) for values in pq.read_table(io.BytesIO(payload)).to_pylist()]
+
+
+@contextlib.contextmanager
+def run_stats() -> Iterator[Counter]:
+    """Acumula los conteos del cache de una ingesta (hits, misses, revalidations)."""
+    stats: Counter = Counter()
+    token = _RUN_STATS.set(stats)
+    try:
+        yield stats
+    finally:
+        _RUN_STATS.reset(token)
+
+
+class GsodYearCache:
+    """
+    Filas diarias de GSOD por estación y año, con lectura a través del cache.
+
+    Args:
+        backend: LocalCacheBackend, GCSCacheBackend o compatible (get/put)
+        fetch_year: Función (client, wban, year) -> filas del año desde NOAA
+        columns: Columnas de las filas a guardar
+        digest: Digest de la query de fetch_year (parte de la clave)
+        ttl_seconds: Antigüedad máxima de las entradas de un año sin cerrar
+        now: Reloj (epoch en segundos); para pruebas
+    """
+
+    def __init__(self, backend: Any, fetch_year: YearFetcher, columns: List[str], digest: str,
+                 ttl_seconds: float = 6 * 3600, now: Callable[[], float] = time.time):
+        self.backend = backend
+        self.fetch_year = fetch_year
+        self.columns = columns
+        self.digest = digest
+        self.ttl_seconds = ttl_seconds
+        self.now = now
+        self._memory: Dict[Tuple[str, int], Tuple[Dict[date, Any], float]] = {}
+        self._locks: Dict[Tuple[str, int], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def key(self, wban: str, year: int) -> str:
+        return f"gsod/wban={wban}/year={year}/{self.digest}.parquet"
+
+    def is_fresh(self, year: int, written_at: float) -> bool:
+        """Una entrada escrita después de cerrado el año no vence; las demás duran ttl_seconds."""
+        year_closed = datetime(year + 1, 1, 1, tzinfo=timezone.utc) + FINALIZATION_LAG
+        if written_at >= year_closed.timestamp():
+            return True
+        return self.now() - written_at <= self.ttl_seconds
+
+    def _count(self, outcome: str) -> None:
+        stats = _RUN_STATS.get()
+        if stats is not None:
+            stats[outcome] += 1
+
+    def _lock(self, wban: str, year: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((wban, year), threading.Lock())
+
+    def year_rows(self, client: Any, wban: str, year: int) -> Dict[date, Any]:
+        """
+        Filas del año de la estación por fecha, del cache o desde NOAA.
+
+        Args:
+            client: Cliente de BigQuery para los misses
+            wban: Código WBAN de la estación
+            year: Año
+
+        Returns:
+            Dict fecha -> fila (los días sin datos en NOAA no aparecen)
+        """
+        # Un solo fetch por año aunque varios threads de fetch pidan días del mismo año
+        with self._lock(wban, year):
+            cached = self._memory.get((wban, year))
+            if cached is not None and self.is_fresh(year, cached[1]):
+                self._count("hits")
+                return cached[0]
+
+            key = self.key(wban, year)
+            entry = None
+            try:
+                entry = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"No se pudo leer {key} del cache de GSOD: {e}")
+            if entry is not None and self.is_fresh(year, entry[1]):
+                self._count("hits")
+                rows = parquet_to_rows(entry[0])
+                written_at = entry[1]
+            else:
+                self._count("revalidations" if entry is not None else "misses")
+                rows = self.fetch_year(client, wban, year)
+                written_at = self.now()
+                try:
+                    self.backend.put(key, rows_to_parquet(rows, self.columns))
+                except Exception as e:
+                    logger.warning(f"No se pudo escribir {key} en el cache de GSOD: {e}")
+                logger.info(f"GSOD {wban}/{year}: {len(rows)} días traídos de NOAA y guardados en el cache")
+
+            by_date = {row.date: row for row in rows}
+            self._memory[(wban, year)] = (by_date, written_at)
+            return by_date
+
+    def rows_for(self, client: Any, wban: str, days: Iterable[date]) -> Dict[date, Any]:
+        """Filas de las fechas pedidas que NOAA tiene (una lectura por año)."""
+        days_by_year: Dict[int, List[date]] = {}
+        for day in days:
+            days_by_year.setdefault(day.year, []).append(day)
+        rows = {}
+        for year, year_days in sorted(days_by_year.items()):
+            year_rows = self.year_rows(client, wban, year)
+            rows.update({day: year_rows[day] for day in year_days if day in year_rows})
+        return rows
@@ -18,22 +18,58 @@ Esta función tiene dos modos:
    - Se ejecuta automáticamente cada día
    - NOTA: Los datos nuevos (2024+) NO se usan en el dashboard (taxis terminan en 2023)
    - Pero se ingieren de todas formas según el requerimiento del desafío
+
+Las dependencias pesadas (google-cloud-bigquery, requests) se importan recién en
+el primer uso para acortar el cold start; ver scripts/profile_cold_start.py.
 """
 
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import importlib
+import importlib.util
+import io
 import os
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import gsod_cache
+import run_status
+import telemetry
+import visual_crossing
+from completeness import PartitionCompleteness
+from query_guard import GIB, QueryBudgetExceeded, QueryExecutor, run_query
+from run_status import BigQueryRunStatusStore, RunStatusStore
+
+
+class _LazyModule:
+    """Proxy que importa el módulo real en el primer acceso a un atributo."""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+bigquery = _LazyModule("google.cloud.bigquery")
+google_exceptions = _LazyModule("google.cloud.exceptions")
 
 # requests solo se usa para fallback con API externa
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
+requests = _LazyModule("requests")
+HAS_REQUESTS = importlib.util.find_spec("requests") is not None
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -50,19 +86,561 @@ TABLE_ID = os.environ.get("TABLE_ID")
 WEATHER_API_KEY = os.environ.get("OPENWEATHER_API_KEY") or os.environ.get("WEATHER_API_KEY")
 CHICAGO_LAT = float(os.environ.get("CHICAGO_LAT", "41.8781"))
 CHICAGO_LON = float(os.environ.get("CHICAGO_LON", "-87.6298"))
+WEATHER_API_URL = os.environ.get(
+    "WEATHER_API_URL",
+    "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline",
+)
+
+# Etapa de fetch concurrente: cantidad de workers y requests por segundo por host (0 = sin límite)
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "4"))
+API_MAX_REQUESTS_PER_SECOND = float(os.environ.get("API_MAX_REQUESTS_PER_SECOND", "5"))
+# Fallback de API por rangos: máximo de días consecutivos por request (0 = un request por día)
+API_MAX_RANGE_DAYS = int(os.environ.get("API_MAX_RANGE_DAYS", "31"))
+# Conexiones keep-alive que conserva la sesión HTTP compartida (>= workers usados)
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "16"))
 
 # Fechas del período de análisis
 START_DATE = datetime(2023, 6, 1)
 END_DATE = datetime(2023, 12, 31)
 
+# Escritura en BigQuery: tamaño de cada lote de streaming insert y cantidad de filas
+# a partir de la cual se usa un load job NDJSON (no pasa por el streaming buffer)
+INSERT_CHUNK_SIZE = int(os.environ.get("INSERT_CHUNK_SIZE", "500"))
+LOAD_JOB_THRESHOLD = int(os.environ.get("LOAD_JOB_THRESHOLD", "50"))
+# Upsert: cada flush carga el lote a una tabla staging y ejecuta un único MERGE por date.
+# Mantiene weather_data sin duplicados aunque dos corridas escriban la misma fecha; el
+# filtro previo por metadatos de partición sigue evitando re-pedir días ya cargados.
+# Con UPSERT_WRITES=false pueden quedar fechas repetidas: la tarea ensure_weather_raw_unique
+# de los DAGs las elimina antes de dbt y sólo entonces pasa weather_raw_is_unique=true.
+UPSERT_WRITES = os.environ.get("UPSERT_WRITES", "true").lower() == "true"
+
+# A partir de cuántas filas el path bulk convierte con noaa_batch (numpy/pandas)
+VECTORIZE_MIN_ROWS = int(os.environ.get("VECTORIZE_MIN_ROWS", "1000"))
+
+# Modo de backfill por defecto: "bulk" (una query NOAA por año) o por día
+BULK_BACKFILL = os.environ.get("BULK_BACKFILL", "true").lower() == "true"
+
+# Modo server-side: un único MERGE desde NOAA hacia weather_data, sin pasar filas por la función
+SERVER_SIDE_INGESTION = os.environ.get("SERVER_SIDE_INGESTION", "false").lower() == "true"
+
+# Máximo de días por request de rango/lista: rangos más grandes se reparten entre
+# varias invocaciones (ver coordinate_weather_backfill en el DAG)
+MAX_DAYS_PER_REQUEST = int(os.environ.get("MAX_DAYS_PER_REQUEST", "366"))
+
+# Control de costo de las queries (ver query_guard.py): dry-run previo, tope por query y
+# presupuesto por invocación en GiB (0 = sin tope), y qué hacer al superar el presupuesto
+QUERY_DRY_RUN = os.environ.get("QUERY_DRY_RUN", "true").lower() == "true"
+QUERY_MAX_GIB_PER_QUERY = float(os.environ.get("QUERY_MAX_GIB_PER_QUERY", "2"))
+QUERY_MAX_GIB_PER_RUN = float(os.environ.get("QUERY_MAX_GIB_PER_RUN", "100"))
+QUERY_OVER_BUDGET = os.environ.get("QUERY_OVER_BUDGET", "batch")
+
+# Cache de GSOD por estación y año (ver gsod_cache.py): directorio local o gs://bucket/prefijo
+# ("" lo desactiva) y antigüedad máxima de las entradas del año en curso
+GSOD_CACHE_URI = os.environ.get("GSOD_CACHE_URI", "/tmp/gsod_cache")
+GSOD_CACHE_TTL_SECONDS = float(os.environ.get("GSOD_CACHE_TTL_SECONDS", str(6 * 3600)))
+
+# Tabla de estado de las corridas asíncronas ({"async": true}), en el mismo dataset
+RUNS_TABLE_ID = os.environ.get("RUNS_TABLE_ID", "weather_ingestion_runs")
+# Cada cuánto una corrida en curso renueva su updated_at; el trigger del DAG da por
+# fallida una corrida sin heartbeat durante varios intervalos
+RUN_HEARTBEAT_SECONDS = float(os.environ.get("RUN_HEARTBEAT_SECONDS", "60"))
+
+# Modo de estaciones ({"stations": true}): clima diario de todas las estaciones GSOD a
+# menos de STATION_RADIUS_KM del centro de Chicago y la dimensión estación más
+# cercana por community area / celda de pickups (ver stations.py), en el mismo dataset
+STATION_TABLE_ID = os.environ.get("STATION_TABLE_ID", "weather_station_data")
+STATION_LOOKUP_TABLE_ID = os.environ.get("STATION_LOOKUP_TABLE_ID", "weather_station_lookup")
+TAXI_TABLE_ID = os.environ.get("TAXI_TABLE_ID", "taxi_trips_raw_table")
+STATION_RADIUS_KM = float(os.environ.get("STATION_RADIUS_KM", "50"))
+# Fracción mínima de días del rango con datos para que una estación entre en la dimensión
+STATION_MIN_COVERAGE = float(os.environ.get("STATION_MIN_COVERAGE", "0.9"))
+# Resolución de la grilla de pickups: tiene que coincidir con la variable de dbt
+# station_grid_cells_per_degree (100 = celdas de 0.01°, ~1.1 km)
+STATION_GRID_CELLS_PER_DEGREE = int(os.environ.get("STATION_GRID_CELLS_PER_DEGREE", "100"))
+
+# Estación: Chicago O'Hare International Airport (USW00094846)
+# Código WBAN: 94846, Código STN: 725300
+NOAA_STATION_WBAN = "94846"
+
+# Agregación diaria común a la query por día y a la query bulk. GSOD marca los
+# faltantes con centinelas (9999.9 en temp/dewp/slp/max/min, 999.9 en wdsp, 99.99 en
+# prcp): NULLIF los saca antes de agregar, igual que en las queries server-side
+NOAA_DAILY_SELECT = """
+    SELECT 
+        date,
+        AVG(NULLIF(SAFE_CAST(temp AS FLOAT64), 9999.9)) as avg_temp,
+        AVG(NULLIF(SAFE_CAST(dewp AS FLOAT64), 9999.9)) as avg_dewpoint,
+        AVG(NULLIF(SAFE_CAST(slp AS FLOAT64), 9999.9)) as avg_pressure,
+        AVG(NULLIF(SAFE_CAST(wdsp AS FLOAT64), 999.9)) as avg_wind_speed,
+        SUM(NULLIF(SAFE_CAST(prcp AS FLOAT64), 99.99)) as total_precipitation,
+        AVG(NULLIF(SAFE_CAST(max AS FLOAT64), 9999.9)) as max_temp,
+        AVG(NULLIF(SAFE_CAST(min AS FLOAT64), 9999.9)) as min_temp
+"""
+# Columnas de NOAA_DAILY_SELECT (las que guarda el cache de GSOD)
+NOAA_DAILY_COLUMNS = [
+    "date", "avg_temp", "avg_dewpoint", "avg_pressure", "avg_wind_speed",
+    "total_precipitation", "max_temp", "min_temp",
+]
+
+# Año completo de una estación: como gsod{year} no está particionada, escanea lo
+# mismo que la query de un solo día
+NOAA_YEAR_SQL = """
+    {select}
+    FROM `bigquery-public-data.noaa_gsod.gsod{year}`
+    WHERE wban = @wban
+      AND temp IS NOT NULL
+    GROUP BY date
+"""
+
+
+# Misma agregación, conversión de unidades, redondeo y clasificación que
+# convert_noaa_row, expresadas en SQL. La tabla wildcard gsod* se poda por año con
+# _TABLE_SUFFIX y el MERGE sólo inserta fechas que todavía no existen.
+SERVER_SIDE_MERGE_SQL = """
+MERGE `{target_table}` AS target
+USING (
+  WITH noaa AS (
+    SELECT
+      date,
+      AVG(NULLIF(SAFE_CAST(temp AS FLOAT64), 9999.9)) AS avg_temp,
+      AVG(NULLIF(SAFE_CAST(wdsp AS FLOAT64), 999.9)) AS avg_wind_speed,
+      SUM(NULLIF(SAFE_CAST(prcp AS FLOAT64), 99.99)) AS total_precipitation
+    FROM `bigquery-public-data.noaa_gsod.gsod*`
+    WHERE _TABLE_SUFFIX BETWEEN @start_year AND @end_year
+      AND wban = '{wban}'
+      AND date BETWEEN @start_date AND @end_date
+      AND temp IS NOT NULL
+    GROUP BY date
+  ),
+  converted AS (
+    SELECT
+      date,
+      (avg_temp - 32) * 5 / 9 AS temp_c,
+      IF(total_precipitation IS NULL, 0.0, total_precipitation * 25.4) AS precip_mm,
+      avg_wind_speed * 0.514 AS wind_speed_ms
+    FROM noaa
+  )
+  SELECT
+    date,
+    FLOOR(temp_c * 10 + 0.5) / 10 AS temperature,
+    CAST(NULL AS INT64) AS humidity,
+    FLOOR(wind_speed_ms * 10 + 0.5) / 10 AS wind_speed,
+    FLOOR(precip_mm * 10 + 0.5) / 10 AS precipitation,
+    CASE
+      WHEN precip_mm > 5 THEN 'Rain'
+      WHEN precip_mm > 0 THEN 'Drizzle'
+      WHEN temp_c < 0 THEN 'Cold'
+      ELSE 'Clear'
+    END AS weather_condition,
+    CURRENT_TIMESTAMP() AS ingestion_timestamp
+  FROM converted
+) AS source
+ON target.date = source.date
+  AND target.date BETWEEN @start_date AND @end_date
+WHEN NOT MATCHED THEN
+  INSERT (date, temperature, humidity, wind_speed, precipitation, weather_condition, ingestion_timestamp)
+  VALUES (source.date, source.temperature, source.humidity, source.wind_speed,
+          source.precipitation, source.weather_condition, source.ingestion_timestamp)
+"""
+
+
+# Todas las estaciones del área en una sola query: gsod* unida a noaa_gsod.stations
+# (una fila por usaf/wban, la de período más reciente) filtrada por distancia al
+# centro. Misma agregación, conversión y clasificación que SERVER_SIDE_MERGE_SQL,
+# por fecha y estación.
+STATIONS_MERGE_SQL = """
+MERGE `{target_table}` AS target
+USING (
+  WITH area_stations AS (
+    SELECT usaf, wban, name, lat, lon
+    FROM `bigquery-public-data.noaa_gsod.stations`
+    WHERE lat BETWEEN -90 AND 90
+      AND lon BETWEEN -180 AND 180
+      AND ST_DWITHIN(ST_GEOGPOINT(lon, lat), ST_GEOGPOINT(@center_lon, @center_lat), @radius_m)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY usaf, wban ORDER BY `end` DESC) = 1
+  ),
+  noaa AS (
+    SELECT
+      g.date,
+      CONCAT(g.stn, '-', g.wban) AS station_id,
+      ANY_VALUE(s.name) AS station_name,
+      ANY_VALUE(s.lat) AS latitude,
+      ANY_VALUE(s.lon) AS longitude,
+      AVG(NULLIF(SAFE_CAST(g.temp AS FLOAT64), 9999.9)) AS avg_temp,
+      AVG(NULLIF(SAFE_CAST(g.wdsp AS FLOAT64), 999.9)) AS avg_wind_speed,
+      SUM(NULLIF(SAFE_CAST(g.prcp AS FLOAT64), 99.99)) AS total_precipitation
+    FROM `bigquery-public-data.noaa_gsod.gsod*` AS g
+    JOIN area_stations AS s
+      ON g.stn = s.usaf AND g.wban = s.wban
+    WHERE g._TABLE_SUFFIX BETWEEN @start_year AND @end_year
+      AND g.date BETWEEN @start_date AND @end_date
+      AND g.temp IS NOT NULL
+    GROUP BY g.date, station_id
+  ),
+  converted AS (
+    SELECT
+      date,
+      station_id,
+      station_name,
+      latitude,
+      longitude,
+      (avg_temp - 32) * 5 / 9 AS temp_c,
+      IF(total_precipitation IS NULL, 0.0, total_precipitation * 25.4) AS precip_mm,
+      avg_wind_speed * 0.514 AS wind_speed_ms
+    FROM noaa
+  )
+  SELECT
+    date,
+    station_id,
+    station_name,
+    latitude,
+    longitude,
+    FLOOR(temp_c * 10 + 0.5) / 10 AS temperature,
+    CAST(NULL AS INT64) AS humidity,
+    FLOOR(wind_speed_ms * 10 + 0.5) / 10 AS wind_speed,
+    FLOOR(precip_mm * 10 + 0.5) / 10 AS precipitation,
+    CASE
+      WHEN precip_mm > 5 THEN 'Rain'
+      WHEN precip_mm > 0 THEN 'Drizzle'
+      WHEN temp_c < 0 THEN 'Cold'
+      ELSE 'Clear'
+    END AS weather_condition,
+    CURRENT_TIMESTAMP() AS ingestion_timestamp
+  FROM converted
+) AS source
+ON target.date = source.date
+  AND target.station_id = source.station_id
+  AND target.date BETWEEN @start_date AND @end_date
+WHEN NOT MATCHED THEN
+  INSERT (date, station_id, station_name, latitude, longitude, temperature, humidity, wind_speed,
+          precipitation, weather_condition, ingestion_timestamp)
+  VALUES (source.date, source.station_id, source.station_name, source.latitude, source.longitude,
+          source.temperature, source.humidity, source.wind_speed, source.precipitation,
+          source.weather_condition, source.ingestion_timestamp)
+"""
+
+# Estaciones de weather_station_data con datos en al menos @min_days días del rango
+STATION_COVERAGE_SQL = """
+    SELECT
+        station_id,
+        ANY_VALUE(station_name) AS station_name,
+        ANY_VALUE(latitude) AS latitude,
+        ANY_VALUE(longitude) AS longitude,
+        COUNT(DISTINCT date) AS days
+    FROM `{station_table}`
+    WHERE date BETWEEN @start_date AND @end_date
+    GROUP BY station_id
+    HAVING days >= @min_days
+"""
+
+# Centroide de los pickups de cada community area (las coordenadas del dataset ya son
+# centroides de census tract o de community area)
+PICKUP_AREA_CENTROIDS_SQL = """
+    SELECT
+        pickup_community_area AS community_area,
+        AVG(pickup_latitude) AS latitude,
+        AVG(pickup_longitude) AS longitude
+    FROM `{taxi_table}`
+    WHERE DATE(trip_start_timestamp) BETWEEN @start_date AND @end_date
+      AND pickup_community_area IS NOT NULL
+      AND pickup_latitude IS NOT NULL
+      AND pickup_longitude IS NOT NULL
+    GROUP BY community_area
+"""
+
+# Celdas de la grilla con pickups (misma expresión que la macro station_grid_cell de dbt)
+PICKUP_GRID_CELLS_SQL = """
+    SELECT DISTINCT
+        CAST(FLOOR(pickup_latitude * @cells_per_degree) AS INT64) AS lat_cell,
+        CAST(FLOOR(pickup_longitude * @cells_per_degree) AS INT64) AS lon_cell
+    FROM `{taxi_table}`
+    WHERE DATE(trip_start_timestamp) BETWEEN @start_date AND @end_date
+      AND pickup_latitude IS NOT NULL
+      AND pickup_longitude IS NOT NULL
+"""
+
+
+# Upsert del lote staging en weather_data: una fila por fecha, gana la ingesta más reciente
+UPSERT_MERGE_SQL = """
+MERGE `{target_table}` AS target
+USING (
+  SELECT * EXCEPT(rn)
+  FROM (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY date ORDER BY ingestion_timestamp DESC) AS rn
+    FROM `{staging_table}`
+  )
+  WHERE rn = 1
+) AS source
+ON target.date = source.date
+WHEN MATCHED THEN
+  UPDATE SET
+    temperature = source.temperature,
+    humidity = source.humidity,
+    wind_speed = source.wind_speed,
+    precipitation = source.precipitation,
+    weather_condition = source.weather_condition,
+    ingestion_timestamp = source.ingestion_timestamp
+WHEN NOT MATCHED THEN
+  INSERT (date, temperature, humidity, wind_speed, precipitation, weather_condition, ingestion_timestamp)
+  VALUES (source.date, source.temperature, source.humidity, source.wind_speed,
+          source.precipitation, source.weather_condition, source.ingestion_timestamp)
+"""
+
+
+def weather_data_schema() -> List[Any]:
+    """Esquema de weather_data (igual al de terraform/main.tf) para la tabla staging."""
+    return [
+        bigquery.SchemaField("date", "DATE", mode="REQUIRED"),
+        bigquery.SchemaField("temperature", "FLOAT"),
+        bigquery.SchemaField("humidity", "INTEGER"),
+        bigquery.SchemaField("wind_speed", "FLOAT"),
+        bigquery.SchemaField("precipitation", "FLOAT"),
+        bigquery.SchemaField("weather_condition", "STRING"),
+        bigquery.SchemaField("ingestion_timestamp", "TIMESTAMP", mode="REQUIRED"),
+    ]
+
+
+def station_lookup_schema() -> List[Any]:
+    """Esquema de weather_station_lookup (igual al de terraform/main.tf)."""
+    return [
+        bigquery.SchemaField("lookup_type", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("community_area", "INTEGER"),
+        bigquery.SchemaField("lat_cell", "INTEGER"),
+        bigquery.SchemaField("lon_cell", "INTEGER"),
+        bigquery.SchemaField("latitude", "FLOAT"),
+        bigquery.SchemaField("longitude", "FLOAT"),
+        bigquery.SchemaField("station_id", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("station_name", "STRING"),
+        bigquery.SchemaField("distance_km", "FLOAT"),
+        bigquery.SchemaField("built_at", "TIMESTAMP", mode="REQUIRED"),
+    ]
+
+
+def round_half_up_1(value: float) -> float:
+    """Redondeo a 1 decimal (half up); noaa_batch usa exactamente la misma fórmula."""
+    return math.floor(value * 10 + 0.5) / 10
+
+
+def convert_noaa_row(row: Any, date: datetime) -> Dict[str, Any]:
+    """
+    Convierte una fila agregada de NOAA GSOD al esquema de weather_data.
+    
+    Los valores 0.0 son datos válidos (0 °F, 0 nudos): sólo None se trata como nulo.
+    
+    Args:
+        row: Fila con avg_temp, avg_wind_speed y total_precipitation
+        date: Fecha a la que corresponde la fila
+        
+    Returns:
+        Diccionario con los datos del clima
+    """
+    # Convertir temperatura de Fahrenheit a Celsius (NOAA usa Fahrenheit)
+    temp_c = (row.avg_temp - 32) * 5/9 if row.avg_temp is not None else None
+    
+    # Convertir precipitación de pulgadas a mm (1 inch = 25.4 mm)
+    precip_mm = row.total_precipitation * 25.4 if row.total_precipitation is not None else 0.0
+    
+    # Convertir velocidad del viento de nudos a m/s (1 knot = 0.514 m/s)
+    wind_speed_ms = row.avg_wind_speed * 0.514 if row.avg_wind_speed is not None else None
+    
+    # Determinar condición climática basada en temperatura y precipitación
+    weather_condition = "Clear"
+    if precip_mm > 5:
+        weather_condition = "Rain"
+    elif precip_mm > 0:
+        weather_condition = "Drizzle"
+    elif temp_c is not None and temp_c < 0:
+        weather_condition = "Cold"
+    
+    return {
+        "date": date.date().isoformat(),
+        "temperature": round_half_up_1(temp_c) if temp_c is not None else None,
+        "humidity": None,  # NOAA GSOD no tiene humedad directa, se puede calcular de dewpoint
+        "wind_speed": round_half_up_1(wind_speed_ms) if wind_speed_ms is not None else None,
+        "precipitation": round_half_up_1(precip_mm),
+        "weather_condition": weather_condition,
+        "ingestion_timestamp": datetime.utcnow().isoformat()
+    }
+
+
+class HostRateLimiter:
+    """
+    Rate limiter por host, seguro entre threads.
+    
+    Reparte los requests de cada host en slots separados por 1/max_per_second
+    segundos; cada llamada a acquire() reserva el siguiente slot y espera hasta él.
+    """
+    
+    def __init__(self, max_per_second: float):
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+    
+    def acquire(self, host: str) -> None:
+        """Bloquea hasta que el host tenga un slot libre."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+API_RATE_LIMITER = HostRateLimiter(API_MAX_REQUESTS_PER_SECOND)
+
+
+# Registro de clientes a nivel de módulo: se crean una sola vez (lazy) y se reutilizan
+# en todas las invocaciones de una instancia caliente de la Cloud Function.
+_CLIENTS: Dict[str, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _build_http_session() -> Any:
+    """Sesión HTTP con pool de conexiones keep-alive dimensionado para la etapa de fetch."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(HTTP_POOL_MAXSIZE, FETCH_MAX_WORKERS))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _build_run_status_store() -> RunStatusStore:
+    """Registro de estado de corridas asíncronas en weather_ingestion_runs."""
+    return BigQueryRunStatusStore(get_client("bigquery"), f"{PROJECT_ID}.{DATASET_ID}.{RUNS_TABLE_ID}")
+
+
+def fetch_noaa_year(client: bigquery.Client, wban: str, year: int) -> List[Any]:
+    """Filas diarias de un año completo de una estación (lo que guarda el cache de GSOD)."""
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("wban", "STRING", wban)]
+    )
+    query = NOAA_YEAR_SQL.format(select=NOAA_DAILY_SELECT, year=year)
+    return list(client.query(query, job_config=job_config).result())
+
+
+def _build_gsod_cache() -> Optional[gsod_cache.GsodYearCache]:
+    """Cache de GSOD configurado con GSOD_CACHE_URI (None si está desactivado)."""
+    if not GSOD_CACHE_URI:
+        return None
+    return gsod_cache.GsodYearCache(
+        gsod_cache.build_backend(GSOD_CACHE_URI),
+        fetch_noaa_year,
+        NOAA_DAILY_COLUMNS,
+        digest=gsod_cache.query_digest(NOAA_YEAR_SQL.format(select=NOAA_DAILY_SELECT, year="")),
+        ttl_seconds=GSOD_CACHE_TTL_SECONDS,
+    )
+
+
+_CLIENT_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "bigquery": lambda: bigquery.Client(project=PROJECT_ID),
+    "http": _build_http_session,
+    "run_status": _build_run_status_store,
+    "gsod_cache": _build_gsod_cache,
+}
+
+
+def get_client(name: str) -> Any:
+    """
+    Devuelve el cliente registrado con ese nombre, creándolo la primera vez.
+    
+    Args:
+        name: "bigquery", "http", "run_status" o "gsod_cache"
+        
+    Returns:
+        Instancia compartida del cliente
+    """
+    client = _CLIENTS.get(name)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(name)
+            if client is None:
+                client = _CLIENT_FACTORIES[name]()
+                _CLIENTS[name] = client
+    return client
+
+
+def set_client(name: str, client: Any) -> None:
+    """Inyecta un cliente (por ejemplo un fake en tests) en el registro."""
+    with _CLIENTS_LOCK:
+        _CLIENTS[name] = client
+
 
-def get_weather_data(date: datetime) -> Dict[str, Any]:
+def reset_clients() -> None:
+    """Vacía el registro; la próxima llamada a get_client crea clientes nuevos."""
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """Cliente de BigQuery compartido por toda la invocación (y las siguientes en caliente)."""
+    return get_client("bigquery")
+
+
+def get_http_session() -> Any:
+    """Sesión HTTP compartida con conexiones keep-alive."""
+    return get_client("http")
+
+
+def fetch_weather_concurrently(
+    dates: List[datetime],
+    fetch_fn: Callable[[datetime], Optional[Dict[str, Any]]],
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> Iterator[Tuple[datetime, Optional[Dict[str, Any]], Optional[Exception], float]]:
+    """
+    Etapa de fetch con concurrencia acotada.
+    
+    Ejecuta fetch_fn para cada fecha en un pool de max_workers threads y entrega los
+    resultados en el mismo orden de las fechas (handoff ordenado hacia el writer).
+    
+    Args:
+        dates: Fechas a obtener
+        fetch_fn: Función que obtiene los datos de una fecha
+        max_workers: Máximo de fetches simultáneos
+        
+    Yields:
+        Tuplas (fecha, datos, error, latencia en segundos) en orden de fecha
+    """
+    def timed_fetch(day: datetime) -> Tuple[Optional[Dict[str, Any]], Optional[Exception], float]:
+        started = time.perf_counter()
+        try:
+            return fetch_fn(day), None, time.perf_counter() - started
+        except Exception as e:
+            return None, e, time.perf_counter() - started
+    
+    if not dates:
+        return
+    
+    latencies = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(dates)))) as executor:
+        # Cada fetch corre en una copia del contexto para heredar la telemetría de la ingesta
+        futures = [executor.submit(contextvars.copy_context().run, timed_fetch, day) for day in dates]
+        for day, future in zip(dates, futures):
+            weather_data, error, latency = future.result()
+            latencies.append(latency)
+            logger.debug(f"Fetch {day.date()}: {latency * 1000:.0f} ms")
+            yield day, weather_data, error, latency
+    
+    latencies.sort()
+    logger.info(
+        f"Fetch de {len(latencies)} días con {max_workers} workers: "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, máx {latencies[-1] * 1000:.0f} ms"
+    )
+
+
+@telemetry.stage("get_weather_data")
+def get_weather_data(date: datetime, client: Optional[bigquery.Client] = None) -> Dict[str, Any]:
     """
     Obtiene datos del clima para una fecha específica desde BigQuery público (NOAA).
     Usa el dataset público de Google Cloud: bigquery-public-data.noaa_gsod
     
+    Con el cache de GSOD activo lee el año de la estación desde el cache (y lo trae
+    completo de NOAA la primera vez) en lugar de consultar el día.
+    
     Args:
         date: Fecha para la cual obtener los datos del clima
+        client: Cliente de BigQuery; por defecto el cliente compartido del módulo
         
     Returns:
         Diccionario con los datos del clima
@@ -71,63 +649,32 @@ def get_weather_data(date: datetime) -> Dict[str, Any]:
         Exception: Si hay error al obtener datos de BigQuery
     """
     # Usar dataset público de NOAA en BigQuery
-    # Estación: Chicago O'Hare International Airport (USW00094846)
-    # Código WBAN: 94846, Código STN: 725300
+    # Con parámetros el texto de la query es el mismo para todas las fechas del año:
+    # BigQuery puede cachear el resultado y el dry-run del QueryExecutor se reutiliza
     query = f"""
-    SELECT 
-        date,
-        AVG(SAFE_CAST(temp AS FLOAT64)) as avg_temp,
-        AVG(SAFE_CAST(dewp AS FLOAT64)) as avg_dewpoint,
-        AVG(SAFE_CAST(slp AS FLOAT64)) as avg_pressure,
-        AVG(SAFE_CAST(wdsp AS FLOAT64)) as avg_wind_speed,
-        SUM(SAFE_CAST(prcp AS FLOAT64)) as total_precipitation,
-        AVG(SAFE_CAST(max AS FLOAT64)) as max_temp,
-        AVG(SAFE_CAST(min AS FLOAT64)) as min_temp
+    {NOAA_DAILY_SELECT}
     FROM `bigquery-public-data.noaa_gsod.gsod{date.year}`
-    WHERE wban = '94846'  -- Chicago O'Hare International Airport
-      AND date = DATE('{date.date().isoformat()}')
+    WHERE wban = @wban  -- Chicago O'Hare International Airport
+      AND date = @date
       AND temp IS NOT NULL
     GROUP BY date
     """
     
     try:
-        client = bigquery.Client(project=PROJECT_ID)
-        query_job = client.query(query)
-        results = query_job.result()
-        
-        row = next(results, None)
+        client = client or get_bigquery_client()
+        cache = get_client("gsod_cache")
+        if cache is not None:
+            row = cache.rows_for(client, NOAA_STATION_WBAN, [date.date()]).get(date.date())
+        else:
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("wban", "STRING", NOAA_STATION_WBAN),
+                bigquery.ScalarQueryParameter("date", "DATE", date.date()),
+            ])
+            query_job = client.query(query, job_config=job_config)
+            row = next(iter(query_job.result()), None)
         
         if row:
-            # Convertir temperatura de Fahrenheit a Celsius (NOAA usa Fahrenheit)
-            temp_c = (row.avg_temp - 32) * 5/9 if row.avg_temp else None
-            max_temp_c = (row.max_temp - 32) * 5/9 if row.max_temp else None
-            min_temp_c = (row.min_temp - 32) * 5/9 if row.min_temp else None
-            
-            # Convertir precipitación de pulgadas a mm (1 inch = 25.4 mm)
-            precip_mm = row.total_precipitation * 25.4 if row.total_precipitation else 0.0
-            
-            # Convertir velocidad del viento de nudos a m/s (1 knot = 0.514 m/s)
-            wind_speed_ms = row.avg_wind_speed * 0.514 if row.avg_wind_speed else None
-            
-            # Determinar condición climática basada en temperatura y precipitación
-            weather_condition = "Clear"
-            if precip_mm > 5:
-                weather_condition = "Rain"
-            elif precip_mm > 0:
-                weather_condition = "Drizzle"
-            elif temp_c and temp_c < 0:
-                weather_condition = "Cold"
-            
-            weather_data = {
-                "date": date.date().isoformat(),
-                "temperature": round(temp_c, 1) if temp_c else None,
-                "humidity": None,  # NOAA GSOD no tiene humedad directa, se puede calcular de dewpoint
-                "wind_speed": round(wind_speed_ms, 1) if wind_speed_ms else None,
-                "precipitation": round(precip_mm, 1),
-                "weather_condition": weather_condition,
-                "ingestion_timestamp": datetime.utcnow().isoformat()
-            }
-            
+            weather_data = convert_noaa_row(row, date)
             logger.info(f"Datos del clima obtenidos exitosamente desde BigQuery para {date.date()}")
             return weather_data
         else:
@@ -135,11 +682,15 @@ def get_weather_data(date: datetime) -> Dict[str, Any]:
             logger.warning(f"No se encontraron datos en NOAA para {date.date()}, usando API externa como fallback")
             return get_weather_data_from_api(date)
         
+    except QueryBudgetExceeded:
+        # Un rechazo por costo no es una falta de datos: no se reemplaza por la API
+        raise
     except Exception as e:
         logger.warning(f"Error obteniendo datos de BigQuery para {date.date()}: {e}. Intentando con API externa...")
         return get_weather_data_from_api(date)
 
 
+@telemetry.stage("get_weather_data_from_api")
 def get_weather_data_from_api(date: datetime) -> Dict[str, Any]:
     """
     Obtiene datos del clima desde API externa (fallback si BigQuery no tiene datos).
@@ -157,7 +708,7 @@ def get_weather_data_from_api(date: datetime) -> Dict[str, Any]:
         raise ValueError("No hay datos en BigQuery público y WEATHER_API_KEY no está configurada.")
     
     # Usar Visual Crossing como fallback
-    url = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+    url = WEATHER_API_URL
     params = {
         "location": f"{CHICAGO_LAT},{CHICAGO_LON}",
         "date": date.strftime("%Y-%m-%d"),
@@ -167,22 +718,13 @@ def get_weather_data_from_api(date: datetime) -> Dict[str, Any]:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        API_RATE_LIMITER.acquire(urlparse(url).netloc)
+        response = get_http_session().get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         
         if "days" in data and len(data["days"]) > 0:
-            day_data = data["days"][0]
-            
-            weather_data = {
-                "date": date.date().isoformat(),
-                "temperature": day_data.get("tempmax", None),
-                "humidity": day_data.get("humidity", None),
-                "wind_speed": day_data.get("windspeed", None),
-                "precipitation": day_data.get("precip", 0.0),
-                "weather_condition": day_data.get("conditions", None),
-                "ingestion_timestamp": datetime.utcnow().isoformat()
-            }
+            weather_data = visual_crossing.day_to_weather_data(data["days"][0], date.date().isoformat())
             logger.info(f"Datos del clima obtenidos desde API externa para {date.date()}")
             return weather_data
         else:
@@ -194,10 +736,125 @@ def get_weather_data_from_api(date: datetime) -> Dict[str, Any]:
         raise Exception(error_msg)
 
 
+@telemetry.stage("get_weather_data_range_from_api")
+def get_weather_data_range_from_api(start_date: date_type, end_date: date_type) -> List[Dict[str, Any]]:
+    """
+    Obtiene de la API externa todos los días de un rango con un solo request.
+    
+    Usa el formato de rango del endpoint timeline (/{lat},{lon}/{inicio}/{fin}) y
+    parsea el array "days" a medida que llega la respuesta (ver visual_crossing.py).
+    
+    Args:
+        start_date: Primer día (inclusive)
+        end_date: Último día (inclusive)
+        
+    Returns:
+        Filas de weather_data de los días que vinieron en la respuesta
+    """
+    if not HAS_REQUESTS:
+        raise ValueError("No hay datos en BigQuery público y el módulo 'requests' no está instalado para usar API externa.")
+    
+    if not WEATHER_API_KEY:
+        raise ValueError("No hay datos en BigQuery público y WEATHER_API_KEY no está configurada.")
+    
+    url = f"{WEATHER_API_URL.rstrip('/')}/{CHICAGO_LAT},{CHICAGO_LON}/{start_date.isoformat()}/{end_date.isoformat()}"
+    params = {
+        "key": WEATHER_API_KEY,
+        "unitGroup": "metric",
+        "include": "days"
+    }
+    
+    try:
+        API_RATE_LIMITER.acquire(urlparse(url).netloc)
+        with get_http_session().get(url, params=params, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            rows = [
+                visual_crossing.day_to_weather_data(day_data, day_data["datetime"])
+                for day_data in visual_crossing.iter_days(response.iter_content(chunk_size=64 * 1024))
+                if start_date.isoformat() <= day_data.get("datetime", "") <= end_date.isoformat()
+            ]
+        logger.info(f"{len(rows)} días obtenidos desde API externa para {start_date} a {end_date} en un request")
+        return rows
+    except Exception as e:
+        error_msg = f"Error obteniendo datos de API externa para {start_date} a {end_date}: {e}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+
+def fetch_weather_from_api(
+    dates: List[datetime],
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> Iterator[Tuple[datetime, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Fallback de API para los días que NOAA no tiene.
+    
+    Agrupa los días en tramos consecutivos de a lo sumo API_MAX_RANGE_DAYS y pide cada
+    tramo con un solo request (los tramos en paralelo); con API_MAX_RANGE_DAYS=0 hace
+    un request por día.
+    
+    Args:
+        dates: Días a obtener
+        max_workers: Máximo de requests simultáneos
+        
+    Yields:
+        Tuplas (fecha, datos, error) en orden de fecha
+    """
+    if API_MAX_RANGE_DAYS <= 0:
+        for day, weather_data, error, _ in fetch_weather_concurrently(dates, get_weather_data_from_api, max_workers):
+            yield day, weather_data, error
+        return
+    
+    runs = visual_crossing.contiguous_runs((day.date() for day in dates), API_MAX_RANGE_DAYS)
+    run_starts = [datetime.combine(start, datetime.min.time()) for start, _ in runs]
+    run_ends = {start: end for start, end in runs}
+    
+    def fetch_run(run_start: datetime) -> Dict[str, Dict[str, Any]]:
+        rows = get_weather_data_range_from_api(run_start.date(), run_ends[run_start.date()])
+        return {row["date"]: row for row in rows}
+    
+    for run_start, rows, error, _ in fetch_weather_concurrently(run_starts, fetch_run, max_workers):
+        run_end = run_ends[run_start.date()]
+        for offset in range((run_end - run_start.date()).days + 1):
+            day = run_start + timedelta(days=offset)
+            if error is not None:
+                yield day, None, error
+            elif day.date().isoformat() in rows:
+                yield day, rows[day.date().isoformat()], None
+            else:
+                yield day, None, Exception(f"No se encontraron datos del día en la respuesta de la API para {day.date()}")
+
+
+# Completitud de weather_data por metadatos de partición, cacheada durante la ingesta.
+# Es por thread: una corrida asíncrona sigue en su propio thread mientras la instancia
+# atiende otros requests.
+_completeness = threading.local()
+
+
+def get_completeness(client: bigquery.Client) -> PartitionCompleteness:
+    """
+    Servicio de completitud de weather_data para la ingesta en curso.
+    
+    run_ingestion lo descarta al comenzar (reset_completeness), así que los conteos
+    cacheados nunca sobreviven a una instancia caliente.
+    """
+    service = getattr(_completeness, "service", None)
+    if service is None or service.client is not client:
+        service = _completeness.service = PartitionCompleteness(client, f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}")
+    return service
+
+
+def reset_completeness() -> None:
+    """Descarta los conteos cacheados de la ingesta anterior de este thread."""
+    _completeness.service = None
+
+
+@telemetry.stage("check_date_exists")
 def check_date_exists(client: bigquery.Client, date: datetime) -> bool:
     """
     Verifica si ya existen datos para una fecha específica.
     
+    Lee el row count de la partición (INFORMATION_SCHEMA.PARTITIONS), sin escanear la tabla.
+    
     Args:
         client: Cliente de BigQuery
         date: Fecha a verificar
@@ -205,47 +862,247 @@ def check_date_exists(client: bigquery.Client, date: datetime) -> bool:
     Returns:
         True si la fecha ya existe, False en caso contrario
     """
-    query = f"""
-    SELECT COUNT(*) as count
-    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
-    WHERE date = DATE('{date.date().isoformat()}')
-    """
-    
     try:
-        query_job = client.query(query)
-        results = query_job.result()
-        row = next(results)
-        return row.count > 0
-    except NotFound:
-        # La tabla no existe aún
-        return False
+        return not get_completeness(client).missing_days(date, date)
     except Exception as e:
         logger.error(f"Error verificando fecha: {e}")
         return False
 
 
-def insert_weather_data(client: bigquery.Client, weather_data: Dict[str, Any]) -> None:
+@telemetry.stage("get_existing_dates")
+def get_existing_dates(client: bigquery.Client, start_date: datetime, end_date: datetime) -> Set[date_type]:
     """
-    Inserta datos del clima en BigQuery.
+    Obtiene todas las fechas que ya existen en la tabla destino.
+    
+    Una sola query de metadatos de partición para todo el rango (cacheada durante la
+    invocación); sólo escanea la tabla si hay filas en el streaming buffer.
     
     Args:
         client: Cliente de BigQuery
-        weather_data: Datos del clima a insertar
+        start_date: Fecha de inicio (inclusive)
+        end_date: Fecha de fin (inclusive)
+        
+    Returns:
+        Conjunto de fechas ya cargadas dentro del rango
+    """
+    return get_completeness(client).present_days(start_date, end_date)
+
+
+@telemetry.stage("get_weather_data_bulk")
+def get_weather_data_bulk(client: bigquery.Client, dates: Iterable[datetime]) -> Dict[date_type, Dict[str, Any]]:
     """
-    table_ref = client.dataset(DATASET_ID).table(TABLE_ID)
+    Obtiene desde NOAA los datos del clima de muchas fechas a la vez.
+    Ejecuta una sola query por año (tabla gsod{year}) filtrando con IN UNNEST(@dates)
+    y convierte el resultado completo al esquema de weather_data. Con el cache de
+    GSOD activo los años se leen del cache.
     
-    rows_to_insert = [weather_data]
+    Args:
+        client: Cliente de BigQuery
+        dates: Fechas a obtener
+        
+    Returns:
+        Diccionario fecha -> datos del clima. Las fechas sin datos en NOAA no aparecen.
+    """
+    dates_by_year: Dict[int, List[date_type]] = {}
+    for day in dates:
+        dates_by_year.setdefault(day.year, []).append(day.date())
     
-    errors = client.insert_rows_json(table_ref, rows_to_insert)
+    weather_by_date: Dict[date_type, Dict[str, Any]] = {}
+    cache = get_client("gsod_cache")
+    for year, year_dates in sorted(dates_by_year.items()):
+        if cache is not None:
+            year_rows = cache.year_rows(client, NOAA_STATION_WBAN, year)
+            rows = [year_rows[day] for day in sorted(set(year_dates)) if day in year_rows]
+            _convert_noaa_rows(rows, weather_by_date)
+            logger.info(f"NOAA {year}: {len(rows)} de {len(year_dates)} días leídos del cache de GSOD")
+            continue
+        query = f"""
+        {NOAA_DAILY_SELECT}
+        FROM `bigquery-public-data.noaa_gsod.gsod{year}`
+        WHERE wban = @wban  -- Chicago O'Hare International Airport
+          AND date IN UNNEST(@dates)
+          AND temp IS NOT NULL
+        GROUP BY date
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("dates", "DATE", year_dates),
+            bigquery.ScalarQueryParameter("wban", "STRING", NOAA_STATION_WBAN),
+        ])
+        rows = list(client.query(query, job_config=job_config).result())
+        _convert_noaa_rows(rows, weather_by_date)
+        logger.info(f"NOAA {year}: {len(rows)} de {len(year_dates)} días obtenidos en una query")
     
-    if errors:
-        logger.error(f"Error insertando datos: {errors}")
-        raise Exception(f"Error insertando datos: {errors}")
+    return weather_by_date
+
+
+def _convert_noaa_rows(rows: List[Any], weather_by_date: Dict[date_type, Dict[str, Any]]) -> None:
+    """Convierte filas de NOAA al esquema de weather_data y las agrega a weather_by_date."""
+    if len(rows) >= VECTORIZE_MIN_ROWS:
+        # Lotes grandes: conversión columnar en una sola pasada
+        import noaa_batch
+        records = noaa_batch.frame_to_records(noaa_batch.convert_noaa_frame(noaa_batch.rows_to_frame(rows)))
+        for row, weather_data in zip(rows, records):
+            weather_by_date[row.date] = weather_data
     else:
-        logger.info(f"Datos insertados correctamente para {weather_data['date']}")
+        for row in rows:
+            day = datetime.combine(row.date, datetime.min.time())
+            weather_by_date[row.date] = convert_noaa_row(row, day)
 
 
-def ingest_date_range(client: bigquery.Client, start_date: datetime, end_date: datetime) -> None:
+class WeatherRowWriter:
+    """
+    Writer con buffer para las filas de weather_data.
+    
+    Acumula las filas convertidas y las escribe al hacer flush():
+    - upsert=True: load job a una tabla staging + un único MERGE por date (idempotente)
+    - Menos de load_threshold filas: streaming insert en lotes de chunk_size
+    - load_threshold filas o más: un único load job NDJSON (load_table_from_file),
+      que no deja las filas en el streaming buffer y permite DML/dbt inmediatamente
+    
+    Los errores se reportan por fila en row_errors ({"date": ..., "errors": [...]}).
+    """
+    
+    def __init__(
+        self,
+        client: bigquery.Client,
+        chunk_size: int = INSERT_CHUNK_SIZE,
+        load_threshold: int = LOAD_JOB_THRESHOLD,
+        upsert: bool = UPSERT_WRITES,
+    ):
+        self.client = client
+        self.chunk_size = max(1, chunk_size)
+        self.load_threshold = load_threshold
+        self.upsert = upsert
+        self.rows: List[Dict[str, Any]] = []
+        self.written_rows = 0
+        self.row_errors: List[Dict[str, Any]] = []
+    
+    def add(self, weather_data: Dict[str, Any]) -> None:
+        """Agrega una fila al buffer."""
+        self.rows.append(weather_data)
+    
+    @telemetry.stage("write_flush")
+    def flush(self) -> Dict[str, int]:
+        """
+        Escribe todas las filas del buffer en BigQuery.
+        
+        Returns:
+            Diccionario con written y failed para este flush
+        """
+        rows, self.rows = self.rows, []
+        if not rows:
+            return {"written": 0, "failed": 0}
+        
+        table_ref = self.client.dataset(DATASET_ID).table(TABLE_ID)
+        if self.upsert:
+            errors = self._merge(rows)
+        elif self.load_threshold and len(rows) >= self.load_threshold:
+            errors = self._load(table_ref, rows)
+        else:
+            errors = self._stream(table_ref, rows)
+        
+        failed = len(errors)
+        self.written_rows += len(rows) - failed
+        self.row_errors.extend(errors)
+        for error in errors:
+            logger.error(f"Error insertando datos para {error['date']}: {error['errors']}")
+        logger.info(f"Flush de weather_data: {len(rows) - failed} filas escritas, {failed} con error")
+        return {"written": len(rows) - failed, "failed": failed}
+    
+    def _stream(self, table_ref: Any, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Streaming insert en lotes; mapea los errores por índice a la fecha de cada fila."""
+        errors = []
+        for offset in range(0, len(rows), self.chunk_size):
+            chunk = rows[offset:offset + self.chunk_size]
+            try:
+                chunk_errors = self.client.insert_rows_json(table_ref, chunk)
+            except Exception as e:
+                errors.extend({"date": row["date"], "errors": [str(e)]} for row in chunk)
+                continue
+            for error in chunk_errors:
+                errors.append({"date": chunk[error["index"]]["date"], "errors": error["errors"]})
+        return errors
+    
+    def _load(
+        self,
+        table_ref: Any,
+        rows: List[Dict[str, Any]],
+        write_disposition: str = "WRITE_APPEND",
+    ) -> List[Dict[str, Any]]:
+        """Load job NDJSON; el job es atómico, un error afecta a todas sus filas."""
+        payload = "\n".join(json.dumps(row) for row in rows).encode("utf-8")
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=write_disposition,
+            schema=weather_data_schema(),
+        )
+        try:
+            load_job = self.client.load_table_from_file(io.BytesIO(payload), table_ref, job_config=job_config)
+            load_job.result()
+        except Exception as e:
+            job_errors = getattr(e, "errors", None) or [str(e)]
+            return [{"date": row["date"], "errors": job_errors} for row in rows]
+        return []
+    
+    def _merge(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Carga el lote a una tabla staging y lo aplica con un único MERGE por date."""
+        staging_table = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}_staging_{uuid.uuid4().hex[:12]}"
+        try:
+            errors = self._load(staging_table, rows, write_disposition="WRITE_TRUNCATE")
+            if errors:
+                return errors
+            query = UPSERT_MERGE_SQL.format(
+                target_table=f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}",
+                staging_table=staging_table,
+            )
+            try:
+                self.client.query(query).result()
+            except Exception as e:
+                job_errors = getattr(e, "errors", None) or [str(e)]
+                return [{"date": row["date"], "errors": job_errors} for row in rows]
+            return []
+        finally:
+            self.client.delete_table(staging_table, not_found_ok=True)
+
+
+@telemetry.stage("insert_weather_data")
+def insert_weather_data(
+    client: bigquery.Client,
+    weather_data: Dict[str, Any],
+    writer: Optional[WeatherRowWriter] = None,
+) -> None:
+    """
+    Inserta datos del clima en BigQuery.
+    
+    Si se pasa un writer la fila queda en su buffer hasta el próximo flush();
+    si no, se escribe inmediatamente.
+    
+    Args:
+        client: Cliente de BigQuery
+        weather_data: Datos del clima a insertar
+        writer: Writer con buffer (opcional)
+    """
+    if writer is not None:
+        writer.add(weather_data)
+        return
+    
+    writer = WeatherRowWriter(client)
+    writer.add(weather_data)
+    writer.flush()
+    
+    if writer.row_errors:
+        raise Exception(f"Error insertando datos: {writer.row_errors}")
+    logger.info(f"Datos insertados correctamente para {weather_data['date']}")
+
+
+def ingest_date_range(
+    client: bigquery.Client,
+    start_date: datetime,
+    end_date: datetime,
+    bulk: bool = BULK_BACKFILL,
+    writer: Optional[WeatherRowWriter] = None,
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> Dict[str, int]:
     """
     Ingesta datos del clima para un rango de fechas.
     
@@ -253,42 +1110,342 @@ def ingest_date_range(client: bigquery.Client, start_date: datetime, end_date: d
         client: Cliente de BigQuery
         start_date: Fecha de inicio (inclusive)
         end_date: Fecha de fin (inclusive)
+        bulk: Si True usa el backfill set-based
+        writer: Writer con buffer; si no se pasa se crea uno para esta ingesta
+        max_workers: Máximo de fetches por día simultáneos
+        
+    Returns:
+        Resumen con total_days, inserted_days, skipped_days y failed_days
+    """
+    logger.info(f"Iniciando ingesta desde {start_date.date()} hasta {end_date.date()} (modo {'bulk' if bulk else 'por día'})")
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    return ingest_dates(client, dates, bulk=bulk, writer=writer, max_workers=max_workers)
+
+
+def ingest_dates(
+    client: bigquery.Client,
+    dates: List[datetime],
+    bulk: bool = BULK_BACKFILL,
+    writer: Optional[WeatherRowWriter] = None,
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> Dict[str, int]:
+    """
+    Ingesta datos del clima para una lista de fechas (no necesariamente contiguas).
+    
+    En ambos modos las fechas existentes salen de una sola lectura de metadatos de
+    partición (get_existing_dates). En modo bulk se piden a NOAA todos los días
+    faltantes con una query por año y sólo los días que NOAA no tiene pasan por el
+    fallback de API. En modo por día se mantiene el recorrido original
+    (get_weather_data para cada fecha faltante). En ambos casos los
+    fetches por día corren en un pool de max_workers threads.
+    
+    Args:
+        client: Cliente de BigQuery
+        dates: Fechas a ingerir
+        bulk: Si True usa el backfill set-based
+        writer: Writer con buffer; si no se pasa se crea uno para esta ingesta
+        max_workers: Máximo de fetches por día simultáneos
+        
+    Returns:
+        Resumen con total_days, inserted_days, skipped_days y failed_days
     """
-    logger.info(f"Iniciando ingesta desde {start_date.date()} hasta {end_date.date()}")
+    dates = sorted({day.replace(hour=0, minute=0, second=0, microsecond=0) for day in dates})
+    writer = writer or WeatherRowWriter(client)
+    
+    if not dates:
+        summary = {"total_days": 0, "skipped_days": 0, "failed_days": 0}
+    elif bulk:
+        summary = _ingest_dates_bulk(client, dates, writer, max_workers)
+    else:
+        summary = _ingest_dates_per_day(client, dates, writer, max_workers)
+    
+    # Todas las filas se escriben juntas al final del rango
+    flushed = writer.flush()
+    summary["inserted_days"] = flushed["written"]
+    summary["failed_days"] += flushed["failed"]
+    
+    logger.info("=" * 60)
+    logger.info(f"INGESTA COMPLETADA")
+    logger.info(f"Total de días procesados: {summary['total_days']}")
+    logger.info(f"Días nuevos insertados: {summary['inserted_days']}")
+    logger.info(f"Días que ya existían: {summary['skipped_days']}")
+    logger.info(f"Días con error: {summary['failed_days']}")
+    logger.info("=" * 60)
+    
+    return summary
+
+
+def _ingest_dates_bulk(
+    client: bigquery.Client,
+    all_dates: List[datetime],
+    writer: WeatherRowWriter,
+    max_workers: int,
+) -> Dict[str, int]:
+    """Backfill set-based: 1 lectura de fechas existentes + 1 query NOAA por año."""
+    # El filtro de metadatos evita volver a pedir (y pagar, en el fallback de API) días
+    # ya cargados; con upsert el MERGE sólo hace idempotente una re-escritura concurrente
+    existing_dates = get_existing_dates(client, all_dates[0], all_dates[-1])
+    missing_dates = [day for day in all_dates if day.date() not in existing_dates]
+    
+    weather_by_date = get_weather_data_bulk(client, missing_dates) if missing_dates else {}
+    for weather_data in weather_by_date.values():
+        insert_weather_data(client, weather_data, writer)
+    
+    # Sólo los días que NOAA no tiene pasan por el fallback de API, por tramos consecutivos
+    api_dates = [day for day in missing_dates if day.date() not in weather_by_date]
+    if api_dates:
+        logger.warning(f"{len(api_dates)} días sin datos en NOAA, usando API externa como fallback")
+    
+    failed_days = 0
+    for day, weather_data, error in fetch_weather_from_api(api_dates, max_workers):
+        if error is not None:
+            logger.error(f"Error procesando {day.date()}: {error}")
+            failed_days += 1
+            continue
+        insert_weather_data(client, weather_data, writer)
+    
+    return {
+        "total_days": len(all_dates),
+        "skipped_days": len(all_dates) - len(missing_dates),
+        "failed_days": failed_days,
+    }
+
+
+def _ingest_dates_per_day(
+    client: bigquery.Client,
+    all_dates: List[datetime],
+    writer: WeatherRowWriter,
+    max_workers: int,
+) -> Dict[str, int]:
+    """Recorrido original: una query NOAA por cada día faltante."""
+    # Una sola lectura de metadatos para todo el rango en vez de una verificación por día
+    existing_dates = get_existing_dates(client, all_dates[0], all_dates[-1])
+    
+    def fetch_if_missing(day: datetime) -> Optional[Dict[str, Any]]:
+        if day.date() in existing_dates:
+            return None
+        return get_weather_data(day, client)
     
-    current_date = start_date
     total_days = 0
-    inserted_days = 0
+    fetched_days = 0
     skipped_days = 0
+    failed_days = 0
     
-    while current_date <= end_date:
-        if not check_date_exists(client, current_date):
-            try:
-                weather_data = get_weather_data(current_date)
-                insert_weather_data(client, weather_data)
-                inserted_days += 1
-            except Exception as e:
-                logger.error(f"Error procesando {current_date.date()}: {e}")
-        else:
-            logger.debug(f"Datos ya existen para {current_date.date()}")
+    for day, weather_data, error, _ in fetch_weather_concurrently(all_dates, fetch_if_missing, max_workers):
+        if error is not None:
+            logger.error(f"Error procesando {day.date()}: {error}")
+            failed_days += 1
+        elif weather_data is None:
+            logger.debug(f"Datos ya existen para {day.date()}")
             skipped_days += 1
+        else:
+            insert_weather_data(client, weather_data, writer)
+            fetched_days += 1
         
-        current_date += timedelta(days=1)
         total_days += 1
         
         # Log de progreso cada 30 días
         if total_days % 30 == 0:
-            logger.info(f"Progreso: {total_days} días procesados, {inserted_days} insertados, {skipped_days} ya existían")
+            logger.info(f"Progreso: {total_days} días procesados, {fetched_days} obtenidos, {skipped_days} ya existían")
     
-    logger.info("=" * 60)
-    logger.info(f"INGESTA COMPLETADA")
-    logger.info(f"Total de días procesados: {total_days}")
-    logger.info(f"Días nuevos insertados: {inserted_days}")
-    logger.info(f"Días que ya existían: {skipped_days}")
-    logger.info("=" * 60)
+    return {
+        "total_days": total_days,
+        "skipped_days": skipped_days,
+        "failed_days": failed_days,
+    }
+
+
+def ingest_date_range_server_side(
+    client: bigquery.Client,
+    start_date: datetime,
+    end_date: datetime,
+    writer: Optional[WeatherRowWriter] = None,
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> Dict[str, int]:
+    """
+    Ingesta server-side: un único MERGE desde noaa_gsod.gsod* hacia weather_data.
+    
+    La conversión de unidades y la clasificación ocurren en BigQuery (ver
+    SERVER_SIDE_MERGE_SQL), así que todo el backfill es un solo job y ninguna fila
+    de NOAA pasa por la función. Sólo los días que NOAA no tiene se completan
+    después con el fallback de API, si hay API key configurada.
+    
+    Args:
+        client: Cliente de BigQuery
+        start_date: Fecha de inicio (inclusive)
+        end_date: Fecha de fin (inclusive)
+        writer: Writer con buffer para los días del fallback de API
+        max_workers: Máximo de fetches de API simultáneos
+        
+    Returns:
+        Resumen con total_days, inserted_days, skipped_days y failed_days
+    """
+    logger.info(f"Iniciando ingesta server-side desde {start_date.date()} hasta {end_date.date()}")
+    
+    query = SERVER_SIDE_MERGE_SQL.format(
+        target_table=f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}",
+        wban=NOAA_STATION_WBAN,
+    )
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("start_year", "STRING", str(start_date.year)),
+        bigquery.ScalarQueryParameter("end_year", "STRING", str(end_date.year)),
+        bigquery.ScalarQueryParameter("start_date", "DATE", start_date.date()),
+        bigquery.ScalarQueryParameter("end_date", "DATE", end_date.date()),
+    ])
+    query_job = client.query(query, job_config=job_config)
+    query_job.result()
+    merged_days = query_job.num_dml_affected_rows or 0
+    logger.info(f"MERGE server-side: {merged_days} días insertados desde NOAA")
+    
+    total_days = (end_date - start_date).days + 1
+    summary = {"total_days": total_days, "inserted_days": merged_days, "skipped_days": 0, "failed_days": 0}
+    
+    # Días que NOAA no tiene: fallback de API por la misma etapa concurrente que los otros modos
+    get_completeness(client).invalidate()  # el MERGE acaba de escribir
+    existing_dates = get_existing_dates(client, start_date, end_date)
+    gaps = [
+        start_date + timedelta(days=i) for i in range(total_days)
+        if (start_date + timedelta(days=i)).date() not in existing_dates
+    ]
+    summary["skipped_days"] = total_days - merged_days - len(gaps)
+    if not gaps:
+        return summary
+    if not WEATHER_API_KEY:
+        logger.warning(f"{len(gaps)} días sin datos en NOAA y sin WEATHER_API_KEY para el fallback")
+        summary["failed_days"] = len(gaps)
+        return summary
+    
+    writer = writer or WeatherRowWriter(client)
+    for day, weather_data, error in fetch_weather_from_api(gaps, max_workers):
+        if error is not None:
+            logger.error(f"Error procesando {day.date()}: {error}")
+            summary["failed_days"] += 1
+            continue
+        insert_weather_data(client, weather_data, writer)
+    flushed = writer.flush()
+    summary["inserted_days"] += flushed["written"]
+    summary["failed_days"] += flushed["failed"]
+    return summary
 
 
-def ingest_historical_data(client: bigquery.Client) -> None:
+@telemetry.stage("ingest_stations")
+def ingest_stations(client: bigquery.Client, start_date: datetime, end_date: datetime) -> Dict[str, int]:
+    """
+    Clima diario de todas las estaciones GSOD del área de Chicago en un único MERGE.
+    
+    Las estaciones salen de noaa_gsod.stations (a menos de STATION_RADIUS_KM del
+    centro) y se escriben en weather_station_data con clave (date, station_id).
+    
+    Args:
+        client: Cliente de BigQuery
+        start_date: Fecha de inicio (inclusive)
+        end_date: Fecha de fin (inclusive)
+        
+    Returns:
+        Resumen con station_rows_merged
+    """
+    logger.info(f"Ingesta de estaciones del área desde {start_date.date()} hasta {end_date.date()}")
+    
+    query = STATIONS_MERGE_SQL.format(target_table=f"{PROJECT_ID}.{DATASET_ID}.{STATION_TABLE_ID}")
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("start_year", "STRING", str(start_date.year)),
+        bigquery.ScalarQueryParameter("end_year", "STRING", str(end_date.year)),
+        bigquery.ScalarQueryParameter("start_date", "DATE", start_date.date()),
+        bigquery.ScalarQueryParameter("end_date", "DATE", end_date.date()),
+        bigquery.ScalarQueryParameter("center_lat", "FLOAT64", CHICAGO_LAT),
+        bigquery.ScalarQueryParameter("center_lon", "FLOAT64", CHICAGO_LON),
+        bigquery.ScalarQueryParameter("radius_m", "FLOAT64", STATION_RADIUS_KM * 1000),
+    ])
+    query_job = client.query(query, job_config=job_config)
+    query_job.result()
+    merged_rows = query_job.num_dml_affected_rows or 0
+    logger.info(f"MERGE de estaciones: {merged_rows} filas (fecha, estación) insertadas desde NOAA")
+    return {"station_rows_merged": merged_rows}
+
+
+@telemetry.stage("build_station_lookup")
+def build_station_lookup(client: bigquery.Client, start_date: datetime, end_date: datetime) -> Dict[str, int]:
+    """
+    Reconstruye weather_station_lookup: estación más cercana por community area y celda.
+    
+    Usa las estaciones de weather_station_data con datos en al menos
+    STATION_MIN_COVERAGE de los días del rango, y los pickups de taxis del mismo
+    rango para los centroides de las community areas y las celdas de la grilla. La
+    tabla se reemplaza completa con un load job.
+    
+    Args:
+        client: Cliente de BigQuery
+        start_date: Fecha de inicio (inclusive)
+        end_date: Fecha de fin (inclusive)
+        
+    Returns:
+        Resumen con stations, community_areas y grid_cells
+        
+    Raises:
+        ValueError: Si ninguna estación tiene la cobertura mínima en el rango
+    """
+    # numpy/scipy sólo en este modo (ver stations.py)
+    import stations
+    
+    params = {"start_date": start_date.date(), "end_date": end_date.date()}
+    total_days = (end_date - start_date).days + 1
+    station_rows = run_query(
+        client,
+        STATION_COVERAGE_SQL.format(station_table=f"{PROJECT_ID}.{DATASET_ID}.{STATION_TABLE_ID}"),
+        {**params, "min_days": math.ceil(total_days * STATION_MIN_COVERAGE)},
+    )
+    if not station_rows:
+        raise ValueError(
+            f"Ninguna estación tiene datos en {STATION_MIN_COVERAGE:.0%} de los días entre "
+            f"{start_date.date()} y {end_date.date()}; ingerir primero el rango en modo estaciones"
+        )
+    
+    taxi_table = f"{PROJECT_ID}.{DATASET_ID}.{TAXI_TABLE_ID}"
+    area_rows = run_query(client, PICKUP_AREA_CENTROIDS_SQL.format(taxi_table=taxi_table), params)
+    cell_rows = run_query(
+        client,
+        PICKUP_GRID_CELLS_SQL.format(taxi_table=taxi_table),
+        {**params, "cells_per_degree": STATION_GRID_CELLS_PER_DEGREE},
+    )
+    
+    rows = stations.build_lookup_rows(
+        [
+            {"station_id": row.station_id, "station_name": row.station_name,
+             "latitude": row.latitude, "longitude": row.longitude}
+            for row in station_rows
+        ],
+        [
+            {"community_area": row.community_area, "latitude": row.latitude, "longitude": row.longitude}
+            for row in area_rows
+        ],
+        [(row.lat_cell, row.lon_cell) for row in cell_rows],
+        STATION_GRID_CELLS_PER_DEGREE,
+        built_at=datetime.utcnow().isoformat(),
+    )
+    
+    payload = "\n".join(json.dumps(row) for row in rows).encode("utf-8")
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        write_disposition="WRITE_TRUNCATE",
+        schema=station_lookup_schema(),
+    )
+    client.load_table_from_file(
+        io.BytesIO(payload),
+        f"{PROJECT_ID}.{DATASET_ID}.{STATION_LOOKUP_TABLE_ID}",
+        job_config=job_config,
+    ).result()
+    
+    summary = {"stations": len(station_rows), "community_areas": len(area_rows), "grid_cells": len(cell_rows)}
+    logger.info(f"weather_station_lookup reconstruida: {summary}")
+    return summary
+
+
+def ingest_historical_data(
+    client: bigquery.Client,
+    bulk: bool = BULK_BACKFILL,
+    writer: Optional[WeatherRowWriter] = None,
+    max_workers: int = FETCH_MAX_WORKERS,
+) -> None:
     """
     Ingesta todos los datos históricos del período de análisis (01/06/2023 - 31/12/2023).
     Este es el modo de ingesta histórica que se ejecuta en la primera corrida.
@@ -298,6 +1455,9 @@ def ingest_historical_data(client: bigquery.Client) -> None:
     
     Args:
         client: Cliente de BigQuery
+        bulk: Si True usa el backfill set-based (una query NOAA por año)
+        writer: Writer con buffer (opcional)
+        max_workers: Máximo de fetches por día simultáneos
     """
     logger.info("=" * 60)
     logger.info("MODO: INGESTA HISTÓRICA")
@@ -305,43 +1465,54 @@ def ingest_historical_data(client: bigquery.Client) -> None:
     logger.info("NOTA: Solo hasta 31/12/2023 para mantener queries en tier gratuito")
     logger.info("=" * 60)
     
-    ingest_date_range(client, START_DATE, END_DATE)
+    ingest_date_range(client, START_DATE, END_DATE, bulk=bulk, writer=writer, max_workers=max_workers)
 
 
-def ingest_single_date(client: bigquery.Client, target_date: datetime) -> None:
+def ingest_single_date(
+    client: bigquery.Client,
+    target_date: datetime,
+    writer: Optional[WeatherRowWriter] = None,
+) -> None:
     """
     Ingesta datos del clima para una fecha específica.
     
     Args:
         client: Cliente de BigQuery
         target_date: Fecha a ingerir
+        writer: Writer con buffer; si no se pasa se crea uno para esta ingesta
     """
     target_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
     
     logger.info(f"Procesando fecha: {target_date.date()}")
     
-    # Verificar si ya existen datos
+    writer = writer or WeatherRowWriter(client)
+    
+    # Verificar si ya existen datos (con upsert el MERGE además evita duplicados si
+    # otra corrida escribe la misma fecha entre la verificación y el flush)
     if check_date_exists(client, target_date):
         logger.info(f"Los datos para {target_date.date()} ya existen. No se insertarán duplicados.")
         return
     
     # Ingerir datos
     try:
-        weather_data = get_weather_data(target_date)
-        insert_weather_data(client, weather_data)
+        weather_data = get_weather_data(target_date, client)
+        insert_weather_data(client, weather_data, writer)
+        if writer.flush()["failed"]:
+            raise Exception(f"Error insertando datos: {writer.row_errors}")
         logger.info(f"✅ Datos para {target_date.date()} ingeridos correctamente")
     except Exception as e:
         logger.error(f"❌ Error al ingerir datos para {target_date.date()}: {e}")
         raise
 
 
-def ingest_daily_data(client: bigquery.Client) -> None:
+def ingest_daily_data(client: bigquery.Client, writer: Optional[WeatherRowWriter] = None) -> None:
     """
     Ingesta datos del clima del día anterior.
     Este es el modo diario que se ejecuta automáticamente cada día.
     
     Args:
         client: Cliente de BigQuery
+        writer: Writer con buffer (opcional)
     """
     logger.info("=" * 60)
     logger.info("MODO: INGESTA DIARIA (día anterior)")
@@ -351,7 +1522,243 @@ def ingest_daily_data(client: bigquery.Client) -> None:
     yesterday = datetime.utcnow() - timedelta(days=1)
     yesterday = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
     
-    ingest_single_date(client, yesterday)
+    ingest_single_date(client, yesterday, writer)
+
+
+def parse_requested_dates(request_json: Dict[str, Any]) -> Optional[List[datetime]]:
+    """
+    Fechas pedidas explícitamente en el request, por rango o por lista.
+    
+    Acepta {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"} (inclusive) o
+    {"dates": ["YYYY-MM-DD", ...]}.
+    
+    Args:
+        request_json: Cuerpo del request
+        
+    Returns:
+        Lista de fechas, o None si el request no pide un rango ni una lista
+        
+    Raises:
+        ValueError: Si las fechas son inválidas, la lista está vacía o superan MAX_DAYS_PER_REQUEST
+    """
+    has_range = "start_date" in request_json or "end_date" in request_json
+    if has_range and "dates" in request_json:
+        raise ValueError("Usar start_date/end_date o dates, no ambos")
+    
+    try:
+        if has_range:
+            start = datetime.strptime(request_json["start_date"], "%Y-%m-%d")
+            end = datetime.strptime(request_json["end_date"], "%Y-%m-%d")
+            if end < start:
+                raise ValueError(f"end_date {request_json['end_date']} es anterior a start_date {request_json['start_date']}")
+            dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        elif "dates" in request_json:
+            if not isinstance(request_json["dates"], list):
+                raise ValueError("dates debe ser una lista de fechas YYYY-MM-DD")
+            if not request_json["dates"]:
+                raise ValueError("dates está vacío: pedir al menos una fecha YYYY-MM-DD")
+            dates = sorted({datetime.strptime(day, "%Y-%m-%d") for day in request_json["dates"]})
+        else:
+            return None
+    except KeyError as e:
+        raise ValueError(f"Falta {e.args[0]} (el rango requiere start_date y end_date)")
+    except TypeError:
+        raise ValueError("Fechas inválidas (formato esperado YYYY-MM-DD)")
+    
+    if len(dates) > MAX_DAYS_PER_REQUEST:
+        raise ValueError(
+            f"{len(dates)} días superan el máximo por request ({MAX_DAYS_PER_REQUEST}); dividir en varios requests"
+        )
+    return dates
+
+
+def build_query_executor(client: bigquery.Client) -> QueryExecutor:
+    """QueryExecutor de una invocación con los topes configurados (ver query_guard.py)."""
+    return QueryExecutor(
+        client,
+        max_bytes_per_query=int(QUERY_MAX_GIB_PER_QUERY * GIB) or None,
+        max_bytes_per_run=int(QUERY_MAX_GIB_PER_RUN * GIB) or None,
+        over_budget=QUERY_OVER_BUDGET,
+        dry_run=QUERY_DRY_RUN,
+    )
+
+
+def run_ingestion(
+    client: bigquery.Client,
+    request_json: Dict[str, Any],
+    target_date: Optional[datetime] = None,
+    requested_dates: Optional[List[datetime]] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta el modo de ingesta pedido y devuelve el body de la respuesta.
+    
+    Args:
+        client: Cliente de BigQuery
+        request_json: Cuerpo del request (ver main)
+        target_date: Fecha de {"date": ...} ya validada
+        requested_dates: Fechas de un request de rango o lista ya validadas
+        
+    Returns:
+        Body con message, mode, rows_written, row_errors, query_budget, gsod_cache, el
+        resumen del modo y, si TELEMETRY_ENABLED, el resumen de telemetría
+    """
+    # Telemetría de la ingesta: tiempos por etapa y estadísticas de los jobs de BigQuery
+    run_telemetry = telemetry.Telemetry() if telemetry.TELEMETRY_ENABLED else None
+    with run_telemetry or contextlib.nullcontext(), gsod_cache.run_stats() as cache_stats:
+        client = telemetry.wrap_client(client, run_telemetry)
+        # Todas las queries de la ingesta pasan por el control de costo
+        client = executor = build_query_executor(client)
+        # Los conteos de completitud se cachean sólo durante esta ingesta
+        reset_completeness()
+        # Todas las escrituras de la ingesta pasan por el mismo writer
+        writer = WeatherRowWriter(client)
+        
+        # Determinar modo de ejecución
+        extra = {}
+        if request_json.get("stations", False):
+            # Modo estaciones: todas las estaciones del área en un MERGE y, si se pide, la dimensión
+            if requested_dates is not None:
+                start_date, end_date = requested_dates[0], requested_dates[-1]
+            elif target_date is not None:
+                start_date = end_date = target_date
+            elif request_json.get("historical", False):
+                start_date, end_date = START_DATE, END_DATE
+            else:
+                end_date = start_date = (datetime.utcnow() - timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+            extra.update(ingest_stations(client, start_date, end_date))
+            if request_json.get("rebuild_lookup", False):
+                extra["station_lookup"] = build_station_lookup(client, start_date, end_date)
+            mode = "stations"
+        elif request_json.get("historical", False) and request_json.get("server_side", SERVER_SIDE_INGESTION):
+            # Modo histórico server-side: conversión y escritura dentro de BigQuery
+            summary = ingest_date_range_server_side(
+                client,
+                START_DATE,
+                END_DATE,
+                writer=writer,
+                max_workers=int(request_json.get("max_workers", FETCH_MAX_WORKERS)),
+            )
+            extra["rows_merged"] = summary["inserted_days"] - writer.written_rows
+            mode = "historical_server_side"
+        elif requested_dates is not None:
+            # Modo rango / lista de fechas (lo usa el coordinador de backfill del DAG)
+            extra.update(ingest_dates(
+                client,
+                requested_dates,
+                bulk=request_json.get("bulk", BULK_BACKFILL),
+                writer=writer,
+                max_workers=int(request_json.get("max_workers", FETCH_MAX_WORKERS)),
+            ))
+            mode = "range" if "dates" not in request_json else "dates"
+        elif request_json.get("historical", False):
+            # Modo histórico: desde START_DATE hasta hoy
+            ingest_historical_data(
+                client,
+                bulk=request_json.get("bulk", BULK_BACKFILL),
+                writer=writer,
+                max_workers=int(request_json.get("max_workers", FETCH_MAX_WORKERS)),
+            )
+            mode = "historical"
+        elif target_date is not None:
+            # Modo fecha específica
+            ingest_single_date(client, target_date, writer)
+            mode = f"single_date_{request_json['date']}"
+        else:
+            # Modo diario: día anterior
+            ingest_daily_data(client, writer)
+            mode = "daily"
+    
+    body = {
+        "message": "Weather data ingestion completed successfully",
+        "mode": mode,
+        "rows_written": writer.written_rows,
+        "row_errors": writer.row_errors,
+        "query_budget": executor.summary(),
+        "gsod_cache": {outcome: cache_stats[outcome] for outcome in ("hits", "misses", "revalidations")},
+        **extra
+    }
+    if run_telemetry is not None:
+        body["telemetry"] = run_telemetry.summary(mode=mode)
+    return body
+
+
+def _run_in_background(
+    run_id: str,
+    client: bigquery.Client,
+    request_json: Dict[str, Any],
+    target_date: Optional[datetime],
+    requested_dates: Optional[List[datetime]],
+) -> None:
+    """Cuerpo del thread de una corrida asíncrona: ejecuta la ingesta y registra el resultado."""
+    store = get_client("run_status")
+    try:
+        store.update(run_id, run_status.RUNNING)
+        with _heartbeat(store, run_id):
+            body = run_ingestion(client, request_json, target_date, requested_dates)
+        store.update(run_id, run_status.SUCCEEDED, summary=body)
+        logger.info(f"Corrida {run_id} terminada: {body['mode']}")
+    except Exception as e:
+        logger.error(f"Corrida {run_id} falló: {e}")
+        try:
+            store.update(run_id, run_status.FAILED, error=str(e))
+        except Exception as status_error:
+            logger.error(f"No se pudo registrar el fallo de la corrida {run_id}: {status_error}")
+
+
+@contextlib.contextmanager
+def _heartbeat(store: RunStatusStore, run_id: str) -> Iterator[None]:
+    """
+    Renueva el updated_at de la corrida cada RUN_HEARTBEAT_SECONDS mientras dura el bloque.
+    
+    Al salir espera al último heartbeat en vuelo, así nunca pisa el estado final
+    (SUCCEEDED / FAILED) con RUNNING.
+    """
+    stop = threading.Event()
+    
+    def beat() -> None:
+        while not stop.wait(RUN_HEARTBEAT_SECONDS):
+            try:
+                store.update(run_id, run_status.RUNNING)
+            except Exception as e:
+                logger.warning(f"No se pudo renovar el heartbeat de la corrida {run_id}: {e}")
+    
+    thread = threading.Thread(target=beat, name=f"weather-heartbeat-{run_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def start_async_run(
+    client: bigquery.Client,
+    request_json: Dict[str, Any],
+    target_date: Optional[datetime] = None,
+    requested_dates: Optional[List[datetime]] = None,
+) -> str:
+    """
+    Registra una corrida y la ejecuta en un thread de fondo.
+    
+    El thread sigue después de responder, así que la función necesita CPU asignada
+    fuera de los requests: el CD desactiva el CPU throttling del servicio y falla el
+    deploy si no queda desactivado. Si igual la instancia se apaga a mitad de la
+    corrida, el heartbeat deja de renovarse y el trigger del DAG la da por fallida.
+    
+    Returns:
+        run_id para consultar el estado con {"run_id": ...}
+    """
+    run_id = run_status.new_run_id()
+    get_client("run_status").create(run_id, request_json)
+    threading.Thread(
+        target=_run_in_background,
+        args=(run_id, client, request_json, target_date, requested_dates),
+        name=f"weather-run-{run_id}",
+    ).start()
+    logger.info(f"Corrida asíncrona {run_id} aceptada")
+    return run_id
 
 
 def main(request):
@@ -360,16 +1767,26 @@ def main(request):
     
     Puede recibir parámetros para especificar el modo:
     - {"historical": true} -> Modo histórico (desde 2023-06-01 hasta hoy)
+    - {"historical": true, "bulk": false} -> Modo histórico consultando NOAA día por día
+    - {"historical": true, "max_workers": 8} -> Fetches por día con 8 workers
+    - {"historical": true, "server_side": true} -> Un único MERGE desde NOAA (sin filas por la función)
     - {"date": "2024-01-15"} -> Ingesta fecha específica
+    - {"start_date": "2023-06-01", "end_date": "2023-06-30"} -> Ingesta del rango (inclusive)
+    - {"dates": ["2023-06-03", "2023-07-14"]} -> Ingesta de esas fechas
+      (rango y lista aceptan "bulk" y "max_workers"; hasta MAX_DAYS_PER_REQUEST días)
+    - {"stations": true} -> Todas las estaciones GSOD del área (día anterior, o el
+      rango/fecha/histórico pedidos) en weather_station_data; con "rebuild_lookup":
+      true también reconstruye weather_station_lookup para ese rango
     - Sin parámetros -> Modo diario (día anterior)
     
+    Con "async": true en cualquiera de los modos responde 202 con un run_id y la
+    ingesta sigue en segundo plano. {"run_id": "..."} (o GET ?run_id=...) devuelve
+    el estado de esa corrida.
+    
     Args:
         request: Request de Cloud Function (puede contener parámetros)
     """
     try:
-        # Inicializar cliente de BigQuery
-        client = bigquery.Client(project=PROJECT_ID)
-        
         # Parsear request
         request_json = {}
         if hasattr(request, 'get_json'):
@@ -377,27 +1794,46 @@ def main(request):
         elif isinstance(request, dict):
             request_json = request
         
-        # Determinar modo de ejecución
-        if request_json.get("historical", False):
-            # Modo histórico: desde START_DATE hasta hoy
-            ingest_historical_data(client)
-            mode = "historical"
-        elif "date" in request_json:
-            # Modo fecha específica
-            target_date = datetime.strptime(request_json["date"], "%Y-%m-%d")
-            ingest_single_date(client, target_date)
-            mode = f"single_date_{request_json['date']}"
-        else:
-            # Modo diario: día anterior
-            ingest_daily_data(client)
-            mode = "daily"
+        # Consulta de estado de una corrida asíncrona
+        run_id = request_json.get("run_id")
+        if run_id is None and hasattr(request, "args"):
+            run_id = request.args.get("run_id")
+        if run_id is not None:
+            record = get_client("run_status").get(run_id)
+            if record is None:
+                return {"statusCode": 404, "body": json.dumps({"error": f"Corrida desconocida: {run_id}"})}
+            return {"statusCode": 200, "body": json.dumps(record)}
+        
+        # Validar la fecha antes de crear clientes: un request inválido no paga el import de BigQuery
+        target_date = None
+        if "date" in request_json:
+            try:
+                target_date = datetime.strptime(request_json["date"], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({
+                        "error": f"Fecha inválida: {request_json['date']!r} (formato esperado YYYY-MM-DD)"
+                    })
+                }
+        try:
+            requested_dates = parse_requested_dates(request_json)
+        except ValueError as e:
+            return {"statusCode": 400, "body": json.dumps({"error": str(e)})}
+        
+        # Cliente de BigQuery compartido (se reutiliza en invocaciones en caliente)
+        client = get_bigquery_client()
+        
+        if request_json.get("async", False):
+            run_id = start_async_run(client, request_json, target_date, requested_dates)
+            return {
+                "statusCode": 202,
+                "body": json.dumps({"run_id": run_id, "status": run_status.ACCEPTED})
+            }
         
         return {
             "statusCode": 200,
-            "body": json.dumps({
-                "message": "Weather data ingestion completed successfully",
-                "mode": mode
-            })
+            "body": json.dumps(run_ingestion(client, request_json, target_date, requested_dates))
         }
         
     except Exception as e:
@@ -423,6 +1859,14 @@ if __name__ == "__main__":
                 idx = sys.argv.index("--date")
                 if idx + 1 < len(sys.argv):
                     return {"date": sys.argv[idx + 1]}
+            elif "--start-date" in sys.argv and "--end-date" in sys.argv:
+                return {
+                    "start_date": sys.argv[sys.argv.index("--start-date") + 1],
+                    "end_date": sys.argv[sys.argv.index("--end-date") + 1],
+                }
+            elif "--dates" in sys.argv:
+                # Fechas separadas por coma: --dates 2023-06-03,2023-07-14
+                return {"dates": sys.argv[sys.argv.index("--dates") + 1].split(",")}
             return {}
     
     request = MockRequest()
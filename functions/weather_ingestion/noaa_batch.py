@@ -0,0 +1,93 @@
+"""
+Conversión vectorizada de resultados NOAA GSOD al esquema de weather_data.
+
+Equivalente columnar de main.convert_noaa_row: recibe el resultado agregado de
+GSOD como DataFrame (columnas date, avg_temp, avg_wind_speed, total_precipitation)
+y produce todas las columnas de weather_data en una sola pasada con NumPy.
+
+La salida es idéntica a la del path escalar fila por fila (salvo
+ingestion_timestamp, que acá es uno solo para todo el lote): mismas fórmulas en el
+mismo orden de operaciones, mismo redondeo (round half up a 1 decimal) y los
+valores 0.0 se tratan como datos, no como nulos.
+
+Se importa sólo desde el path bulk cuando el lote es grande, para no sumar
+numpy/pandas al cold start de la función.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+WEATHER_DATA_COLUMNS = [
+    "date",
+    "temperature",
+    "humidity",
+    "wind_speed",
+    "precipitation",
+    "weather_condition",
+    "ingestion_timestamp",
+]
+
+NOAA_COLUMNS = ["date", "avg_temp", "avg_wind_speed", "total_precipitation"]
+
+
+def round_half_up_1(values: np.ndarray) -> np.ndarray:
+    """Redondeo a 1 decimal idéntico a main.round_half_up_1 (NaN se mantiene)."""
+    return np.floor(values * 10 + 0.5) / 10
+
+
+def _float_column(frame: pd.DataFrame, column: str) -> np.ndarray:
+    """Columna como float64 con NaN en lugar de None/NA."""
+    return pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def convert_noaa_frame(frame: pd.DataFrame, ingestion_timestamp: Optional[str] = None) -> pd.DataFrame:
+    """
+    Convierte un DataFrame de GSOD agregado por día al esquema de weather_data.
+
+    Args:
+        frame: DataFrame con las columnas de NOAA_COLUMNS
+        ingestion_timestamp: Timestamp ISO de ingesta; por defecto ahora (UTC)
+
+    Returns:
+        DataFrame con las columnas de WEATHER_DATA_COLUMNS (NaN donde el valor es nulo)
+    """
+    avg_temp = _float_column(frame, "avg_temp")
+    avg_wind_speed = _float_column(frame, "avg_wind_speed")
+    total_precipitation = _float_column(frame, "total_precipitation")
+
+    # Fahrenheit -> Celsius, pulgadas -> mm, nudos -> m/s (mismas fórmulas que el path escalar)
+    temp_c = (avg_temp - 32) * 5 / 9
+    precip_mm = np.where(np.isnan(total_precipitation), 0.0, total_precipitation * 25.4)
+    wind_speed_ms = avg_wind_speed * 0.514
+
+    # Clasificación: NaN < 0 es False, igual que "temp_c is not None and temp_c < 0"
+    with np.errstate(invalid="ignore"):
+        weather_condition = np.select(
+            [precip_mm > 5, precip_mm > 0, temp_c < 0],
+            ["Rain", "Drizzle", "Cold"],
+            default="Clear",
+        )
+
+    return pd.DataFrame({
+        "date": pd.to_datetime(frame["date"]).dt.strftime("%Y-%m-%d").to_numpy(),
+        "temperature": round_half_up_1(temp_c),
+        "humidity": np.full(len(frame), np.nan),
+        "wind_speed": round_half_up_1(wind_speed_ms),
+        "precipitation": round_half_up_1(precip_mm),
+        "weather_condition": weather_condition,
+        "ingestion_timestamp": ingestion_timestamp or datetime.utcnow().isoformat(),
+    }, columns=WEATHER_DATA_COLUMNS)
+
+
+def rows_to_frame(rows: Iterable[Any]) -> pd.DataFrame:
+    """Construye el DataFrame de entrada a partir de filas de BigQuery (acceso por atributo)."""
+    rows = list(rows)
+    return pd.DataFrame({column: [getattr(row, column) for row in rows] for column in NOAA_COLUMNS})
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Filas listas para insertar: tipos nativos de Python y None en lugar de NaN."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
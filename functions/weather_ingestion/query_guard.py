@@ -0,0 +1,215 @@
+"""
+Control de costo de las queries del pipeline: dry-run y topes de bytes facturados.
+
+Lo usan la Cloud Function de clima y las tareas del DAG que consultan BigQuery; en
+Composer se copia junto a los DAGs (airflow/dags/query_guard.py es un symlink a
+este archivo).
+
+QueryExecutor envuelve al cliente de BigQuery y se usa en su lugar (query() tiene
+la misma firma; el resto de los métodos pasan al cliente). Antes de cada query:
+1. Estima los bytes con un dry-run. La estimación se reutiliza para el mismo texto
+   de query: con parámetros (@date, @dates) el texto no cambia entre fechas y un
+   backfill por día hace un solo dry-run por tabla
+2. Tope por query (max_bytes_per_query): si la estimación lo supera la query se
+   rechaza (QueryBudgetExceeded) sin ejecutarse. El tope también se fija como
+   maximum_bytes_billed del job, así BigQuery la corta si la estimación falló
+3. Presupuesto por corrida (max_bytes_per_run, una invocación de la función o una
+   tarea de Airflow): si la query lo haría superar, según over_budget se rechaza
+   ("refuse") o se ejecuta con prioridad BATCH ("batch"), sin competir por slots
+   con las queries interactivas
+
+query_parameters() arma los parámetros desde un dict: las queries con parámetros
+en lugar de literales interpolados se pueden cachear y no admiten inyección.
+"""
+
+import copy
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REFUSE = "refuse"
+BATCH = "batch"
+
+GIB = 1024 ** 3
+
+
+class QueryBudgetExceeded(Exception):
+    """La query superaría el tope por query o el presupuesto de la corrida."""
+
+
+def _parameter_type(value: Any) -> str:
+    # bool antes que int: True es un int en Python
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime):
+        return "TIMESTAMP" if value.tzinfo else "DATETIME"
+    if isinstance(value, date):
+        return "DATE"
+    return "STRING"
+
+
+def query_parameters(params: Dict[str, Any]) -> List[Any]:
+    """
+    Parámetros de BigQuery a partir de un dict nombre -> valor.
+
+    El tipo se infiere del valor (str, int, float, bool, date, datetime); las listas
+    y tuplas son ARRAY del tipo de su primer elemento (STRING si están vacías).
+
+    Args:
+        params: Valores por nombre de parámetro (@nombre en la query)
+
+    Returns:
+        Lista de ScalarQueryParameter / ArrayQueryParameter
+    """
+    from google.cloud import bigquery
+
+    parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            element_type = _parameter_type(value[0]) if value else "STRING"
+            parameters.append(bigquery.ArrayQueryParameter(name, element_type, list(value)))
+        else:
+            parameters.append(bigquery.ScalarQueryParameter(name, _parameter_type(value), value))
+    return parameters
+
+
+def run_query(client: Any, query: str, params: Optional[Dict[str, Any]] = None,
+              location: Optional[str] = None) -> List[Any]:
+    """
+    Ejecuta una query con parámetros y devuelve sus filas.
+
+    Args:
+        client: Cliente de BigQuery o QueryExecutor
+        query: SQL con parámetros @nombre
+        params: Valores de los parámetros
+        location: Ubicación del job (None = la del cliente)
+
+    Returns:
+        Lista de filas
+    """
+    kwargs: Dict[str, Any] = {"location": location} if location else {}
+    if params:
+        from google.cloud import bigquery
+        kwargs["job_config"] = bigquery.QueryJobConfig(query_parameters=query_parameters(params))
+    return list(client.query(query, **kwargs).result())
+
+
+class QueryExecutor:
+    """
+    Cliente de BigQuery con dry-run, tope por query y presupuesto por corrida.
+
+    Una instancia por corrida: el presupuesto se descuenta con las estimaciones de
+    las queries ejecutadas por esta instancia.
+
+    Args:
+        client: Cliente de BigQuery
+        max_bytes_per_query: Tope de bytes de cada query (None = sin tope)
+        max_bytes_per_run: Presupuesto de bytes de la corrida (None = sin tope)
+        over_budget: "refuse" o "batch": qué hacer si una query superaría el presupuesto
+        dry_run: Estimar con dry-run antes de ejecutar (sin dry-run sólo aplica
+            maximum_bytes_billed y el presupuesto no se descuenta)
+    """
+
+    def __init__(self, client: Any, max_bytes_per_query: Optional[int] = None,
+                 max_bytes_per_run: Optional[int] = None, over_budget: str = BATCH, dry_run: bool = True):
+        if over_budget not in (REFUSE, BATCH):
+            raise ValueError(f"over_budget inválido: {over_budget} (usar '{REFUSE}' o '{BATCH}')")
+        self.client = client
+        self.max_bytes_per_query = max_bytes_per_query
+        self.max_bytes_per_run = max_bytes_per_run
+        self.over_budget = over_budget
+        self.dry_run = dry_run
+        self.estimated_bytes = 0
+        self.queries = 0
+        self.dry_runs = 0
+        self.batch_downgrades = 0
+        self.refused = 0
+        self._estimates: Dict[Tuple[str, Optional[str]], int] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # dataset(), insert_rows_json(), load_table_from_file(), ... van al cliente
+        return getattr(self.client, name)
+
+    def estimate(self, query: str, job_config: Any = None, location: Optional[str] = None) -> int:
+        """
+        Bytes que procesaría la query, según un dry-run (cacheado por texto y ubicación).
+
+        Args:
+            query: SQL a estimar
+            job_config: QueryJobConfig de la query (se usan sus parámetros)
+            location: Ubicación del job
+
+        Returns:
+            Bytes estimados
+        """
+        key = (query, location)
+        if key not in self._estimates:
+            from google.cloud import bigquery
+            dry_config = bigquery.QueryJobConfig(
+                dry_run=True,
+                use_query_cache=False,
+                query_parameters=list(getattr(job_config, "query_parameters", None) or []),
+            )
+            kwargs = {"location": location} if location else {}
+            dry_job = self.client.query(query, job_config=dry_config, **kwargs)
+            self.dry_runs += 1
+            self._estimates[key] = dry_job.total_bytes_processed or 0
+        return self._estimates[key]
+
+    def query(self, query: str, job_config: Any = None, location: Optional[str] = None, **kwargs: Any) -> Any:
+        """
+        Igual que Client.query, con los controles de costo.
+
+        Raises:
+            QueryBudgetExceeded: Si la query supera el tope por query, o el presupuesto
+                de la corrida con over_budget="refuse"
+        """
+        from google.cloud import bigquery
+
+        # Copia: el tope y la prioridad son de esta ejecución, no del config del llamador
+        config = copy.deepcopy(job_config) if job_config is not None else bigquery.QueryJobConfig()
+        estimated = self.estimate(query, config, location) if self.dry_run else 0
+
+        if self.max_bytes_per_query is not None and estimated > self.max_bytes_per_query:
+            self.refused += 1
+            raise QueryBudgetExceeded(
+                f"La query procesaría {estimated:,} bytes, más que el tope por query "
+                f"({self.max_bytes_per_query:,}): {' '.join(query.split())[:200]}"
+            )
+        if self.max_bytes_per_run is not None and self.estimated_bytes + estimated > self.max_bytes_per_run:
+            if self.over_budget == REFUSE:
+                self.refused += 1
+                raise QueryBudgetExceeded(
+                    f"La query ({estimated:,} bytes) superaría el presupuesto de la corrida: "
+                    f"{self.estimated_bytes:,} de {self.max_bytes_per_run:,} bytes ya usados"
+                )
+            logger.warning(f"Presupuesto de la corrida superado ({self.estimated_bytes + estimated:,} de "
+                           f"{self.max_bytes_per_run:,} bytes): la query se ejecuta con prioridad BATCH")
+            config.priority = bigquery.QueryPriority.BATCH
+            self.batch_downgrades += 1
+
+        if self.max_bytes_per_query is not None:
+            config.maximum_bytes_billed = self.max_bytes_per_query
+        self.estimated_bytes += estimated
+        self.queries += 1
+        if location:
+            kwargs["location"] = location
+        return self.client.query(query, job_config=config, **kwargs)
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumen de la corrida: queries, dry-runs, bytes estimados, BATCH y rechazos."""
+        return {
+            "queries": self.queries,
+            "dry_runs": self.dry_runs,
+            "estimated_bytes": self.estimated_bytes,
+            "max_bytes_per_query": self.max_bytes_per_query,
+            "max_bytes_per_run": self.max_bytes_per_run,
+            "batch_downgrades": self.batch_downgrades,
+            "refused": self.refused,
+        }
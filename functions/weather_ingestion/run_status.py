@@ -0,0 +1,155 @@
+"""
+Registro de estado de las corridas asíncronas de ingesta de clima.
+
+Un request con {"async": true} devuelve un run_id en seguida (HTTP 202) y la
+ingesta sigue en un thread de fondo que va actualizando el registro:
+ACCEPTED -> RUNNING -> SUCCEEDED | FAILED. Mientras corre, el thread renueva
+updated_at cada RUN_HEARTBEAT_SECONDS; el DAG consulta el estado con
+{"run_id": "..."} desde un trigger deferrable (airflow/dags/weather_trigger.py) y
+da por fallida una corrida sin terminar cuyo updated_at quedó viejo (la instancia
+se reinició o se apagó a mitad de la ingesta).
+
+Stores:
+- BigQueryRunStatusStore: tabla weather_ingestion_runs (terraform), append-only con
+  streaming inserts: una fila por evento (creación, cambio de estado, heartbeat) y
+  get() arma el estado con las filas del run_id. Sin UPDATE: BigQuery limita los DML
+  concurrentes por tabla y un heartbeat encolado haría parecer muerta una corrida sana
+- InMemoryRunStatusStore: local (scripts/fake_weather_status_server.py)
+"""
+
+import abc
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+ACCEPTED = "ACCEPTED"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+
+def new_run_id() -> str:
+    """Identificador de corrida: fecha UTC + sufijo aleatorio (ordenable y único)."""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+class RunStatusStore(abc.ABC):
+    """Interfaz de los registros de estado."""
+
+    @abc.abstractmethod
+    def create(self, run_id: str, request: Dict[str, Any]) -> None:
+        """Registra una corrida nueva en ACCEPTED."""
+
+    @abc.abstractmethod
+    def update(self, run_id: str, status: str, summary: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        """Cambia el estado y renueva updated_at (también sirve de heartbeat en RUNNING)."""
+
+    @abc.abstractmethod
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Devuelve {"run_id", "status", "request", "summary", "error", "created_at", "updated_at"} o None."""
+
+
+class InMemoryRunStatusStore(RunStatusStore):
+    """Registro en memoria del proceso (sólo para pruebas locales)."""
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, run_id: str, request: Dict[str, Any]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._runs[run_id] = {
+                "run_id": run_id, "status": ACCEPTED, "request": request,
+                "summary": None, "error": None, "created_at": now, "updated_at": now,
+            }
+
+    def update(self, run_id: str, status: str, summary: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        with self._lock:
+            record = self._runs[run_id]
+            record.update(status=status, updated_at=datetime.now(timezone.utc).isoformat())
+            if summary is not None:
+                record["summary"] = summary
+            if error is not None:
+                record["error"] = error
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._runs.get(run_id)
+            return dict(record) if record else None
+
+
+class BigQueryRunStatusStore(RunStatusStore):
+    """
+    Registro en la tabla weather_ingestion_runs, una fila por evento.
+
+    Cada fila lleva su propio created_at (la tabla se particiona por esa columna);
+    get() devuelve el created_at de la primera fila y el updated_at de la última.
+
+    Args:
+        client: Cliente de BigQuery
+        table_id: Tabla "project.dataset.weather_ingestion_runs"
+    """
+
+    def __init__(self, client: Any, table_id: str):
+        self.client = client
+        self.table_id = table_id
+
+    def _run(self, query: str, **params: Any) -> list:
+        from google.cloud import bigquery
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter(name, "STRING", value) for name, value in params.items()
+        ])
+        return list(self.client.query(query, job_config=job_config).result())
+
+    def _append(self, run_id: str, status: str, request: Optional[Dict[str, Any]] = None,
+                summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        errors = self.client.insert_rows_json(self.table_id, [{
+            "run_id": run_id,
+            "status": status,
+            "request": json.dumps(request) if request is not None else None,
+            "summary": json.dumps(summary) if summary is not None else None,
+            "error": error,
+            "created_at": now,
+            "updated_at": now,
+        }])
+        if errors:
+            raise RuntimeError(f"No se pudo registrar el estado de la corrida {run_id}: {errors}")
+
+    def create(self, run_id: str, request: Dict[str, Any]) -> None:
+        self._append(run_id, ACCEPTED, request=request)
+
+    def update(self, run_id: str, status: str, summary: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        self._append(run_id, status, summary=summary, error=error)
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        # Pocas filas por corrida (una por heartbeat): se combinan acá en orden
+        rows = self._run(f"""
+            SELECT run_id, status, request, summary, error, created_at, updated_at
+            FROM `{self.table_id}`
+            WHERE run_id = @run_id
+            ORDER BY updated_at
+        """, run_id=run_id)
+        if not rows:
+            return None
+        record: Dict[str, Any] = {"run_id": run_id, "status": None, "request": None, "summary": None, "error": None}
+        for row in rows:
+            # Un estado final no vuelve atrás aunque llegue un heartbeat con el mismo timestamp
+            if record["status"] not in TERMINAL_STATUSES:
+                record["status"] = row.status
+            if row.request and record["request"] is None:
+                record["request"] = json.loads(row.request)
+            if row.summary:
+                record["summary"] = json.loads(row.summary)
+            if row.error:
+                record["error"] = row.error
+        record["created_at"] = min(row.created_at for row in rows).isoformat()
+        record["updated_at"] = max(row.updated_at for row in rows).isoformat()
+        return record
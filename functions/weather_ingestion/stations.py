@@ -0,0 +1,170 @@
+"""
+Asignación de la estación meteorológica más cercana a los pickups de Chicago.
+
+El modo de estaciones de la función ingiere todas las estaciones GSOD del área
+(STATIONS_MERGE_SQL en main.py) y arma la tabla de dimensión
+weather_station_lookup: la estación más cercana a cada community area (centroide
+de sus pickups) y a cada celda de la grilla de lat/long de los pickups. silver y
+gold resuelven la estación de cada viaje con un join de igualdad contra esa tabla
+chica, sin calcular distancias por viaje.
+
+La búsqueda usa un KD-tree (scipy.spatial.cKDTree) sobre los puntos proyectados a
+la esfera unitaria: la distancia euclídea (cuerda) crece con la distancia sobre la
+superficie, así que el vecino más cercano es exacto. Sin scipy se usa fuerza bruta
+vectorizada por bloques, con el mismo resultado.
+
+Se importa sólo desde el modo de estaciones, para no sumar numpy al cold start.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+COMMUNITY_AREA = "community_area"
+GRID_CELL = "grid_cell"
+
+
+def unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Coordenadas (grados) como vectores de la esfera unitaria, forma (n, 3)."""
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Distancia de cuerda en la esfera unitaria -> distancia sobre la superficie en km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def nearest_stations(
+    station_lat: Sequence[float],
+    station_lon: Sequence[float],
+    lat: np.ndarray,
+    lon: np.ndarray,
+    chunk_size: int = 1_000_000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estación más cercana a cada punto.
+
+    Args:
+        station_lat: Latitudes de las estaciones
+        station_lon: Longitudes de las estaciones
+        lat: Latitudes de los puntos
+        lon: Longitudes de los puntos
+        chunk_size: Puntos por bloque en la búsqueda por fuerza bruta (sin scipy)
+
+    Returns:
+        (índice de la estación, distancia en km) por punto
+    """
+    station_xyz = unit_vectors(station_lat, station_lon)
+    points = unit_vectors(lat, lon)
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        cKDTree = None
+
+    if cKDTree is not None:
+        chords, indexes = cKDTree(station_xyz).query(points, k=1, workers=-1)
+        return indexes.astype(np.int64), chord_to_km(chords)
+
+    indexes = np.empty(len(points), dtype=np.int64)
+    chords = np.empty(len(points), dtype=np.float64)
+    for offset in range(0, len(points), chunk_size):
+        block = points[offset:offset + chunk_size]
+        squared = ((block[:, None, :] - station_xyz[None, :, :]) ** 2).sum(axis=2)
+        nearest = squared.argmin(axis=1)
+        indexes[offset:offset + len(block)] = nearest
+        chords[offset:offset + len(block)] = np.sqrt(squared[np.arange(len(block)), nearest])
+    return indexes, chord_to_km(chords)
+
+
+def grid_cells(lat: np.ndarray, lon: np.ndarray, cells_per_degree: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Celda de la grilla de cada punto: FLOOR(coordenada * cells_per_degree).
+
+    Es la misma expresión que la macro station_grid_cell de dbt; las dos tienen que
+    usar el mismo cells_per_degree.
+    """
+    lat_cell = np.floor(np.asarray(lat, dtype=np.float64) * cells_per_degree).astype(np.int64)
+    lon_cell = np.floor(np.asarray(lon, dtype=np.float64) * cells_per_degree).astype(np.int64)
+    return lat_cell, lon_cell
+
+
+def cell_centers(lat_cell: np.ndarray, lon_cell: np.ndarray, cells_per_degree: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordenadas del centro de cada celda."""
+    return (
+        (np.asarray(lat_cell, dtype=np.float64) + 0.5) / cells_per_degree,
+        (np.asarray(lon_cell, dtype=np.float64) + 0.5) / cells_per_degree,
+    )
+
+
+def build_lookup_rows(
+    stations: List[Dict[str, Any]],
+    areas: List[Dict[str, Any]],
+    cells: List[Tuple[int, int]],
+    cells_per_degree: int,
+    built_at: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Filas de weather_station_lookup: estación más cercana por community area y por celda.
+
+    Args:
+        stations: Estaciones con station_id, station_name, latitude y longitude
+        areas: Community areas con community_area, latitude y longitude (centroide)
+        cells: Celdas (lat_cell, lon_cell) con pickups
+        cells_per_degree: Resolución de la grilla
+        built_at: Timestamp ISO de la construcción
+
+    Returns:
+        Una fila por community area y por celda
+    """
+    if not stations:
+        raise ValueError("No hay estaciones para asignar")
+
+    station_lat = [station["latitude"] for station in stations]
+    station_lon = [station["longitude"] for station in stations]
+
+    area_lat = np.array([area["latitude"] for area in areas], dtype=np.float64)
+    area_lon = np.array([area["longitude"] for area in areas], dtype=np.float64)
+    lat_cell = np.array([cell[0] for cell in cells], dtype=np.int64)
+    lon_cell = np.array([cell[1] for cell in cells], dtype=np.int64)
+    cell_lat, cell_lon = cell_centers(lat_cell, lon_cell, cells_per_degree)
+
+    # Una sola búsqueda para áreas y celdas
+    indexes, distances = nearest_stations(
+        station_lat, station_lon, np.concatenate([area_lat, cell_lat]), np.concatenate([area_lon, cell_lon])
+    )
+
+    rows = []
+    for i, (index, distance) in enumerate(zip(indexes.tolist(), distances.tolist())):
+        station = stations[index]
+        if i < len(areas):
+            keys = {
+                "lookup_type": COMMUNITY_AREA,
+                "community_area": int(areas[i]["community_area"]),
+                "lat_cell": None,
+                "lon_cell": None,
+                "latitude": float(area_lat[i]),
+                "longitude": float(area_lon[i]),
+            }
+        else:
+            j = i - len(areas)
+            keys = {
+                "lookup_type": GRID_CELL,
+                "community_area": None,
+                "lat_cell": int(lat_cell[j]),
+                "lon_cell": int(lon_cell[j]),
+                "latitude": float(cell_lat[j]),
+                "longitude": float(cell_lon[j]),
+            }
+        rows.append({
+            **keys,
+            "station_id": station["station_id"],
+            "station_name": station.get("station_name"),
+            "distance_km": round(distance, 3),
+            "built_at": built_at,
+        })
+    return rows
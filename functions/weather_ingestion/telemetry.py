@@ -0,0 +1,227 @@
+"""
+Telemetría de performance de la función de clima.
+
+Cada ingesta (run_ingestion) abre un Telemetry propio que acumula:
+- etapas: llamadas, tiempo total/máximo y errores de las funciones decoradas con
+  @stage (get_weather_data, get_weather_data_from_api, check_date_exists, ...)
+- jobs de BigQuery: bytes procesados/facturados, slot-ms y cache hits, leídos del
+  job al terminar su result() (el cliente se envuelve con wrap_client)
+
+Cada etapa, job y el resumen final se publican como eventos a los hooks
+registrados con add_hook. El hook por defecto escribe los jobs y el resumen como
+registros JSON de una línea (Cloud Logging los indexa como jsonPayload); el
+resumen además vuelve en el body de la respuesta.
+
+Con TELEMETRY_ENABLED=false @stage devuelve la función original y wrap_client el
+cliente sin envolver: el costo es cero.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+TELEMETRY_ENABLED = os.environ.get("TELEMETRY_ENABLED", "true").lower() == "true"
+
+# Telemetría de la ingesta en curso; los threads de fetch la heredan vía copy_context
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("weather_telemetry", default=None)
+
+Hook = Callable[[Dict[str, Any]], None]
+_HOOKS: List[Hook] = []
+
+# Logger propio sin prefijo: cada registro es una línea JSON
+_json_logger = logging.getLogger("weather_telemetry")
+_json_logger.propagate = False
+if not _json_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _json_logger.addHandler(_handler)
+    _json_logger.setLevel(logging.INFO)
+
+
+def json_log_hook(event: Dict[str, Any]) -> None:
+    """Hook por defecto: jobs de BigQuery y resumen como JSON estructurado (las etapas no)."""
+    if event["type"] == "stage":
+        return
+    _json_logger.info(json.dumps({
+        "severity": "INFO",
+        "message": f"telemetry {event['type']}",
+        "telemetry": event,
+    }, default=str))
+
+
+def add_hook(hook: Hook) -> None:
+    """Registra un hook que recibe cada evento ({"type": "stage" | "job" | "summary", ...})."""
+    _HOOKS.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Quita un hook registrado."""
+    _HOOKS.remove(hook)
+
+
+add_hook(json_log_hook)
+
+
+def current() -> Optional["Telemetry"]:
+    """Telemetría de la ingesta en curso (None si no hay o está deshabilitada)."""
+    return _CURRENT.get()
+
+
+class Telemetry:
+    """
+    Acumulador de etapas y jobs de una ingesta. Es thread-safe: los fetches por día
+    registran desde los threads del pool.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.jobs = {"jobs": 0, "bytes_processed": 0, "bytes_billed": 0, "slot_ms": 0, "cache_hits": 0}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self) -> "Telemetry":
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _CURRENT.reset(self._token)
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        event["telemetry_run"] = self.run_id
+        for hook in list(_HOOKS):
+            try:
+                hook(event)
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Hook de telemetría falló: {e}")
+
+    def record_stage(self, name: str, elapsed_s: float, error: bool = False) -> None:
+        """Registra una llamada a una etapa."""
+        elapsed_ms = elapsed_s * 1000
+        with self._lock:
+            stats = self.stages.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["errors"] += int(error)
+        self._emit({"type": "stage", "stage": name, "elapsed_ms": round(elapsed_ms, 1), "error": error})
+
+    def record_job(self, job: Any, kind: str, elapsed_s: float) -> None:
+        """Registra las estadísticas de un job de BigQuery terminado."""
+        event = {
+            "type": "job",
+            "kind": kind,
+            "job_id": getattr(job, "job_id", None),
+            "statement_type": getattr(job, "statement_type", None),
+            "bytes_processed": getattr(job, "total_bytes_processed", None) or 0,
+            "bytes_billed": getattr(job, "total_bytes_billed", None) or 0,
+            "slot_ms": getattr(job, "slot_millis", None) or 0,
+            "cache_hit": bool(getattr(job, "cache_hit", False)),
+            "elapsed_ms": round(elapsed_s * 1000, 1),
+        }
+        with self._lock:
+            self.jobs["jobs"] += 1
+            self.jobs["bytes_processed"] += event["bytes_processed"]
+            self.jobs["bytes_billed"] += event["bytes_billed"]
+            self.jobs["slot_ms"] += event["slot_ms"]
+            self.jobs["cache_hits"] += int(event["cache_hit"])
+        self._emit(event)
+
+    def summary(self, **labels: Any) -> Dict[str, Any]:
+        """
+        Resumen de la ingesta; también se publica como evento "summary".
+
+        Args:
+            **labels: Campos extra del resumen (p. ej. mode)
+
+        Returns:
+            Diccionario con wall_ms, stages (por etapa) y bigquery (totales de jobs)
+        """
+        with self._lock:
+            result = {
+                **labels,
+                "wall_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "stages": {
+                    name: {**stats, "total_ms": round(stats["total_ms"], 1), "max_ms": round(stats["max_ms"], 1)}
+                    for name, stats in sorted(self.stages.items())
+                },
+                "bigquery": dict(self.jobs),
+            }
+        self._emit({"type": "summary", **result})
+        return result
+
+
+def stage(name: str) -> Callable[[Callable], Callable]:
+    """Decorador que mide cada llamada como la etapa `name` de la ingesta en curso."""
+    def decorator(fn: Callable) -> Callable:
+        if not TELEMETRY_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            telemetry = _CURRENT.get()
+            if telemetry is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            error = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                telemetry.record_stage(name, time.perf_counter() - started, error)
+        return wrapper
+    return decorator
+
+
+class _TrackedJob:
+    """Job de BigQuery que registra sus estadísticas cuando termina result()."""
+
+    def __init__(self, job: Any, telemetry: Telemetry, kind: str, started: float):
+        self._job = job
+        self._telemetry = telemetry
+        self._kind = kind
+        self._started = started
+
+    def result(self, *args, **kwargs):
+        try:
+            return self._job.result(*args, **kwargs)
+        finally:
+            self._telemetry.record_job(self._job, self._kind, time.perf_counter() - self._started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._job, name)
+
+
+class _TrackedClient:
+    """Proxy del cliente de BigQuery que envuelve los jobs de query y load."""
+
+    def __init__(self, client: Any, telemetry: Telemetry):
+        self._client = client
+        self._telemetry = telemetry
+
+    def query(self, *args, **kwargs):
+        started = time.perf_counter()
+        return _TrackedJob(self._client.query(*args, **kwargs), self._telemetry, "query", started)
+
+    def load_table_from_file(self, *args, **kwargs):
+        started = time.perf_counter()
+        return _TrackedJob(self._client.load_table_from_file(*args, **kwargs), self._telemetry, "load", started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def wrap_client(client: Any, telemetry: Optional[Telemetry]) -> Any:
+    """Cliente que registra los jobs en telemetry (el mismo cliente si no hay telemetría)."""
+    if telemetry is None or not TELEMETRY_ENABLED:
+        return client
+    return _TrackedClient(client, telemetry)
@@ -0,0 +1,150 @@
+"""
+Respuestas del endpoint timeline de Visual Crossing (fallback de la función de clima).
+
+Un request de rango (/timeline/{lat},{lon}/{inicio}/{fin}) devuelve todos los días
+en el array "days". iter_days lo recorre a medida que llegan los chunks HTTP: cada
+día se decodifica una sola vez y sólo se conserva en memoria el tramo del payload
+que todavía no se procesó (nunca la respuesta completa). day_to_weather_data pasa
+cada día al esquema de weather_data.
+"""
+
+import codecs
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+def contiguous_runs(days: Iterable[date], max_span: int) -> List[Tuple[date, date]]:
+    """
+    Agrupa fechas en tramos consecutivos de a lo sumo max_span días.
+
+    Args:
+        days: Fechas (en cualquier orden, con o sin repetidos)
+        max_span: Máximo de días por tramo
+
+    Returns:
+        Lista ordenada de (inicio, fin) inclusive
+    """
+    runs: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if runs and day == runs[-1][1] + timedelta(days=1) and (day - runs[-1][0]).days < max_span:
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def day_to_weather_data(day_data: Dict[str, Any], day: str) -> Dict[str, Any]:
+    """
+    Convierte un elemento de "days" al esquema de weather_data.
+
+    Args:
+        day_data: Día de la respuesta de Visual Crossing (unitGroup=metric)
+        day: Fecha ISO del día
+
+    Returns:
+        Diccionario con los datos del clima
+    """
+    return {
+        "date": day,
+        "temperature": day_data.get("tempmax", None),
+        "humidity": day_data.get("humidity", None),
+        "wind_speed": day_data.get("windspeed", None),
+        "precipitation": day_data.get("precip", 0.0),
+        "weather_condition": day_data.get("conditions", None),
+        "ingestion_timestamp": datetime.utcnow().isoformat()
+    }
+
+
+class _Buffer:
+    """Texto pendiente de una respuesta que llega por chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Agrega el próximo chunk (descartando lo ya consumido); False al final."""
+        if self.eof:
+            return False
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return True
+        self.text += self._decoder.decode(b"", final=True)
+        self.eof = True
+        return True
+
+    def skip_whitespace(self) -> str:
+        """Avanza hasta el próximo caracter significativo y lo devuelve ("" al final)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.skip_whitespace() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}' en la respuesta de la API")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodifica el próximo valor JSON completo (pidiendo más chunks si está cortado)."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # Un número cortado por el chunk ("41." de "41.87") decodifica igual: sólo se
+            # acepta el valor si después viene un delimitador
+            if not self.eof and (end == len(self.text) or self.text[end] not in _DELIMITERS):
+                self.more()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_days(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre el array "days" del objeto raíz de una respuesta timeline, día por día.
+
+    Las otras claves del objeto raíz se decodifican y se descartan.
+
+    Args:
+        chunks: Cuerpo de la respuesta en chunks (p. ej. response.iter_content())
+
+    Yields:
+        Cada elemento de "days"
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    while buffer.skip_whitespace() != "}":
+        key = buffer.value()
+        buffer.expect(":")
+        if key != "days":
+            buffer.value()
+        else:
+            buffer.expect("[")
+            while buffer.skip_whitespace() != "]":
+                yield buffer.value()
+                if buffer.skip_whitespace() == ",":
+                    buffer.pos += 1
+            buffer.pos += 1
+        if buffer.skip_whitespace() == ",":
+            buffer.pos += 1
+        elif buffer.skip_whitespace() == "":
+            raise ValueError("JSON inválido: respuesta de la API incompleta")
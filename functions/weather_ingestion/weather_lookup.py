@@ -0,0 +1,387 @@
+"""
+Clima diario en memoria para enriquecer viajes de taxi en Python.
+
+Para los jobs que arman features en Python: en lugar de un join en BigQuery por
+cada lote de viajes, la tabla weather_data se lee una vez (load_weather_lookup) y
+queda en un WeatherLookup, un arreglo columnar indexado por número de día
+(días desde 1970-01-01, el ordinal de datetime64[D]): un array NumPy por columna,
+con un casillero por día del rango, sin un dict ni un objeto por fila.
+
+enrich / enrich_arrow resuelven el clima de un lote de trip_start_timestamp con un
+solo cálculo de índice y un gather por columna. El día del viaje es
+DATE(trip_start_timestamp) en UTC, como trip_date en taxi_trips_silver. Los días
+sin clima (fuera del rango o sin fila en weather_data) apuntan a un casillero
+centinela vacío: columnas numéricas en NaN, categorías en None y has_weather en
+False, sin ramas por viaje.
+
+Las reglas son las de weather_silver.sql: la última ingesta de cada fecha
+(ingestion_timestamp más reciente) y las categorías de
+dbt/macros/weather_categories.sql, incluido que una temperatura NULL cae en el
+ELSE del CASE ('Hot') y una condición NULL en 'Other'.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rango de weather_silver.sql
+SILVER_START_DATE = date(2023, 6, 1)
+SILVER_END_DATE = date(2023, 12, 31)
+
+WEATHER_CATEGORIES = ("Rainy", "Snowy", "Clear", "Cloudy", "Other")
+TEMPERATURE_CATEGORIES = ("Freezing", "Cold", "Cool", "Warm", "Hot")
+
+# macro weather_category: comparación exacta (IN); el resto, incluido NULL, es 'Other'
+CONDITION_CATEGORIES = {
+    "Rain": "Rainy",
+    "Drizzle": "Rainy",
+    "Thunderstorm": "Rainy",
+    "Snow": "Snowy",
+    "Sleet": "Snowy",
+    "Clear": "Clear",
+    "Sun": "Clear",
+    "Clouds": "Cloudy",
+    "Mist": "Cloudy",
+    "Fog": "Cloudy",
+}
+
+# macro temperature_category: < 0 Freezing, < 10 Cold, < 20 Cool, < 30 Warm, si no Hot
+TEMPERATURE_BOUNDS = np.array([0.0, 10.0, 20.0, 30.0])
+
+NUMERIC_COLUMNS = ("temperature", "humidity", "wind_speed", "precipitation")
+
+WEATHER_LOOKUP_SQL = """
+SELECT date, temperature, humidity, wind_speed, precipitation, weather_condition, ingestion_timestamp
+FROM `{weather_table}`
+WHERE date BETWEEN @start_date AND @end_date
+"""
+
+_EPOCH = date(1970, 1, 1)
+# Número de día de los timestamps nulos / NaT (el mínimo de int64, como NaT en datetime64)
+_MISSING_DAY = np.iinfo(np.int64).min
+_UNITS_PER_DAY = {"s": 86_400, "ms": 86_400_000, "us": 86_400_000_000, "ns": 86_400_000_000_000}
+
+
+def _day_number(value: Any) -> int:
+    """Fecha (date o ISO) -> días desde 1970-01-01."""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return (value - _EPOCH).days
+
+
+def _micros(value: Any) -> int:
+    """Timestamp (datetime o ISO) -> microsegundos UTC; sin zona horaria se asume UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1_000_000)
+
+
+def temperature_category_codes(temperature: np.ndarray) -> np.ndarray:
+    """Índice en TEMPERATURE_CATEGORIES de cada temperatura (NaN -> 'Hot', como el CASE)."""
+    temperature = np.asarray(temperature, dtype=np.float64)
+    codes = np.searchsorted(TEMPERATURE_BOUNDS, temperature, side="right")
+    return np.where(np.isnan(temperature), len(TEMPERATURE_CATEGORIES) - 1, codes).astype(np.int8)
+
+
+def weather_category(condition: Optional[str]) -> str:
+    """Categoría de una condición climática, como la macro weather_category."""
+    return CONDITION_CATEGORIES.get(condition, "Other") if condition is not None else "Other"
+
+
+class WeatherLookup:
+    """
+    Clima por día en arrays NumPy indexados por número de día.
+
+    Cada array tiene un casillero por día entre first_day y first_day + span - 1 y
+    uno más al final, el centinela de "sin clima", al que apuntan los días fuera del
+    rango. Los días del rango sin fila quedan iguales al centinela.
+    """
+
+    __slots__ = (
+        "first_day",
+        "span",
+        "has_weather",
+        "temperature",
+        "humidity",
+        "wind_speed",
+        "precipitation",
+        "condition_code",
+        "weather_category_code",
+        "temperature_category_code",
+        "conditions",
+    )
+
+    def __init__(
+        self,
+        days: np.ndarray,
+        ingestion_micros: np.ndarray,
+        temperature: np.ndarray,
+        humidity: np.ndarray,
+        wind_speed: np.ndarray,
+        precipitation: np.ndarray,
+        weather_condition: Sequence[Optional[str]],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ):
+        """
+        Arma el índice a partir de las columnas de weather_data (una entrada por fila).
+
+        Args:
+            days: Fecha de cada fila en días desde 1970-01-01
+            ingestion_micros: ingestion_timestamp de cada fila en microsegundos
+            temperature: Temperaturas (NaN = NULL)
+            humidity: Humedad (NaN = NULL)
+            wind_speed: Velocidad del viento (NaN = NULL)
+            precipitation: Precipitación (NaN = NULL)
+            weather_condition: Condiciones (None = NULL)
+            start_date: Primer día a conservar (None = sin límite)
+            end_date: Último día a conservar (None = sin límite)
+        """
+        days = np.asarray(days, dtype=np.int64)
+        keep = np.ones(len(days), dtype=bool)
+        if start_date is not None:
+            keep &= days >= _day_number(start_date)
+        if end_date is not None:
+            keep &= days <= _day_number(end_date)
+        rows = np.flatnonzero(keep)
+
+        # Deduplicación de weather_silver: por fecha, la ingesta más reciente
+        if len(rows):
+            order = rows[np.lexsort((np.asarray(ingestion_micros, dtype=np.int64)[rows], days[rows]))]
+            last_of_day = np.append(days[order][1:] != days[order][:-1], True)
+            rows = order[last_of_day]
+
+        self.first_day = int(days[rows].min()) if len(rows) else 0
+        self.span = int(days[rows].max()) - self.first_day + 1 if len(rows) else 0
+        slots = days[rows] - self.first_day
+
+        self.has_weather = np.zeros(self.span + 1, dtype=bool)
+        self.has_weather[slots] = True
+        for name, values in zip(NUMERIC_COLUMNS, (temperature, humidity, wind_speed, precipitation)):
+            column = np.full(self.span + 1, np.nan)
+            column[slots] = np.asarray(values, dtype=np.float64)[rows]
+            setattr(self, name, column)
+
+        # Condiciones codificadas contra la lista de valores distintos (pocas decenas)
+        conditions: Dict[str, int] = {}
+        row_conditions = [weather_condition[i] for i in rows.tolist()]
+        row_codes = [conditions.setdefault(c, len(conditions)) if c is not None else -1 for c in row_conditions]
+        self.conditions = tuple(conditions)
+        self.condition_code = np.full(self.span + 1, -1, dtype=np.int32)
+        self.condition_code[slots] = row_codes
+
+        category_index = {category: i for i, category in enumerate(WEATHER_CATEGORIES)}
+        self.weather_category_code = np.full(self.span + 1, -1, dtype=np.int8)
+        self.weather_category_code[slots] = [category_index[weather_category(c)] for c in row_conditions]
+        self.temperature_category_code = np.full(self.span + 1, -1, dtype=np.int8)
+        self.temperature_category_code[slots] = temperature_category_codes(self.temperature[slots])
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Any],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> "WeatherLookup":
+        """
+        Índice a partir de filas de weather_data (BigQuery Row o cualquier objeto con atributos).
+
+        Args:
+            rows: Filas con date, temperature, humidity, wind_speed, precipitation,
+                weather_condition e ingestion_timestamp
+            start_date: Primer día a conservar (None = sin límite)
+            end_date: Último día a conservar (None = sin límite)
+        """
+        columns: Dict[str, List[Any]] = {name: [] for name in ("days", "ingestion", "condition", *NUMERIC_COLUMNS)}
+        for row in rows:
+            columns["days"].append(_day_number(row.date))
+            columns["ingestion"].append(_micros(row.ingestion_timestamp))
+            columns["condition"].append(row.weather_condition)
+            for name in NUMERIC_COLUMNS:
+                value = getattr(row, name)
+                columns[name].append(np.nan if value is None else value)
+        return cls(
+            np.array(columns["days"], dtype=np.int64),
+            np.array(columns["ingestion"], dtype=np.int64),
+            *(np.array(columns[name], dtype=np.float64) for name in NUMERIC_COLUMNS),
+            columns["condition"],
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+    @classmethod
+    def from_arrow(
+        cls,
+        table: Any,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> "WeatherLookup":
+        """
+        Índice a partir de una pyarrow.Table con el esquema de weather_data.
+
+        Sirve para QueryJob.to_arrow() o para un export Parquet de la tabla.
+
+        Args:
+            table: Tabla con date, temperature, humidity, wind_speed, precipitation,
+                weather_condition e ingestion_timestamp
+            start_date: Primer día a conservar (None = sin límite)
+            end_date: Último día a conservar (None = sin límite)
+        """
+        import pyarrow as pa
+
+        def floats(name: str) -> np.ndarray:
+            return table.column(name).cast(pa.float64()).to_numpy().astype(np.float64)
+
+        days = table.column("date").cast(pa.date32()).cast(pa.int32()).to_numpy().astype(np.int64)
+        ingestion = table.column("ingestion_timestamp")
+        ticks = ingestion.cast(pa.int64()).to_numpy().astype(np.int64)
+        if ingestion.type.unit == "ns":
+            micros = ticks // 1_000
+        else:
+            micros = ticks * (_UNITS_PER_DAY["us"] // _UNITS_PER_DAY[ingestion.type.unit])
+        return cls(
+            days,
+            micros,
+            *(floats(name) for name in NUMERIC_COLUMNS),
+            table.column("weather_condition").to_pylist(),
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+    def __len__(self) -> int:
+        """Días con clima."""
+        return int(self.has_weather.sum())
+
+    @property
+    def date_range(self) -> Optional[Tuple[date, date]]:
+        """Primer y último día con clima (None si está vacío)."""
+        if not self.span:
+            return None
+        first = date.fromordinal(_EPOCH.toordinal() + self.first_day)
+        return first, date.fromordinal(first.toordinal() + self.span - 1)
+
+    def slot_indexes(self, timestamps: Any) -> np.ndarray:
+        """
+        Casillero de cada viaje: el día del viaje o el centinela si no hay clima.
+
+        Args:
+            timestamps: trip_start_timestamp como array NumPy datetime64 (se toma como
+                UTC), pyarrow Array/ChunkedArray timestamp o pandas.Series
+                datetime64 (con o sin zona). Los nulos / NaT van al centinela
+
+        Returns:
+            Array int64 de índices en los arrays del índice
+        """
+        days = _day_numbers(timestamps)
+        present = days != _MISSING_DAY
+        # Los nulos se enmascaran antes de restar: _MISSING_DAY - first_day desborda int64
+        slots = np.where(present, days, self.first_day) - self.first_day
+        return np.where(present & (slots >= 0) & (slots < self.span), slots, self.span)
+
+    def enrich(self, timestamps: Any) -> Dict[str, np.ndarray]:
+        """
+        Clima de cada viaje del lote, como arrays NumPy.
+
+        Args:
+            timestamps: trip_start_timestamp del lote (ver slot_indexes)
+
+        Returns:
+            has_weather (bool), temperature, humidity, wind_speed y precipitation
+            (float64, NaN sin dato) y weather_condition, weather_category y
+            temperature_category (object, None sin dato)
+        """
+        slots = self.slot_indexes(timestamps)
+        result = {"has_weather": self.has_weather.take(slots)}
+        for name in NUMERIC_COLUMNS:
+            result[name] = getattr(self, name).take(slots)
+        for name, codes, labels in self._category_columns():
+            # Código -1 (sin dato) -> último elemento, None
+            result[name] = np.array([*labels, None], dtype=object).take(codes.take(slots))
+        return result
+
+    def enrich_arrow(self, timestamps: Any) -> Any:
+        """
+        Clima de cada viaje del lote, como pyarrow.Table.
+
+        Las columnas numéricas sin dato son nulas y las categorías son
+        DictionaryArray (índices int sobre las etiquetas, sin copiar strings).
+
+        Args:
+            timestamps: trip_start_timestamp del lote (ver slot_indexes)
+
+        Returns:
+            pyarrow.Table con las columnas de enrich
+        """
+        import pyarrow as pa
+
+        slots = self.slot_indexes(timestamps)
+        columns = {"has_weather": pa.array(self.has_weather.take(slots))}
+        for name in NUMERIC_COLUMNS:
+            values = getattr(self, name).take(slots)
+            columns[name] = pa.array(values, mask=np.isnan(values))
+        for name, codes, labels in self._category_columns():
+            indexes = codes.take(slots)
+            columns[name] = pa.DictionaryArray.from_arrays(
+                pa.array(indexes, mask=indexes < 0), pa.array(labels, pa.string())
+            )
+        return pa.table(columns)
+
+    def _category_columns(self) -> List[Tuple[str, np.ndarray, Sequence[str]]]:
+        return [
+            ("weather_condition", self.condition_code, self.conditions),
+            ("weather_category", self.weather_category_code, WEATHER_CATEGORIES),
+            ("temperature_category", self.temperature_category_code, TEMPERATURE_CATEGORIES),
+        ]
+
+
+def _day_numbers(timestamps: Any) -> np.ndarray:
+    """Timestamps -> días desde 1970-01-01 (UTC); nulos / NaT como _MISSING_DAY."""
+    if hasattr(timestamps, "type") and hasattr(timestamps, "cast"):
+        import pyarrow as pa
+
+        unit = timestamps.type.unit
+        # El valor físico de un timestamp Arrow es UTC aunque la columna tenga zona
+        values = timestamps.cast(pa.int64()).fill_null(_MISSING_DAY).to_numpy()
+        return np.where(values == _MISSING_DAY, _MISSING_DAY, np.floor_divide(values, _UNITS_PER_DAY[unit]))
+
+    if hasattr(timestamps, "dt"):
+        # pandas.Series: con zona, to_numpy(datetime64) la pasa a UTC
+        timestamps = timestamps.to_numpy(dtype="datetime64[ns]")
+    values = np.asarray(timestamps)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        raise TypeError(f"Se esperaban timestamps datetime64 o Arrow, no {values.dtype}")
+    # datetime64[D] redondea hacia abajo y NaT queda en el mínimo de int64 (_MISSING_DAY)
+    return values.astype("datetime64[D]").astype(np.int64)
+
+
+def load_weather_lookup(
+    client: Any,
+    weather_table: str,
+    start_date: date = SILVER_START_DATE,
+    end_date: date = SILVER_END_DATE,
+) -> WeatherLookup:
+    """
+    Lee weather_data una vez y arma el índice en memoria.
+
+    Args:
+        client: Cliente de BigQuery o QueryExecutor
+        weather_table: Tabla completa (proyecto.dataset.weather_data)
+        start_date: Primer día (por defecto el de weather_silver)
+        end_date: Último día (por defecto el de weather_silver)
+
+    Returns:
+        WeatherLookup con una fila por fecha (la última ingesta)
+    """
+    from query_guard import run_query
+
+    rows = run_query(
+        client,
+        WEATHER_LOOKUP_SQL.format(weather_table=weather_table),
+        {"start_date": start_date, "end_date": end_date},
+    )
+    return WeatherLookup.from_rows(rows, start_date=start_date, end_date=end_date)
@@ -0,0 +1,178 @@
+"""
+Benchmark del fallback de API (Visual Crossing) de la función de clima.
+
+Levanta un servidor HTTP local con el formato del endpoint timeline que cuenta los
+requests y responde en chunks (Transfer-Encoding: chunked) con una latencia fija
+por request. Ejecuta el backfill bulk contra un cliente falso de BigQuery cuyo NOAA
+no tiene algunos días (días sueltos y un tramo largo) y compara el fallback de a
+un request por día (API_MAX_RANGE_DAYS=0) con el fallback por tramos. Verifica que
+los dos modos escriban las mismas filas. No requiere credenciales ni red.
+
+Uso:
+    python scripts/benchmark_api_fallback.py [--latency-ms 100] [--max-range-days 31]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("PROJECT_ID", "benchmark-project")
+os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+os.environ.setdefault("TABLE_ID", "weather_data")
+os.environ.setdefault("WEATHER_API_KEY", "benchmark-key")
+# Sin cache de GSOD: cada modo consulta el NOAA falso
+os.environ.setdefault("GSOD_CACHE_URI", "")
+os.environ.setdefault("API_MAX_REQUESTS_PER_SECOND", "0")
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import main as weather  # noqa: E402
+from benchmark_backfill_roundtrips import FakeBigQueryClient, FakeQueryJob  # noqa: E402
+
+# Tamaño de los chunks HTTP del servidor: chico para que los días queden cortados
+CHUNK_BYTES = 256
+
+
+def fake_api_day(day):
+    """Día determinístico con el formato de "days" de Visual Crossing."""
+    return {
+        "datetime": day.isoformat(),
+        "datetimeEpoch": int(datetime.combine(day, datetime.min.time()).timestamp()),
+        "tempmax": round(10.0 + (day.toordinal() % 30) * 0.37, 1),
+        "tempmin": -2.5,
+        "humidity": 60.0 + day.toordinal() % 20,
+        "windspeed": 14.2,
+        "precip": (day.toordinal() % 4) * 0.8,
+        "conditions": "Rain, Partially cloudy" if day.toordinal() % 4 else "Clear",
+        "hours": None,
+    }
+
+
+class TimelineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_served = 0
+    latency_s = 0.0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            TimelineHandler.requests_served += 1
+        time.sleep(self.latency_s)
+
+        url = urlparse(self.path)
+        segments = [s for s in url.path.split("/") if s]
+        params = parse_qs(url.query)
+        # Rango: /timeline/{lat},{lon}/{inicio}/{fin}; por día: ?location=...&date=...
+        if len(segments) >= 4:
+            start, end = date.fromisoformat(segments[-2]), date.fromisoformat(segments[-1])
+        else:
+            start = end = date.fromisoformat(params["date"][0])
+        days = [fake_api_day(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+        payload = json.dumps({
+            "queryCost": len(days),
+            "latitude": 41.8781,
+            "resolvedAddress": "Chicago, IL, United States",
+            "days": days,
+            "stations": {"KMDW": {"distance": 14000.0}},
+        }, indent=1).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for offset in range(0, len(payload), CHUNK_BYTES):
+            chunk = payload[offset:offset + CHUNK_BYTES]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GappyNoaaClient(FakeBigQueryClient):
+    """NOAA falso sin los días de `gaps`; guarda las filas escritas."""
+
+    def __init__(self, gaps):
+        super().__init__()
+        self.gaps = gaps
+        self.rows = []
+
+    def query(self, query, job_config=None, location=None):
+        job = super().query(query, job_config, location)
+        if "noaa_gsod" in query and not getattr(job_config, "dry_run", False):
+            return FakeQueryJob([row for row in job.result() if row.date not in self.gaps])
+        return job
+
+    def insert_rows_json(self, table_ref, rows):
+        self.rows.extend(rows)
+        return super().insert_rows_json(table_ref, rows)
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        self.rows.extend(json.loads(line) for line in file_obj.read().splitlines())
+        return super().load_table_from_file(file_obj, destination, job_config)
+
+
+def run_mode(max_range_days, start, end, gaps):
+    weather.API_MAX_RANGE_DAYS = max_range_days
+    weather.reset_clients()
+    client = GappyNoaaClient(gaps)
+    weather.set_client("bigquery", client)
+    TimelineHandler.requests_served = 0
+
+    started = time.perf_counter()
+    writer = weather.WeatherRowWriter(client, upsert=False)
+    summary = weather.ingest_date_range(client, start, end, bulk=True, writer=writer)
+    elapsed = time.perf_counter() - started
+
+    api_rows = {
+        row["date"]: (row["temperature"], row["humidity"], row["precipitation"], row["weather_condition"])
+        for row in client.rows if date.fromisoformat(row["date"]) in gaps
+    }
+    return TimelineHandler.requests_served, summary, api_rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Latencia simulada por request a la API")
+    parser.add_argument("--max-range-days", type=int, default=31, help="Días máximos por request en modo rango")
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2023-12-31")
+    args = parser.parse_args()
+
+    weather.logger.setLevel("WARNING")
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    all_days = [(start + timedelta(days=i)).date() for i in range((end - start).days + 1)]
+    # Un día suelto cada 9 y un tramo de 75 días seguidos (p. ej. una caída de la estación)
+    gaps = {day for i, day in enumerate(all_days) if i % 9 == 4 or 120 <= i < 195}
+
+    TimelineHandler.latency_s = args.latency_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TimelineHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    weather.WEATHER_API_URL = f"http://127.0.0.1:{server.server_address[1]}/timeline"
+
+    print(f"Rango: {start.date()} - {end.date()} ({len(all_days)} días), {len(gaps)} sin datos en NOAA, "
+          f"latencia {args.latency_ms:.0f} ms/request, {weather.FETCH_MAX_WORKERS} workers")
+    print(f"{'modo':<14} {'requests':>9} {'fallidos':>9} {'tiempo (s)':>11}")
+    results = {}
+    for name, max_range_days in (("por_dia", 0), (f"rango_{args.max_range_days}", args.max_range_days)):
+        requests_served, summary, api_rows, elapsed = run_mode(max_range_days, start, end, gaps)
+        print(f"{name:<14} {requests_served:>9} {summary['failed_days']:>9} {elapsed:>11.2f}")
+        assert summary["failed_days"] == 0 and len(api_rows) == len(gaps), summary
+        results[name] = api_rows
+    server.shutdown()
+
+    per_day, by_range = results.values()
+    assert per_day == by_range, "Los modos escribieron filas distintas"
+    print("Filas del fallback idénticas en los dos modos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark de round trips del backfill histórico de clima.
+
+Ejecuta ingest_date_range en modo por día y en modo bulk contra un cliente falso
+de BigQuery que cuenta cada llamada (queries, streaming inserts, load jobs y MERGE)
+y simula la latencia de cada round trip, con y sin escrituras upsert. No requiere credenciales de GCP.
+
+Uso:
+    python scripts/benchmark_backfill_roundtrips.py [--latency-ms 50]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("PROJECT_ID", "benchmark-project")
+os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+os.environ.setdefault("TABLE_ID", "weather_data")
+# Sin cache de GSOD: el benchmark cuenta las queries a NOAA de cada modo
+os.environ.setdefault("GSOD_CACHE_URI", "")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import main as weather  # noqa: E402
+
+
+def fake_noaa_row(day):
+    """Fila agregada de GSOD determinística para una fecha."""
+    return SimpleNamespace(
+        date=day,
+        avg_temp=40.0 + (day.toordinal() % 50),
+        avg_dewpoint=30.0,
+        avg_pressure=1015.0,
+        avg_wind_speed=8.0,
+        total_precipitation=(day.toordinal() % 7) * 0.05,
+        max_temp=60.0,
+        min_temp=30.0,
+    )
+
+
+# Estimaciones fijas de los dry-runs (QueryExecutor): una tabla gsod anual y una
+# query de metadatos (mínimo facturable de BigQuery)
+NOAA_DRY_RUN_BYTES = 150 * 1024 ** 2
+DEFAULT_DRY_RUN_BYTES = 10 * 1024 ** 2
+
+
+def query_parameter_values(job_config):
+    """Valores de los parámetros de una query por nombre (escalares y arrays)."""
+    parameters = getattr(job_config, "query_parameters", None) or []
+    return {p.name: getattr(p, "values", None) or [getattr(p, "value", None)] for p in parameters}
+
+
+class FakeQueryJob:
+    def __init__(self, rows, total_bytes_processed=None):
+        self._rows = rows
+        self.total_bytes_processed = total_bytes_processed
+
+    def result(self):
+        return iter(self._rows)
+
+
+class FakeBigQueryClient:
+    """Cliente falso que cuenta round trips por tipo de operación."""
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.calls = Counter()
+
+    def _round_trip(self, kind):
+        self.calls[kind] += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def query(self, query, job_config=None, location=None):
+        if getattr(job_config, "dry_run", False):
+            self._round_trip("dry_run")
+            return FakeQueryJob([], NOAA_DRY_RUN_BYTES if "noaa_gsod" in query else DEFAULT_DRY_RUN_BYTES)
+        if "noaa_gsod" in query:
+            self._round_trip("noaa_query")
+            params = query_parameter_values(job_config)
+            if "dates" in params or "date" in params:
+                days = params.get("dates") or params["date"]
+            elif "wban" in params:
+                # Año completo de la estación (cache de GSOD)
+                year = int(re.search(r"gsod(\d{4})", query).group(1))
+                first = date(year, 1, 1)
+                days = [first + timedelta(days=i) for i in range((date(year + 1, 1, 1) - first).days)]
+            else:
+                days = [datetime.strptime(re.search(r"DATE\('([\d-]+)'\)", query).group(1), "%Y-%m-%d").date()]
+            return FakeQueryJob([fake_noaa_row(day) for day in days])
+        if "COUNT(*)" in query:
+            self._round_trip("existence_check")
+            return FakeQueryJob([SimpleNamespace(count=0)])
+        if query.lstrip().startswith("MERGE"):
+            self._round_trip("insert")
+            return FakeQueryJob([])
+        self._round_trip("existing_dates")
+        return FakeQueryJob([])
+
+    def dataset(self, dataset_id):
+        return SimpleNamespace(table=lambda table_id: f"{dataset_id}.{table_id}")
+
+    def insert_rows_json(self, table_ref, rows):
+        self._round_trip("insert")
+        return []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        self._round_trip("insert")
+        return FakeQueryJob([])
+
+    def delete_table(self, table, not_found_ok=False):
+        pass
+
+
+def run_mode(bulk, upsert, start, end, latency_s):
+    client = FakeBigQueryClient(latency_s)
+    weather.set_client("bigquery", client)
+    started = time.perf_counter()
+    writer = weather.WeatherRowWriter(client, upsert=upsert)
+    summary = weather.ingest_date_range(client, start, end, bulk=bulk, writer=writer)
+    elapsed = time.perf_counter() - started
+    return client.calls, summary, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latencia simulada por round trip")
+    parser.add_argument("--start", default=weather.START_DATE.strftime("%Y-%m-%d"))
+    parser.add_argument("--end", default=weather.END_DATE.strftime("%Y-%m-%d"))
+    args = parser.parse_args()
+
+    weather.logger.setLevel("WARNING")
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    days = (end - start + timedelta(days=1)).days
+
+    print(f"Rango: {start.date()} - {end.date()} ({days} días), latencia {args.latency_ms:.0f} ms/round trip")
+    print(f"{'modo':<16} {'queries':>8} {'escrituras':>11} {'total':>8} {'tiempo (s)':>11}")
+    modes = (("por_dia", False, False), ("bulk", True, False), ("por_dia_upsert", False, True), ("bulk_upsert", True, True))
+    for name, bulk, upsert in modes:
+        calls, summary, elapsed = run_mode(bulk, upsert, start, end, args.latency_ms / 1000.0)
+        queries = sum(count for kind, count in calls.items() if kind != "insert")
+        print(f"{name:<16} {queries:>8} {calls['insert']:>11} {sum(calls.values()):>8} {elapsed:>11.2f}")
+        assert summary["inserted_days"] == days, summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de latencia de invocaciones frías vs calientes de la función de clima.
+
+Cada invocación llama a main({"date": ...}) con un cliente falso de BigQuery que
+no tiene datos NOAA, de modo que la fecha pasa por el fallback HTTP contra un stub
+local keep-alive. La construcción del cliente de BigQuery simula el descubrimiento
+de credenciales con una espera fija.
+
+- fría: se vacía el registro de clientes antes de cada invocación
+- caliente: el registro sobrevive entre invocaciones (instancia caliente)
+
+Uso:
+    python scripts/benchmark_client_reuse.py [--invocations 20] [--client-setup-ms 150]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+NEW_CONNECTIONS = 0
+
+
+class KeepAliveTimelineHandler(BaseHTTPRequestHandler):
+    """Stub del endpoint timeline con HTTP/1.1 keep-alive; cuenta conexiones nuevas."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        global NEW_CONNECTIONS
+        NEW_CONNECTIONS += 1
+        super().setup()
+
+    def do_GET(self):
+        body = json.dumps({"days": [{"tempmax": 20.0, "humidity": 55.0, "windspeed": 3.0,
+                                     "precip": 0.0, "conditions": "Clear"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeQueryJob:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def result(self):
+        return iter(self._rows)
+
+
+class FakeBigQueryClient:
+    """Sin datos NOAA ni fechas existentes; los inserts siempre funcionan."""
+
+    def query(self, query, job_config=None):
+        if "COUNT(*)" in query:
+            return FakeQueryJob([SimpleNamespace(count=0)])
+        return FakeQueryJob([])
+
+    def dataset(self, dataset_id):
+        return SimpleNamespace(table=lambda table_id: f"{dataset_id}.{table_id}")
+
+    def insert_rows_json(self, table_ref, rows):
+        return []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        return FakeQueryJob([])
+
+    def delete_table(self, table, not_found_ok=False):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--client-setup-ms", type=float, default=150.0,
+                        help="Costo simulado de crear el cliente de BigQuery")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveTimelineHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.setdefault("PROJECT_ID", "benchmark-project")
+    os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+    os.environ.setdefault("TABLE_ID", "weather_data")
+    os.environ["WEATHER_API_KEY"] = "stub"
+    os.environ["WEATHER_API_URL"] = f"http://127.0.0.1:{server.server_port}/timeline"
+    os.environ["API_MAX_REQUESTS_PER_SECOND"] = "0"
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+    import main as weather
+
+    weather.logger.setLevel("ERROR")
+
+    def slow_bigquery_factory():
+        time.sleep(args.client_setup_ms / 1000.0)
+        return FakeBigQueryClient()
+
+    weather._CLIENT_FACTORIES["bigquery"] = slow_bigquery_factory
+
+    global NEW_CONNECTIONS
+    print(f"{args.invocations} invocaciones por modo, setup del cliente {args.client_setup_ms:.0f} ms")
+    print(f"{'modo':<10} {'p50 (ms)':>9} {'máx (ms)':>9} {'conexiones':>11}")
+    for mode in ("fria", "caliente"):
+        weather.reset_clients()
+        NEW_CONNECTIONS = 0
+        latencies = []
+        for i in range(args.invocations):
+            if mode == "fria":
+                weather.reset_clients()
+            day = (datetime(2023, 6, 1) + timedelta(days=i)).strftime("%Y-%m-%d")
+            started = time.perf_counter()
+            response = weather.main({"date": day})
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response["statusCode"] == 200, response
+        print(f"{mode:<10} {statistics.median(latencies):>9.1f} {max(latencies):>9.1f} {NEW_CONNECTIONS:>11}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
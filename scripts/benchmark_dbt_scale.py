@@ -0,0 +1,155 @@
+"""
+Benchmark de escala de los modelos dbt silver/gold contra DuckDB local.
+
+Para cada escala genera (o reutiliza) Parquet sintético con
+generate_synthetic_data.py, arma un profile dbt-duckdb temporal que lee las
+tablas raw desde esos archivos (macro raw_table) y ejecuta cada modelo en un
+proceso dbt propio, en orden de dependencias. Por modelo registra:
+- execute_s: tiempo de ejecución del modelo (run_results.json, sin parseo de dbt)
+- wall_s: tiempo total del proceso dbt
+- peak_rss_mb: pico de memoria residente del proceso (DuckDB corre embebido)
+- rows: filas del modelo materializado
+- input_rows_per_s: filas de viajes raw de la escala / execute_s
+
+En DuckDB los modelos se materializan como tabla completa (ver
+incremental_materialization), así que se mide el costo de un build completo.
+
+Requiere dbt-duckdb. Uso:
+    python scripts/benchmark_dbt_scale.py --scales 1M,10M [--data-dir synthetic_data] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import generate_synthetic_data  # noqa: E402
+
+DBT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "dbt"))
+
+# Orden de dependencias (el agregado horario antes de los dos modelos gold)
+MODELS = [
+    ("taxi_trips_silver", "chicago_taxi_silver"),
+    ("weather_silver", "chicago_taxi_silver"),
+    ("weather_station_silver", "chicago_taxi_silver"),
+    ("taxi_weather_hourly", "chicago_taxi_gold"),
+    ("daily_summary", "chicago_taxi_gold"),
+    ("taxi_weather_analysis", "chicago_taxi_gold"),
+    ("taxi_weather_station_daily", "chicago_taxi_gold"),
+]
+
+PROFILE_TEMPLATE = """
+chicago_taxi_analysis:
+  target: benchmark
+  outputs:
+    benchmark:
+      type: duckdb
+      path: {database_path}
+      schema: main
+      threads: {threads}
+      settings:
+        TimeZone: UTC
+"""
+
+
+def run_model(model, profiles_dir, target_dir, raw_parquet_path):
+    """Ejecuta un modelo en su propio proceso dbt y devuelve wall time, RSS pico y timing del modelo."""
+    command = [
+        "dbt", "run", "--select", model, "--full-refresh",
+        "--profiles-dir", profiles_dir,
+        "--target-path", target_dir,
+        # El weather_data sintético tiene re-ingestas: weather_silver tiene que deduplicar
+        "--vars", json.dumps({"raw_parquet_path": raw_parquet_path, "weather_raw_is_unique": False}),
+        "--quiet",
+    ]
+    env = dict(os.environ, GCP_PROJECT_ID=os.environ.get("GCP_PROJECT_ID", "benchmark-project"))
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=DBT_DIR, env=env)
+    # wait4 devuelve el rusage sólo de este proceso (no acumulado entre modelos)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall_s = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"dbt run falló para {model}")
+
+    with open(os.path.join(target_dir, "run_results.json")) as f:
+        result = json.load(f)["results"][0]
+    execute_s = next(
+        (
+            (_parse_ts(t["completed_at"]) - _parse_ts(t["started_at"]))
+            for t in result["timing"] if t["name"] == "execute"
+        ),
+        result["execution_time"],
+    )
+    return {"wall_s": wall_s, "execute_s": execute_s, "peak_rss_mb": rusage.ru_maxrss / 1024}
+
+
+def _parse_ts(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def benchmark_scale(scale, data_dir, work_dir, threads, start, end):
+    """Genera los datos de la escala si faltan y mide todos los modelos."""
+    trips = generate_synthetic_data.parse_count(scale)
+    raw_parquet_path = os.path.abspath(os.path.join(data_dir, scale))
+    if not os.path.isdir(os.path.join(raw_parquet_path, "weather_station_lookup")):
+        print(f"🔄 Generando datos sintéticos {scale} en {raw_parquet_path}")
+        generate_synthetic_data.generate(raw_parquet_path, trips, start, end)
+
+    scale_dir = os.path.join(work_dir, scale)
+    os.makedirs(scale_dir, exist_ok=True)
+    database_path = os.path.join(scale_dir, "benchmark.duckdb")
+    if os.path.exists(database_path):
+        os.remove(database_path)
+    with open(os.path.join(scale_dir, "profiles.yml"), "w") as f:
+        f.write(PROFILE_TEMPLATE.format(database_path=database_path, threads=threads))
+
+    results = {}
+    for model, schema in MODELS:
+        result = run_model(model, scale_dir, os.path.join(scale_dir, "target"), raw_parquet_path)
+        with duckdb.connect(database_path, read_only=True) as con:
+            result["rows"] = con.execute(f"SELECT COUNT(*) FROM {schema}.{model}").fetchone()[0]
+        result["input_rows_per_s"] = trips / result["execute_s"] if result["execute_s"] else None
+        results[model] = result
+        print(f"{scale:>6} {model:<26} {result['execute_s']:>10.2f} {result['wall_s']:>8.2f} "
+              f"{result['peak_rss_mb']:>10.0f} {result['rows']:>12,} {result['input_rows_per_s'] or 0:>14,.0f}",
+              flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1M,10M")
+    parser.add_argument("--data-dir", default="synthetic_data", help="Se reutilizan los datos ya generados")
+    parser.add_argument("--work-dir", default=None, help="Base DuckDB y artefactos dbt (por defecto temporal)")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--start-date", default="2023-06-01")
+    parser.add_argument("--end-date", default="2023-12-31")
+    parser.add_argument("--json", dest="json_path", default=None, help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dbt_scale_")
+    start = date.fromisoformat(args.start_date)
+    end = date.fromisoformat(args.end_date)
+
+    print(f"{'escala':>6} {'modelo':<26} {'execute (s)':>10} {'wall (s)':>8} "
+          f"{'RSS (MB)':>10} {'filas':>12} {'filas raw/s':>14}")
+    results = {}
+    for scale in args.scales.split(","):
+        results[scale] = benchmark_scale(scale, args.data_dir, work_dir, args.threads, start, end)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
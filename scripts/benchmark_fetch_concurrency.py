@@ -0,0 +1,94 @@
+"""
+Benchmark de la etapa de fetch concurrente contra un servidor HTTP local.
+
+Levanta un stub del endpoint timeline de Visual Crossing que responde con una
+latencia artificial y mide el tiempo total de fetch_weather_concurrently con
+distintas cantidades de workers. No hace requests a Internet.
+
+Uso:
+    python scripts/benchmark_fetch_concurrency.py [--days 32] [--latency-ms 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STUB_LATENCY_S = 0.2
+
+
+class StubTimelineHandler(BaseHTTPRequestHandler):
+    """Responde como el endpoint timeline con un único día."""
+
+    def do_GET(self):
+        time.sleep(STUB_LATENCY_S)
+        params = parse_qs(urlparse(self.path).query)
+        body = json.dumps({
+            "days": [{
+                "datetime": params["date"][0],
+                "tempmax": 21.5,
+                "humidity": 60.0,
+                "windspeed": 4.2,
+                "precip": 0.0,
+                "conditions": "Clear",
+            }]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    global STUB_LATENCY_S
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Latencia artificial del stub")
+    parser.add_argument("--workers", default="1,2,4,8,16")
+    args = parser.parse_args()
+    STUB_LATENCY_S = args.latency_ms / 1000.0
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTimelineHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.setdefault("PROJECT_ID", "benchmark-project")
+    os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+    os.environ.setdefault("TABLE_ID", "weather_data")
+    os.environ["WEATHER_API_KEY"] = "stub"
+    os.environ["WEATHER_API_URL"] = f"http://127.0.0.1:{server.server_port}/timeline"
+    # Sin rate limit: se mide sólo el efecto de la concurrencia
+    os.environ["API_MAX_REQUESTS_PER_SECOND"] = "0"
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+    import main as weather
+
+    weather.logger.setLevel("WARNING")
+    dates = [datetime(2023, 6, 1) + timedelta(days=i) for i in range(args.days)]
+
+    print(f"{args.days} días, latencia del stub {args.latency_ms:.0f} ms")
+    print(f"{'workers':>8} {'tiempo (s)':>11} {'speedup':>8} {'p50 día (ms)':>13}")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        started = time.perf_counter()
+        results = list(weather.fetch_weather_concurrently(dates, weather.get_weather_data_from_api, workers))
+        elapsed = time.perf_counter() - started
+        assert [day for day, *_ in results] == dates, "el handoff debe respetar el orden de fechas"
+        assert all(error is None for _, _, error, _ in results)
+        baseline = baseline or elapsed
+        latencies = sorted(latency for *_, latency in results)
+        print(f"{workers:>8} {elapsed:>11.2f} {baseline / elapsed:>7.1f}x {latencies[len(latencies) // 2] * 1000:>13.0f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
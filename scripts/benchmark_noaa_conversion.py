@@ -0,0 +1,88 @@
+"""
+Microbenchmark de la conversión NOAA -> weather_data: path escalar vs vectorizado.
+
+Genera filas GSOD sintéticas (incluyendo 0.0 y nulos en cada columna), verifica
+que main.convert_noaa_row y noaa_batch.convert_noaa_frame produzcan exactamente la
+misma salida (sin contar ingestion_timestamp) y mide ambos a distintos tamaños.
+
+Uso:
+    python scripts/benchmark_noaa_conversion.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import main as weather  # noqa: E402
+import noaa_batch  # noqa: E402
+
+
+def synthetic_gsod_frame(size, seed=42):
+    """GSOD agregado con temperaturas de -20 a 100 °F, lluvia escasa, ceros y nulos."""
+    rng = np.random.default_rng(seed)
+    start = date(2000, 1, 1)
+    frame = pd.DataFrame({
+        "date": [start + timedelta(days=int(i)) for i in rng.integers(0, 9000, size)],
+        "avg_temp": np.round(rng.uniform(-20, 100, size), 1),
+        "avg_wind_speed": np.round(rng.gamma(2.0, 4.0, size), 1),
+        "total_precipitation": np.round(np.where(rng.random(size) < 0.7, 0.0, rng.exponential(0.3, size)), 2),
+    })
+    # Casos borde: 0.0 exacto y nulos en todas las columnas numéricas
+    for column in ("avg_temp", "avg_wind_speed", "total_precipitation"):
+        frame.loc[rng.random(size) < 0.01, column] = 0.0
+        frame.loc[rng.random(size) < 0.01, column] = np.nan
+    frame.loc[0, ["avg_temp", "avg_wind_speed", "total_precipitation"]] = [0.0, 0.0, 0.0]
+    return frame
+
+
+def scalar_convert(frame):
+    rows = []
+    for record in frame.to_dict("records"):
+        row = SimpleNamespace(**{k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in record.items()})
+        rows.append(weather.convert_noaa_row(row, datetime.combine(row.date, datetime.min.time())))
+    return rows
+
+
+def strip_timestamp(rows):
+    return [{k: v for k, v in row.items() if k != "ingestion_timestamp"} for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    parity = synthetic_gsod_frame(20000, seed=7)
+    expected = strip_timestamp(scalar_convert(parity))
+    actual = strip_timestamp(noaa_batch.frame_to_records(noaa_batch.convert_noaa_frame(parity)))
+    assert actual == expected, "el path vectorizado difiere del escalar"
+    assert expected[0]["temperature"] == -17.8 and expected[0]["wind_speed"] == 0.0
+    print("✅ Paridad escalar/vectorizado verificada en 20.000 filas (incluye 0.0 y nulos)")
+
+    print(f"{'filas':>10} {'escalar (s)':>12} {'vectorizado (s)':>16} {'+ a registros (s)':>18} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        frame = synthetic_gsod_frame(size)
+
+        started = time.perf_counter()
+        scalar_convert(frame)
+        scalar_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        converted = noaa_batch.convert_noaa_frame(frame)
+        vector_s = time.perf_counter() - started
+        noaa_batch.frame_to_records(converted)
+        records_s = time.perf_counter() - started
+
+        print(f"{size:>10} {scalar_s:>12.3f} {vector_s:>16.3f} {records_s:>18.3f} {scalar_s / vector_s:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark de la asignación de estación meteorológica a pickups de taxis.
+
+Compara, sobre N pickups sintéticos (por defecto 10M), tres formas de obtener la
+estación GSOD de cada viaje:
+- distancia_por_viaje: haversine de cada pickup contra todas las estaciones y argmin
+  (el costo de resolver la estación en la query de cada viaje)
+- kdtree_por_viaje: búsqueda de la estación más cercana de cada pickup con el
+  KD-tree de stations.py
+- lookup: la dimensión weather_station_lookup (stations.build_lookup_rows sobre los
+  centroides de community area y las celdas con pickups) y después sólo joins de
+  igualdad, como hace taxi_trips_silver: gather NumPy por área / celda y hash join
+  con pandas
+
+Los pickups se generan alrededor del centroide de su community area (en el dataset
+real las coordenadas son centroides de census tract), con una fracción sin área
+que se resuelve por celda. Se informa la coincidencia con la estación exacta: las
+diferencias del lookup son viajes cerca del límite entre dos estaciones cuyo área
+o celda tiene el centro del otro lado.
+
+Uso:
+    python scripts/benchmark_station_assignment.py [--pickups 10000000] [--cells-per-degree 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import stations  # noqa: E402
+from generate_synthetic_data import LAT_RANGE, LON_RANGE, SYNTHETIC_STATIONS  # noqa: E402
+
+N_AREAS = 77
+
+
+def synthetic_pickups(rng, n, null_area_rate=0.08):
+    """Pickups alrededor del centroide de su área; null_area_rate sin área (community_area = 0)."""
+    centroid_lat = rng.uniform(*LAT_RANGE, N_AREAS + 1)
+    centroid_lon = rng.uniform(*LON_RANGE, N_AREAS + 1)
+    area = rng.integers(1, N_AREAS + 1, n)
+    lat = centroid_lat[area] + rng.normal(0, 0.01, n)
+    lon = centroid_lon[area] + rng.normal(0, 0.01, n)
+    area[rng.random(n) < null_area_rate] = 0
+    return area, lat, lon
+
+
+def haversine_nearest(station_lat, station_lon, lat, lon, chunk_size=1_000_000):
+    """Estación más cercana por haversine contra todas las estaciones, por bloques."""
+    station_lat = np.radians(np.asarray(station_lat))[None, :]
+    station_lon = np.radians(np.asarray(station_lon))[None, :]
+    nearest = np.empty(len(lat), dtype=np.int64)
+    for offset in range(0, len(lat), chunk_size):
+        block_lat = np.radians(lat[offset:offset + chunk_size])[:, None]
+        block_lon = np.radians(lon[offset:offset + chunk_size])[:, None]
+        a = (np.sin((station_lat - block_lat) / 2) ** 2
+             + np.cos(block_lat) * np.cos(station_lat) * np.sin((station_lon - block_lon) / 2) ** 2)
+        nearest[offset:offset + len(a)] = np.arcsin(np.sqrt(a)).argmin(axis=1)
+    return nearest
+
+
+def aggregate_pickups(area, lat, lon, cells_per_degree):
+    """Centroide por área y celdas con pickups (en producción, los GROUP BY de la función)."""
+    has_area = area > 0
+    counts = np.bincount(area[has_area], minlength=N_AREAS + 1)
+    sum_lat = np.bincount(area[has_area], weights=lat[has_area], minlength=N_AREAS + 1)
+    sum_lon = np.bincount(area[has_area], weights=lon[has_area], minlength=N_AREAS + 1)
+    areas = [
+        {"community_area": a, "latitude": sum_lat[a] / counts[a], "longitude": sum_lon[a] / counts[a]}
+        for a in np.flatnonzero(counts).tolist()
+    ]
+    lat_cell, lon_cell = stations.grid_cells(lat, lon, cells_per_degree)
+    # Una clave int64 por celda: np.unique sobre un vector es mucho más rápido que por filas
+    lon0 = lon_cell.min()
+    width = lon_cell.max() - lon0 + 1
+    keys = np.unique(lat_cell * width + (lon_cell - lon0))
+    cells = list(zip((keys // width).tolist(), (keys % width + lon0).tolist()))
+    return areas, cells
+
+
+def build_lookup(areas, cells, cells_per_degree):
+    """Filas de la dimensión: KD-tree sobre las estaciones y una búsqueda por área y celda."""
+    return stations.build_lookup_rows(SYNTHETIC_STATIONS, areas, cells, cells_per_degree)
+
+
+def gather_assignment(rows, area, lat, lon, cells_per_degree, station_index):
+    """Estación por viaje con arrays densos indexados por área y por celda (un gather por join)."""
+    area_station = np.full(N_AREAS + 1, -1, dtype=np.int64)
+    cell_rows = [row for row in rows if row["lookup_type"] == stations.GRID_CELL]
+    lat_cells = np.array([row["lat_cell"] for row in cell_rows])
+    lon_cells = np.array([row["lon_cell"] for row in cell_rows])
+    lat0, lon0 = lat_cells.min(), lon_cells.min()
+    cell_station = np.full((lat_cells.max() - lat0 + 1, lon_cells.max() - lon0 + 1), -1, dtype=np.int64)
+    for row in rows:
+        if row["lookup_type"] == stations.COMMUNITY_AREA:
+            area_station[row["community_area"]] = station_index[row["station_id"]]
+        else:
+            cell_station[row["lat_cell"] - lat0, row["lon_cell"] - lon0] = station_index[row["station_id"]]
+
+    lat_cell, lon_cell = stations.grid_cells(lat, lon, cells_per_degree)
+    by_area = area_station[area]
+    return np.where(by_area >= 0, by_area, cell_station[lat_cell - lat0, lon_cell - lon0])
+
+
+def hash_join_assignment(rows, area, lat, lon, cells_per_degree, station_index):
+    """Estación por viaje con dos hash joins de pandas, como los LEFT JOIN de taxi_trips_silver."""
+    lookup = pd.DataFrame(rows)
+    lookup["station"] = lookup["station_id"].map(station_index)
+    by_area = lookup.loc[lookup["lookup_type"] == stations.COMMUNITY_AREA, ["community_area", "station"]]
+    by_cell = lookup.loc[lookup["lookup_type"] == stations.GRID_CELL, ["lat_cell", "lon_cell", "station"]]
+    lat_cell, lon_cell = stations.grid_cells(lat, lon, cells_per_degree)
+    trips = pd.DataFrame({"community_area": area, "lat_cell": lat_cell, "lon_cell": lon_cell})
+    trips = trips.merge(by_area.astype({"community_area": "int64"}), on="community_area", how="left")
+    trips = trips.merge(by_cell.astype({"lat_cell": "int64", "lon_cell": "int64"}), on=["lat_cell", "lon_cell"],
+                        how="left", suffixes=("", "_cell"))
+    return trips["station"].fillna(trips["station_cell"]).to_numpy(dtype=np.int64)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pickups", type=int, default=10_000_000)
+    parser.add_argument("--cells-per-degree", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    area, lat, lon = synthetic_pickups(rng, args.pickups)
+    station_lat = [station["latitude"] for station in SYNTHETIC_STATIONS]
+    station_lon = [station["longitude"] for station in SYNTHETIC_STATIONS]
+    station_index = {station["station_id"]: i for i, station in enumerate(SYNTHETIC_STATIONS)}
+    n = args.pickups
+
+    exact, haversine_s = timed(haversine_nearest, station_lat, station_lon, lat, lon)
+    (kdtree, _), kdtree_s = timed(stations.nearest_stations, station_lat, station_lon, lat, lon)
+    (areas, cells), aggregate_s = timed(aggregate_pickups, area, lat, lon, args.cells_per_degree)
+    rows, build_s = timed(build_lookup, areas, cells, args.cells_per_degree)
+    gathered, gather_s = timed(gather_assignment, rows, area, lat, lon, args.cells_per_degree, station_index)
+    joined, join_s = timed(hash_join_assignment, rows, area, lat, lon, args.cells_per_degree, station_index)
+
+    assert (kdtree == exact).all(), "El KD-tree no coincide con la distancia exacta"
+    assert (gathered == joined).all(), "El gather y el hash join asignan estaciones distintas"
+
+    print(f"{n:,} pickups, {len(SYNTHETIC_STATIONS)} estaciones, {sum(area == 0):,} sin community area, "
+          f"dimensión de {len(rows):,} filas ({args.cells_per_degree} celdas/grado)")
+    print(f"{'método':<24} {'tiempo (s)':>11} {'Mviajes/s':>10} {'= exacta':>9}")
+    for name, elapsed, assigned in (
+        ("distancia_por_viaje", haversine_s, exact),
+        ("kdtree_por_viaje", kdtree_s, kdtree),
+        ("lookup_gather", gather_s, gathered),
+        ("lookup_hash_join", join_s, joined),
+    ):
+        print(f"{name:<24} {elapsed:>11.2f} {n / elapsed / 1e6:>10.1f} {(assigned == exact).mean():>9.2%}")
+    print(f"dimensión: agregación de pickups {aggregate_s:.2f} s (en BigQuery), "
+          f"KD-tree y filas {build_s * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
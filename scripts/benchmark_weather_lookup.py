@@ -0,0 +1,199 @@
+"""
+Benchmark del enriquecimiento de viajes con clima en Python (weather_lookup.py).
+
+Genera weather_data sintético (generate_synthetic_data.generate_weather, con
+re-ingestas) y le agrega días sin fila, días fuera del rango de weather_silver y
+casos borde de las categorías (temperaturas en los límites, NULL, condiciones que
+no mapea el CASE). Después:
+1. Verifica que WeatherLookup.from_arrow devuelva, para cada día, lo mismo que el
+   modelo weather_silver construido con dbt-duckdb sobre esos datos (dedup por
+   ingesta, categorías de macros/weather_categories.sql, días faltantes)
+2. Mide trips/s de enriquecer lotes de --batch-size trip_start_timestamp con:
+   - dict_por_viaje: dict fecha -> fila de weather_silver y una búsqueda por viaje
+   - pandas_merge: merge de pandas por fecha contra weather_silver (el join del
+     lote, en memoria)
+   - lookup_numpy: WeatherLookup.enrich sobre datetime64 (gather NumPy)
+   - lookup_arrow: WeatherLookup.enrich_arrow sobre un timestamp Arrow
+   y verifica que todos los métodos den el mismo clima por viaje
+
+Requiere dbt-duckdb para el paso 1 (--skip-dbt lo omite). Uso:
+    python scripts/benchmark_weather_lookup.py [--batch-size 1000000] [--batches 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import weather_lookup  # noqa: E402
+from generate_synthetic_data import WEATHER_SCHEMA, generate_weather  # noqa: E402
+
+ENRICHED_COLUMNS = (
+    "temperature", "humidity", "wind_speed", "precipitation",
+    "weather_condition", "weather_category", "temperature_category",
+)
+
+
+def synthetic_weather(rng, start, end):
+    """weather_data con re-ingestas, huecos, días fuera de rango y bordes de categoría."""
+    margin = 5
+    table = generate_weather(rng, start - timedelta(days=margin), (end - start).days + 1 + 2 * margin, 0.05)
+    weather = table.to_pandas()
+    days = pd.to_datetime(weather["date"])
+    # Un día sin fila cada 13 (p. ej. NOAA y la API sin dato)
+    weather = weather[(days - pd.Timestamp(start)).dt.days % 13 != 6].reset_index(drop=True)
+
+    edge_temperatures = [0.0, 10.0, 20.0, 30.0, -0.1, 29.9, None]
+    edge_conditions = [None, "Sleet", "Mist", "Sun", "Partially cloudy", "rain", "Overcast"]
+    for i, (temperature, condition) in enumerate(zip(edge_temperatures, edge_conditions)):
+        weather.loc[20 + 3 * i, "temperature"] = temperature
+        weather.loc[21 + 3 * i, "weather_condition"] = condition
+    return pa.Table.from_pandas(weather, schema=WEATHER_SCHEMA, preserve_index=False)
+
+
+def build_weather_silver(weather, work_dir):
+    """Construye weather_silver con dbt-duckdb sobre `weather` y lo devuelve como DataFrame."""
+    import duckdb
+    from benchmark_dbt_scale import PROFILE_TEMPLATE, run_model
+
+    raw_dir = os.path.join(work_dir, "raw")
+    os.makedirs(os.path.join(raw_dir, "weather_data"), exist_ok=True)
+    pq.write_table(weather, os.path.join(raw_dir, "weather_data", "part-00000.parquet"))
+    database_path = os.path.join(work_dir, "weather.duckdb")
+    with open(os.path.join(work_dir, "profiles.yml"), "w") as f:
+        f.write(PROFILE_TEMPLATE.format(database_path=database_path, threads=1))
+    run_model("weather_silver", work_dir, os.path.join(work_dir, "target"), raw_dir)
+    with duckdb.connect(database_path, read_only=True) as con:
+        return con.execute("SELECT * FROM chicago_taxi_silver.weather_silver").df()
+
+
+def to_object(values):
+    """Strings con NULL como None (pandas usa NaN / NA según la versión)."""
+    return np.array([None if pd.isna(v) else v for v in values], dtype=object)
+
+
+def assert_same_weather(name, expected, actual):
+    for column in ENRICHED_COLUMNS:
+        left, right = expected[column], actual[column]
+        if left.dtype == object or right.dtype == object:
+            same = (to_object(left) == to_object(right)).all()
+        else:
+            same = np.array_equal(np.asarray(left, dtype=np.float64), np.asarray(right, dtype=np.float64),
+                                  equal_nan=True)
+        assert same, f"{name}: {column} no coincide"
+
+
+def verify_against_silver(lookup, silver, start, end):
+    """Un timestamp por día (más días fuera del rango) contra las filas de weather_silver."""
+    days = pd.date_range(start - timedelta(days=3), end + timedelta(days=3), freq="D")
+    timestamps = (days + pd.Timedelta(hours=13)).to_numpy(dtype="datetime64[us]")
+    enriched = lookup.enrich(timestamps)
+
+    silver = silver.assign(date=pd.to_datetime(silver["date"]))
+    expected = pd.DataFrame({"date": days}).merge(silver, on="date", how="left")
+    assert_same_weather("weather_silver", {c: expected[c].to_numpy() for c in ENRICHED_COLUMNS}, enriched)
+    assert (enriched["has_weather"] == expected["ingestion_timestamp"].notna().to_numpy()).all()
+    return len(days), int((~enriched["has_weather"]).sum())
+
+
+def silver_frame(lookup):
+    """weather_silver en un DataFrame (a partir del índice ya verificado) para los baselines."""
+    first, last = lookup.date_range
+    days = pd.date_range(first, last, freq="D")
+    frame = pd.DataFrame(lookup.enrich(days.to_numpy(dtype="datetime64[us]")))
+    frame["date"] = days
+    return frame[frame.pop("has_weather")].reset_index(drop=True)
+
+
+def enrich_dict(silver, timestamps):
+    """Baseline: dict fecha -> fila y una búsqueda por viaje."""
+    by_date = {row["date"].date(): row for row in silver.to_dict("records")}
+    missing = dict.fromkeys(ENRICHED_COLUMNS)
+    rows = [by_date.get(day, missing) for day in timestamps.astype("datetime64[D]").tolist()]
+    return {column: np.array([row[column] for row in rows], dtype=object) for column in ENRICHED_COLUMNS}
+
+
+def enrich_pandas(silver, timestamps):
+    """Baseline: merge de pandas por fecha."""
+    trips = pd.DataFrame({"date": timestamps.astype("datetime64[D]").astype("datetime64[ns]")})
+    merged = trips.merge(silver, on="date", how="left")
+    return {column: merged[column].to_numpy() for column in ENRICHED_COLUMNS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1_000_000)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--start-date", default="2023-06-01")
+    parser.add_argument("--end-date", default="2023-12-31")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-dbt", action="store_true", help="No verificar contra weather_silver de dbt")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    start = date.fromisoformat(args.start_date)
+    end = date.fromisoformat(args.end_date)
+    weather = synthetic_weather(rng, start, end)
+
+    started = time.perf_counter()
+    lookup = weather_lookup.WeatherLookup.from_arrow(weather, start, end)
+    build_ms = (time.perf_counter() - started) * 1000
+    footprint = sum(getattr(lookup, name).nbytes for name in weather_lookup.WeatherLookup.__slots__
+                    if isinstance(getattr(lookup, name), np.ndarray))
+    print(f"weather_data: {weather.num_rows} filas -> {len(lookup)} días con clima en {lookup.date_range}, "
+          f"índice de {footprint / 1024:.1f} KiB armado en {build_ms:.1f} ms")
+
+    if not args.skip_dbt:
+        silver = build_weather_silver(weather, tempfile.mkdtemp(prefix="weather_lookup_"))
+        checked, missing = verify_against_silver(lookup, silver, start, end)
+        print(f"Coincide con weather_silver (dbt-duckdb) en {checked} días, {missing} sin clima")
+
+    # Viajes entre una semana antes y una después del rango: hay días sin clima
+    low = np.datetime64(start - timedelta(days=7), "us").astype(np.int64)
+    high = np.datetime64(end + timedelta(days=8), "us").astype(np.int64)
+    silver = silver_frame(lookup)
+    timings = {name: [] for name in ("dict_por_viaje", "pandas_merge", "lookup_numpy", "lookup_arrow")}
+    for _ in range(args.batches):
+        timestamps = rng.integers(low, high, args.batch_size).astype("datetime64[us]")
+        arrow_timestamps = pa.array(timestamps.astype(np.int64), pa.timestamp("us", tz="UTC"))
+        results = {}
+        for name, enrich in (
+            ("dict_por_viaje", lambda: enrich_dict(silver, timestamps)),
+            ("pandas_merge", lambda: enrich_pandas(silver, timestamps)),
+            ("lookup_numpy", lambda: lookup.enrich(timestamps)),
+            ("lookup_arrow", lambda: lookup.enrich_arrow(arrow_timestamps)),
+        ):
+            began = time.perf_counter()
+            results[name] = enrich()
+            timings[name].append(time.perf_counter() - began)
+
+        table = results["lookup_arrow"]
+        results["lookup_arrow"] = {
+            c: (table.column(c).cast(pa.string()) if pa.types.is_dictionary(table.column(c).type)
+                else table.column(c)).to_numpy(zero_copy_only=False)
+            for c in ENRICHED_COLUMNS
+        }
+        for name in ("dict_por_viaje", "pandas_merge", "lookup_arrow"):
+            assert_same_weather(name, results["lookup_numpy"], results[name])
+
+    print(f"{args.batches} lotes de {args.batch_size:,} viajes, mediana por lote; "
+          f"todos los métodos dan el mismo clima")
+    print(f"{'método':<16} {'lote (ms)':>10} {'viajes/s':>14}")
+    for name, elapsed in timings.items():
+        median = statistics.median(elapsed)
+        print(f"{name:<16} {median * 1000:>10.1f} {args.batch_size / median:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,12 @@ set -euo pipefail
 
 PROJECT_ID="${1:-chicago-taxi-48702}"
 REGION="${2:-us-central1}"
+# Ventana a cargar (inclusive) y codec del export
+START_DATE="${3:-2023-06-01}"
+END_DATE="${4:-2023-12-31}"
+COMPRESSION="${COMPRESSION:-SNAPPY}"
 BUCKET="gs://${PROJECT_ID}-taxi-export"
+EXPORT_PREFIX="$BUCKET/taxi_trips_window"
 EXT_TABLE="${PROJECT_ID}:chicago_taxi_raw.taxi_trips_ext"
 TARGET_TABLE="${PROJECT_ID}:chicago_taxi_raw.taxi_trips_raw_table"
 
@@ -12,39 +17,75 @@ export PATH="/Users/joaquincano/google-cloud-sdk/bin:$PATH"
 echo "🪣 Creando bucket de export (si no existe): $BUCKET"
 gsutil mb -p "$PROJECT_ID" -l "$REGION" "$BUCKET" 2>/dev/null || echo "   (bucket ya existe)"
 
-echo "🔄 Exportando tabla pública a GCS (PARQUET)..."
-PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq extract \
+# Meses YYYY-MM entre START_DATE y END_DATE (sin depender de date de GNU/BSD)
+months() {
+  local year=$((10#${START_DATE:0:4})) month=$((10#${START_DATE:5:2}))
+  local end_year=$((10#${END_DATE:0:4})) end_month=$((10#${END_DATE:5:2}))
+  while [ $((year * 12 + month)) -le $((end_year * 12 + end_month)) ]; do
+    printf '%04d-%02d\n' "$year" "$month"
+    month=$((month + 1))
+    if [ "$month" -gt 12 ]; then month=1; year=$((year + 1)); fi
+  done
+}
+
+echo "🔄 Exportando ${START_DATE}..${END_DATE} a GCS (PARQUET $COMPRESSION, un directorio por mes)..."
+PIDS=()
+for MONTH in $(months); do
+  echo "   📦 $MONTH"
+  # Sólo columnas de raw y filas de la ventana que pasan los filtros de calidad
+  PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq query \
+    --use_legacy_sql=false \
+    --project_id="$PROJECT_ID" \
+    --location=US \
+    "EXPORT DATA OPTIONS (
+       uri = '${EXPORT_PREFIX}/month=${MONTH}/part-*.parquet',
+       format = 'PARQUET',
+       compression = '${COMPRESSION}',
+       overwrite = true
+     ) AS
+     SELECT unique_key, taxi_id, trip_start_timestamp, trip_end_timestamp, trip_seconds, trip_miles,
+            CAST(pickup_census_tract AS STRING) AS pickup_census_tract,
+            CAST(dropoff_census_tract AS STRING) AS dropoff_census_tract,
+            pickup_community_area, dropoff_community_area, fare, tips, tolls, extras, trip_total,
+            payment_type, company, pickup_latitude, pickup_longitude, dropoff_latitude, dropoff_longitude
+     FROM \`bigquery-public-data.chicago_taxi_trips.taxi_trips\`
+     WHERE DATE(trip_start_timestamp) BETWEEN GREATEST(DATE '${MONTH}-01', DATE '${START_DATE}')
+                                          AND LEAST(LAST_DAY(DATE '${MONTH}-01'), DATE '${END_DATE}')
+       AND trip_start_timestamp IS NOT NULL
+       AND trip_seconds IS NOT NULL
+       AND trip_seconds > 0
+       AND trip_miles >= 0" &
+  PIDS+=("$!")
+done
+# Esperar cada export por separado para que set -e corte si alguno falla
+for PID in "${PIDS[@]}"; do
+  wait "$PID"
+done
+
+echo "🔧 Creando tabla externa particionada por mes sobre GCS..."
+PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq query \
+  --use_legacy_sql=false \
   --project_id="$PROJECT_ID" \
-  --compression=GZIP \
-  --destination_format=PARQUET \
-  --location=US \
-  "bigquery-public-data:chicago_taxi_trips.taxi_trips" \
-  "$BUCKET/taxi_trips_*.parquet"
-
-echo "🔧 Creando tabla externa sobre GCS..."
-PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq mk \
   --location="$REGION" \
-  --external_table_definition="PARQUET=$BUCKET/taxi_trips_*.parquet" \
-  "$EXT_TABLE" || echo "   (tabla externa ya existe)"
+  "CREATE OR REPLACE EXTERNAL TABLE \`${PROJECT_ID}.chicago_taxi_raw.taxi_trips_ext\`
+   WITH PARTITION COLUMNS (month STRING)
+   OPTIONS (
+     format = 'PARQUET',
+     uris = ['${EXPORT_PREFIX}/*'],
+     hive_partition_uri_prefix = '${EXPORT_PREFIX}'
+   )"
 
-echo "🔄 Cargando datos 2023 desde la tabla externa..."
+echo "🔄 Cargando ${START_DATE}..${END_DATE} desde la tabla externa..."
 PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq query \
   --use_legacy_sql=false \
   --project_id="$PROJECT_ID" \
   --location="$REGION" \
   --priority=BATCH \
   "INSERT INTO \`${PROJECT_ID}.chicago_taxi_raw.taxi_trips_raw_table\`
-   SELECT unique_key, taxi_id, trip_start_timestamp, trip_end_timestamp, trip_seconds, trip_miles,
-          CAST(pickup_census_tract AS STRING), CAST(dropoff_census_tract AS STRING),
-          pickup_community_area, dropoff_community_area, fare, tips, tolls, extras, trip_total,
-          payment_type, company, pickup_latitude, pickup_longitude, dropoff_latitude, dropoff_longitude
+   SELECT * EXCEPT (month)
    FROM \`${PROJECT_ID}.chicago_taxi_raw.taxi_trips_ext\`
-   WHERE DATE(trip_start_timestamp) >= '2023-06-01'
-     AND DATE(trip_start_timestamp) <= '2023-12-31'
-     AND trip_start_timestamp IS NOT NULL
-     AND trip_seconds IS NOT NULL
-     AND trip_seconds > 0
-     AND trip_miles >= 0"
+   WHERE month BETWEEN '${START_DATE:0:7}' AND '${END_DATE:0:7}'
+     AND DATE(trip_start_timestamp) BETWEEN '${START_DATE}' AND '${END_DATE}'"
 
 echo "✅ Verificando carga..."
 PYTHONPATH="" /Users/joaquincano/google-cloud-sdk/bin/bq query \
@@ -0,0 +1,95 @@
+"""
+Endpoint local con el contrato de la Cloud Function de clima, para probar el
+trigger deferrable del DAG (airflow/dags/weather_trigger.py) sin GCP.
+
+Atiende los requests con main.main de la función real, pero con un cliente de
+BigQuery falso (el de benchmark_backfill_roundtrips.py, con latencia simulada por
+round trip) y el registro de estado en memoria (InMemoryRunStatusStore):
+- POST {"dates": [...], "async": true} -> 202 con run_id, la ingesta sigue en un thread
+- POST {"run_id": "..."} o GET ?run_id=... -> estado de la corrida
+- --fail-date YYYY-MM-DD hace fallar las corridas que incluyan esa fecha
+
+Uso:
+    python scripts/fake_weather_status_server.py [--port 8089] [--latency-ms 200]
+    WEATHER_FUNCTION_URL=http://localhost:8089  (variable de Airflow o del trigger)
+"""
+
+import argparse
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("PROJECT_ID", "fake-project")
+os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+os.environ.setdefault("TABLE_ID", "weather_data")
+# Sin cache de GSOD: --fail-date necesita que cada chunk consulte NOAA
+os.environ.setdefault("GSOD_CACHE_URI", "")
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import main as weather  # noqa: E402
+from benchmark_backfill_roundtrips import FakeBigQueryClient, query_parameter_values  # noqa: E402
+from run_status import InMemoryRunStatusStore  # noqa: E402
+
+
+class FailingNoaaClient(FakeBigQueryClient):
+    """Cliente falso que falla las queries NOAA que incluyen fail_date."""
+
+    def __init__(self, latency_s, fail_date=None):
+        super().__init__(latency_s)
+        self.fail_date = fail_date
+
+    def query(self, query, job_config=None, location=None):
+        if self.fail_date and "noaa_gsod" in query and not getattr(job_config, "dry_run", False):
+            params = query_parameter_values(job_config)
+            days = [str(day) for day in params.get("dates") or params.get("date") or []]
+            if self.fail_date in days:
+                raise RuntimeError(f"Falla simulada para {self.fail_date}")
+        return super().query(query, job_config, location)
+
+
+class FunctionHandler(BaseHTTPRequestHandler):
+    def _respond(self, request_json):
+        result = weather.main(request_json)
+        body = json.dumps(result).encode()
+        # Igual que la Cloud Function: el statusCode viaja dentro de un HTTP 200
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._respond(json.loads(self.rfile.read(length) or b"{}"))
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self._respond({key: values[0] for key, values in query.items()})
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Latencia simulada por round trip a BigQuery")
+    parser.add_argument("--fail-date", default=None, help="Fecha cuya query NOAA falla (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    weather.set_client("bigquery", FailingNoaaClient(args.latency_ms / 1000, args.fail_date))
+    weather.set_client("run_status", InMemoryRunStatusStore())
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FunctionHandler)
+    print(f"🌦️  Función falsa de clima en http://127.0.0.1:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
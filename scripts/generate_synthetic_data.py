@@ -0,0 +1,426 @@
+"""
+Generador de datos sintéticos de taxis de Chicago y clima en Parquet.
+
+Escribe las tablas con el mismo esquema que las tablas raw de BigQuery:
+- taxi_trips_raw_table/part-XXXXX.parquet (esquema de create_raw_taxi_table en el DAG)
+- weather_data/part-00000.parquet (esquema de weather_data de la función)
+- weather_station_data/part-00000.parquet y weather_station_lookup/part-00000.parquet
+  (modo de estaciones de la función; la dimensión se arma con stations.py)
+
+Los datos imitan los patrones del dataset real:
+- viajes con distribución horaria diurna, timestamps redondeados a 15 minutos,
+  duración y distancia log-normales y montos derivados de la tarifa
+- unique_key duplicados (re-cargas del export) en la misma partición del original
+- nulos en census tracts, community areas, coordenadas, company y trip_seconds
+- un día de clima por fecha con temperatura estacional, lluvia intermitente y
+  re-ingestas duplicadas con ingestion_timestamp posterior
+- clima por estación: el de la ciudad con un desvío propio de cada estación
+
+Uso:
+    python scripts/generate_synthetic_data.py --trips 10M --out synthetic_data/10M
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+
+import stations  # noqa: E402
+
+TAXI_SCHEMA = pa.schema([
+    ("unique_key", pa.string()),
+    ("taxi_id", pa.string()),
+    ("trip_start_timestamp", pa.timestamp("us", tz="UTC")),
+    ("trip_end_timestamp", pa.timestamp("us", tz="UTC")),
+    ("trip_seconds", pa.int64()),
+    ("trip_miles", pa.float64()),
+    ("pickup_census_tract", pa.string()),
+    ("dropoff_census_tract", pa.string()),
+    ("pickup_community_area", pa.int64()),
+    ("dropoff_community_area", pa.int64()),
+    ("fare", pa.float64()),
+    ("tips", pa.float64()),
+    ("tolls", pa.float64()),
+    ("extras", pa.float64()),
+    ("trip_total", pa.float64()),
+    ("payment_type", pa.string()),
+    ("company", pa.string()),
+    ("pickup_latitude", pa.float64()),
+    ("pickup_longitude", pa.float64()),
+    ("dropoff_latitude", pa.float64()),
+    ("dropoff_longitude", pa.float64()),
+])
+
+WEATHER_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("temperature", pa.float64()),
+    ("humidity", pa.float64()),
+    ("wind_speed", pa.float64()),
+    ("precipitation", pa.float64()),
+    ("weather_condition", pa.string()),
+    ("ingestion_timestamp", pa.timestamp("us", tz="UTC")),
+])
+
+STATION_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("station_id", pa.string()),
+    ("station_name", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("temperature", pa.float64()),
+    ("humidity", pa.int64()),
+    ("wind_speed", pa.float64()),
+    ("precipitation", pa.float64()),
+    ("weather_condition", pa.string()),
+    ("ingestion_timestamp", pa.timestamp("us", tz="UTC")),
+])
+
+STATION_LOOKUP_SCHEMA = pa.schema([
+    ("lookup_type", pa.string()),
+    ("community_area", pa.int64()),
+    ("lat_cell", pa.int64()),
+    ("lon_cell", pa.int64()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("station_id", pa.string()),
+    ("station_name", pa.string()),
+    ("distance_km", pa.float64()),
+    ("built_at", pa.timestamp("us", tz="UTC")),
+])
+
+# Estaciones del área: O'Hare y Midway reales, el resto inventadas para cubrir el
+# lago, el norte y el sur de la ciudad
+SYNTHETIC_STATIONS = [
+    {"station_id": "725300-94846", "station_name": "CHICAGO O'HARE INTERNATIONAL", "latitude": 41.995, "longitude": -87.934},
+    {"station_id": "725340-14819", "station_name": "CHICAGO MIDWAY INTL ARPT", "latitude": 41.786, "longitude": -87.752},
+    {"station_id": "999999-90001", "station_name": "LAKEFRONT (SINTETICA)", "latitude": 41.870, "longitude": -87.610},
+    {"station_id": "999999-90002", "station_name": "NORTE (SINTETICA)", "latitude": 42.050, "longitude": -87.700},
+    {"station_id": "999999-90003", "station_name": "SUR (SINTETICA)", "latitude": 41.660, "longitude": -87.600},
+]
+
+# Rango de las coordenadas de pickup/dropoff sintéticas
+LAT_RANGE = (41.65, 41.65 + 0.37)
+LON_RANGE = (-87.85, -87.85 + 0.32)
+
+# Proporción de viajes por hora del día (0-23), aproximada a 2023
+HOURLY_WEIGHTS = np.array([
+    2.2, 1.6, 1.2, 0.9, 0.8, 1.0, 1.8, 3.2, 4.6, 5.0, 5.2, 5.6,
+    6.0, 6.2, 6.4, 6.8, 7.0, 6.9, 6.4, 5.4, 4.4, 3.8, 3.4, 2.9,
+])
+HOURLY_WEIGHTS = HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum()
+
+PAYMENT_TYPES = np.array(["Credit Card", "Cash", "Mobile", "Prcard", "Unknown", "No Charge"], dtype=object)
+PAYMENT_WEIGHTS = np.array([0.46, 0.27, 0.14, 0.09, 0.03, 0.01])
+
+COMPANIES = np.array([
+    "Flash Cab", "Taxi Affiliation Services", "Sun Taxi", "City Service",
+    "Chicago Independents", "Medallion Leasin", "Globe Taxi", "Blue Ribbon Taxi Association",
+    "Taxicab Insurance Agency Llc", "5 Star Taxi",
+], dtype=object)
+
+# Temperatura media mensual de Chicago (°C)
+MONTHLY_MEAN_TEMP_C = [-4.5, -2.5, 3.5, 9.5, 15.5, 21.5, 24.0, 23.0, 19.0, 12.0, 5.0, -1.5]
+
+SCALES = {"1M": 1_000_000, "10M": 10_000_000, "100M": 100_000_000}
+
+
+def parse_count(value):
+    """Acepta 1M / 10M / 100M o un número entero."""
+    return SCALES.get(value.upper(), None) or int(value)
+
+
+def _nullable(values, null_mask):
+    """Array de pyarrow con nulos donde null_mask es True."""
+    return pa.array(values, mask=null_mask)
+
+
+def generate_taxi_chunk(rng, first_id, size, start, days, duplicate_rate, n_taxis):
+    """
+    Genera un bloque de viajes con el esquema de taxi_trips_raw_table.
+
+    Args:
+        rng: Generador de NumPy
+        first_id: Primer id secuencial del bloque (para unique_key)
+        size: Cantidad de filas del bloque (incluye duplicados)
+        start: Primera fecha del rango
+        days: Cantidad de días del rango
+        duplicate_rate: Fracción de filas que repiten el unique_key de otra fila del bloque
+        n_taxis: Tamaño de la flota
+
+    Returns:
+        pyarrow.Table con las columnas de TAXI_SCHEMA
+    """
+    ids = np.arange(first_id, first_id + size)
+
+    day_offset = rng.integers(0, days, size)
+    hour = rng.choice(24, size, p=HOURLY_WEIGHTS)
+    quarter = rng.integers(0, 4, size)
+    start_epoch = int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp())
+    start_s = start_epoch + day_offset * 86400 + hour * 3600 + quarter * 900
+
+    trip_seconds = np.clip(rng.lognormal(np.log(780), 0.75, size), 1, 86_000).astype(np.int64)
+    speed_mph = np.clip(rng.lognormal(np.log(13), 0.45, size), 1, 60)
+    trip_miles = np.round(trip_seconds / 3600.0 * speed_mph, 2)
+    # Viajes con 0 millas (taxímetro sin GPS)
+    trip_miles[rng.random(size) < 0.04] = 0.0
+    end_s = start_s + (np.ceil(trip_seconds / 900) * 900).astype(np.int64)
+
+    fare = np.round(3.25 + 2.25 * trip_miles + 0.25 * (trip_seconds // 36), 2)
+    payment_idx = rng.choice(len(PAYMENT_TYPES), size, p=PAYMENT_WEIGHTS)
+    # Propinas sólo con pago electrónico (las de efectivo no se registran)
+    electronic = np.isin(payment_idx, (0, 2, 3))
+    tips = np.where(electronic & (rng.random(size) < 0.8), np.round(fare * rng.uniform(0.1, 0.25, size), 2), 0.0)
+    tolls = np.where(rng.random(size) < 0.002, 4.0, 0.0)
+    extras = np.where(rng.random(size) < 0.3, rng.choice([1.0, 4.0, 5.0, 9.0], size), 0.0)
+    trip_total = np.round(fare + tips + tolls + extras, 2)
+
+    pickup_area = rng.integers(1, 78, size)
+    dropoff_area = rng.integers(1, 78, size)
+    pickup_lat = np.round(rng.uniform(*LAT_RANGE, size), 9)
+    pickup_lon = np.round(rng.uniform(*LON_RANGE, size), 9)
+    dropoff_lat = np.round(rng.uniform(*LAT_RANGE, size), 9)
+    dropoff_lon = np.round(rng.uniform(*LON_RANGE, size), 9)
+
+    # Patrones de nulos del dataset público
+    pickup_area_null = rng.random(size) < 0.08
+    dropoff_area_null = rng.random(size) < 0.10
+    pickup_tract_null = pickup_area_null | (rng.random(size) < 0.30)
+    dropoff_tract_null = dropoff_area_null | (rng.random(size) < 0.32)
+    trip_seconds_null = rng.random(size) < 0.0005
+    end_null = rng.random(size) < 0.0002
+    company_null = rng.random(size) < 0.05
+
+    # Duplicados: copian la fila completa de otra fila del bloque (mismo unique_key,
+    # mismo trip_start_timestamp y por lo tanto misma partición)
+    n_duplicates = int(size * duplicate_rate)
+    if n_duplicates:
+        targets = rng.choice(size, n_duplicates, replace=False)
+        sources = rng.integers(0, size, n_duplicates)
+        for column in (ids, start_s, end_s, trip_seconds, trip_miles, fare, tips, tolls, extras, trip_total,
+                       pickup_area, dropoff_area, pickup_lat, pickup_lon, dropoff_lat, dropoff_lon,
+                       payment_idx, pickup_area_null, dropoff_area_null, pickup_tract_null,
+                       dropoff_tract_null, trip_seconds_null, end_null, company_null):
+            column[targets] = column[sources]
+
+    taxi_pool = np.array([f"{n:040x}{'0' * 88}" for n in range(n_taxis)], dtype=object)
+    taxi_idx = rng.integers(0, n_taxis, size)
+    company_idx = rng.integers(0, len(COMPANIES), size)
+    if n_duplicates:
+        taxi_idx[targets] = taxi_idx[sources]
+        company_idx[targets] = company_idx[sources]
+
+    tract = lambda area: 17031000000 + area * 100 + 1  # noqa: E731
+    return pa.table({
+        "unique_key": pa.array([f"{i:040x}" for i in ids.tolist()], pa.string()),
+        "taxi_id": pa.array(taxi_pool[taxi_idx], pa.string()),
+        "trip_start_timestamp": pa.array(start_s * 1_000_000, pa.timestamp("us", tz="UTC")),
+        "trip_end_timestamp": pa.array(end_s * 1_000_000, pa.timestamp("us", tz="UTC"), mask=end_null),
+        "trip_seconds": _nullable(trip_seconds, trip_seconds_null),
+        "trip_miles": pa.array(trip_miles),
+        "pickup_census_tract": pa.array(tract(pickup_area).astype(str), pa.string(), mask=pickup_tract_null),
+        "dropoff_census_tract": pa.array(tract(dropoff_area).astype(str), pa.string(), mask=dropoff_tract_null),
+        "pickup_community_area": _nullable(pickup_area, pickup_area_null),
+        "dropoff_community_area": _nullable(dropoff_area, dropoff_area_null),
+        "fare": pa.array(fare),
+        "tips": pa.array(tips),
+        "tolls": pa.array(tolls),
+        "extras": pa.array(extras),
+        "trip_total": pa.array(trip_total),
+        "payment_type": pa.array(PAYMENT_TYPES[payment_idx], pa.string()),
+        "company": pa.array(COMPANIES[company_idx], pa.string(), mask=company_null),
+        "pickup_latitude": _nullable(pickup_lat, pickup_area_null),
+        "pickup_longitude": _nullable(pickup_lon, pickup_area_null),
+        "dropoff_latitude": _nullable(dropoff_lat, dropoff_area_null),
+        "dropoff_longitude": _nullable(dropoff_lon, dropoff_area_null),
+    }, schema=TAXI_SCHEMA)
+
+
+def generate_weather(rng, start, days, duplicate_rate):
+    """
+    Genera un día de clima por fecha con el esquema de weather_data.
+
+    La condición sigue la misma regla que la conversión NOAA de la función
+    (Rain > 5 mm, Drizzle > 0, Cold < 0 °C, si no Clear), con una fracción de días
+    con condiciones de la API (Clouds, Fog, Snow, Thunderstorm). humidity es nula
+    en los días NOAA, como en producción.
+
+    Returns:
+        pyarrow.Table con las columnas de WEATHER_SCHEMA
+    """
+    dates = [start + timedelta(days=i) for i in range(days)]
+    mean_temp = np.array([MONTHLY_MEAN_TEMP_C[d.month - 1] for d in dates])
+    temperature = np.round(mean_temp + rng.normal(0, 4.0, days), 1)
+    rainy = rng.random(days) < 0.33
+    precipitation = np.round(np.where(rainy, rng.exponential(6.0, days), 0.0), 1)
+    wind_speed = np.round(rng.gamma(4.0, 1.1, days), 1)
+
+    condition = np.where(precipitation > 5, "Rain", np.where(precipitation > 0, "Drizzle",
+                         np.where(temperature < 0, "Cold", "Clear"))).astype(object)
+    from_api = rng.random(days) < 0.2
+    api_condition = np.where(temperature < 0, "Snow", rng.choice(["Clouds", "Fog", "Thunderstorm", "Clear"], days))
+    condition[from_api] = api_condition[from_api]
+    humidity = np.round(rng.uniform(40, 95, days), 1)
+
+    ingested_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = {
+        "date": dates,
+        "temperature": temperature.tolist(),
+        "humidity": pa.array(humidity, mask=~from_api),
+        "wind_speed": wind_speed.tolist(),
+        "precipitation": precipitation.tolist(),
+        "weather_condition": condition.tolist(),
+        "ingestion_timestamp": [ingested_at] * days,
+    }
+    table = pa.table(rows, schema=WEATHER_SCHEMA)
+
+    # Re-ingestas: misma fecha, ingestion_timestamp posterior y valores corregidos
+    n_duplicates = int(days * duplicate_rate)
+    if n_duplicates:
+        idx = rng.choice(days, n_duplicates, replace=False)
+        duplicates = table.take(pa.array(idx)).to_pydict()
+        duplicates["temperature"] = [round(t + 0.3, 1) for t in duplicates["temperature"]]
+        duplicates["ingestion_timestamp"] = [ingested_at + timedelta(days=1)] * n_duplicates
+        table = pa.concat_tables([table, pa.table(duplicates, schema=WEATHER_SCHEMA)])
+    return table
+
+
+def generate_station_weather(rng, weather):
+    """
+    Clima diario por estación con el esquema de weather_station_data.
+
+    Cada estación toma el clima de la ciudad (la última ingesta de cada fecha) con un
+    desvío propio de temperatura y lluvia, y la condición recalculada con la regla de
+    la conversión NOAA.
+
+    Returns:
+        pyarrow.Table con las columnas de STATION_SCHEMA
+    """
+    city = weather.to_pandas().sort_values("ingestion_timestamp").drop_duplicates("date", keep="last")
+    days = len(city)
+    tables = []
+    for station in SYNTHETIC_STATIONS:
+        temperature = np.round(city["temperature"].to_numpy() + rng.normal(0, 1.5, days), 1)
+        precipitation = np.round(np.clip(city["precipitation"].to_numpy() * rng.uniform(0.5, 1.5, days), 0, None), 1)
+        condition = np.where(precipitation > 5, "Rain", np.where(precipitation > 0, "Drizzle",
+                             np.where(temperature < 0, "Cold", "Clear")))
+        tables.append(pa.table({
+            "date": city["date"].tolist(),
+            "station_id": [station["station_id"]] * days,
+            "station_name": [station["station_name"]] * days,
+            "latitude": [station["latitude"]] * days,
+            "longitude": [station["longitude"]] * days,
+            "temperature": temperature,
+            "humidity": pa.nulls(days, pa.int64()),
+            "wind_speed": city["wind_speed"].tolist(),
+            "precipitation": precipitation,
+            "weather_condition": condition.tolist(),
+            "ingestion_timestamp": city["ingestion_timestamp"].tolist(),
+        }, schema=STATION_SCHEMA))
+    return pa.concat_tables(tables)
+
+
+def generate_station_lookup(rng, cells_per_degree=100):
+    """
+    Dimensión weather_station_lookup para los viajes sintéticos.
+
+    Las community areas toman un centroide al azar dentro del rango de coordenadas
+    (en los datos sintéticos el área y la lat/long de un viaje son independientes);
+    las celdas cubren todo ese rango.
+
+    Returns:
+        pyarrow.Table con las columnas de STATION_LOOKUP_SCHEMA
+    """
+    areas = [
+        {"community_area": area, "latitude": rng.uniform(*LAT_RANGE), "longitude": rng.uniform(*LON_RANGE)}
+        for area in range(1, 78)
+    ]
+    lat_cells = range(int(np.floor(LAT_RANGE[0] * cells_per_degree)), int(np.floor(LAT_RANGE[1] * cells_per_degree)) + 1)
+    lon_cells = range(int(np.floor(LON_RANGE[0] * cells_per_degree)), int(np.floor(LON_RANGE[1] * cells_per_degree)) + 1)
+    cells = [(lat_cell, lon_cell) for lat_cell in lat_cells for lon_cell in lon_cells]
+    rows = stations.build_lookup_rows(SYNTHETIC_STATIONS, areas, cells, cells_per_degree)
+    built_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for row in rows:
+        row["built_at"] = built_at
+    return pa.Table.from_pylist(rows, schema=STATION_LOOKUP_SCHEMA)
+
+
+def generate(out_dir, trips, start, end, duplicate_rate=0.002, weather_duplicate_rate=0.05,
+             chunk_size=2_000_000, n_taxis=6500, seed=42, compression="snappy"):
+    """
+    Escribe ambas tablas en out_dir y devuelve un resumen con filas y tiempos.
+
+    Los viajes se generan por bloques de chunk_size filas (un archivo por bloque)
+    para que la memoria no crezca con la escala.
+    """
+    rng = np.random.default_rng(seed)
+    days = (end - start).days + 1
+    taxi_dir = os.path.join(out_dir, "taxi_trips_raw_table")
+    weather_dir = os.path.join(out_dir, "weather_data")
+    station_dir = os.path.join(out_dir, "weather_station_data")
+    lookup_dir = os.path.join(out_dir, "weather_station_lookup")
+    for directory in (taxi_dir, weather_dir, station_dir, lookup_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    started = time.perf_counter()
+    written = 0
+    part = 0
+    while written < trips:
+        size = min(chunk_size, trips - written)
+        chunk = generate_taxi_chunk(rng, written, size, start, days, duplicate_rate, n_taxis)
+        pq.write_table(chunk, os.path.join(taxi_dir, f"part-{part:05d}.parquet"), compression=compression)
+        written += size
+        part += 1
+        print(f"   viajes: {written:,}/{trips:,}", flush=True)
+
+    weather = generate_weather(rng, start, days, weather_duplicate_rate)
+    pq.write_table(weather, os.path.join(weather_dir, "part-00000.parquet"), compression=compression)
+    station_weather = generate_station_weather(rng, weather)
+    pq.write_table(station_weather, os.path.join(station_dir, "part-00000.parquet"), compression=compression)
+    lookup = generate_station_lookup(rng)
+    pq.write_table(lookup, os.path.join(lookup_dir, "part-00000.parquet"), compression=compression)
+
+    return {
+        "trips": written,
+        "weather_rows": weather.num_rows,
+        "station_weather_rows": station_weather.num_rows,
+        "lookup_rows": lookup.num_rows,
+        "files": part + 3,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", default="1M", help="1M, 10M, 100M o un número de filas")
+    parser.add_argument("--out", required=True, help="Directorio de salida")
+    parser.add_argument("--start-date", default="2023-06-01")
+    parser.add_argument("--end-date", default="2023-12-31")
+    parser.add_argument("--duplicate-rate", type=float, default=0.002,
+                        help="Fracción de viajes con unique_key repetido")
+    parser.add_argument("--weather-duplicate-rate", type=float, default=0.05,
+                        help="Fracción de días de clima re-ingestados")
+    parser.add_argument("--chunk-size", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compression", default="snappy")
+    args = parser.parse_args()
+
+    trips = parse_count(args.trips)
+    start = date.fromisoformat(args.start_date)
+    end = date.fromisoformat(args.end_date)
+    print(f"🔄 Generando {trips:,} viajes ({start} a {end}) en {args.out}")
+    summary = generate(args.out, trips, start, end, args.duplicate_rate, args.weather_duplicate_rate,
+                       args.chunk_size, seed=args.seed, compression=args.compression)
+    print(f"✅ {summary['trips']:,} viajes, {summary['weather_rows']} filas de clima y "
+          f"{summary['station_weather_rows']} de clima por estación "
+          f"en {summary['seconds']:.1f} s ({summary['files']} archivos)")
+
+
+if __name__ == "__main__":
+    main()
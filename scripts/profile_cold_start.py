@@ -0,0 +1,149 @@
+"""
+Harness de cold start para la Cloud Function de clima.
+
+Ejecuta cada modo en un intérprete nuevo con `python -X importtime` y registra:
+- import_ms: tiempo acumulado de imports (sin el arranque del intérprete)
+- modules: cantidad de módulos cargados
+- peak_rss_mb: pico de memoria residente del proceso
+- total_ms: tiempo del modo dentro del proceso (imports + ejecución)
+
+Modos:
+- import: sólo importar main.py
+- bad_request: request con fecha inválida (no debe importar BigQuery)
+- duplicate_date: fecha que ya existe, con cliente inyectado (salida temprana; importa
+  google-cloud-bigquery porque el QueryExecutor arma el QueryJobConfig del dry-run)
+- bigquery_import: salida temprana + import real de google-cloud-bigquery
+- eager_imports: referencia con BigQuery y requests importados al cargar (comportamiento previo)
+
+Con --budget-import-ms / --budget-rss-mb falla (exit 1) si algún modo liviano
+(import, bad_request) supera el presupuesto.
+
+Uso:
+    python scripts/profile_cold_start.py [--budget-import-ms 80] [--budget-rss-mb 40] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "functions", "weather_ingestion"))
+LIGHT_MODES = ("import", "bad_request")
+
+CHILD_PRELUDE = """
+import json, os, resource, sys, time
+from types import SimpleNamespace
+started = time.perf_counter()
+os.environ.setdefault("PROJECT_ID", "profile-project")
+os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+os.environ.setdefault("TABLE_ID", "weather_data")
+# La salida temprana por fecha duplicada sólo existe sin upsert
+os.environ.setdefault("UPSERT_WRITES", "false")
+sys.path.insert(0, {function_dir!r})
+
+class ExistingDateClient:
+    # Responde la query de INFORMATION_SCHEMA.PARTITIONS con la partición del día cargada
+    # (y los dry-runs del QueryExecutor con una estimación fija)
+    def query(self, query, job_config=None, location=None):
+        return SimpleNamespace(
+            total_bytes_processed=10 * 1024 ** 2,
+            result=lambda: iter([SimpleNamespace(partition_id="20230601", total_rows=1)]),
+        )
+"""
+
+CHILD_MODES = {
+    "import": "import main",
+    "bad_request": "import main\nassert main.main({'date': 'no-es-fecha'})['statusCode'] == 400",
+    "duplicate_date": (
+        "import main\nmain.set_client('bigquery', ExistingDateClient())\n"
+        "assert main.main({'date': '2023-06-01'})['statusCode'] == 200"
+    ),
+    "bigquery_import": (
+        "import main\nmain.set_client('bigquery', ExistingDateClient())\n"
+        "main.bigquery.QueryJobConfig\n"
+        "assert main.main({'date': '2023-06-01'})['statusCode'] == 200"
+    ),
+    "eager_imports": (
+        "import google.cloud.bigquery, requests\nimport main\n"
+        "main.set_client('bigquery', ExistingDateClient())\n"
+        "assert main.main({'date': '2023-06-01'})['statusCode'] == 200"
+    ),
+}
+
+CHILD_EPILOGUE = """
+print(json.dumps({
+    "total_ms": (time.perf_counter() - started) * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}))
+"""
+
+# Módulos cargados por el arranque del intérprete, no por la función
+STARTUP_MODULES = {"site", "encodings", "_frozen_importlib_external", "zipimport", "codecs", "io", "abc"}
+
+
+def parse_import_time(stderr):
+    """Suma el tiempo acumulado (us) de los imports de primer nivel fuera del arranque."""
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Primer nivel: el nombre tiene un único espacio de indentación
+        if name.startswith("  ") or name.strip() in STARTUP_MODULES:
+            continue
+        total_us += int(cumulative)
+    return total_us / 1000
+
+
+def run_mode(mode):
+    code = CHILD_PRELUDE.format(function_dir=FUNCTION_DIR) + CHILD_MODES[mode] + CHILD_EPILOGUE
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"El modo {mode} falló:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["import_ms"] = parse_import_time(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(CHILD_MODES))
+    parser.add_argument("--budget-import-ms", type=float, default=None)
+    parser.add_argument("--budget-rss-mb", type=float, default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'modo':<16} {'import (ms)':>12} {'total (ms)':>11} {'RSS pico (MB)':>14} {'módulos':>8}")
+    for mode in args.modes.split(","):
+        result = results[mode] = run_mode(mode)
+        print(f"{mode:<16} {result['import_ms']:>12.1f} {result['total_ms']:>11.1f} "
+              f"{result['peak_rss_mb']:>14.1f} {result['modules']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    over_budget = []
+    for mode in LIGHT_MODES:
+        if mode not in results:
+            continue
+        if args.budget_import_ms is not None and results[mode]["import_ms"] > args.budget_import_ms:
+            over_budget.append(f"{mode}: import {results[mode]['import_ms']:.1f} ms > {args.budget_import_ms} ms")
+        if args.budget_rss_mb is not None and results[mode]["peak_rss_mb"] > args.budget_rss_mb:
+            over_budget.append(f"{mode}: RSS {results[mode]['peak_rss_mb']:.1f} MB > {args.budget_rss_mb} MB")
+    if over_budget:
+        print("\n❌ Presupuesto de cold start excedido:")
+        for line in over_budget:
+            print(f"   {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
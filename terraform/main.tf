@@ -129,6 +129,226 @@ resource "google_bigquery_table" "weather_raw" {
   clustering = ["date"]
 }
 
+# Estado de las corridas asíncronas de la función de clima ({"async": true})
+# Append-only con streaming inserts: una fila por evento (estado o heartbeat), sin UPDATE
+resource "google_bigquery_table" "weather_ingestion_runs" {
+  dataset_id = google_bigquery_dataset.raw_dataset.dataset_id
+  table_id   = "weather_ingestion_runs"
+
+  schema = jsonencode([
+    {
+      name = "run_id"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "status"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "request"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "summary"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "error"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "created_at"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    },
+    {
+      name = "updated_at"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    }
+  ])
+
+  time_partitioning {
+    type          = "DAY"
+    field         = "created_at"
+    expiration_ms = 2592000000 # 30 días
+  }
+
+  clustering = ["run_id"]
+}
+
+# Watermark del delta diario de taxis (airflow/dags/taxi_sources.py): el último
+# trip_start_timestamp mergeado en raw, una fila por tabla raw y origen
+resource "google_bigquery_table" "taxi_delta_watermarks" {
+  dataset_id = google_bigquery_dataset.raw_dataset.dataset_id
+  table_id   = "taxi_delta_watermarks"
+
+  schema = jsonencode([
+    {
+      name = "raw_table"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "source"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "watermark"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    },
+    {
+      name = "run_id"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "updated_at"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    }
+  ])
+}
+
+# Clima diario de todas las estaciones GSOD del área de Chicago ({"stations": true} en la función)
+# Una fila por (date, station_id), escrita con MERGE
+resource "google_bigquery_table" "weather_station_raw" {
+  dataset_id = google_bigquery_dataset.raw_dataset.dataset_id
+  table_id   = "weather_station_data"
+
+  schema = jsonencode([
+    {
+      name = "date"
+      type = "DATE"
+      mode = "REQUIRED"
+    },
+    {
+      name = "station_id"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "station_name"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "latitude"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "longitude"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "temperature"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "humidity"
+      type = "INTEGER"
+      mode = "NULLABLE"
+    },
+    {
+      name = "wind_speed"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "precipitation"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "weather_condition"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "ingestion_timestamp"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    }
+  ])
+
+  time_partitioning {
+    type  = "DAY"
+    field = "date"
+  }
+
+  clustering = ["station_id"]
+}
+
+# Dimensión estación más cercana por community area y por celda de la grilla de pickups
+# ({"stations": true, "rebuild_lookup": true}); se reemplaza completa en cada reconstrucción
+resource "google_bigquery_table" "weather_station_lookup" {
+  dataset_id = google_bigquery_dataset.raw_dataset.dataset_id
+  table_id   = "weather_station_lookup"
+
+  schema = jsonencode([
+    {
+      name = "lookup_type"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "community_area"
+      type = "INTEGER"
+      mode = "NULLABLE"
+    },
+    {
+      name = "lat_cell"
+      type = "INTEGER"
+      mode = "NULLABLE"
+    },
+    {
+      name = "lon_cell"
+      type = "INTEGER"
+      mode = "NULLABLE"
+    },
+    {
+      name = "latitude"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "longitude"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "station_id"
+      type = "STRING"
+      mode = "REQUIRED"
+    },
+    {
+      name = "station_name"
+      type = "STRING"
+      mode = "NULLABLE"
+    },
+    {
+      name = "distance_km"
+      type = "FLOAT"
+      mode = "NULLABLE"
+    },
+    {
+      name = "built_at"
+      type = "TIMESTAMP"
+      mode = "REQUIRED"
+    }
+  ])
+}
+
 # Tabla para datos de taxis (raw) - vista sobre el dataset público
 # Esta vista se crea automáticamente. Si falla por permisos, el sistema seguirá funcionando
 # consultando directamente el dataset público en los modelos dbt.
@@ -218,6 +438,24 @@ resource "google_storage_bucket" "function_source" {
   }
 }
 
+# Cache de filas de NOAA GSOD por estación y año (ver functions/weather_ingestion/gsod_cache.py)
+resource "google_storage_bucket" "gsod_cache" {
+  name     = "${var.project_id}-gsod-cache"
+  location = var.region
+
+  uniform_bucket_level_access = true
+
+  lifecycle {
+    ignore_changes = [name]
+  }
+}
+
+resource "google_storage_bucket_iam_member" "weather_ingestion_gsod_cache" {
+  bucket = google_storage_bucket.gsod_cache.name
+  role   = "roles/storage.objectAdmin"
+  member = "serviceAccount:${google_service_account.weather_ingestion_sa.email}"
+}
+
 # Subir el código de la función a Cloud Storage
 resource "google_storage_bucket_object" "function_source" {
   name   = "weather-ingestion-source.zip"
@@ -250,20 +488,47 @@ resource "google_cloudfunctions2_function" "weather_ingestion" {
     create_before_destroy = true
   }
 
+  # Las corridas asíncronas siguen en un thread después de responder 202: el CPU
+  # throttling del servicio de Cloud Run subyacente se desactiva en
+  # null_resource.weather_ingestion_cpu_always_allocated (no se expone acá)
   service_config {
-    max_instance_count    = 1
-    available_memory      = "256M"
+    max_instance_count    = var.weather_function_max_instances
+    available_memory      = "512M"
     timeout_seconds       = 540
     service_account_email = google_service_account.weather_ingestion_sa.email
     environment_variables = {
-      PROJECT_ID          = var.project_id
-      DATASET_ID          = google_bigquery_dataset.raw_dataset.dataset_id
-      TABLE_ID            = google_bigquery_table.weather_raw.table_id
-      OPENWEATHER_API_KEY = var.openweather_api_key
+      PROJECT_ID              = var.project_id
+      DATASET_ID              = google_bigquery_dataset.raw_dataset.dataset_id
+      TABLE_ID                = google_bigquery_table.weather_raw.table_id
+      RUNS_TABLE_ID           = google_bigquery_table.weather_ingestion_runs.table_id
+      STATION_TABLE_ID        = google_bigquery_table.weather_station_raw.table_id
+      STATION_LOOKUP_TABLE_ID = google_bigquery_table.weather_station_lookup.table_id
+      OPENWEATHER_API_KEY     = var.openweather_api_key
+      TELEMETRY_ENABLED       = tostring(var.weather_function_telemetry)
+      GSOD_CACHE_URI          = "gs://${google_storage_bucket.gsod_cache.name}"
+      UPSERT_WRITES           = tostring(var.weather_upsert_writes)
     }
   }
 }
 
+# CPU siempre asignada en el servicio de Cloud Run de la función: el provider de la
+# Cloud Function 2nd gen no expone el setting y cada deploy de la función crea una
+# revisión nueva que vuelve al default, así que se reaplica en cada cambio
+resource "null_resource" "weather_ingestion_cpu_always_allocated" {
+  triggers = {
+    function_update = google_cloudfunctions2_function.weather_ingestion.update_time
+  }
+
+  provisioner "local-exec" {
+    command = <<-EOT
+      gcloud run services update ${google_cloudfunctions2_function.weather_ingestion.service_config[0].service} \
+        --project ${var.project_id} \
+        --region ${var.region} \
+        --no-cpu-throttling --quiet
+    EOT
+  }
+}
+
 # Cloud Scheduler para ejecutar la función diariamente
 resource "google_cloud_scheduler_job" "weather_ingestion_daily" {
   name        = "weather-ingestion-daily"
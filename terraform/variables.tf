@@ -32,3 +32,21 @@ variable "chicago_longitude" {
   type        = number
   default     = -87.6298
 }
+
+variable "weather_function_max_instances" {
+  description = "Máximo de instancias de la Cloud Function de clima (el backfill del DAG invoca chunks en paralelo)"
+  type        = number
+  default     = 4
+}
+
+variable "weather_upsert_writes" {
+  description = "Escrituras de weather_data con MERGE por fecha (false = streaming inserts; los DAGs deduplican raw antes de dbt)"
+  type        = bool
+  default     = true
+}
+
+variable "weather_function_telemetry" {
+  description = "Telemetría de la función de clima: tiempos por etapa y estadísticas de jobs de BigQuery en logs JSON y en la respuesta"
+  type        = bool
+  default     = true
+}
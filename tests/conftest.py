@@ -0,0 +1,29 @@
+"""
+Configuración común de los tests.
+
+Los módulos de la función y de los DAGs se despliegan como archivos sueltos (no
+son paquetes), así que se agregan sus directorios al path, igual que hacen los
+scripts de scripts/. Los tests que necesitan Airflow, DuckDB o dbt se saltean si
+la dependencia no está instalada (pytest.importorskip).
+
+    pip install -r functions/weather_ingestion/requirements.txt pytest duckdb
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+for path in ("functions/weather_ingestion", "airflow/dags", "scripts"):
+    path = os.path.join(ROOT, path)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# main.py lee la configuración del entorno al importarse
+os.environ.setdefault("PROJECT_ID", "test-project")
+os.environ.setdefault("DATASET_ID", "chicago_taxi_raw")
+os.environ.setdefault("TABLE_ID", "weather_data")
+os.environ.setdefault("AIRFLOW_HOME", os.path.join(ROOT, ".pytest_cache", "airflow"))
+os.environ.setdefault("AIRFLOW__CORE__LOAD_EXAMPLES", "false")
+os.environ.setdefault("AIRFLOW__CORE__UNIT_TEST_MODE", "true")
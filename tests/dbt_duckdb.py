@@ -0,0 +1,49 @@
+"""
+Proyecto dbt del repo sobre dbt-duckdb para los tests.
+
+Igual que scripts/benchmark_dbt_scale.py: un profile duckdb temporal cuyas tablas
+raw son los directorios Parquet de raw_parquet_path (macro raw_table) y un proceso
+dbt por comando. run() devuelve los resultados de target/run_results.json.
+"""
+
+import json
+import os
+import subprocess
+from typing import Any, Dict, List
+
+from benchmark_dbt_scale import DBT_DIR, PROFILE_TEMPLATE
+
+
+class DbtDuckDBProject:
+    """
+    Args:
+        work_dir: Directorio para el profile, la base DuckDB y los artefactos de dbt
+        raw_parquet_path: Directorio con <tabla>/*.parquet de las tablas raw
+    """
+
+    def __init__(self, work_dir: str, raw_parquet_path: str):
+        self.work_dir = str(work_dir)
+        self.raw_parquet_path = str(raw_parquet_path)
+        self.database_path = os.path.join(self.work_dir, "dbt.duckdb")
+        self.target_dir = os.path.join(self.work_dir, "target")
+        with open(os.path.join(self.work_dir, "profiles.yml"), "w") as f:
+            f.write(PROFILE_TEMPLATE.format(database_path=self.database_path, threads=1))
+
+    def run(self, *args: str) -> List[Dict[str, Any]]:
+        """Ejecuta `dbt <args>` y devuelve un resultado por nodo."""
+        run_results = os.path.join(self.target_dir, "run_results.json")
+        if os.path.exists(run_results):
+            os.remove(run_results)
+        command = [
+            "dbt", *args,
+            "--profiles-dir", self.work_dir,
+            "--target-path", self.target_dir,
+            "--log-path", os.path.join(self.work_dir, "logs"),
+            # Los datos sintéticos tienen re-ingestas de clima: weather_silver deduplica
+            "--vars", json.dumps({"raw_parquet_path": self.raw_parquet_path, "weather_raw_is_unique": False}),
+            "--quiet",
+        ]
+        env = dict(os.environ, GCP_PROJECT_ID="test-project")
+        subprocess.run(command, cwd=DBT_DIR, env=env)
+        with open(run_results) as f:
+            return json.load(f)["results"]
@@ -0,0 +1,258 @@
+"""
+Cliente de BigQuery emulado sobre DuckDB para los tests.
+
+Implementa la parte de la API de google.cloud.bigquery.Client que usan la función
+y los DAGs (query con parámetros y dry-run, load_table_from_file NDJSON,
+insert_rows_json, delete_table, dataset().table()) ejecutando el SQL en una base
+DuckDB en memoria. Las tablas se llaman con su nombre completo
+"proyecto.dataset.tabla" como un solo identificador.
+
+translate() adapta el dialecto de las queries del repo (backticks, @parámetros,
+MERGE sin INTO, INSERT ROW, SAFE_CAST, * EXCEPT, IN UNNEST, PARSE_DATE, FLOAT64,
+CURRENT_TIMESTAMP()). INFORMATION_SCHEMA.PARTITIONS se arma antes de cada query
+que la lee con COUNT(*) por día de las tablas particionadas del dataset, así los
+tests ejercitan el SQL real y no una respuesta enlatada. La sesión usa UTC y
+TIMESTAMP es TIMESTAMPTZ, como en BigQuery.
+
+Cada job queda registrado en `jobs` como (tipo, sql): "query", "dry_run", "load"
+o "stream".
+"""
+
+import io
+import json
+import os
+import re
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import duckdb
+
+DUCKDB_TYPES = {
+    "DATE": "DATE",
+    "FLOAT": "DOUBLE",
+    "FLOAT64": "DOUBLE",
+    "INTEGER": "BIGINT",
+    "INT64": "BIGINT",
+    "STRING": "VARCHAR",
+    "TIMESTAMP": "TIMESTAMPTZ",
+    "BOOLEAN": "BOOLEAN",
+}
+
+_PARTITIONS_QUERY = re.compile(r"`([^`.]+\.[^`.]+)\.INFORMATION_SCHEMA\.PARTITIONS`")
+_DML = re.compile(r"\s*(MERGE|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+class Row(dict):
+    """Fila con acceso por atributo y por clave, como google.cloud.bigquery.Row."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+
+class FakeJob:
+    def __init__(
+        self,
+        rows: Optional[List[Row]] = None,
+        total_bytes_processed: Optional[int] = None,
+        num_dml_affected_rows: Optional[int] = None,
+    ):
+        self._rows = rows or []
+        self.total_bytes_processed = total_bytes_processed
+        self.num_dml_affected_rows = num_dml_affected_rows
+
+    def result(self) -> List[Row]:
+        return list(self._rows)
+
+
+def translate(sql: str) -> str:
+    """SQL de BigQuery del repo -> SQL de DuckDB."""
+    sql = re.sub(r"\bMERGE\s+`", "MERGE INTO `", sql)
+    sql = sql.replace("`", '"')
+    sql = re.sub(r"\bSAFE_CAST\(", "TRY_CAST(", sql)
+    sql = re.sub(r"\*\s*EXCEPT\s*\(", "* EXCLUDE(", sql)
+    sql = re.sub(r"\bINSERT\s+ROW\b", "INSERT *", sql)
+    sql = re.sub(r"\bPARSE_DATE\('%Y%m%d',\s*([^)]+)\)", r"CAST(strptime(\1, '%Y%m%d') AS DATE)", sql)
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\(\)", "CAST(CURRENT_TIMESTAMP AS TIMESTAMP)", sql)
+    sql = re.sub(r"([\w.]+)\s+IN\s+UNNEST\(@(\w+)\)", r"list_contains($\2, \1)", sql)
+    sql = re.sub(r"@(\w+)", r"$\1", sql)
+    return sql
+
+
+def parameter_values(job_config: Any) -> Dict[str, Any]:
+    """Parámetros de un QueryJobConfig por nombre (escalares y arrays)."""
+    values = {}
+    for parameter in getattr(job_config, "query_parameters", None) or []:
+        values[parameter.name] = parameter.values if hasattr(parameter, "values") else parameter.value
+    return values
+
+
+class DuckDBBigQueryClient:
+    """
+    Cliente falso de BigQuery sobre DuckDB.
+
+    Args:
+        project: Proyecto con el que se completan las referencias "dataset.tabla"
+        dry_run_bytes: Bytes estimados que devuelve cada dry-run
+    """
+
+    def __init__(self, project: str = "test-project", dry_run_bytes: int = 10 * 1024 ** 2):
+        self.project = project
+        self.dry_run_bytes = dry_run_bytes
+        self.con = duckdb.connect()
+        self.con.execute("SET TimeZone = 'UTC'")
+        self.con.execute("CREATE TYPE FLOAT64 AS DOUBLE")
+        self.jobs: List[tuple] = []
+        # Tabla -> expresión de la partición diaria (para INFORMATION_SCHEMA.PARTITIONS)
+        self.partitioning: Dict[str, str] = {}
+
+    # -- helpers de los tests --------------------------------------------------
+
+    def table_id(self, table: Any) -> str:
+        table = str(table)
+        return table if table.count(".") >= 2 else f"{self.project}.{table}"
+
+    def create_table(self, table: str, schema: List[Any], partition_by: Optional[str] = None) -> None:
+        """
+        Crea una tabla a partir de SchemaField (o tuplas nombre, tipo).
+
+        partition_by es la expresión de la partición diaria; por defecto la columna
+        date si existe (sin partición la tabla no aparece en PARTITIONS).
+        """
+        fields = self._fields(schema)
+        columns = ", ".join(f'"{name}" {DUCKDB_TYPES[field_type]}' for name, field_type in fields)
+        table = self.table_id(table)
+        self.con.execute(f'CREATE OR REPLACE TABLE "{table}" ({columns})')
+        if partition_by is None and "date" in dict(fields):
+            partition_by = "date"
+        if partition_by:
+            self.partitioning[table] = partition_by
+
+    def insert(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        columns = list(rows[0])
+        placeholders = ", ".join("?" for _ in columns)
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        self.con.executemany(
+            f'INSERT INTO "{self.table_id(table)}" ({quoted}) VALUES ({placeholders})',
+            [[row[column] for column in columns] for row in rows],
+        )
+
+    def rows(self, table: str, order_by: str = "1") -> List[Row]:
+        return self._fetch(f'SELECT * FROM "{self.table_id(table)}" ORDER BY {order_by}')
+
+    def tables(self) -> List[str]:
+        return [name for (name,) in self.con.execute("SELECT table_name FROM duckdb_tables()").fetchall()]
+
+    def count(self, kind: str, prefix: str = "") -> int:
+        """Jobs de un tipo cuyo SQL empieza con prefix (p. ej. "MERGE")."""
+        return sum(1 for job_kind, sql in self.jobs if job_kind == kind and sql.lstrip().startswith(prefix))
+
+    @property
+    def job_counts(self) -> Counter:
+        return Counter(kind for kind, _ in self.jobs)
+
+    # -- API de google.cloud.bigquery.Client -------------------------------------
+
+    def query(self, query: str, job_config: Any = None, location: Optional[str] = None, **kwargs: Any) -> FakeJob:
+        if getattr(job_config, "dry_run", False):
+            self.jobs.append(("dry_run", query))
+            return FakeJob([], self.dry_run_bytes)
+        self.jobs.append(("query", query))
+        params = parameter_values(job_config)
+
+        for dataset in set(_PARTITIONS_QUERY.findall(query)):
+            self._build_partitions(dataset)
+
+        sql = translate(query)
+        used = {name: value for name, value in params.items() if f"${name}" in sql}
+        rows = self._fetch(sql, used)
+        if _DML.match(query):
+            # DuckDB devuelve las filas afectadas como resultado del statement
+            return FakeJob(num_dml_affected_rows=rows[0]["Count"] if rows else 0)
+        return FakeJob(rows)
+
+    def load_table_from_file(self, file_obj: io.IOBase, destination: Any, job_config: Any = None) -> FakeJob:
+        table = self.table_id(destination)
+        self.jobs.append(("load", table))
+        fields = self._fields(job_config.schema)
+        truncate = getattr(job_config, "write_disposition", None) == "WRITE_TRUNCATE"
+        if truncate or table not in self.tables():
+            self.create_table(table, fields)
+        payload = file_obj.read()
+        if getattr(job_config, "source_format", None) == "PARQUET":
+            self._load_parquet(table, fields, payload)
+            return FakeJob()
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        rows = [json.loads(line) for line in payload.splitlines() if line.strip()]
+        self.insert(table, [{name: row.get(name) for name, _ in fields} for row in rows])
+        return FakeJob()
+
+    def insert_rows_json(self, table: Any, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.jobs.append(("stream", str(table)))
+        self.insert(table, rows)
+        return []
+
+    def get_table(self, table: Any) -> Any:
+        [(num_rows,)] = self.con.execute(f'SELECT COUNT(*) FROM "{self.table_id(table)}"').fetchall()
+        return Row(table_id=self.table_id(table), num_rows=num_rows)
+
+    def delete_table(self, table: Any, not_found_ok: bool = False) -> None:
+        self.con.execute(f'DROP TABLE IF EXISTS "{self.table_id(table)}"')
+        self.partitioning.pop(self.table_id(table), None)
+
+    def dataset(self, dataset_id: str) -> Any:
+        client = self
+
+        class _Dataset:
+            def table(self, table_id: str) -> str:
+                return f"{client.project}.{dataset_id}.{table_id}"
+
+        return _Dataset()
+
+    # -- internos --------------------------------------------------------------
+
+    @staticmethod
+    def _fields(schema: List[Any]) -> List[tuple]:
+        return [
+            (field.name, field.field_type) if hasattr(field, "field_type") else tuple(field)
+            for field in schema
+        ]
+
+    def _fetch(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Row]:
+        cursor = self.con.execute(sql, params or {})
+        if cursor.description is None:
+            return []
+        names = [column[0] for column in cursor.description]
+        return [Row(zip(names, values)) for values in cursor.fetchall()]
+
+    def _load_parquet(self, table: str, fields: List[tuple], payload: bytes) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "load.parquet")
+            with open(path, "wb") as f:
+                f.write(payload)
+            columns = ", ".join(f'"{name}"' for name, _ in fields)
+            self.con.execute(f'INSERT INTO "{table}" ({columns}) SELECT {columns} FROM read_parquet(\'{path}\')')
+
+    def _build_partitions(self, dataset: str) -> None:
+        """Materializa "dataset.INFORMATION_SCHEMA.PARTITIONS" con las filas por día de sus tablas."""
+        selects = [
+            f"""SELECT '{table.rsplit(".", 1)[1]}' AS table_name,
+                       strftime({expression}, '%Y%m%d') AS partition_id, COUNT(*) AS total_rows
+                FROM "{table}" GROUP BY partition_id"""
+            for table, expression in sorted(self.partitioning.items())
+            if table.rsplit(".", 1)[0] == dataset and table in self.tables()
+        ]
+        # Dataset sin tablas particionadas: la vista existe, vacía
+        selects.append(
+            "SELECT NULL::VARCHAR AS table_name, NULL::VARCHAR AS partition_id, NULL::BIGINT AS total_rows WHERE false"
+        )
+        self.con.execute(
+            f'CREATE OR REPLACE TEMP TABLE "{dataset}.INFORMATION_SCHEMA.PARTITIONS" AS '
+            + " UNION ALL ".join(selects)
+        )
@@ -0,0 +1,173 @@
+"""
+completeness.py: PartitionCompleteness contra un cliente falso que devuelve filas de
+INFORMATION_SCHEMA.PARTITIONS (metadatos, fallback exacto cuando __UNPARTITIONED__
+tiene filas, tabla inexistente y cache por instancia), y la detección y eliminación
+de fechas repetidas en weather_data (duplicate_days / deduplicate_days) sobre el
+cliente emulado en DuckDB.
+"""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+import main  # noqa: E402
+from completeness import (  # noqa: E402
+    UNPARTITIONED_PARTITION_ID, PartitionCompleteness, deduplicate_days, duplicate_days,
+)
+from google.api_core.exceptions import NotFound  # noqa: E402
+
+TARGET = "test-project.chicago_taxi_raw.weather_data"
+START = date(2023, 6, 1)
+
+
+def weather_row(day, temperature, ingested):
+    return {
+        "date": day,
+        "temperature": temperature,
+        "humidity": None,
+        "wind_speed": 3.1,
+        "precipitation": 0.0,
+        "weather_condition": "Clear",
+        "ingestion_timestamp": datetime.fromisoformat(ingested),
+    }
+
+
+class PartitionsClient:
+    """
+    BigQuery falso: las queries a INFORMATION_SCHEMA.PARTITIONS devuelven partitions
+    ({partition_id: total_rows}) y el GROUP BY exacto devuelve scan ({día: filas}).
+    Registra (tipo, parámetros) de cada query.
+    """
+
+    def __init__(self, partitions=None, scan=None, missing=False):
+        self.partitions = partitions or {}
+        self.scan = scan or {}
+        self.missing = missing
+        self.queries = []
+
+    def query(self, query, job_config=None, location=None):
+        params = {p.name: p.value for p in job_config.query_parameters} if job_config else {}
+        kind = "metadata" if "INFORMATION_SCHEMA.PARTITIONS" in query else "scan"
+        self.queries.append((kind, params))
+        if self.missing:
+            raise NotFound("Not found: Table test-project:chicago_taxi_raw.weather_data")
+        if kind == "metadata":
+            rows = [SimpleNamespace(partition_id=partition_id, total_rows=total_rows)
+                    for partition_id, total_rows in self.partitions.items()]
+        else:
+            rows = [SimpleNamespace(day=day, row_count=count) for day, count in self.scan.items()
+                    if params["start"] <= day <= params["end"]]
+        return SimpleNamespace(result=lambda: rows)
+
+
+def test_counts_come_from_partition_metadata():
+    client = PartitionsClient(
+        partitions={"20230601": 24, "20230602": 0, "20230603": 5, UNPARTITIONED_PARTITION_ID: None}
+    )
+    completeness = PartitionCompleteness(client, TARGET)
+
+    assert completeness.row_counts(date(2023, 6, 1), date(2023, 6, 4)) == {date(2023, 6, 1): 24, date(2023, 6, 3): 5}
+    assert completeness.source == "metadata"
+    assert completeness.missing_days(date(2023, 6, 1), date(2023, 6, 4)) == [date(2023, 6, 2), date(2023, 6, 4)]
+    assert completeness.missing_days(datetime(2023, 6, 1), datetime(2023, 6, 4), min_rows=10) == [
+        date(2023, 6, 2), date(2023, 6, 3), date(2023, 6, 4)
+    ]
+    assert completeness.present_days(date(2023, 6, 1), date(2023, 6, 4), min_rows=10) == {date(2023, 6, 1)}
+    # Una sola query de metadatos para todo el rango, sin escanear la tabla
+    assert client.queries == [("metadata", {
+        "table_name": "weather_data", "start_partition": "20230601", "end_partition": "20230604",
+        "unpartitioned": UNPARTITIONED_PARTITION_ID,
+    })]
+
+
+def test_unpartitioned_rows_fall_back_to_an_exact_scan():
+    # Filas en el streaming buffer: los metadatos no dicen de qué día son
+    client = PartitionsClient(
+        partitions={"20230601": 24, UNPARTITIONED_PARTITION_ID: 3},
+        scan={date(2023, 6, 1): 24, date(2023, 6, 2): 3, date(2023, 6, 9): 1},
+    )
+    completeness = PartitionCompleteness(client, TARGET)
+
+    assert completeness.row_counts(date(2023, 6, 1), date(2023, 6, 3)) == {date(2023, 6, 1): 24, date(2023, 6, 2): 3}
+    assert completeness.source == "scan"
+    assert completeness.missing_days(date(2023, 6, 1), date(2023, 6, 3)) == [date(2023, 6, 3)]
+    assert [kind for kind, _ in client.queries] == ["metadata", "scan"]
+    assert client.queries[1][1] == {"start": date(2023, 6, 1), "end": date(2023, 6, 3)}
+
+
+def test_missing_table_is_empty():
+    client = PartitionsClient(missing=True)
+    completeness = PartitionCompleteness(client, TARGET)
+
+    assert completeness.row_counts(date(2023, 6, 1), date(2023, 6, 2)) == {}
+    assert completeness.missing_days(date(2023, 6, 1), date(2023, 6, 2)) == [date(2023, 6, 1), date(2023, 6, 2)]
+    assert completeness.present_days(date(2023, 6, 1), date(2023, 6, 2)) == set()
+
+
+def test_counts_are_cached_until_invalidated():
+    client = PartitionsClient(partitions={"20230601": 24})
+    completeness = PartitionCompleteness(client, TARGET)
+
+    completeness.missing_days(date(2023, 6, 1), date(2023, 6, 30))
+    # Un subrango sale del cache
+    completeness.missing_days(date(2023, 6, 10), date(2023, 6, 12))
+    assert len(client.queries) == 1
+
+    # Un rango más amplio vuelve a consultar
+    completeness.missing_days(date(2023, 5, 31), date(2023, 6, 30))
+    assert len(client.queries) == 2
+
+    # Después de escribir: invalidate() descarta los conteos
+    client.partitions["20230602"] = 24
+    assert date(2023, 6, 2) in completeness.missing_days(date(2023, 6, 1), date(2023, 6, 2))
+    completeness.invalidate()
+    assert completeness.missing_days(date(2023, 6, 1), date(2023, 6, 2)) == []
+    assert len(client.queries) == 3
+
+
+@pytest.fixture
+def client():
+    pytest.importorskip("duckdb")
+    from duckdb_bigquery import DuckDBBigQueryClient
+
+    client = DuckDBBigQueryClient()
+    client.create_table(TARGET, main.weather_data_schema())
+    return client
+
+
+def test_deduplicate_keeps_latest_ingestion_per_day(client):
+    # Streaming inserts de dos corridas que escribieron los mismos días
+    client.insert(TARGET, [weather_row(START + timedelta(days=i), 20.0, "2024-01-01T00:00:00") for i in range(5)])
+    client.insert(TARGET, [
+        weather_row(START + timedelta(days=1), 21.0, "2024-01-02T00:00:00"),
+        weather_row(START + timedelta(days=3), 23.0, "2024-01-02T00:00:00"),
+        weather_row(START + timedelta(days=3), 24.0, "2024-01-03T00:00:00"),
+    ])
+
+    duplicated = duplicate_days(client, TARGET)
+    assert duplicated == [date(2023, 6, 2), date(2023, 6, 4)]
+
+    deduplicate_days(client, TARGET, duplicated, order_by="ingestion_timestamp DESC")
+
+    rows = client.rows(TARGET, order_by="date")
+    assert [(row.date, row.temperature) for row in rows] == [
+        (date(2023, 6, 1), 20.0),
+        (date(2023, 6, 2), 21.0),
+        (date(2023, 6, 3), 20.0),
+        (date(2023, 6, 4), 24.0),
+        (date(2023, 6, 5), 20.0),
+    ]
+    assert duplicate_days(client, TARGET) == []
+    assert client.count("query", "MERGE") == 1
+
+
+def test_deduplicate_without_days_is_a_no_op(client):
+    deduplicate_days(client, TARGET, [], order_by="ingestion_timestamp DESC")
+    assert client.jobs == []
+
+
+def test_duplicate_days_of_missing_table_is_empty():
+    assert duplicate_days(PartitionsClient(missing=True), TARGET) == []
@@ -0,0 +1,107 @@
+"""DbtBuildOperator: un `dbt build` por corrida con el estado de parseo persistido, entorno acotado y rutas locales."""
+
+import os
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+# "airflow" a secas resuelve al directorio airflow/ del repo (namespace package)
+pytest.importorskip("airflow.models")
+
+import dbt_runner  # noqa: E402
+
+
+class FakeRunResults:
+    elapsed_time = 1.5
+    results = []
+
+
+class FakeResult:
+    success = True
+    exception = None
+    result = FakeRunResults()
+
+
+class FakeRunner:
+    """dbtRunner falso: registra cada invocación, el manifest recibido y el entorno que vio."""
+
+    calls = []
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+
+    def invoke(self, args):
+        target_path = args[args.index("--target-path") + 1]
+        # Simula el parseo parcial: dbt deja partial_parse.msgpack en el target
+        with open(os.path.join(target_path, "partial_parse.msgpack"), "w") as f:
+            f.write(" ".join(args))
+        FakeRunner.calls.append((args, self.manifest, os.environ.get("GCP_PROJECT_ID"),
+                                 os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")))
+        return FakeResult()
+
+
+@pytest.fixture
+def fake_dbt(monkeypatch, tmp_path):
+    FakeRunner.calls = []
+    cli_main = types.ModuleType("dbt.cli.main")
+    cli_main.dbtRunner = FakeRunner
+    monkeypatch.setitem(sys.modules, "dbt.cli.main", cli_main)
+    monkeypatch.setattr(dbt_runner.DbtBuildOperator, "_target_path", lambda self: str(tmp_path / "target"))
+    monkeypatch.setattr(dbt_runner.DbtBuildOperator, "_emit_metrics", lambda self, timings: None)
+    return tmp_path
+
+
+def operator(task_id, state_dir="/tmp/state", **kwargs):
+    return dbt_runner.DbtBuildOperator(
+        task_id=task_id, project_dir="/opt/dbt", profiles_dir="/opt/dbt", state_dir=state_dir, **kwargs
+    )
+
+
+def test_each_run_parses_from_the_persisted_state(fake_dbt):
+    state_dir = str(fake_dbt / "state")
+
+    operator("a", state_dir=state_dir, dbt_vars={"silver_lookback_days": 3}).execute({})
+    # Otra corrida en el mismo proceso (p. ej. después de un redeploy del proyecto)
+    operator("b", state_dir=state_dir, dbt_vars={"silver_lookback_days": 7}).execute({})
+
+    # Un solo `dbt build` por corrida, sin Manifest reutilizado del proceso
+    assert [args[0] for args, *_ in FakeRunner.calls] == ["build", "build"]
+    assert [manifest for _, manifest, *_ in FakeRunner.calls] == [None, None]
+    assert '{"silver_lookback_days": 7}' in FakeRunner.calls[1][0]
+    # El estado de parseo queda en state_dir para la próxima corrida
+    with open(os.path.join(state_dir, "partial_parse.msgpack")) as f:
+        assert '{"silver_lookback_days": 7}' in f.read()
+
+
+def test_restore_state_copies_only_newer_files(tmp_path):
+    state_dir, target_path = tmp_path / "state", tmp_path / "target"
+    state_dir.mkdir()
+    (state_dir / "partial_parse.msgpack").write_text("saved")
+
+    assert dbt_runner.restore_state(str(state_dir), str(target_path)) == ["partial_parse.msgpack"]
+    assert dbt_runner.restore_state(str(state_dir), str(target_path)) == []
+
+    later = datetime(2030, 1, 1).timestamp()
+    os.utime(state_dir / "partial_parse.msgpack", (later, later))
+    assert dbt_runner.restore_state(str(state_dir), str(target_path)) == ["partial_parse.msgpack"]
+
+
+def test_environment_restored_after_call(fake_dbt, monkeypatch):
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", "/keys/sa.json")
+    monkeypatch.delenv("GCP_PROJECT_ID", raising=False)
+
+    operator("a", state_dir=str(fake_dbt / "state"), env={"GCP_PROJECT_ID": "p"}).execute({})
+
+    assert FakeRunner.calls[0][2:] == ("p", None)
+    assert "GCP_PROJECT_ID" not in os.environ
+    assert os.environ["GOOGLE_APPLICATION_CREDENTIALS"] == "/keys/sa.json"
+
+
+def test_logs_and_target_outside_project():
+    args = operator("a").build_args("/tmp/target")
+
+    log_path = args[args.index("--log-path") + 1]
+    assert not log_path.startswith("/opt/dbt")
+    assert args[args.index("--target-path") + 1] == "/tmp/target"
@@ -0,0 +1,86 @@
+"""
+Etapa de fetch concurrente (fetch_weather_concurrently) contra un stub local del
+endpoint timeline que cuenta requests: un request por día, orden de fechas en el
+handoff, concurrencia acotada por max_workers y rate limit por host.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("requests")
+
+import main  # noqa: E402
+from timeline_stub import TimelineStub  # noqa: E402
+
+DATES = [datetime(2023, 6, 1) + timedelta(days=i) for i in range(16)]
+LATENCY_S = 0.05
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with TimelineStub(latency_s=LATENCY_S) as stub:
+        monkeypatch.setattr(main, "WEATHER_API_URL", stub.url)
+        monkeypatch.setattr(main, "WEATHER_API_KEY", "stub")
+        monkeypatch.setattr(main, "API_RATE_LIMITER", main.HostRateLimiter(0))
+        main.reset_clients()
+        yield stub
+    main.reset_clients()
+
+
+def fetch(workers):
+    started = time.perf_counter()
+    results = list(main.fetch_weather_concurrently(DATES, main.get_weather_data_from_api, workers))
+    return results, time.perf_counter() - started
+
+
+def test_one_request_per_day_in_date_order(stub):
+    results, _ = fetch(4)
+
+    assert [day for day, *_ in results] == DATES
+    assert all(error is None for _, _, error, _ in results)
+    assert [data["date"] for _, data, _, _ in results] == [day.date().isoformat() for day in DATES]
+    assert sorted(start for start, _ in stub.requests) == [day.date() for day in DATES]
+
+
+@pytest.mark.parametrize("workers", [1, 4, 8])
+def test_concurrency_is_bounded_by_workers(stub, workers):
+    fetch(workers)
+
+    assert len(stub.requests) == len(DATES)
+    assert stub.max_in_flight <= workers
+    if workers > 1:
+        assert stub.max_in_flight > 1
+
+
+def test_wall_time_scales_with_workers(stub):
+    _, serial = fetch(1)
+    _, parallel = fetch(8)
+
+    # 16 días x 50 ms: ~0.8 s en serie, ~0.1 s con 8 workers
+    assert serial >= len(DATES) * LATENCY_S
+    assert parallel < serial / 3
+
+
+def test_rate_limit_spaces_requests_per_host(stub, monkeypatch):
+    monkeypatch.setattr(main, "API_RATE_LIMITER", main.HostRateLimiter(40))
+
+    _, elapsed = fetch(8)
+
+    # 16 requests a 40/s: el último sale a los 15 intervalos de 25 ms aunque haya 8 workers
+    assert elapsed >= 15 / 40
+    assert len(stub.requests) == len(DATES)
+
+
+def test_failed_day_does_not_stop_the_others(stub):
+    def flaky(day):
+        if day == DATES[3]:
+            raise RuntimeError("timeout")
+        return main.get_weather_data_from_api(day)
+
+    results = list(main.fetch_weather_concurrently(DATES, flaky, 4))
+
+    errors = {day: error for day, _, error, _ in results if error is not None}
+    assert list(errors) == [DATES[3]]
+    assert len(stub.requests) == len(DATES) - 1
@@ -0,0 +1,188 @@
+"""
+Cache de GSOD por estación y año (gsod_cache) con el backend de disco local:
+misses/hits entre instancias, TTL del año en curso, años cerrados, capa en
+memoria, un solo fetch por año con threads concurrentes y fallas del backend.
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import gsod_cache  # noqa: E402
+
+WBAN = "94846"
+COLUMNS = ["date", "temp", "prcp"]
+TTL = 6 * 3600
+
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Fetcher:
+    """NOAA falso: dos días por año; cuenta los fetches."""
+
+    def __init__(self, temp=20.5):
+        self.temp = temp
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, client, wban, year):
+        with self._lock:
+            self.calls.append((wban, year))
+        time.sleep(0.01)
+        return [
+            SimpleNamespace(date=date(year, 1, 1), temp=self.temp, prcp=None),
+            SimpleNamespace(date=date(year, 7, 4), temp=self.temp + 1, prcp=0.25),
+        ]
+
+
+def make_cache(root, fetcher, clock, digest="abc123"):
+    return gsod_cache.GsodYearCache(
+        gsod_cache.build_backend(str(root)), fetcher, COLUMNS, digest=digest, ttl_seconds=TTL, now=clock
+    )
+
+
+def set_written_at(cache, year, written_at):
+    os.utime(os.path.join(cache.backend.root, cache.key(WBAN, year)), (written_at, written_at))
+
+
+def test_miss_writes_parquet_and_next_instance_hits(tmp_path):
+    fetcher = Fetcher()
+    clock = Clock(epoch(2025, 3, 1))
+    with gsod_cache.run_stats() as stats:
+        rows = make_cache(tmp_path, fetcher, clock).rows_for(None, WBAN, [date(2023, 7, 4), date(2023, 7, 5)])
+
+    # 2023-07-05 no está en NOAA: no aparece
+    assert list(rows) == [date(2023, 7, 4)]
+    assert (rows[date(2023, 7, 4)].temp, rows[date(2023, 7, 4)].prcp) == (21.5, 0.25)
+    assert os.path.exists(tmp_path / "gsod" / f"wban={WBAN}" / "year=2023" / "abc123.parquet")
+    assert stats == {"misses": 1}
+
+    # Otra instancia (otra invocación) lee el archivo: sin fetch, con los mismos tipos
+    with gsod_cache.run_stats() as stats:
+        rows = make_cache(tmp_path, fetcher, clock).year_rows(None, WBAN, 2023)
+    assert fetcher.calls == [(WBAN, 2023)]
+    assert stats == {"hits": 1}
+    assert rows[date(2023, 1, 1)].prcp is None
+    assert isinstance(next(iter(rows)), date)
+
+
+def test_current_year_is_revalidated_after_ttl(tmp_path):
+    fetcher = Fetcher()
+    written_at = epoch(2024, 5, 10, 12)
+    make_cache(tmp_path, fetcher, Clock(written_at)).year_rows(None, WBAN, 2024)
+
+    clock = Clock(written_at + TTL - 60)
+    cache = make_cache(tmp_path, fetcher, clock)
+    set_written_at(cache, 2024, written_at)
+    cache.year_rows(None, WBAN, 2024)
+    assert len(fetcher.calls) == 1
+
+    # Vencido el TTL: la capa en memoria y el archivo se revalidan contra NOAA
+    fetcher.temp = 25.0
+    clock.now = written_at + TTL + 60
+    with gsod_cache.run_stats() as stats:
+        rows = cache.year_rows(None, WBAN, 2024)
+    assert stats == {"revalidations": 1}
+    assert len(fetcher.calls) == 2
+    assert rows[date(2024, 1, 1)].temp == 25.0
+    # El archivo reescrito sirve a otra instancia con el valor nuevo
+    assert make_cache(tmp_path, fetcher, clock).year_rows(None, WBAN, 2024)[date(2024, 1, 1)].temp == 25.0
+
+
+def test_closed_year_never_expires_unless_written_before_finalization(tmp_path):
+    fetcher = Fetcher()
+    much_later = Clock(epoch(2030, 1, 1))
+
+    # Escrita después del 31/12 + FINALIZATION_LAG: se sirve siempre
+    cache = make_cache(tmp_path, fetcher, much_later)
+    cache.year_rows(None, WBAN, 2022)
+    set_written_at(cache, 2022, epoch(2023, 2, 15))
+    make_cache(tmp_path, fetcher, much_later).year_rows(None, WBAN, 2022)
+    assert fetcher.calls == [(WBAN, 2022)]
+
+    # Escrita el 5 de enero (NOAA todavía publicando): vence como el año en curso
+    set_written_at(cache, 2022, epoch(2023, 1, 5))
+    with gsod_cache.run_stats() as stats:
+        make_cache(tmp_path, fetcher, much_later).year_rows(None, WBAN, 2022)
+    assert stats == {"revalidations": 1}
+    assert fetcher.calls == [(WBAN, 2022), (WBAN, 2022)]
+
+
+def test_memory_layer_skips_the_backend(tmp_path):
+    fetcher = Fetcher()
+    cache = make_cache(tmp_path, fetcher, Clock(epoch(2025, 3, 1)))
+    cache.year_rows(None, WBAN, 2023)
+
+    def fail(key):
+        raise AssertionError("la segunda lectura debe salir de memoria")
+
+    cache.backend.get = fail
+    with gsod_cache.run_stats() as stats:
+        cache.rows_for(None, WBAN, [date(2023, 1, 1), date(2023, 7, 4)])
+    assert stats == {"hits": 1}
+
+
+def test_concurrent_reads_fetch_each_year_once(tmp_path):
+    fetcher = Fetcher()
+    cache = make_cache(tmp_path, fetcher, Clock(epoch(2025, 3, 1)))
+
+    threads = [
+        threading.Thread(target=cache.year_rows, args=(None, WBAN, 2023 + i % 2)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(fetcher.calls) == [(WBAN, 2023), (WBAN, 2024)]
+
+
+def test_new_digest_does_not_reuse_old_entries(tmp_path):
+    fetcher = Fetcher()
+    clock = Clock(epoch(2025, 3, 1))
+
+    def read(query):
+        make_cache(tmp_path, fetcher, clock, digest=gsod_cache.query_digest(query)).year_rows(None, WBAN, 2023)
+
+    read("SELECT a FROM t")
+    # Mismo texto con otros espacios: misma clave
+    read("SELECT  a\n FROM t")
+    assert len(fetcher.calls) == 1
+
+    read("SELECT b FROM t")
+    assert len(fetcher.calls) == 2
+
+
+def test_backend_failures_fall_back_to_noaa(tmp_path):
+    class BrokenBackend:
+        def get(self, key):
+            raise OSError("disco lleno")
+
+        def put(self, key, payload):
+            raise OSError("disco lleno")
+
+    fetcher = Fetcher()
+    cache = gsod_cache.GsodYearCache(BrokenBackend(), fetcher, COLUMNS, digest="abc123")
+
+    assert date(2023, 7, 4) in cache.year_rows(None, WBAN, 2023)
+    assert fetcher.calls == [(WBAN, 2023)]
+
+
+def test_build_backend():
+    assert isinstance(gsod_cache.build_backend("/tmp/gsod_cache"), gsod_cache.LocalCacheBackend)
@@ -0,0 +1,181 @@
+"""
+Carga histórica de taxis por meses (chicago_taxi_historical_ingestion): ventanas
+mensuales y sus bordes, el grafo de tareas con load_taxi_month mapeado, y un
+dag.test() con BigQuery/GCS falsos que expande los shards y corre dbt al final.
+"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+import chicago_taxi_pipeline as pipeline  # noqa: E402
+from airflow.models.mappedoperator import MappedOperator  # noqa: E402
+from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator  # noqa: E402
+from airflow.utils import db  # noqa: E402
+from airflow.utils.state import DagRunState, TaskInstanceState  # noqa: E402
+from dbt_runner import DbtBuildOperator  # noqa: E402
+from weather_trigger import WeatherIngestionOperator  # noqa: E402
+
+
+def test_month_windows_are_clipped_to_the_range():
+    assert pipeline.month_windows("2023-06-15", "2023-08-02") == [
+        {"month": "2023-06", "start": "2023-06-15", "end": "2023-06-30"},
+        {"month": "2023-07", "start": "2023-07-01", "end": "2023-07-31"},
+        {"month": "2023-08", "start": "2023-08-01", "end": "2023-08-02"},
+    ]
+
+
+def test_month_windows_cross_year_and_leap_february():
+    windows = pipeline.month_windows("2023-12-30", "2024-03-01")
+    assert [(w["month"], w["start"], w["end"]) for w in windows] == [
+        ("2023-12", "2023-12-30", "2023-12-31"),
+        ("2024-01", "2024-01-01", "2024-01-31"),
+        ("2024-02", "2024-02-01", "2024-02-29"),
+        ("2024-03", "2024-03-01", "2024-03-01"),
+    ]
+    assert pipeline.month_windows("2024-05-10", "2024-05-10") == [
+        {"month": "2024-05", "start": "2024-05-10", "end": "2024-05-10"}
+    ]
+
+
+def test_shard_sql_covers_exactly_its_month():
+    window = {"month": "2023-07", "start": "2023-07-01", "end": "2023-07-31"}
+    export_sql = pipeline.build_taxi_export_sql(window)
+    load_sql = pipeline.build_taxi_month_load_sql(window)
+
+    assert "BETWEEN '2023-07-01' AND '2023-07-31'" in export_sql
+    assert "/month=2023-07/part-*.parquet" in export_sql
+    assert load_sql.index("DELETE FROM") < load_sql.index("LOAD DATA INTO")
+    assert "BETWEEN '2023-07-01' AND '2023-07-31'" in load_sql
+    assert "/month=2023-07/*.parquet" in load_sql
+
+
+def test_task_graph():
+    dag = pipeline.historical_dag
+    load = dag.get_task("load_taxi_month")
+
+    assert isinstance(load, MappedOperator)
+    assert load.pool == pipeline.TAXI_SHARD_POOL
+    assert load.upstream_task_ids == {"plan_taxi_month_shards"}
+    assert load.downstream_task_ids == {"trigger_weather_stations_historical", "ensure_weather_raw_unique"}
+    # La deduplicación de weather_data espera ambas ramas y corre aunque la de taxis se haya salteado
+    ensure = dag.get_task("ensure_weather_raw_unique")
+    assert ensure.upstream_task_ids == {
+        "load_taxi_month", "trigger_weather_historical", "trigger_weather_stations_historical"
+    }
+    assert ensure.trigger_rule == "none_failed"
+    build = dag.get_task("run_dbt_build")
+    assert build.upstream_task_ids == {"ensure_weather_raw_unique"}
+    assert build.trigger_rule == "none_failed"
+    assert "ensure_weather_raw_unique" in build.dbt_vars["weather_raw_is_unique"]
+    assert dag.get_task("check_taxi_data_missing").ignore_downstream_trigger_rules is False
+
+
+class FakeXCom:
+    def __init__(self, missing_days):
+        self.missing_days = missing_days
+
+    def xcom_pull(self, task_ids, key):
+        return self.missing_days
+
+
+def test_plan_loads_only_months_with_missing_days(monkeypatch):
+    monkeypatch.setattr(pipeline, "HISTORY_START_DATE", "2023-06-01")
+    monkeypatch.setattr(pipeline, "HISTORY_END_DATE", "2023-09-30")
+
+    class DagRun:
+        conf = {}
+
+    shards = pipeline.plan_taxi_month_shards(dag_run=DagRun(), ti=FakeXCom(["2023-07-04", "2023-09-30"]))
+    assert [shard["window"]["month"] for shard in shards] == ["2023-07", "2023-09"]
+
+    # Con la ventana en la configuración del DAG run se cargan todos sus meses
+    DagRun.conf = {"start_date": "2023-06-15", "end_date": "2023-08-02"}
+    shards = pipeline.plan_taxi_month_shards(dag_run=DagRun(), ti=FakeXCom(["2023-07-04"]))
+    assert [shard["window"]["month"] for shard in shards] == ["2023-06", "2023-07", "2023-08"]
+
+
+class FakeJob:
+    total_bytes_processed = 0
+
+    def result(self):
+        return []
+
+
+class FakeGuardedClient:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def query(self, sql, location=None):
+        self.calls.append(("export", sql))
+        return FakeJob()
+
+    def summary(self):
+        return {}
+
+
+class FakeCompleteness:
+    def __init__(self, client, table, **kwargs):
+        pass
+
+    def missing_days(self, start, end, min_rows=1):
+        return [date(2023, 7, 4)]
+
+
+@pytest.fixture
+def fake_gcp(monkeypatch):
+    """BigQuery, GCS, la función de clima y dbt falsos; registra las queries de cada shard."""
+    calls = []
+
+    class GCSHook:
+        def get_bucket(self, bucket):
+            return bucket
+
+        def list(self, bucket, prefix):
+            calls.append(("clear", prefix))
+            return []
+
+    class BigQueryHook:
+        def __init__(self, **kwargs):
+            pass
+
+        def insert_job(self, configuration, **kwargs):
+            calls.append(("load", configuration["query"]["query"]))
+
+    monkeypatch.setattr(pipeline, "GCSHook", GCSHook)
+    monkeypatch.setattr(pipeline, "BigQueryHook", BigQueryHook)
+    monkeypatch.setattr(pipeline, "PartitionCompleteness", FakeCompleteness)
+    monkeypatch.setattr(pipeline, "guarded_client", lambda location=pipeline.REGION: FakeGuardedClient(calls))
+    monkeypatch.setattr(BigQueryInsertJobOperator, "execute", lambda self, context: None)
+    monkeypatch.setattr(WeatherIngestionOperator, "execute", lambda self, context: {"runs": 0})
+    monkeypatch.setattr(
+        DbtBuildOperator, "execute", lambda self, context: calls.extend([("vars", self.dbt_vars), ("dbt", self.task_id)])
+    )
+    db.initdb()
+    return calls
+
+
+def test_dag_run_expands_one_shard_per_month(fake_gcp):
+    dag_run = pipeline.historical_dag.test(run_conf={"start_date": "2023-06-15", "end_date": "2023-08-02"})
+
+    assert dag_run.state == DagRunState.SUCCESS
+    shards = sorted(
+        (ti for ti in dag_run.get_task_instances() if ti.task_id == "load_taxi_month"),
+        key=lambda ti: ti.map_index,
+    )
+    assert [ti.map_index for ti in shards] == [0, 1, 2]
+    assert {ti.state for ti in shards} == {TaskInstanceState.SUCCESS}
+
+    loads = [sql for kind, sql in fake_gcp if kind == "load"]
+    assert sorted(sql.split("BETWEEN ")[1].split("\n")[0] for sql in loads) == [
+        "'2023-06-15' AND '2023-06-30';",
+        "'2023-07-01' AND '2023-07-31';",
+        "'2023-08-01' AND '2023-08-02';",
+    ]
+    assert sorted(prefix for kind, prefix in fake_gcp if kind == "clear") == [
+        f"{pipeline.EXPORT_OBJECT_PREFIX}/month={month}/" for month in ("2023-06", "2023-07", "2023-08")
+    ]
+    # dbt después de todos los shards; weather_data sin fechas repetidas habilita la var
+    assert fake_gcp[-2:] == [("vars", {"weather_raw_is_unique": "True"}), ("dbt", "run_dbt_build")]
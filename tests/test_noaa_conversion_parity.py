@@ -0,0 +1,165 @@
+"""
+Paridad de la conversión NOAA GSOD entre SERVER_SIDE_MERGE_SQL (en BigQuery) y el
+path de la función (NOAA_DAILY_SELECT + convert_noaa_row / noaa_batch).
+
+fixtures/gsod_94846.csv sigue el formato de noaa_gsod.gsod{year} (stn, wban, date y
+las columnas de medición; wdsp es STRING como en la tabla pública) con valores
+armados para los casos borde: centinelas de faltante (9999.9, 999.9, 99.99), días
+con dos filas de la misma estación, temperaturas bajo cero, ceros, wdsp vacío,
+un día sin datos y filas de otra estación. No es un export de la tabla pública.
+Las queries se ejecutan tal cual sobre el cliente emulado en DuckDB.
+"""
+
+import csv
+import os
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pandas")
+pytest.importorskip("google.cloud.bigquery")
+
+import main  # noqa: E402
+import noaa_batch  # noqa: E402
+from duckdb_bigquery import DuckDBBigQueryClient  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "gsod_94846.csv")
+TARGET = "test-project.chicago_taxi_raw.weather_data"
+START = datetime(2023, 12, 26)
+END = datetime(2024, 1, 6)
+
+GSOD_SCHEMA = [
+    ("stn", "STRING"), ("wban", "STRING"), ("date", "DATE"), ("temp", "FLOAT64"), ("dewp", "FLOAT64"),
+    ("slp", "FLOAT64"), ("wdsp", "STRING"), ("prcp", "FLOAT64"), ("max", "FLOAT64"), ("min", "FLOAT64"),
+]
+SENTINELS = {"temp": 9999.9, "wdsp": 999.9, "prcp": 99.99}
+COMPARED = ["date", "temperature", "humidity", "wind_speed", "precipitation", "weather_condition"]
+
+
+def gsod_rows():
+    with open(FIXTURE) as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["date"] = date.fromisoformat(row["date"])
+        for column, _ in GSOD_SCHEMA[3:]:
+            if column != "wdsp":
+                row[column] = float(row[column]) if row[column] else None
+        row["wdsp"] = row["wdsp"] or None
+    return rows
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "GSOD_CACHE_URI", "")
+    main.reset_clients()
+    client = DuckDBBigQueryClient()
+    rows = gsod_rows()
+    # Tablas por año (query por día / bulk) y la wildcard gsod* con su _TABLE_SUFFIX
+    client.create_table("bigquery-public-data.noaa_gsod.gsod*", GSOD_SCHEMA + [("_TABLE_SUFFIX", "STRING")])
+    client.insert("bigquery-public-data.noaa_gsod.gsod*", [dict(row, _TABLE_SUFFIX=str(row["date"].year)) for row in rows])
+    for year in (2023, 2024):
+        client.create_table(f"bigquery-public-data.noaa_gsod.gsod{year}", GSOD_SCHEMA)
+        client.insert(f"bigquery-public-data.noaa_gsod.gsod{year}", [row for row in rows if row["date"].year == year])
+    client.create_table(TARGET, main.weather_data_schema())
+    yield client
+    main.reset_clients()
+
+
+def python_reference():
+    """Agregación diaria en Python (sin centinelas) + convert_noaa_row, independiente del SQL."""
+    by_date = {}
+    for row in gsod_rows():
+        if row["wban"] == main.NOAA_STATION_WBAN and row["temp"] is not None:
+            by_date.setdefault(row["date"], []).append(row)
+
+    def values(rows, column):
+        raw = [float(row[column]) for row in rows if row[column] is not None]
+        return [value for value in raw if value != SENTINELS[column]]
+
+    reference = {}
+    for day, rows in by_date.items():
+        temps, winds, precips = values(rows, "temp"), values(rows, "wdsp"), values(rows, "prcp")
+        aggregated = SimpleNamespace(
+            avg_temp=sum(temps) / len(temps) if temps else None,
+            avg_wind_speed=sum(winds) / len(winds) if winds else None,
+            total_precipitation=sum(precips) if precips else None,
+        )
+        reference[day.isoformat()] = main.convert_noaa_row(aggregated, datetime.combine(day, datetime.min.time()))
+    return reference
+
+
+def comparable(rows):
+    return {
+        str(row["date"]): {column: (str(row[column]) if column == "date" else row[column]) for column in COMPARED}
+        for row in rows
+    }
+
+
+def test_server_side_merge_matches_function_conversion(client, monkeypatch):
+    summary = main.ingest_date_range_server_side(client, START, END)
+    server_side = comparable(client.rows(TARGET, order_by="date"))
+
+    dates = [datetime.combine(day, datetime.min.time()) for day in (date(2023, 12, 26 + i) for i in range(6))]
+    dates += [datetime(2024, 1, day) for day in range(1, 7)]
+    monkeypatch.setattr(main, "VECTORIZE_MIN_ROWS", 10 ** 6)
+    scalar = comparable(main.get_weather_data_bulk(client, dates).values())
+    monkeypatch.setattr(main, "VECTORIZE_MIN_ROWS", 0)
+    vectorized = comparable(main.get_weather_data_bulk(client, dates).values())
+    reference = comparable(python_reference().values())
+
+    # 2024-01-03 no tiene filas de la estación: queda como hueco para el fallback de API
+    assert "2024-01-03" not in server_side
+    assert summary["inserted_days"] == len(server_side) == 11
+    assert server_side == scalar == vectorized == reference
+
+
+def test_sentinels_and_edge_days(client):
+    main.ingest_date_range_server_side(client, START, END)
+    rows = comparable(client.rows(TARGET, order_by="date"))
+
+    # wdsp 999.9 y slp 9999.9 son faltantes; 0.05 in = 1.27 mm
+    assert rows["2023-12-28"]["wind_speed"] is None
+    assert rows["2023-12-28"]["precipitation"] == 1.3
+    assert rows["2023-12-28"]["weather_condition"] == "Drizzle"
+    # prcp 99.99 es faltante: 0.0 mm, no 2539.7
+    assert rows["2023-12-29"]["precipitation"] == 0.0
+    assert rows["2023-12-29"]["weather_condition"] == "Cold"
+    # Dos filas de la misma estación: AVG de temp y wdsp, SUM de prcp (0.58 in)
+    assert rows["2023-12-30"]["temperature"] == 1.9
+    assert rows["2023-12-30"]["precipitation"] == 14.7
+    assert rows["2023-12-30"]["weather_condition"] == "Rain"
+    # Una fila con centinelas en todo y otra válida: sólo cuenta la válida
+    assert rows["2024-01-05"]["temperature"] == -1.1
+    assert rows["2024-01-05"]["wind_speed"] == 5.4
+    # Sólo centinelas: sin temperatura ni viento, precipitación 0 y "Clear"
+    assert rows["2024-01-06"] == {
+        "date": "2024-01-06", "temperature": None, "humidity": None, "wind_speed": None,
+        "precipitation": 0.0, "weather_condition": "Clear",
+    }
+    # 0 °C exacto y 0 nudos son datos, no nulos
+    assert rows["2023-12-27"]["temperature"] == 0.0
+    assert rows["2023-12-27"]["wind_speed"] == 0.0
+    # wdsp vacío (SAFE_CAST a NULL)
+    assert rows["2024-01-02"]["wind_speed"] is None
+    # 31.55 °F = -0.25 °C (-0.24999... en float): half up da -0.2
+    assert rows["2023-12-26"]["temperature"] == -0.2
+    assert rows["2023-12-26"]["weather_condition"] == "Cold"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0.25, 0.3), (-0.25, -0.2), (0.75, 0.8), (-0.75, -0.7), (12.25, 12.3), (-12.25, -12.2), (0.0, 0.0),
+])
+def test_half_up_rounding_matches_sql(value, expected):
+    # Half up (hacia +inf), no half even como round(): round(0.25, 1) == 0.2
+    assert main.round_half_up_1(value) == expected
+    assert noaa_batch.round_half_up_1(np.array([value]))[0] == expected
+
+    expression = "FLOOR(temp_c * 10 + 0.5) / 10"
+    assert expression in main.SERVER_SIDE_MERGE_SQL
+    assert expression in main.STATIONS_MERGE_SQL
+    client = DuckDBBigQueryClient()
+    [row] = client.query(f"SELECT {expression} AS rounded FROM (SELECT CAST({value!r} AS FLOAT64) AS temp_c)").result()
+    assert row.rounded == expected
@@ -0,0 +1,117 @@
+"""
+QueryExecutor con un cliente falso que responde al dry-run con bytes fijos: tope
+por query, presupuesto por corrida y que el job_config del llamador no se modifica.
+"""
+
+import pytest
+
+bigquery = pytest.importorskip("google.cloud.bigquery")
+
+from query_guard import GIB, QueryBudgetExceeded, QueryExecutor, query_parameters  # noqa: E402
+
+SQL = "SELECT * FROM `test-project.chicago_taxi_raw.weather_data` WHERE date = @date"
+
+
+class FakeJob:
+    def __init__(self, total_bytes_processed=None):
+        self.total_bytes_processed = total_bytes_processed
+
+    def result(self):
+        return []
+
+
+class FakeClient:
+    """Dry-run con dry_run_bytes; registra la config de cada query ejecutada."""
+
+    def __init__(self, dry_run_bytes):
+        self.dry_run_bytes = dry_run_bytes
+        self.dry_runs = 0
+        self.executed = []
+
+    def query(self, query, job_config=None, **kwargs):
+        if job_config is not None and job_config.dry_run:
+            self.dry_runs += 1
+            return FakeJob(self.dry_run_bytes)
+        self.executed.append(job_config)
+        return FakeJob()
+
+
+def caller_config():
+    return bigquery.QueryJobConfig(query_parameters=query_parameters({"date": "2024-01-15"}))
+
+
+def test_under_cap_runs_with_maximum_bytes_billed():
+    client = FakeClient(dry_run_bytes=2 * GIB)
+    executor = QueryExecutor(client, max_bytes_per_query=10 * GIB, max_bytes_per_run=100 * GIB)
+
+    executor.query(SQL, job_config=caller_config()).result()
+
+    [config] = client.executed
+    assert config.maximum_bytes_billed == 10 * GIB
+    assert config.priority != bigquery.QueryPriority.BATCH
+    assert executor.summary()["estimated_bytes"] == 2 * GIB
+
+
+def test_over_cap_is_refused_without_running():
+    client = FakeClient(dry_run_bytes=11 * GIB)
+    executor = QueryExecutor(client, max_bytes_per_query=10 * GIB)
+
+    with pytest.raises(QueryBudgetExceeded, match="tope por query"):
+        executor.query(SQL, job_config=caller_config())
+
+    assert client.executed == []
+    assert executor.summary()["refused"] == 1
+
+
+def test_cap_disabled():
+    client = FakeClient(dry_run_bytes=500 * GIB)
+    executor = QueryExecutor(client)
+
+    executor.query(SQL, job_config=caller_config())
+
+    [config] = client.executed
+    assert config.maximum_bytes_billed is None
+    assert executor.summary()["estimated_bytes"] == 500 * GIB
+
+
+def test_dry_run_is_cached_by_query_text():
+    client = FakeClient(dry_run_bytes=GIB)
+    executor = QueryExecutor(client, max_bytes_per_query=10 * GIB)
+
+    for day in ("2024-01-15", "2024-01-16", "2024-01-17"):
+        executor.query(SQL, job_config=bigquery.QueryJobConfig(query_parameters=query_parameters({"date": day})))
+
+    assert client.dry_runs == 1
+    assert len(client.executed) == 3
+
+
+def test_over_run_budget_batch_or_refuse():
+    client = FakeClient(dry_run_bytes=6 * GIB)
+    executor = QueryExecutor(client, max_bytes_per_run=10 * GIB, over_budget="batch")
+    executor.query(SQL)
+    executor.query(SQL)
+    first, second = client.executed
+    assert first.priority != bigquery.QueryPriority.BATCH
+    assert second.priority == bigquery.QueryPriority.BATCH
+
+    executor = QueryExecutor(FakeClient(dry_run_bytes=6 * GIB), max_bytes_per_run=10 * GIB, over_budget="refuse")
+    executor.query(SQL)
+    with pytest.raises(QueryBudgetExceeded, match="presupuesto de la corrida"):
+        executor.query(SQL)
+
+
+def test_caller_job_config_is_not_modified():
+    client = FakeClient(dry_run_bytes=6 * GIB)
+    executor = QueryExecutor(client, max_bytes_per_query=10 * GIB, max_bytes_per_run=10 * GIB)
+    config = caller_config()
+
+    # La segunda query supera el presupuesto y se baja a BATCH: sólo en su copia
+    executor.query(SQL, job_config=config)
+    executor.query(SQL, job_config=config)
+
+    assert config.maximum_bytes_billed is None
+    assert config.priority is None
+    assert not config.dry_run
+    assert [p.value for p in config.query_parameters] == ["2024-01-15"]
+    assert all(executed is not config for executed in client.executed)
+    assert client.executed[1].priority == bigquery.QueryPriority.BATCH
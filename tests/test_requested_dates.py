@@ -0,0 +1,147 @@
+"""
+Fechas pedidas a la función por rango ({"start_date", "end_date"}) o por lista
+({"dates"}): parse_requested_dates, las respuestas de main() con un request
+simulado, como el MockRequest de main.py, y un request {"dates"} de punta a punta
+sobre el cliente emulado en DuckDB.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import main
+
+
+class MockRequest:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def get_json(self, silent=False):
+        return self.payload
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    """Reemplaza BigQuery y la ingesta: registra las fechas que llegan a run_ingestion."""
+    calls = []
+
+    def run_ingestion(client, request_json, target_date=None, requested_dates=None):
+        calls.append(requested_dates)
+        return {"mode": "dates", "total_days": len(requested_dates or [])}
+
+    monkeypatch.setattr(main, "get_bigquery_client", lambda: object())
+    monkeypatch.setattr(main, "run_ingestion", run_ingestion)
+    return calls
+
+
+def test_range_is_inclusive(ingestion):
+    response = main.main(MockRequest({"start_date": "2023-06-29", "end_date": "2023-07-02"}))
+
+    assert response["statusCode"] == 200
+    assert ingestion == [[datetime(2023, 6, 29), datetime(2023, 6, 30), datetime(2023, 7, 1), datetime(2023, 7, 2)]]
+
+
+def test_list_is_sorted_and_deduplicated(ingestion):
+    response = main.main(MockRequest({"dates": ["2023-07-14", "2023-06-03", "2023-07-14"]}))
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["total_days"] == 2
+    assert ingestion == [[datetime(2023, 6, 3), datetime(2023, 7, 14)]]
+
+
+def test_without_dates_is_not_a_dates_request():
+    assert main.parse_requested_dates({}) is None
+    assert main.parse_requested_dates({"stations": True}) is None
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"dates": []}, "dates está vacío"),
+    ({"dates": "2023-06-03"}, "dates debe ser una lista"),
+    ({"dates": ["2023-06-31"]}, "day is out of range"),
+    ({"dates": [20230603]}, "Fechas inválidas"),
+    ({"start_date": "2023-06-01"}, "Falta end_date"),
+    ({"start_date": "2023-06-10", "end_date": "2023-06-01"}, "es anterior a start_date"),
+    ({"start_date": "2023-06-01", "end_date": "2023-06-02", "dates": ["2023-06-03"]}, "no ambos"),
+    ({"start_date": "2023-01-01", "end_date": "2024-12-31"}, "superan el máximo por request"),
+    ({"stations": True, "dates": []}, "dates está vacío"),
+])
+def test_invalid_requests_are_400_before_touching_bigquery(monkeypatch, payload, error):
+    def no_client():
+        raise AssertionError("un request inválido no debe crear el cliente de BigQuery")
+
+    monkeypatch.setattr(main, "get_bigquery_client", no_client)
+    response = main.main(MockRequest(payload))
+
+    assert response["statusCode"] == 400
+    assert error in json.loads(response["body"])["error"]
+
+
+WEATHER_TABLE = "test-project.chicago_taxi_raw.weather_data"
+GSOD_2023 = "bigquery-public-data.noaa_gsod.gsod2023"
+
+
+@pytest.fixture
+def duckdb_client(monkeypatch):
+    """weather_data con 2023-06-03 ya cargado y NOAA con 2023-06-04 y 2023-07-14."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("google.cloud.bigquery")
+    from duckdb_bigquery import DuckDBBigQueryClient
+
+    monkeypatch.setattr(main, "GSOD_CACHE_URI", "")
+    main.reset_clients()
+    main.reset_completeness()
+    client = DuckDBBigQueryClient()
+    client.create_table(WEATHER_TABLE, main.weather_data_schema())
+    client.insert(WEATHER_TABLE, [{
+        "date": date(2023, 6, 3), "temperature": 11.0, "humidity": 70.0, "wind_speed": 2.0,
+        "precipitation": 0.0, "weather_condition": "Clear", "ingestion_timestamp": datetime(2024, 1, 1),
+    }])
+    client.create_table(GSOD_2023, [
+        ("date", "DATE"), ("wban", "STRING"), ("temp", "FLOAT64"), ("dewp", "FLOAT64"),
+        ("slp", "FLOAT64"), ("wdsp", "FLOAT64"), ("prcp", "FLOAT64"), ("max", "FLOAT64"), ("min", "FLOAT64"),
+    ])
+    client.insert(GSOD_2023, [
+        {"date": day, "wban": main.NOAA_STATION_WBAN, "temp": 70.0, "dewp": 50.0, "slp": 1015.0,
+         "wdsp": 6.0, "prcp": 0.0, "max": 80.0, "min": 60.0}
+        for day in (date(2023, 6, 4), date(2023, 7, 14))
+    ])
+    main.set_client("bigquery", client)
+    yield client
+    main.reset_clients()
+    main.reset_completeness()
+
+
+def test_dates_request_end_to_end(duckdb_client, monkeypatch):
+    api_calls = []
+
+    def fake_range_api(start, end):
+        # Días que NOAA no tiene: la API devuelve el tramo pedido
+        api_calls.append((start, end))
+        return [{
+            "date": (start + timedelta(days=offset)).isoformat(), "temperature": 18.0, "humidity": 55.0,
+            "wind_speed": 4.0, "precipitation": 1.2, "weather_condition": "Rain",
+            "ingestion_timestamp": "2024-02-01T00:00:00",
+        } for offset in range((end - start).days + 1)]
+
+    monkeypatch.setattr(main, "get_weather_data_range_from_api", fake_range_api)
+
+    response = main.main(MockRequest({"dates": ["2023-07-14", "2023-06-03", "2023-06-05", "2023-06-04", "2023-07-14"]}))
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["mode"] == "dates"
+    assert (body["total_days"], body["skipped_days"], body["inserted_days"], body["failed_days"]) == (4, 1, 3, 0)
+    assert body["rows_written"] == 3
+    assert body["row_errors"] == []
+    # Sólo el día que NOAA no tiene pasa por la API
+    assert api_calls == [(date(2023, 6, 5), date(2023, 6, 5))]
+
+    rows = duckdb_client.rows(WEATHER_TABLE, order_by="date")
+    assert [row.date for row in rows] == [date(2023, 6, 3), date(2023, 6, 4), date(2023, 6, 5), date(2023, 7, 14)]
+    # El día ya cargado no se reescribe; los nuevos vienen de NOAA (°F -> °C) o de la API
+    by_day = {row.date: row for row in rows}
+    assert by_day[date(2023, 6, 3)].temperature == 11.0
+    assert by_day[date(2023, 6, 4)].temperature == pytest.approx((70.0 - 32) * 5 / 9, abs=0.1)
+    assert by_day[date(2023, 6, 5)].weather_condition == "Rain"
+    assert duckdb_client.count("query", "MERGE") == 1
@@ -0,0 +1,115 @@
+"""Registro de estado de corridas asíncronas: interfaz abstracta, store append-only de BigQuery y heartbeat de la corrida."""
+
+import threading
+import time
+
+import pytest
+
+import main
+import run_status
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        run_status.RunStatusStore()
+
+    class Incomplete(run_status.RunStatusStore):
+        def create(self, run_id, request):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_heartbeat_renews_updated_at_and_never_overwrites_final_status(monkeypatch):
+    monkeypatch.setattr(main, "RUN_HEARTBEAT_SECONDS", 0.01)
+    store = run_status.InMemoryRunStatusStore()
+    store.create("run-1", {"dates": ["2023-06-01"]})
+    store.update("run-1", run_status.RUNNING)
+    started = store.get("run-1")["updated_at"]
+
+    with main._heartbeat(store, "run-1"):
+        time.sleep(0.1)
+        assert store.get("run-1")["updated_at"] > started
+    store.update("run-1", run_status.SUCCEEDED, summary={"mode": "dates"})
+    time.sleep(0.05)
+
+    assert store.get("run-1")["status"] == run_status.SUCCEEDED
+    assert not [thread for thread in threading.enumerate() if thread.name == "weather-heartbeat-run-1"]
+
+
+def test_background_run_records_failure(monkeypatch):
+    store = run_status.InMemoryRunStatusStore()
+    monkeypatch.setattr(main, "RUN_HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(main, "get_client", lambda name: store)
+
+    def failing_ingestion(*args):
+        time.sleep(0.05)
+        raise RuntimeError("NOAA no responde")
+
+    monkeypatch.setattr(main, "run_ingestion", failing_ingestion)
+    store.create("run-2", {})
+    main._run_in_background("run-2", None, {}, None, None)
+
+    record = store.get("run-2")
+    assert record["status"] == run_status.FAILED
+    assert record["error"] == "NOAA no responde"
+
+
+RUNS_TABLE = "test-project.chicago_taxi_raw.weather_ingestion_runs"
+RUNS_SCHEMA = [
+    ("run_id", "STRING"), ("status", "STRING"), ("request", "STRING"), ("summary", "STRING"),
+    ("error", "STRING"), ("created_at", "TIMESTAMP"), ("updated_at", "TIMESTAMP"),
+]
+
+
+@pytest.fixture
+def runs_client():
+    pytest.importorskip("duckdb")
+    pytest.importorskip("google.cloud.bigquery")
+    from duckdb_bigquery import DuckDBBigQueryClient
+
+    client = DuckDBBigQueryClient()
+    client.create_table(RUNS_TABLE, RUNS_SCHEMA, partition_by="CAST(created_at AS DATE)")
+    return client
+
+
+def test_bigquery_store_appends_one_row_per_event_without_dml(runs_client, monkeypatch):
+    monkeypatch.setattr(main, "RUN_HEARTBEAT_SECONDS", 0.01)
+    store = run_status.BigQueryRunStatusStore(runs_client, RUNS_TABLE)
+    store.create("run-3", {"dates": ["2023-06-01"]})
+    store.update("run-3", run_status.RUNNING)
+    accepted = store.get("run-3")
+
+    with main._heartbeat(store, "run-3"):
+        time.sleep(0.1)
+        running = store.get("run-3")
+    store.update("run-3", run_status.SUCCEEDED, summary={"mode": "dates"})
+
+    assert running["status"] == run_status.RUNNING
+    assert running["updated_at"] > accepted["updated_at"]
+    record = store.get("run-3")
+    assert record["status"] == run_status.SUCCEEDED
+    assert record["request"] == {"dates": ["2023-06-01"]}
+    assert record["summary"] == {"mode": "dates"}
+    assert record["created_at"] == accepted["created_at"]
+    # Heartbeats y cambios de estado son filas nuevas: ningún UPDATE/MERGE sobre la tabla
+    assert runs_client.count("stream") == len(runs_client.rows(RUNS_TABLE)) > 3
+    assert runs_client.count("query", "UPDATE") == runs_client.count("query", "MERGE") == 0
+    assert store.get("run-unknown") is None
+
+
+def test_bigquery_store_final_status_wins_over_late_heartbeat(runs_client):
+    store = run_status.BigQueryRunStatusStore(runs_client, RUNS_TABLE)
+    store.create("run-4", {})
+    store.update("run-4", run_status.FAILED, error="NOAA no responde")
+    # Heartbeat con el mismo timestamp que el estado final (o un reloj atrasado)
+    failed_at = runs_client.rows(RUNS_TABLE, order_by="updated_at")[-1].updated_at
+    runs_client.insert(RUNS_TABLE, [{
+        "run_id": "run-4", "status": run_status.RUNNING, "request": None, "summary": None,
+        "error": None, "created_at": failed_at, "updated_at": failed_at,
+    }])
+
+    record = store.get("run-4")
+    assert record["status"] == run_status.FAILED
+    assert record["error"] == "NOAA no responde"
@@ -0,0 +1,54 @@
+"""
+taxi_trips_silver con y sin weather_station_lookup (dbt-duckdb sobre datos
+sintéticos): antes de la primera corrida stations de la función la dimensión no
+existe y el modelo tiene que compilar igual, con pickup_weather_station NULL.
+"""
+
+import shutil
+from datetime import date
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+pytest.importorskip("dbt.adapters.duckdb")
+if shutil.which("dbt") is None:
+    pytest.skip("dbt no está en el PATH", allow_module_level=True)
+
+import generate_synthetic_data  # noqa: E402
+from dbt_duckdb import DbtDuckDBProject  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def raw_parquet_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("raw"))
+    generate_synthetic_data.generate(path, 2_000, date(2023, 6, 1), date(2023, 6, 2))
+    return path
+
+
+def build_silver(tmp_path, raw_parquet_path):
+    project = DbtDuckDBProject(tmp_path, raw_parquet_path)
+    [result] = project.run("run", "--select", "taxi_trips_silver")
+    assert result["status"] == "success"
+    with duckdb.connect(project.database_path, read_only=True) as con:
+        return con.execute(
+            "SELECT COUNT(*), COUNT(pickup_weather_station) FROM chicago_taxi_silver.taxi_trips_silver"
+        ).fetchone()
+
+
+def test_pickups_get_a_station_from_the_lookup(tmp_path, raw_parquet_path):
+    trips, with_station = build_silver(tmp_path, raw_parquet_path)
+    assert trips > 0
+    assert with_station > 0
+
+
+def test_missing_lookup_leaves_station_null(tmp_path, raw_parquet_path):
+    # Mismas tablas raw sin weather_station_lookup
+    without_lookup = tmp_path / "raw"
+    shutil.copytree(raw_parquet_path, without_lookup,
+                    ignore=lambda directory, names: [name for name in names if name == "weather_station_lookup"])
+
+    trips, with_station = build_silver(tmp_path, without_lookup)
+
+    assert trips > 0
+    assert with_station == 0
@@ -0,0 +1,63 @@
+"""
+Test singular dbt/tests/gold_sketch_parity.sql: los sketches de taxi_weather_hourly
+contra el cálculo exacto sobre taxi_trips_silver, con dbt-duckdb sobre datos
+sintéticos. En DuckDB los sketches son listas exactas, así que el test tiene que
+pasar sin diferencias; después se corrompe un día por métrica más allá de la
+tolerancia y el test tiene que reportar exactamente esos días.
+"""
+
+import shutil
+from datetime import date
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+pytest.importorskip("dbt.adapters.duckdb")
+if shutil.which("dbt") is None:
+    pytest.skip("dbt no está en el PATH", allow_module_level=True)
+
+import generate_synthetic_data  # noqa: E402
+from dbt_duckdb import DbtDuckDBProject  # noqa: E402
+
+START = date(2023, 6, 1)
+END = date(2023, 6, 7)
+PARITY_TEST = "gold_sketch_parity"
+
+
+@pytest.fixture(scope="module")
+def project(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp("sketch_parity")
+    raw_parquet_path = str(work_dir / "raw")
+    generate_synthetic_data.generate(raw_parquet_path, 20_000, START, END, n_taxis=800)
+    project = DbtDuckDBProject(work_dir, raw_parquet_path)
+    results = project.run("run", "--select", "+taxi_weather_hourly")
+    assert {result["status"] for result in results} == {"success"}
+    return project
+
+
+def parity_failures(project):
+    [result] = project.run("test", "--select", PARITY_TEST)
+    return result["status"], result["failures"]
+
+
+def test_sketches_match_exact_values(project):
+    assert parity_failures(project) == ("pass", 0)
+
+
+def test_deviation_beyond_tolerance_fails(project):
+    with duckdb.connect(project.database_path) as con:
+        # Un día con la mitad de los taxis (error relativo ~50% > 2%) y otro con la
+        # mediana corrida (duraciones x2: la nueva mediana queda en el rango ~0.8)
+        con.execute("""
+            UPDATE chicago_taxi_gold.taxi_weather_hourly
+            SET taxi_id_sketch = list_filter(taxi_id_sketch, x -> hash(x) % 2 = 0)
+            WHERE trip_date = DATE '2023-06-06'
+        """)
+        con.execute("""
+            UPDATE chicago_taxi_gold.taxi_weather_hourly
+            SET trip_seconds_sketch = list_transform(trip_seconds_sketch, x -> x * 2)
+            WHERE trip_date = DATE '2023-06-07'
+        """)
+
+    assert parity_failures(project) == ("fail", 2)
@@ -0,0 +1,130 @@
+"""
+Delta diario de taxis (taxi_sources.ingest_taxi_delta) con ParquetTaxiSource sobre el
+cliente emulado en DuckDB: watermark guardado, ventana [since, until), staging por
+corrida y MERGE por unique_key.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("duckdb")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("google.cloud.bigquery")
+
+import taxi_sources  # noqa: E402
+from duckdb_bigquery import DuckDBBigQueryClient  # noqa: E402
+
+RAW = "test-project.chicago_taxi_raw.taxi_trips_raw_table"
+WATERMARKS = "test-project.chicago_taxi_raw.taxi_delta_watermarks"
+RUN_ID = "scheduled__2024-01-05T00:00:00+00:00"
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def trip(unique_key, start, fare=10.0, trip_seconds=600):
+    row = {name: None for name, _ in taxi_sources.TAXI_RAW_SCHEMA}
+    row.update(unique_key=unique_key, taxi_id="taxi-1", trip_start_timestamp=start, trip_seconds=trip_seconds,
+               trip_miles=2.5, fare=fare, trip_total=fare, pickup_community_area=8, payment_type="Cash")
+    return row
+
+
+def write_parquet(path, rows):
+    arrow_types = {"STRING": pa.string(), "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+                   "INT64": pa.int64(), "FLOAT64": pa.float64()}
+    schema = pa.schema([(name, arrow_types[field_type]) for name, field_type in taxi_sources.TAXI_RAW_SCHEMA])
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), path)
+
+
+@pytest.fixture
+def client():
+    client = DuckDBBigQueryClient()
+    client.create_table(RAW, taxi_sources.taxi_raw_schema(), partition_by="DATE(trip_start_timestamp)")
+    client.create_table(WATERMARKS, [("raw_table", "STRING"), ("source", "STRING"), ("watermark", "TIMESTAMP"),
+                                     ("run_id", "STRING"), ("updated_at", "TIMESTAMP")])
+    client.insert(RAW, [
+        trip("a", utc(2024, 1, 1, 9)),
+        trip("b", utc(2024, 1, 2, 9)),
+        trip("c", utc(2024, 1, 3, 12)),
+    ])
+    return client
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "trips.parquet")
+    write_parquet(path, [
+        trip("a", utc(2024, 1, 1, 9), fare=99.0),    # fuera del lookback: no se vuelve a comparar
+        trip("b", utc(2024, 1, 2, 9), fare=12.5),    # corrección de un viaje ya cargado
+        trip("c", utc(2024, 1, 3, 12)),              # sin cambios
+        trip("d", utc(2024, 1, 3, 18)),
+        trip("e", utc(2024, 1, 4, 23, 59)),
+        trip("f", utc(2024, 1, 4, 8), trip_seconds=0),  # filtro de calidad
+        trip("g", utc(2024, 1, 5, 10)),              # después de until de la primera corrida
+    ])
+    return taxi_sources.ParquetTaxiSource(path)
+
+
+def raw_fares(client):
+    return {row.unique_key: row.fare for row in client.rows(RAW)}
+
+
+def test_delta_bounded_by_watermark_and_until(client, source):
+    summary = taxi_sources.ingest_taxi_delta(client, source, RAW, lookback_days=1, run_id=RUN_ID,
+                                             until=utc(2024, 1, 5))
+
+    # Sin watermark guardado: sale de raw (última partición 2024-01-03, lookback de 1 día)
+    assert summary["since"] == "2024-01-02T00:00:00+00:00"
+    assert summary["staged_rows"] == 4
+    assert raw_fares(client) == {"a": 10.0, "b": 12.5, "c": 10.0, "d": 10.0, "e": 10.0}
+    assert summary["new_watermark"] == "2024-01-04T23:59:00+00:00"
+    [saved] = client.rows(WATERMARKS)
+    assert (saved.raw_table, saved.source, saved.watermark, saved.run_id) == (
+        RAW, "parquet", utc(2024, 1, 4, 23, 59), RUN_ID)
+
+    # Staging propia de la corrida y borrada al terminar
+    staging = taxi_sources.staging_table_for_run(RAW, RUN_ID)
+    assert staging == f"{RAW}_delta_staging_scheduled__2024_01_05T00_00_00_00_00"
+    assert ("load", staging) in client.jobs
+    assert staging not in client.tables()
+
+
+def test_next_run_starts_from_saved_watermark(client, source):
+    taxi_sources.ingest_taxi_delta(client, source, RAW, lookback_days=1, run_id=RUN_ID, until=utc(2024, 1, 5))
+    client.jobs.clear()
+
+    summary = taxi_sources.ingest_taxi_delta(client, source, RAW, lookback_days=1,
+                                             run_id="scheduled__2024-01-06T00:00:00+00:00", until=utc(2024, 1, 6))
+
+    # Watermark guardado (2024-01-04 23:59) menos 1 día: no vuelve a leer particiones de raw
+    assert summary["watermark"] == "2024-01-04T23:59:00+00:00"
+    assert summary["since"] == "2024-01-03T00:00:00+00:00"
+    assert not any("INFORMATION_SCHEMA" in sql for _, sql in client.jobs)
+    # c, d, e sin cambios y g nuevo: el MERGE sólo inserta g
+    assert summary["staged_rows"] == 4
+    assert summary["merged_rows"] == 1
+    assert set(raw_fares(client)) == {"a", "b", "c", "d", "e", "g"}
+    [saved] = client.rows(WATERMARKS)
+    assert saved.watermark == utc(2024, 1, 5, 10)
+
+
+def test_watermark_never_moves_back(client):
+    taxi_sources.save_watermark(client, WATERMARKS, RAW, "public", utc(2024, 1, 5), "run-1")
+    taxi_sources.save_watermark(client, WATERMARKS, RAW, "public", utc(2024, 1, 3), "run-2")
+    assert taxi_sources.read_watermark(client, WATERMARKS, RAW, "public") == utc(2024, 1, 5)
+    assert taxi_sources.read_watermark(client, WATERMARKS, RAW, "parquet") is None
+
+
+def test_public_export_is_bounded_by_the_window():
+    source = taxi_sources.PublicDatasetTaxiSource("gs://bucket/exports")
+    sql = source.export_sql("gs://bucket/exports/delta/part-*.parquet", utc(2024, 1, 3), utc(2024, 1, 5))
+    assert "trip_start_timestamp >= TIMESTAMP '2024-01-03T00:00:00+00:00'" in sql
+    assert "trip_start_timestamp < TIMESTAMP '2024-01-05T00:00:00+00:00'" in sql
+
+
+def test_source_interface_is_abstract():
+    with pytest.raises(TypeError):
+        taxi_sources.TaxiTripSource()
@@ -0,0 +1,217 @@
+"""
+Telemetría de la función (telemetry.py): tiempos y errores por etapa de @stage,
+bytes y cantidad de jobs del cliente envuelto en el resumen JSON, delegación del
+cliente y de los jobs, y la ingesta en curso acotada a su contextvar.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import telemetry
+
+
+class FakeJob:
+    job_id = "job-1"
+    statement_type = "SELECT"
+
+    def __init__(self, rows, bytes_processed, cache_hit=False):
+        self.rows = rows
+        self.total_bytes_processed = bytes_processed
+        self.total_bytes_billed = bytes_processed
+        self.slot_millis = 7
+        self.cache_hit = cache_hit
+        self.result_calls = []
+
+    def result(self, *args, **kwargs):
+        self.result_calls.append((args, kwargs))
+        return self.rows
+
+
+class FakeClient:
+    project = "test-project"
+
+    def __init__(self):
+        self.calls = []
+
+    def query(self, query, job_config=None, location=None):
+        self.calls.append(("query", query, job_config, location))
+        return FakeJob([{"n": 1}], 1024, cache_hit=query.startswith("SELECT 1"))
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        self.calls.append(("load", file_obj, destination, job_config))
+        return FakeJob([], 0)
+
+    def insert_rows_json(self, table, rows):
+        self.calls.append(("stream", table, rows))
+        return []
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    """Telemetría habilitada y los eventos emitidos (incluido el log JSON del hook por defecto)."""
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", True)
+    events, logged = [], []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            logged.append(json.loads(record.getMessage()))
+
+    handler = Capture()
+    telemetry._json_logger.addHandler(handler)
+    telemetry.add_hook(events.append)
+    yield events, logged
+    telemetry.remove_hook(events.append)
+    telemetry._json_logger.removeHandler(handler)
+
+
+def stages():
+    @telemetry.stage("fetch")
+    def fetch(delay):
+        time.sleep(delay)
+        return delay
+
+    @telemetry.stage("convert")
+    def convert():
+        raise ValueError("fila inválida")
+
+    return fetch, convert
+
+
+def test_summary_has_stage_timings_and_job_totals(enabled):
+    events, logged = enabled
+    fetch, convert = stages()
+
+    with telemetry.Telemetry() as run:
+        client = telemetry.wrap_client(FakeClient(), run)
+        assert fetch(0.02) == 0.02
+        fetch(0.01)
+        with pytest.raises(ValueError):
+            convert()
+        client.query("SELECT 1").result()
+        client.query("SELECT * FROM t").result()
+        client.load_table_from_file(object(), "dataset.table").result()
+        summary = run.summary(mode="dates")
+
+    assert summary["mode"] == "dates"
+    assert summary["stages"]["fetch"]["calls"] == 2
+    assert summary["stages"]["fetch"]["total_ms"] >= 30
+    assert summary["stages"]["fetch"]["max_ms"] >= 20
+    assert (summary["stages"]["convert"]["calls"], summary["stages"]["convert"]["errors"]) == (1, 1)
+    assert summary["bigquery"] == {
+        "jobs": 3, "bytes_processed": 2048, "bytes_billed": 2048, "slot_ms": 21, "cache_hits": 1
+    }
+    assert summary["wall_ms"] >= summary["stages"]["fetch"]["total_ms"]
+
+    # Hooks: un evento por etapa y por job, y el resumen; el log JSON lleva jobs y resumen
+    assert [event["type"] for event in events].count("stage") == 3
+    assert [event["kind"] for event in events if event["type"] == "job"] == ["query", "query", "load"]
+    assert [record["message"] for record in logged] == ["telemetry job"] * 3 + ["telemetry summary"]
+    logged_summary = logged[-1]["telemetry"]
+    assert logged_summary["telemetry_run"] == run.run_id
+    assert logged_summary["bigquery"] == summary["bigquery"]
+    assert logged_summary["stages"]["fetch"]["calls"] == 2
+
+
+def test_wrapped_client_delegates_calls_and_attributes(enabled):
+    client = FakeClient()
+    with telemetry.Telemetry() as run:
+        wrapped = telemetry.wrap_client(client, run)
+        job = wrapped.query("SELECT * FROM t", job_config="config", location="US")
+        assert job.job_id == "job-1"
+        assert job.total_bytes_processed == 1024
+        assert job.result(timeout=30) == [{"n": 1}]
+        assert job._job.result_calls == [((), {"timeout": 30})]
+
+        source = object()
+        wrapped.load_table_from_file(source, "dataset.table", job_config="load-config").result()
+        # Lo que no es un job pasa directo al cliente
+        assert wrapped.insert_rows_json("dataset.table", [{"a": 1}]) == []
+        assert wrapped.project == "test-project"
+
+    assert client.calls == [
+        ("query", "SELECT * FROM t", "config", "US"),
+        ("load", source, "dataset.table", "load-config"),
+        ("stream", "dataset.table", [{"a": 1}]),
+    ]
+    assert run.jobs["jobs"] == 2
+
+
+def test_job_is_recorded_even_if_result_fails(enabled):
+    class FailingJob(FakeJob):
+        def result(self, *args, **kwargs):
+            raise RuntimeError("quota")
+
+    class FailingClient(FakeClient):
+        def query(self, query, **kwargs):
+            return FailingJob([], 512)
+
+    with telemetry.Telemetry() as run:
+        with pytest.raises(RuntimeError):
+            telemetry.wrap_client(FailingClient(), run).query("SELECT 2").result()
+    assert run.jobs["jobs"] == 1
+    assert run.jobs["bytes_processed"] == 512
+
+
+def test_disabled_or_without_run_is_a_no_op(enabled, monkeypatch):
+    client = FakeClient()
+    assert telemetry.wrap_client(client, None) is client
+    fetch, _ = stages()
+    # Fuera de una ingesta las etapas no registran nada
+    assert fetch(0) == 0
+    assert telemetry.current() is None
+
+    # Deshabilitada: @stage devuelve la función original y el cliente no se envuelve
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", False)
+    plain_fetch, _ = stages()
+    with telemetry.Telemetry() as run:
+        assert telemetry.wrap_client(client, run) is client
+        assert not hasattr(plain_fetch, "__wrapped__")
+        plain_fetch(0)
+    assert run.stages == {}
+
+
+def test_runs_do_not_leak_state(enabled):
+    fetch, _ = stages()
+
+    with telemetry.Telemetry() as first:
+        assert telemetry.current() is first
+        fetch(0)
+    assert telemetry.current() is None
+
+    with telemetry.Telemetry() as second:
+        assert telemetry.current() is second
+        # Los threads del pool de fetch heredan la ingesta con copy_context
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(fetch, 0))
+        worker.start()
+        worker.join()
+    assert telemetry.current() is None
+    assert first.stages["fetch"]["calls"] == 1
+    assert second.stages["fetch"]["calls"] == 1
+    assert first.run_id != second.run_id
+
+
+def test_concurrent_runs_record_only_their_own_stages(enabled):
+    fetch, _ = stages()
+    runs = {}
+    barrier = threading.Barrier(2)
+
+    def ingest(name, calls):
+        with telemetry.Telemetry() as run:
+            runs[name] = run
+            barrier.wait()
+            for _ in range(calls):
+                fetch(0.001)
+
+    threads = [threading.Thread(target=ingest, args=(name, calls)) for name, calls in (("a", 2), ("b", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert runs["a"].stages["fetch"]["calls"] == 2
+    assert runs["b"].stages["fetch"]["calls"] == 5
@@ -0,0 +1,122 @@
+"""
+Fallback de Visual Crossing por tramos: iter_days sobre respuestas cortadas en
+chunks al azar, contiguous_runs, y fetch_weather_from_api contra el stub local que
+cuenta requests (un request por tramo en lugar de uno por día).
+"""
+
+import json
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import main
+import visual_crossing
+from timeline_stub import TimelineStub, fake_api_day
+
+PAYLOAD = json.dumps({
+    "queryCost": 3,
+    "latitude": 41.8781,
+    "resolvedAddress": "Chicago, IL, éste \"sur\"",
+    "days": [
+        {**fake_api_day(date(2023, 6, 1)), "tempmax": 41.87, "description": "Lluvia [intensa], {viento}"},
+        {**fake_api_day(date(2023, 6, 2)), "hours": [{"temp": -1.5e-1}, {"temp": 2}]},
+        fake_api_day(date(2023, 6, 3)),
+    ],
+    "stations": {"KMDW": {"distance": 14000.0}},
+}, indent=1, ensure_ascii=False).encode("utf-8")
+
+
+def random_chunks(payload, rng, max_size=7):
+    chunks, offset = [], 0
+    while offset < len(payload):
+        size = rng.randint(0, max_size)
+        chunks.append(payload[offset:offset + size])
+        offset += size
+    return chunks
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_iter_days_matches_json_loads_for_any_chunking(seed):
+    # Chunks de 0 a 7 bytes: cortan números, strings escapados y caracteres UTF-8 multibyte
+    chunks = random_chunks(PAYLOAD, random.Random(seed))
+    assert list(visual_crossing.iter_days(chunks)) == json.loads(PAYLOAD)["days"]
+
+
+def test_iter_days_single_chunk_and_empty_days():
+    assert list(visual_crossing.iter_days([PAYLOAD])) == json.loads(PAYLOAD)["days"]
+    assert list(visual_crossing.iter_days([b'{"days": [], "queryCost": 0}'])) == []
+    assert list(visual_crossing.iter_days([b'{"queryCost": 0}'])) == []
+
+
+@pytest.mark.parametrize("cut", [len(PAYLOAD) // 3, len(PAYLOAD) // 2, len(PAYLOAD) - 2])
+def test_truncated_payload_raises(cut):
+    with pytest.raises(ValueError):
+        list(visual_crossing.iter_days(random_chunks(PAYLOAD[:cut], random.Random(cut))))
+
+
+def test_contiguous_runs():
+    days = [date(2023, 6, 3), date(2023, 6, 1), date(2023, 6, 2), date(2023, 6, 2),
+            date(2023, 6, 10), date(2023, 6, 30), date(2023, 7, 1)]
+    assert visual_crossing.contiguous_runs(days, 31) == [
+        (date(2023, 6, 1), date(2023, 6, 3)),
+        (date(2023, 6, 10), date(2023, 6, 10)),
+        (date(2023, 6, 30), date(2023, 7, 1)),
+    ]
+    # Un tramo largo se parte en max_span días
+    long_run = [date(2023, 1, 1) + timedelta(days=i) for i in range(70)]
+    assert visual_crossing.contiguous_runs(long_run, 31) == [
+        (date(2023, 1, 1), date(2023, 1, 31)),
+        (date(2023, 2, 1), date(2023, 3, 3)),
+        (date(2023, 3, 4), date(2023, 3, 11)),
+    ]
+    assert visual_crossing.contiguous_runs([], 31) == []
+
+
+# Días sin NOAA: sueltos, un tramo que cruza de mes y uno más largo que API_MAX_RANGE_DAYS
+GAPS = [datetime(2023, 6, 1) + timedelta(days=i) for i in (0, 1, 2, 9, 29, 30)] + [
+    datetime(2023, 8, 1) + timedelta(days=i) for i in range(40)
+]
+
+
+@pytest.fixture
+def api_stub(monkeypatch):
+    pytest.importorskip("requests")
+    # El stub no devuelve 2023-08-15 aunque esté dentro del tramo pedido
+    with TimelineStub(missing_days=[date(2023, 8, 15)]) as stub:
+        monkeypatch.setattr(main, "WEATHER_API_URL", stub.url)
+        monkeypatch.setattr(main, "WEATHER_API_KEY", "stub")
+        monkeypatch.setattr(main, "API_RATE_LIMITER", main.HostRateLimiter(0))
+        main.reset_clients()
+        yield stub
+    main.reset_clients()
+
+
+def test_fallback_makes_one_request_per_run(api_stub, monkeypatch):
+    monkeypatch.setattr(main, "API_MAX_RANGE_DAYS", 31)
+
+    results = list(main.fetch_weather_from_api(GAPS, max_workers=4))
+
+    assert sorted(api_stub.requests) == [
+        (date(2023, 6, 1), date(2023, 6, 3)),
+        (date(2023, 6, 10), date(2023, 6, 10)),
+        (date(2023, 6, 30), date(2023, 7, 1)),
+        (date(2023, 8, 1), date(2023, 8, 31)),
+        (date(2023, 9, 1), date(2023, 9, 9)),
+    ]
+    assert [day for day, _, _ in results] == GAPS
+    # El día que no vino en la respuesta queda como fallido; el resto con sus datos
+    assert [day for day, _, error in results if error is not None] == [datetime(2023, 8, 15)]
+    rows = {day: data for day, data, error in results if error is None}
+    assert rows[datetime(2023, 6, 30)]["date"] == "2023-06-30"
+    assert rows[datetime(2023, 6, 30)]["temperature"] == fake_api_day(date(2023, 6, 30))["tempmax"]
+
+
+def test_max_range_zero_is_one_request_per_day(api_stub, monkeypatch):
+    monkeypatch.setattr(main, "API_MAX_RANGE_DAYS", 0)
+
+    results = list(main.fetch_weather_from_api(GAPS, max_workers=4))
+
+    assert len(api_stub.requests) == len(GAPS)
+    assert all(start == end for start, end in api_stub.requests)
+    assert [day for day, _, error in results if error is not None] == [datetime(2023, 8, 15)]
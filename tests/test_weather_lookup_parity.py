@@ -0,0 +1,148 @@
+"""
+WeatherLookup contra weather_silver.sql (dbt-duckdb): las mismas filas de weather_data
+pasan por el modelo y por enrich / enrich_arrow, y tienen que dar la misma fila por
+fecha, las mismas categorías (incluida la temperatura NULL en el ELSE) y los mismos
+días sin clima. Los timestamps nulos / NaT van al casillero centinela.
+"""
+
+import shutil
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("dbt.adapters.duckdb")
+if shutil.which("dbt") is None:
+    pytest.skip("dbt no está en el PATH", allow_module_level=True)
+
+from dbt_duckdb import DbtDuckDBProject  # noqa: E402
+from generate_synthetic_data import WEATHER_SCHEMA  # noqa: E402
+from weather_lookup import SILVER_END_DATE, SILVER_START_DATE, WeatherLookup  # noqa: E402
+
+
+def ingested(day, hour=6):
+    return datetime(2024, 1, day, hour, tzinfo=timezone.utc)
+
+
+# (fecha, temperatura, condición, ingesta): cada condición de la macro, una
+# desconocida y una NULL, temperaturas en los bordes y NULL, y re-ingestas
+RAW_WEATHER = [
+    (date(2023, 5, 31), 15.0, "Clear", ingested(1)),  # fuera de la ventana de silver
+    (date(2023, 6, 1), -0.5, "Snow", ingested(1)),
+    (date(2023, 6, 2), 0.0, "Sleet", ingested(1)),
+    (date(2023, 6, 3), 9.99, "Rain", ingested(1)),
+    (date(2023, 6, 3), 12.0, "Drizzle", ingested(2)),  # re-ingesta: gana la más reciente
+    (date(2023, 6, 4), 10.0, "Thunderstorm", ingested(1)),
+    (date(2023, 6, 5), 19.9, "Sun", ingested(1)),
+    # 2023-06-06 sin fila
+    (date(2023, 6, 7), 20.0, "Clouds", ingested(2)),
+    (date(2023, 6, 7), 5.0, "Clear", ingested(1)),
+    (date(2023, 6, 8), 29.9, "Mist", ingested(1)),
+    (date(2023, 6, 9), 30.0, "Fog", ingested(1)),
+    (date(2023, 6, 10), None, "Haze", ingested(1)),  # temperatura NULL -> 'Hot'
+    (date(2023, 6, 11), 25.0, None, ingested(1)),  # condición NULL -> 'Other'
+    (date(2024, 1, 1), 1.0, "Clear", ingested(3)),  # fuera de la ventana de silver
+]
+
+QUERY_DAYS = [date(2023, 5, 31)] + [date(2023, 6, day) for day in range(1, 13)] + [date(2024, 1, 1)]
+COLUMNS = ("temperature", "weather_condition", "weather_category", "temperature_category")
+
+
+@pytest.fixture(scope="module")
+def raw_table():
+    return pa.table({
+        "date": [row[0] for row in RAW_WEATHER],
+        "temperature": [row[1] for row in RAW_WEATHER],
+        "humidity": [60.0] * len(RAW_WEATHER),
+        "wind_speed": [3.5] * len(RAW_WEATHER),
+        "precipitation": [0.0] * len(RAW_WEATHER),
+        "weather_condition": [row[2] for row in RAW_WEATHER],
+        "ingestion_timestamp": [row[3] for row in RAW_WEATHER],
+    }, schema=WEATHER_SCHEMA)
+
+
+@pytest.fixture(scope="module")
+def silver(tmp_path_factory, raw_table):
+    """weather_silver por fecha, construido por dbt sobre raw_table."""
+    raw_dir = tmp_path_factory.mktemp("raw")
+    (raw_dir / "weather_data").mkdir()
+    pq.write_table(raw_table, raw_dir / "weather_data" / "part-00000.parquet")
+
+    project = DbtDuckDBProject(tmp_path_factory.mktemp("dbt"), raw_dir)
+    [result] = project.run("run", "--select", "weather_silver")
+    assert result["status"] == "success"
+    with duckdb.connect(project.database_path, read_only=True) as con:
+        rows = con.execute(f"SELECT date, {', '.join(COLUMNS)} FROM chicago_taxi_silver.weather_silver").fetchall()
+    return {row[0]: dict(zip(COLUMNS, row[1:])) for row in rows}
+
+
+def noon(day):
+    return np.datetime64(f"{day.isoformat()}T12:00:00")
+
+
+def expected(silver, day):
+    return silver.get(day, dict.fromkeys(COLUMNS))
+
+
+def as_python(value):
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
+
+
+@pytest.mark.parametrize("source", ["rows", "arrow"])
+def test_enrich_matches_weather_silver(silver, raw_table, source):
+    if source == "rows":
+        rows = [SimpleNamespace(**row) for row in raw_table.to_pylist()]
+        lookup = WeatherLookup.from_rows(rows, start_date=SILVER_START_DATE, end_date=SILVER_END_DATE)
+    else:
+        lookup = WeatherLookup.from_arrow(raw_table, start_date=SILVER_START_DATE, end_date=SILVER_END_DATE)
+
+    enriched = lookup.enrich(np.array([noon(day) for day in QUERY_DAYS]))
+
+    # Los días fuera de la ventana y 2023-06-06 no están en silver ni en el índice
+    assert sorted(silver) == [date(2023, 6, day) for day in (1, 2, 3, 4, 5, 7, 8, 9, 10, 11)]
+    for i, day in enumerate(QUERY_DAYS):
+        assert bool(enriched["has_weather"][i]) == (day in silver), day
+        for column in COLUMNS:
+            assert as_python(enriched[column][i]) == expected(silver, day)[column], (day, column)
+
+    # Las reglas de las macros, explícitas
+    assert silver[date(2023, 6, 10)]["temperature_category"] == "Hot"
+    assert silver[date(2023, 6, 10)]["weather_category"] == "Other"
+    assert silver[date(2023, 6, 11)]["weather_category"] == "Other"
+    assert silver[date(2023, 6, 3)]["weather_condition"] == "Drizzle"
+
+
+def test_enrich_arrow_matches_weather_silver(silver, raw_table):
+    lookup = WeatherLookup.from_arrow(raw_table, start_date=SILVER_START_DATE, end_date=SILVER_END_DATE)
+    timestamps = pa.array([datetime(d.year, d.month, d.day, 12, tzinfo=timezone.utc) for d in QUERY_DAYS],
+                          pa.timestamp("us", tz="UTC"))
+
+    enriched = lookup.enrich_arrow(timestamps).to_pydict()
+
+    for i, day in enumerate(QUERY_DAYS):
+        assert enriched["has_weather"][i] == (day in silver), day
+        for column in COLUMNS:
+            assert enriched[column][i] == expected(silver, day)[column], (day, column)
+
+
+def test_null_and_nat_timestamps_use_the_sentinel(raw_table):
+    lookup = WeatherLookup.from_arrow(raw_table, start_date=SILVER_START_DATE, end_date=SILVER_END_DATE)
+    sentinel = lookup.span
+
+    numpy_ts = np.array([noon(date(2023, 6, 1)), np.datetime64("NaT")], dtype="datetime64[us]")
+    pandas_ts = pd.Series(pd.to_datetime(["2023-06-01T12:00:00Z", None], utc=True))
+    arrow_ts = pa.array([datetime(2023, 6, 1, 12), None], pa.timestamp("ns"))
+    for timestamps in (numpy_ts, pandas_ts, arrow_ts):
+        assert lookup.slot_indexes(timestamps).tolist() == [0, sentinel]
+
+    enriched = lookup.enrich(numpy_ts)
+    assert enriched["has_weather"].tolist() == [True, False]
+    assert np.isnan(enriched["temperature"][1])
+    assert enriched["weather_category"].tolist() == ["Snowy", None]
+    assert enriched["temperature_category"].tolist() == ["Freezing", None]
+    assert lookup.enrich_arrow(arrow_ts).column("temperature").to_pylist() == [-0.5, None]
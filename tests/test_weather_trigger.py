@@ -0,0 +1,106 @@
+"""
+WeatherIngestionTrigger contra un endpoint aiohttp local con el contrato de la
+función: corridas que terminan, corridas sin heartbeat y el timeout del defer.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("airflow.models")
+web = pytest.importorskip("aiohttp.web")
+
+import weather_trigger  # noqa: E402
+from airflow.exceptions import TaskDeferred  # noqa: E402
+
+
+class FakeFunction:
+    """Corridas en memoria: "ok" termina en la segunda consulta, "dead" deja de latir."""
+
+    def __init__(self):
+        self.runs = {}
+        self.polls = {}
+
+    async def handle(self, request):
+        payload = await request.json()
+        now = datetime.now(timezone.utc)
+        if "run_id" in payload:
+            run_id = payload["run_id"]
+            self.polls[run_id] = self.polls.get(run_id, 0) + 1
+            record = self.runs[run_id]
+            if record["kind"] == "ok":
+                record["updated_at"] = now.isoformat()
+                if self.polls[run_id] >= 2:
+                    record.update(status="SUCCEEDED", summary={"mode": "dates", "inserted_days": 3})
+            return web.json_response({"statusCode": 200, "body": record})
+        run_id = f"run-{len(self.runs)}"
+        started = now - timedelta(hours=1) if payload["kind"] == "dead" else now
+        self.runs[run_id] = {"run_id": run_id, "kind": payload["kind"], "status": "RUNNING",
+                             "updated_at": started.isoformat(), "summary": None, "error": None}
+        return web.json_response({"statusCode": 202, "body": {"run_id": run_id, "status": "ACCEPTED"}})
+
+
+async def run_trigger(payloads, **kwargs):
+    function = FakeFunction()
+    app = web.Application()
+    app.router.add_post("/", function.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        trigger = weather_trigger.WeatherIngestionTrigger(
+            f"http://127.0.0.1:{port}/", payloads, poll_interval=0.01, **kwargs
+        )
+        events = [event async for event in trigger.run()]
+    finally:
+        await runner.cleanup()
+    return function, events
+
+
+@pytest.fixture(autouse=True)
+def no_id_token(monkeypatch):
+    monkeypatch.setattr(weather_trigger, "fetch_id_token", lambda audience: None)
+
+
+def test_runs_succeed():
+    function, [event] = asyncio.run(run_trigger([{"kind": "ok"}, {"kind": "ok"}], max_parallel=1))
+    assert event.payload["status"] == "success"
+    assert [run["status"] for run in event.payload["runs"]] == ["SUCCEEDED", "SUCCEEDED"]
+    assert set(function.polls.values()) == {2}
+
+
+def test_run_without_heartbeat_is_failed():
+    function, [event] = asyncio.run(run_trigger([{"kind": "ok"}, {"kind": "dead"}], stale_after=600))
+    ok, dead = event.payload["runs"]
+    assert event.payload["status"] == "error"
+    assert ok["status"] == "SUCCEEDED"
+    assert dead["status"] == "FAILED"
+    assert "Sin heartbeat" in dead["error"]
+    # Se descarta en la primera consulta, sin esperar más
+    assert function.polls[dead["run_id"]] == 1
+
+
+def test_is_stale():
+    now = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    recent = (now - timedelta(minutes=5)).isoformat()
+    old = (now - timedelta(minutes=20)).isoformat()
+    assert not weather_trigger.is_stale({"status": "RUNNING", "updated_at": recent}, 900, now)
+    assert weather_trigger.is_stale({"status": "RUNNING", "updated_at": old}, 900, now)
+    assert weather_trigger.is_stale({"status": "ACCEPTED", "updated_at": old}, 900, now)
+    assert not weather_trigger.is_stale({"status": "SUCCEEDED", "updated_at": old}, 900, now)
+    # updated_at sin zona horaria se interpreta como UTC
+    assert weather_trigger.is_stale({"status": "RUNNING", "updated_at": "2024-01-01T11:00:00"}, 900, now)
+
+
+def test_defer_has_timeout():
+    operator = weather_trigger.WeatherIngestionOperator(
+        task_id="trigger_weather", function_url="http://localhost", payloads=[{"kind": "ok"}],
+        defer_timeout=timedelta(hours=2), stale_after=300,
+    )
+    with pytest.raises(TaskDeferred) as deferred:
+        operator.execute({})
+    assert deferred.value.timeout == timedelta(hours=2)
+    assert deferred.value.trigger.serialize()[1]["stale_after"] == 300
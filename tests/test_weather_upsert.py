@@ -0,0 +1,119 @@
+"""
+Escrituras con upsert de weather_data (WeatherRowWriter + UPSERT_MERGE_SQL) sobre el
+cliente emulado en DuckDB: un MERGE por flush, re-corridas idempotentes y el filtro
+de metadatos de partición que evita volver a pedir días ya cargados.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("google.cloud.bigquery")
+
+import main  # noqa: E402
+from duckdb_bigquery import DuckDBBigQueryClient  # noqa: E402
+
+TARGET = "test-project.chicago_taxi_raw.weather_data"
+GSOD_2023 = "bigquery-public-data.noaa_gsod.gsod2023"
+START = datetime(2023, 6, 1)
+
+
+def weather_row(day, temperature, ingested="2024-01-01T00:00:00"):
+    return {
+        "date": day.date().isoformat(),
+        "temperature": temperature,
+        "humidity": None,
+        "wind_speed": 3.1,
+        "precipitation": 0.0,
+        "weather_condition": "Clear",
+        "ingestion_timestamp": ingested,
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "GSOD_CACHE_URI", "")
+    main.reset_clients()
+    main.reset_completeness()
+    client = DuckDBBigQueryClient()
+    client.create_table(TARGET, main.weather_data_schema())
+    yield client
+    main.reset_clients()
+    main.reset_completeness()
+
+
+def test_flush_issues_a_single_merge(client):
+    writer = main.WeatherRowWriter(client, upsert=True)
+    for offset in range(40):
+        writer.add(weather_row(START + timedelta(days=offset), 20.0))
+
+    assert writer.flush() == {"written": 40, "failed": 0}
+    assert client.count("query", "MERGE") == 1
+    assert client.count("load") == 1
+    # La tabla staging se borra después del MERGE
+    assert client.tables() == [TARGET]
+
+
+def test_rerun_keeps_one_row_per_date_and_latest_values(client):
+    days = [START + timedelta(days=offset) for offset in range(10)]
+    first = main.WeatherRowWriter(client, upsert=True)
+    for day in days:
+        first.add(weather_row(day, 20.0))
+    first.flush()
+
+    # Misma corrida repetida (con un día duplicado dentro del lote) y valores nuevos
+    second = main.WeatherRowWriter(client, upsert=True)
+    for day in days + days[:1]:
+        second.add(weather_row(day, 25.0, ingested="2024-02-01T00:00:00"))
+    second.add(weather_row(days[0], 26.0, ingested="2024-03-01T00:00:00"))
+    second.flush()
+
+    rows = client.rows(TARGET, order_by="date")
+    assert [row.date for row in rows] == [day.date() for day in days]
+    assert rows[0].temperature == 26.0
+    assert {row.temperature for row in rows[1:]} == {25.0}
+    assert client.count("query", "MERGE") == 2
+
+
+def test_second_run_skips_loaded_days_without_fetching(client, monkeypatch):
+    days = [START + timedelta(days=offset) for offset in range(6)]
+    client.create_table(GSOD_2023, [
+        ("date", "DATE"), ("wban", "STRING"), ("temp", "FLOAT64"), ("dewp", "FLOAT64"),
+        ("slp", "FLOAT64"), ("wdsp", "FLOAT64"), ("prcp", "FLOAT64"), ("max", "FLOAT64"), ("min", "FLOAT64"),
+    ])
+    # NOAA tiene los primeros 4 días; los 2 últimos pasan por el fallback de API
+    client.insert(GSOD_2023, [
+        {"date": day.date(), "wban": main.NOAA_STATION_WBAN, "temp": 70.0, "dewp": 50.0, "slp": 1015.0,
+         "wdsp": 6.0, "prcp": 0.0, "max": 80.0, "min": 60.0}
+        for day in days[:4]
+    ])
+    api_calls = []
+
+    def fake_range_api(start, end):
+        api_calls.append((start, end))
+        return [
+            weather_row(datetime.combine(start, datetime.min.time()) + timedelta(days=offset), 18.0)
+            for offset in range((end - start).days + 1)
+        ]
+
+    monkeypatch.setattr(main, "get_weather_data_range_from_api", fake_range_api)
+
+    summary = main.ingest_dates(client, days, bulk=True, writer=main.WeatherRowWriter(client, upsert=True))
+    assert summary["inserted_days"] == 6
+    assert api_calls == [(days[4].date(), days[5].date())]
+    assert sum(GSOD_2023 in sql for kind, sql in client.jobs if kind == "query") == 1
+    assert client.count("query", "MERGE") == 1
+
+    # Corrida siguiente (run_ingestion descarta los conteos de la anterior)
+    main.reset_completeness()
+    client.jobs.clear()
+    api_calls.clear()
+    summary = main.ingest_dates(client, days, bulk=True, writer=main.WeatherRowWriter(client, upsert=True))
+
+    assert summary["skipped_days"] == 6
+    assert summary["inserted_days"] == 0
+    assert api_calls == []
+    assert not any(GSOD_2023 in sql for kind, sql in client.jobs if kind == "query")
+    assert client.count("query", "MERGE") == 0
+    assert len(client.rows(TARGET)) == 6
@@ -0,0 +1,136 @@
+"""
+WeatherRowWriter sin upsert: streaming insert en lotes de chunk_size con los errores
+por fila mapeados a su fecha, y el cambio a un load job NDJSON desde load_threshold.
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+
+import main  # noqa: E402
+
+START = date(2023, 6, 1)
+
+
+def weather_row(day):
+    return {"date": day.isoformat(), "temperature": 20.0, "weather_condition": "Clear"}
+
+
+class FailedLoad(Exception):
+    errors = [{"reason": "invalid", "message": "Could not parse 'x' as FLOAT"}]
+
+
+class FakeLoadJob:
+    def __init__(self, error=None):
+        self.error = error
+
+    def result(self):
+        if self.error:
+            raise self.error
+
+
+class FakeClient:
+    """
+    BigQuery falso: insert_rows_json devuelve errores de BigQuery (índice dentro del
+    lote) para las fechas de reject; raise_on_chunk hace fallar un lote completo.
+    """
+
+    def __init__(self, reject=(), raise_on_chunk=None, load_error=None):
+        self.reject = set(reject)
+        self.raise_on_chunk = raise_on_chunk
+        self.load_error = load_error
+        self.chunks = []
+        self.loads = []
+
+    def dataset(self, dataset_id):
+        return main.bigquery.DatasetReference("test-project", dataset_id)
+
+    def insert_rows_json(self, table, rows):
+        self.chunks.append([row["date"] for row in rows])
+        if len(self.chunks) - 1 == self.raise_on_chunk:
+            raise RuntimeError("503 backend error")
+        return [
+            {"index": index, "errors": [{"reason": "invalid", "message": f"fila {row['date']}"}]}
+            for index, row in enumerate(rows)
+            if row["date"] in self.reject
+        ]
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        self.loads.append((destination, file_obj.read(), job_config))
+        return FakeLoadJob(self.load_error)
+
+
+def write(client, days, **kwargs):
+    writer = main.WeatherRowWriter(client, upsert=False, **kwargs)
+    for day in days:
+        writer.add(weather_row(day))
+    return writer, writer.flush()
+
+
+DAYS = [START + timedelta(days=offset) for offset in range(7)]
+
+
+def test_stream_chunks_and_maps_error_index_to_date():
+    # Un error en el primer lote (índice 1) y otro en el último (índice 0)
+    client = FakeClient(reject={"2023-06-02", "2023-06-07"})
+    writer, result = write(client, DAYS, chunk_size=3, load_threshold=50)
+
+    assert client.chunks == [
+        ["2023-06-01", "2023-06-02", "2023-06-03"],
+        ["2023-06-04", "2023-06-05", "2023-06-06"],
+        ["2023-06-07"],
+    ]
+    assert client.loads == []
+    assert result == {"written": 5, "failed": 2}
+    assert [error["date"] for error in writer.row_errors] == ["2023-06-02", "2023-06-07"]
+    assert writer.row_errors[0]["errors"] == [{"reason": "invalid", "message": "fila 2023-06-02"}]
+    assert writer.written_rows == 5
+
+
+def test_stream_chunk_exception_fails_only_that_chunk():
+    client = FakeClient(raise_on_chunk=1)
+    writer, result = write(client, DAYS, chunk_size=3, load_threshold=50)
+
+    assert len(client.chunks) == 3
+    assert result == {"written": 4, "failed": 3}
+    assert [error["date"] for error in writer.row_errors] == ["2023-06-04", "2023-06-05", "2023-06-06"]
+    assert writer.row_errors[0]["errors"] == ["503 backend error"]
+
+
+def test_load_threshold_switches_to_ndjson_load_job():
+    # Una fila menos que el umbral: streaming
+    client = FakeClient()
+    write(client, DAYS[:6], chunk_size=3, load_threshold=7)
+    assert len(client.chunks) == 2
+    assert client.loads == []
+
+    # En el umbral: un solo load job con todas las filas, sin streaming
+    client = FakeClient()
+    writer, result = write(client, DAYS, chunk_size=3, load_threshold=7)
+    assert client.chunks == []
+    [(destination, payload, job_config)] = client.loads
+    assert destination.table_id == main.TABLE_ID
+    assert [json.loads(line)["date"] for line in payload.decode().splitlines()] == [day.isoformat() for day in DAYS]
+    assert job_config.source_format == "NEWLINE_DELIMITED_JSON"
+    assert job_config.write_disposition == "WRITE_APPEND"
+    assert result == {"written": 7, "failed": 0}
+
+
+def test_failed_load_job_fails_every_row():
+    client = FakeClient(load_error=FailedLoad("load failed"))
+    writer, result = write(client, DAYS, load_threshold=7)
+
+    assert result == {"written": 0, "failed": 7}
+    assert {error["date"] for error in writer.row_errors} == {day.isoformat() for day in DAYS}
+    assert writer.row_errors[0]["errors"] == FailedLoad.errors
+
+
+def test_zero_threshold_always_streams():
+    client = FakeClient()
+    write(client, DAYS, chunk_size=500, load_threshold=0)
+
+    assert client.chunks == [[day.isoformat() for day in DAYS]]
+    assert client.loads == []
@@ -0,0 +1,105 @@
+"""
+Servidor HTTP local con el formato del endpoint timeline de Visual Crossing.
+
+Como los de scripts/benchmark_fetch_concurrency.py y scripts/benchmark_api_fallback.py:
+responde por día (?date=...) o por rango (/timeline/{lat},{lon}/{inicio}/{fin}) con
+una latencia fija y en chunks (Transfer-Encoding: chunked). Cuenta los requests, los
+guarda (fecha o rango pedido) y registra el máximo de requests simultáneos.
+"""
+
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_api_day(day: date) -> dict:
+    """Día determinístico con el formato de "days" de Visual Crossing."""
+    return {
+        "datetime": day.isoformat(),
+        "tempmax": round(10.0 + (day.toordinal() % 30) * 0.37, 1),
+        "tempmin": -2.5,
+        "humidity": 60.0 + day.toordinal() % 20,
+        "windspeed": 14.2,
+        "precip": (day.toordinal() % 4) * 0.8,
+        "conditions": "Rain, Partially cloudy" if day.toordinal() % 4 else "Clear",
+        "hours": None,
+    }
+
+
+class TimelineStub:
+    """
+    Args:
+        latency_s: Latencia artificial de cada request
+        chunk_bytes: Tamaño de los chunks HTTP (chico para cortar los días)
+        missing_days: Días que el stub omite de sus respuestas
+    """
+
+    def __init__(self, latency_s: float = 0.0, chunk_bytes: int = 256, missing_days=()):
+        self.latency_s = latency_s
+        self.chunk_bytes = chunk_bytes
+        self.missing_days = set(missing_days)
+        self.requests: List[Tuple[date, date]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/timeline"
+
+    def __enter__(self) -> "TimelineStub":
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                segments = [s for s in url.path.split("/") if s]
+                if len(segments) >= 4:
+                    start, end = date.fromisoformat(segments[-2]), date.fromisoformat(segments[-1])
+                else:
+                    start = end = date.fromisoformat(parse_qs(url.query)["date"][0])
+                with stub._lock:
+                    stub.requests.append((start, end))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.latency_s)
+                    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+                    payload = json.dumps({
+                        "queryCost": len(days),
+                        "resolvedAddress": "Chicago, IL, United States",
+                        "days": [fake_api_day(day) for day in days if day not in stub.missing_days],
+                        "stations": {"KMDW": {"distance": 14000.0}},
+                    }, indent=1).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for offset in range(0, len(payload), stub.chunk_bytes):
+                        chunk = payload[offset:offset + stub.chunk_bytes]
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler